@@ -0,0 +1,170 @@
+"""
+Measure the AFK scheduler with a million recurring tasks in one process.
+
+`--tasks` AFK tasks are scheduled with intervals spread uniformly between
+`--min-interval` and `--max-interval` seconds, on a simulated clock. The
+benchmark reports:
+
+- scheduling: tasks inserted per second and memory per task;
+- throughput: the simulated clock is advanced one resolution step at a
+  time for `--simulate` seconds, so every task run is fired exactly as in
+  production but without waiting; runs fired per CPU second and the cost
+  of one tick;
+- Pause All / Start All cost per user;
+- restart: rebuilding the whole schedule from the persisted documents;
+- live lag: `--live-tasks` tasks due over the next seconds on the real
+  clock, run by the scheduler's own loop for `--live` seconds, reporting
+  scheduling lag and the largest queue depth seen.
+
+For comparison, memory per task of `--baseline-tasks` asyncio tasks each
+sleeping until their next run, the naive one-task-per-config design, is
+measured too.
+
+Usage:
+    python -m benchmarks.bench_afk_scheduler --tasks 1000000 --simulate 300
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import tracemalloc
+
+from services.afk_scheduler import AfkScheduler
+from benchmarks.fakes import MemoryCollection
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class SimulatedClock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+async def noop(tasks):
+    pass
+
+
+async def schedule(scheduler, count, args, rng, now):
+    for number in range(count):
+        interval = rng.uniform(args.min_interval, args.max_interval)
+        await scheduler.add_task(number % args.users, "mint", 0.1, interval, start=now + rng.uniform(0, interval))
+
+
+async def memory_per_task(count, args):
+    rng = random.Random(1)
+    clock = SimulatedClock()
+    tracemalloc.start()
+    scheduler = AfkScheduler(noop, clock=clock)
+    await schedule(scheduler, count, args, rng, clock.now)
+    wheel = tracemalloc.get_traced_memory()[0] / count
+    tracemalloc.stop()
+
+    async def sleeper(interval):
+        while True:
+            await asyncio.sleep(interval)
+
+    tracemalloc.start()
+    sleepers = [asyncio.create_task(sleeper(rng.uniform(args.min_interval, args.max_interval))) for _ in range(count)]
+    await asyncio.sleep(0)
+    naive = tracemalloc.get_traced_memory()[0] / count
+    tracemalloc.stop()
+    for sleeper_task in sleepers:
+        sleeper_task.cancel()
+    await asyncio.gather(*sleepers, return_exceptions=True)
+    print(f"memory per task ({count} tasks): timer wheel {wheel:.0f} B, one asyncio task each {naive:.0f} B")
+
+
+async def simulate(args):
+    rng = random.Random(2)
+    clock = SimulatedClock()
+    scheduler = AfkScheduler(noop, resolution=args.resolution, clock=clock)
+
+    started = time.perf_counter()
+    await schedule(scheduler, args.tasks, args, rng, clock.now)
+    elapsed = time.perf_counter() - started
+    print(f"scheduled {len(scheduler)} tasks in {elapsed:.1f}s ({len(scheduler) / elapsed:,.0f} tasks/s)")
+
+    tick_costs = []
+    cpu = time.process_time()
+    for _ in range(int(args.simulate / args.resolution)):
+        clock.now += args.resolution
+        started = time.perf_counter()
+        scheduler.advance()
+        tick_costs.append(time.perf_counter() - started)
+        await scheduler.drain()
+    cpu = time.process_time() - cpu
+    stats = scheduler.stats()
+    print(
+        f"simulated {args.simulate:.0f}s: {stats['fired']:,} runs in {stats['batches']:,} batches, "
+        f"{stats['fired'] / cpu:,.0f} runs per CPU second; tick p50={statistics.median(tick_costs) * 1000:.2f}ms "
+        f"p99={percentile(tick_costs, 0.99) * 1000:.2f}ms"
+    )
+
+    started = time.perf_counter()
+    for user_id in range(args.users):
+        await scheduler.pause_all(user_id)
+    for user_id in range(args.users):
+        await scheduler.start_all(user_id)
+    print(f"pause/start all: {(time.perf_counter() - started) / (2 * args.users) * 1e6:.2f}µs per toggle")
+
+    collection = MemoryCollection(key="task_id")
+    for user_id in range(args.users):
+        for task in scheduler.user_tasks(user_id):
+            collection.insert_one(task.to_document())
+    restarted = AfkScheduler(noop, collection=collection, resolution=args.resolution, clock=clock)
+    started = time.perf_counter()
+    await restarted.load()
+    print(f"rebuilt {len(restarted):,} tasks from storage in {time.perf_counter() - started:.1f}s")
+
+
+async def live(args):
+    rng = random.Random(3)
+    depths = []
+
+    async def execute(tasks):
+        depths.append(scheduler.pending)
+        await asyncio.sleep(0.01)
+
+    scheduler = AfkScheduler(execute, resolution=args.resolution)
+    now = time.time()
+    for number in range(args.live_tasks):
+        interval = rng.uniform(1.0, 5.0)
+        await scheduler.add_task(number, "mint", 0.1, interval, start=now + rng.uniform(0, interval))
+    await scheduler.start()
+    await asyncio.sleep(args.live)
+    await scheduler.stop()
+    await scheduler.drain()
+    stats = scheduler.stats()
+    print(
+        f"live {args.live:.0f}s with {args.live_tasks:,} tasks: {stats['fired']:,} runs, lag p50={stats['lag_p50'] * 1000:.0f}ms "
+        f"p99={stats['lag_p99'] * 1000:.0f}ms max={stats['lag_max'] * 1000:.0f}ms, max depth={max(depths, default=0)}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--min-interval", type=float, default=60.0)
+    parser.add_argument("--max-interval", type=float, default=900.0)
+    parser.add_argument("--resolution", type=float, default=0.1)
+    parser.add_argument("--simulate", type=float, default=300.0, help="simulated seconds")
+    parser.add_argument("--live", type=float, default=10.0, help="real seconds of the live run")
+    parser.add_argument("--live-tasks", type=int, default=20_000)
+    parser.add_argument("--baseline-tasks", type=int, default=100_000)
+    args = parser.parse_args()
+
+    asyncio.run(memory_per_task(args.baseline_tasks, args))
+    asyncio.run(simulate(args))
+    asyncio.run(live(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Load-test every dashboard through the real `Application` built by `main.py`.
+
+`main.build_application` is called with an in-memory MongoDB
+(`MemoryDatabase`) and `FakeBotApi` as the Bot API backend, and the
+Solana RPC and price feeds point at local stubs, so nothing leaves the
+machine. Outbound send shaping is lifted by default (`--send-global-rate`,
+`--send-chat-rate`) so the dashboard code, not Telegram's flood limits,
+is measured.
+
+`--users` simulated users first send `/start`, then walk through the
+scenario of every dashboard: each step is a wave of one update per user
+fed to `Application.process_update` with at most `--concurrency` updates
+in flight. Per dashboard the benchmark reports:
+
+- throughput: interactions per second;
+- p50/p99 handler latency, from update received to handler done;
+- outbound Bot API calls per interaction, by method.
+
+A second pass with `--memory-users` fresh users runs under `tracemalloc`
+and reports the memory retained per active user. `--output` writes every
+result as JSON; `--baseline` compares the run with an earlier JSON file
+and prints the changes, so regressions show up between versions.
+
+Usage:
+    python -m benchmarks.bench_application --users 2000 --output bench.json
+    python -m benchmarks.bench_application --users 2000 --baseline bench.json
+"""
+import argparse
+import asyncio
+import gc
+import importlib
+import json
+import os
+import statistics
+import time
+import tracemalloc
+
+from telegram import Update
+
+from benchmarks.fake_price_server import FakePriceServer
+from benchmarks.fake_telegram import FakeBotApi, make_callback_update, make_command_update
+from benchmarks.fakes import MemoryDatabase
+from benchmarks.stub_rpc import StubRpcServer
+
+# The updates each simulated user sends per dashboard, in order.
+SCENARIOS = {
+    "main": ["/start", "main:refresh"],
+    "position": ["position:show", "position:refresh"],
+    "lpsniper": ["lpsniper:show", "lpsniper:refresh"],
+    "trade": ["trade:show", "trade:refresh"],
+    "afk": ["afk:show", "afk:refresh"],
+    "withdraw": ["withdraw:show", "withdraw:refresh"],
+    "setting": ["setting:show", "setting:degen_mode", "setting:feesetting", "setting:mev_protect"],
+}
+
+# Calls the Application makes for itself rather than for an interaction.
+SETUP_METHODS = ("getMe", "getUpdates", "deleteWebhook")
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Simulation:
+    """Feeds synthetic updates from many users into one `Application`."""
+
+    def __init__(self, application, api, concurrency):
+        self.application = application
+        self.api = api
+        self.limit = asyncio.Semaphore(concurrency)
+        self.next_update_id = 1
+
+    def make_update(self, user_id, step):
+        self.next_update_id += 1
+        if step.startswith("/"):
+            raw = make_command_update(self.next_update_id, user_id, step)
+        else:
+            # Buttons are pressed on the dashboard message the bot last sent to the user.
+            raw = make_callback_update(self.next_update_id, user_id, step, self.api.message_ids.get(user_id, 1))
+        return Update.de_json(raw, self.application.bot)
+
+    async def send(self, user_id, step, latencies):
+        update = self.make_update(user_id, step)
+        async with self.limit:
+            started = time.perf_counter()
+            await self.application.process_update(update)
+            latencies.append(time.perf_counter() - started)
+
+    def interaction_calls(self):
+        return {method: count for method, count in self.api.calls.items() if method not in SETUP_METHODS}
+
+    async def run(self, name, user_ids):
+        """Run one dashboard's scenario for every user and return its results."""
+        self.api.reset_calls()
+        latencies = []
+        started = time.perf_counter()
+        for step in SCENARIOS[name]:
+            await asyncio.gather(*(self.send(user_id, step, latencies) for user_id in user_ids))
+        elapsed = time.perf_counter() - started
+        calls = self.interaction_calls()
+        return {
+            "interactions": len(latencies),
+            "throughput": len(latencies) / elapsed,
+            "p50_ms": statistics.median(latencies) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "api_calls_per_interaction": sum(calls.values()) / len(latencies),
+            "api_calls": calls,
+        }
+
+
+async def measure_memory(simulation, user_ids):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for name in SCENARIOS:
+        await simulation.run(name, user_ids)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / len(user_ids)
+
+
+def configure(args, rpc_url, price_spec):
+    """Point `config` at the local stubs; must run before `main` is imported."""
+    os.environ.update({
+        "TELEGRAM_BOT_TOKEN": "1:bench",
+        "SOLANA_RPC_URL": rpc_url,
+        "TRADE_NODES": rpc_url,
+        "PRICE_SOURCES": price_spec,
+        "SESSION_BACKEND": args.session_backend,
+        "SEND_GLOBAL_RATE": str(args.send_global_rate),
+        "SEND_CHAT_RATE": str(args.send_chat_rate),
+        "SEND_CHAT_BURST": str(args.send_chat_burst),
+        "METRICS_ENABLED": "false",
+        "SNIPER_ENABLED": "false",
+        "COPY_TRADE_ENABLED": "false",
+        "TRADE_EXECUTION_ENABLED": "false",
+    })
+
+
+def compare(results, baseline):
+    print("\nchange against baseline:")
+    for name, result in results["dashboards"].items():
+        before = baseline.get("dashboards", {}).get(name)
+        if before is None:
+            print(f"  {name:9} new")
+            continue
+        changes = [
+            f"{field}={(result[field] / before[field] - 1) * 100:+.0f}%"
+            for field in ("throughput", "p50_ms", "p99_ms", "api_calls_per_interaction")
+            if before[field]
+        ]
+        print(f"  {name:9} " + " ".join(changes))
+    if baseline.get("memory_per_user"):
+        change = results["memory_per_user"] / baseline["memory_per_user"] - 1
+        print(f"  memory per user {change * 100:+.0f}%")
+
+
+async def main_async(args):
+    rpc = StubRpcServer(latency=args.rpc_latency)
+    prices = FakePriceServer(latency=args.rpc_latency, seed=7)
+    await rpc.start()
+    await prices.start()
+    configure(args, rpc.url, prices.source_spec("coingecko"))
+    main = importlib.import_module("main")
+
+    api = FakeBotApi(latency=args.api_latency)
+    application = main.build_application(database=MemoryDatabase(), request=api.request())
+    await application.initialize()
+    await application.post_init(application)
+    await application.start()
+
+    simulation = Simulation(application, api, args.concurrency)
+    results = {
+        "users": args.users,
+        "concurrency": args.concurrency,
+        "session_backend": args.session_backend,
+        "api_latency": args.api_latency,
+        "rpc_latency": args.rpc_latency,
+        "dashboards": {},
+    }
+    user_ids = range(1000, 1000 + args.users)
+    print(f"{args.users} users, {args.concurrency} updates in flight, sessions in {args.session_backend}")
+    for name in SCENARIOS:
+        result = results["dashboards"][name] = await simulation.run(name, user_ids)
+        print(
+            f"{name:9} {result['throughput']:7.0f} interactions/s  p50={result['p50_ms']:6.1f}ms "
+            f"p99={result['p99_ms']:6.1f}ms  {result['api_calls_per_interaction']:.2f} API calls per interaction "
+            f"{result['api_calls']}"
+        )
+
+    memory_user_ids = range(user_ids.stop, user_ids.stop + args.memory_users)
+    results["memory_per_user"] = await measure_memory(simulation, memory_user_ids)
+    print(f"memory:   {results['memory_per_user'] / 1024:.1f} KiB retained per active user")
+
+    await application.stop()
+    await application.post_shutdown(application)
+    await application.shutdown()
+    await prices.stop()
+    await rpc.stop()
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            compare(results, json.load(file))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"results written to {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--memory-users", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--session-backend", choices=("chat_data", "memory", "mongo"), default="chat_data")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="simulated Bot API round trip in seconds")
+    parser.add_argument("--rpc-latency", type=float, default=0.0, help="simulated RPC and price feed round trip")
+    parser.add_argument("--send-global-rate", type=float, default=1e9)
+    parser.add_argument("--send-chat-rate", type=float, default=1e9)
+    parser.add_argument("--send-chat-burst", type=int, default=1000000)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with the results of an earlier run")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Measure the RPC cost of a dashboard refresh storm.
+
+`--users` wallets each refresh their balance `--presses` times, in waves
+spread over `--duration` seconds, against a local stub JSON-RPC node that
+adds `--latency` seconds per call. The naive strategy issues one
+`getBalance` per refresh, as a dashboard calling the node directly would;
+the service strategy goes through `BalanceService` (TTL cache, shared
+in-flight fetches and batched `getMultipleAccounts`).
+
+Usage:
+    python -m benchmarks.bench_balance_service --users 500 --presses 5 --latency 0.05
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import httpx
+from solders.keypair import Keypair
+
+from benchmarks.stub_rpc import StubRpcServer
+from services.balance_service import BalanceService
+from services.solana_rpc import SolanaRpcClient
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def storm(lookup, pubkeys, presses, duration):
+    latencies = []
+
+    async def press(pubkey, delay):
+        await asyncio.sleep(delay)
+        started = time.perf_counter()
+        await lookup(pubkey)
+        latencies.append(time.perf_counter() - started)
+
+    rng = random.Random(7)
+    await asyncio.gather(*(
+        press(pubkey, rng.uniform(0, duration))
+        for pubkey in pubkeys
+        for _ in range(presses)
+    ))
+    return latencies
+
+
+async def run(strategy, args, pubkeys):
+    server = StubRpcServer({pubkey: 1_000_000 * (n + 1) for n, pubkey in enumerate(pubkeys)}, latency=args.latency)
+    await server.start()
+    limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+    rpc = SolanaRpcClient(server.url, client=httpx.AsyncClient(timeout=None, limits=limits))
+
+    if strategy == "naive":
+        async def lookup(pubkey):
+            return (await rpc.call("getBalance", [pubkey]))["value"]
+        service = None
+    else:
+        service = BalanceService(rpc, ttl=args.ttl, batch_window=args.window)
+        lookup = service.get_lamports
+
+    started = time.perf_counter()
+    latencies = await storm(lookup, pubkeys, args.presses, args.duration)
+    elapsed = time.perf_counter() - started
+    await rpc.close()
+    await server.stop()
+
+    line = (
+        f"{strategy:>7}: lookups={len(latencies)} elapsed={elapsed:.2f}s rpc_calls={sum(server.calls.values())} "
+        f"p50={statistics.median(latencies) * 1000:.1f}ms p99={percentile(latencies, 0.99) * 1000:.1f}ms"
+    )
+    if service is not None:
+        stats = service.stats()
+        line += (
+            f" hit_rate={stats['cache_hit_rate']:.1%} shared={stats['shared_lookups']}"
+            f" avg_batch={stats['average_batch_size']:.1f} max_batch={max(service.batch_sizes)}"
+        )
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--presses", type=int, default=5, help="refreshes per user")
+    parser.add_argument("--duration", type=float, default=2.0, help="seconds the storm is spread over")
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated RPC round trip in seconds")
+    parser.add_argument("--connections", type=int, default=50, help="HTTP connections to the RPC node")
+    parser.add_argument("--ttl", type=float, default=3.0)
+    parser.add_argument("--window", type=float, default=0.005, help="batch collection window in seconds")
+    args = parser.parse_args()
+
+    pubkeys = [str(Keypair().pubkey()) for _ in range(args.users)]
+    for strategy in ("naive", "service"):
+        asyncio.run(run(strategy, args, pubkeys))
+
+
+if __name__ == "__main__":
+    main()
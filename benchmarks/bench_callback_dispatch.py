@@ -0,0 +1,107 @@
+"""
+Microbenchmark of callback query dispatch cost.
+
+Compares the original chain of 13 regex `CallbackQueryHandler`s, which
+python-telegram-bot walks in order until one matches, against the single
+`CallbackQueryHandler` backed by `CallbackRouter`. Only the routing step is
+timed; no handler is awaited.
+
+Usage:
+    python -m benchmarks.bench_callback_dispatch --iterations 200000
+"""
+import argparse
+import timeit
+
+from telegram import CallbackQuery, Update, User
+from telegram.ext import CallbackQueryHandler
+
+from dashboards.afk_dashboard import AfkDashboard
+from dashboards.lpsniper_dashboard import LpSniperDashboard
+from dashboards.main_dashboard import MainDashboard
+from dashboards.position_dashboard import PositionDashboard
+from dashboards.router import CallbackRouter
+from dashboards.setting_dashboard import SettingDashboard
+from dashboards.trade_dashboard import TradeDashboard
+from dashboards.withdraw_dashboard import WithdrawDashboard
+
+
+async def noop(update, context):
+    pass
+
+
+# The handler chain as it was registered in main.py before the router existed.
+LEGACY_PATTERNS = [
+    "main",
+    "afk_mode",
+    "afk_mode|back_to_main|refresh",
+    "positions",
+    "back_to_main|refresh",
+    "copy_trade",
+    "back_to_main|refresh",
+    "withdraw",
+    "back_to_main|refresh",
+    "settings",
+    "back_to_main|refresh",
+    "lp_sniper",
+    "back_to_main|refresh",
+]
+
+# (legacy callback_data, routed callback_data) pairs for the same button.
+BUTTONS = [
+    ("positions", "position:show"),
+    ("lp_sniper", "lpsniper:show"),
+    ("settings", "setting:show"),
+    ("refresh", "setting:refresh"),
+    ("back_to_main", "withdraw:back"),
+    ("min_val", "position:min_val"),
+]
+
+
+def make_update(data):
+    user = User(id=1, first_name="bench", is_bot=False)
+    return Update(update_id=1, callback_query=CallbackQuery(id="1", from_user=user, chat_instance="1", data=data))
+
+
+def legacy_dispatch(handlers, update):
+    for handler in handlers:
+        check = handler.check_update(update)
+        if check is not None and check is not False:
+            return handler
+    return None
+
+
+def routed_dispatch(handler, router, update):
+    if handler.check_update(update):
+        return router.resolve(update.callback_query.data)
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200000)
+    args = parser.parse_args()
+
+    main_dashboard = MainDashboard(None, None)
+    router = CallbackRouter([
+        main_dashboard,
+        AfkDashboard(None, None, main_dashboard),
+        PositionDashboard(None, None, main_dashboard),
+        TradeDashboard(None, None, main_dashboard),
+        WithdrawDashboard(None, None, main_dashboard),
+        SettingDashboard(None, None, main_dashboard),
+        LpSniperDashboard(None, None, main_dashboard),
+    ])
+    legacy_handlers = [CallbackQueryHandler(noop, pattern=pattern) for pattern in LEGACY_PATTERNS]
+    routed_handler = CallbackQueryHandler(router.dispatch)
+
+    print(f"{'button':<18}{'legacy ns':>12}{'router ns':>12}")
+    for legacy_data, routed_data in BUTTONS:
+        legacy_update = make_update(legacy_data)
+        routed_update = make_update(routed_data)
+        legacy = timeit.timeit(lambda: legacy_dispatch(legacy_handlers, legacy_update), number=args.iterations)
+        routed = timeit.timeit(lambda: routed_dispatch(routed_handler, router, routed_update), number=args.iterations)
+        print(f"{routed_data:<18}{legacy / args.iterations * 1e9:>12.0f}{routed / args.iterations * 1e9:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Simulate copy-trade fan-out with thousands of followers per leader.
+
+`--leaders` leader wallets are each copied by `--followers` configs. A
+replay of `--trades` leader trades, arriving `--rate` per second, is fed to
+`CopyTradeEngine`; every follower order takes `--order-latency` seconds, as
+a swap submission would. The run is repeated for each `--concurrency` value
+and reports:
+
+- feed subscriptions (one per leader, however many followers);
+- dispatch latency: trade received -> a follower's order starts;
+- fan-out time: trade received -> the last follower's order completes;
+- the cost of Pause All / Start All and of a config change reaching the
+  very next trade.
+
+Usage:
+    python -m benchmarks.bench_copy_trade --leaders 10 --followers 2000 --concurrency 64 256 1024
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from solders.pubkey import Pubkey
+
+from services.copy_trade import CopyTradeEngine
+from services.leader_feed import LeaderTrade
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def make_wallet(number):
+    return str(Pubkey(number.to_bytes(32, "big")))
+
+
+class CountingFeed:
+    def __init__(self):
+        self.subscribed = set()
+        self.calls = 0
+
+    async def subscribe(self, leader):
+        self.calls += 1
+        self.subscribed.add(leader)
+
+    async def unsubscribe(self, leader):
+        self.calls += 1
+        self.subscribed.discard(leader)
+
+
+async def run(concurrency, args):
+    pending = {}
+    fanout = []
+
+    async def execute(config, trade):
+        await asyncio.sleep(args.order_latency)
+        state = pending[trade.signature]
+        state[0] -= 1
+        if state[0] == 0:
+            fanout.append(time.perf_counter() - trade.received_at)
+
+    feed = CountingFeed()
+    engine = CopyTradeEngine(execute, feed=feed, max_concurrency=concurrency)
+    leaders = [make_wallet(1 + n) for n in range(args.leaders)]
+    rng = random.Random(5)
+    users = args.leaders * args.followers // 2
+    for leader in leaders:
+        for user_id in rng.sample(range(users), args.followers):
+            await engine.add_config(user_id, leader, 0.1)
+
+    for number in range(args.trades):
+        leader = rng.choice(leaders)
+        trade = LeaderTrade(leader, make_wallet(10_000 + number), "buy", 1000.0, 1.0, signature=f"sig{number}")
+        pending[trade.signature] = [args.followers]
+        engine.on_trade(trade)
+        await asyncio.sleep(1 / args.rate)
+    await engine.drain()
+    stats = engine.stats()
+
+    dispatch = list(engine.dispatch_latencies)
+    print(
+        f"concurrency={concurrency:>5}: subscriptions={len(feed.subscribed)} (calls={feed.calls}) "
+        f"copies={stats['copies']} dispatch p50={statistics.median(dispatch) * 1000:.1f}ms "
+        f"p99={percentile(dispatch, 0.99) * 1000:.1f}ms fan-out p50={statistics.median(fanout) * 1000:.0f}ms "
+        f"p99={percentile(fanout, 0.99) * 1000:.0f}ms"
+    )
+    return engine, users
+
+
+async def controls(engine, users, args):
+    started = time.perf_counter()
+    for user_id in range(users):
+        await engine.pause_all(user_id)
+    for user_id in range(users):
+        await engine.start_all(user_id)
+    per_toggle = (time.perf_counter() - started) / (2 * users)
+
+    executed = []
+    engine.execute = lambda config, trade: asyncio.sleep(0, executed.append(config.user_id))
+    leader = make_wallet(1)
+    started = time.perf_counter()
+    config = await engine.add_config(10**9, leader, 0.1)
+    engine.on_trade(LeaderTrade(leader, make_wallet(99), "buy", 1.0, 1.0, signature="after-change"))
+    await engine.drain()
+    applied = time.perf_counter() - started
+    print(
+        f"pause/start all: {per_toggle * 1e6:.2f}µs per toggle; new config copied on the next trade: "
+        f"{config.user_id in executed} ({applied * 1000:.1f}ms including a {args.followers + 1}-follower fan-out)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--leaders", type=int, default=10)
+    parser.add_argument("--followers", type=int, default=2000, help="configs copying each leader")
+    parser.add_argument("--trades", type=int, default=20)
+    parser.add_argument("--rate", type=float, default=2.0, help="leader trades per second")
+    parser.add_argument("--order-latency", type=float, default=0.05, help="seconds per follower order")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[64, 256, 1024])
+    args = parser.parse_args()
+
+    async def run_all():
+        for concurrency in args.concurrency:
+            engine, users = await run(concurrency, args)
+        await controls(engine, users, args)
+
+    asyncio.run(run_all())
+
+
+if __name__ == "__main__":
+    main()
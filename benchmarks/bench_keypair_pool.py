@@ -0,0 +1,82 @@
+"""
+Benchmark `/start` latency for a burst of new users.
+
+Every simulated user hits `WalletStore.get_wallet` for the first time, which
+is exactly what `MainDashboard.show` does on `/start`. The run is repeated
+with wallets generated inline and with a pre-warmed `KeypairPool`.
+
+Usage:
+    python -m benchmarks.bench_keypair_pool --users 5000 --window 1.0
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.fakes import MemoryCollection
+from services.keypair_pool import KeypairPool
+from services.wallet_store import WalletStore
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def simulate_burst(store, users, window):
+    latencies = []
+    start = time.perf_counter()
+
+    async def start_command(user_id, delay):
+        await asyncio.sleep(delay)
+        arrived = time.perf_counter()
+        await store.public_key(user_id)
+        latencies.append(time.perf_counter() - arrived)
+
+    await asyncio.gather(*(start_command(user_id, random.uniform(0, window)) for user_id in range(users)))
+    return latencies, time.perf_counter() - start
+
+
+async def run(mode, users, window, workers, reserve):
+    pool = None
+    executor = None
+    if mode == "pool":
+        executor = ProcessPoolExecutor(max_workers=workers)
+        pool = KeypairPool(reserve=reserve, batch_size=max(1, reserve // (workers * 4)), executor=executor)
+        await pool.start()
+
+    store = WalletStore(MemoryCollection(), cache_size=users, keypair_pool=pool)
+    latencies, elapsed = await simulate_burst(store, users, window)
+
+    inline = users
+    if pool is not None:
+        inline = pool.generated_inline
+        await pool.stop()
+        executor.shutdown()
+
+    print(
+        f"{mode:>6}: users={users} elapsed={elapsed:.3f}s "
+        f"p50={statistics.median(latencies) * 1000:.2f}ms "
+        f"p99={percentile(latencies, 0.99) * 1000:.2f}ms "
+        f"max={max(latencies) * 1000:.2f}ms "
+        f"generated_inline={inline}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=5000, help="number of /start commands in the burst")
+    parser.add_argument("--window", type=float, default=0.0, help="seconds over which the burst arrives")
+    parser.add_argument("--workers", type=int, default=2, help="process pool size for the keypair pool")
+    parser.add_argument("--reserve", type=int, default=None, help="pool reserve (defaults to twice the burst size)")
+    args = parser.parse_args()
+    reserve = args.reserve or args.users * 2
+
+    for mode in ("inline", "pool"):
+        asyncio.run(run(mode, args.users, args.window, args.workers, reserve))
+
+
+if __name__ == "__main__":
+    main()
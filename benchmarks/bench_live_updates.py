@@ -0,0 +1,202 @@
+"""
+Compare refresh polling with pushed live updates through the real `Application`.
+
+`--users` simulated users open a dashboard: `--position-share` of them the
+positions page (all holding one token whose price ticks `--tick-rate`
+times a second), the others the main page (whose wallet balance changes
+`--balance-rate` times a second across all users). For `--duration`
+seconds:
+
+- poll: live updates off; every user presses ♻️Refresh every
+  `--poll-interval` seconds, as an auto-refresh by polling would;
+- push: users turned Auto Refresh on in Settings; nobody presses anything,
+  and `LiveUpdates` edits the messages whose data changed.
+
+Per mode the benchmark reports the `editMessageText` calls and all Bot API
+calls made during the run, and staleness: how long after a change the
+user's message was next edited (changes never shown count as `missed`).
+The Bot API is `FakeBotApi`, the RPC node and price feed local stubs.
+
+Usage:
+    python -m benchmarks.bench_live_updates --users 300 --duration 10
+"""
+import argparse
+import asyncio
+import bisect
+import importlib
+import random
+import statistics
+import time
+
+from telegram.ext import CallbackQueryHandler
+
+from benchmarks.bench_application import SETUP_METHODS, Simulation, configure, percentile
+from benchmarks.fake_price_server import FakePriceServer
+from benchmarks.fake_telegram import FakeBotApi
+from benchmarks.fakes import MemoryDatabase
+from benchmarks.stub_rpc import StubRpcServer
+
+TOKEN_MINT = "So11111111111111111111111111111111111111112"
+
+
+def find_router(application):
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            if isinstance(handler, CallbackQueryHandler):
+                return handler.callback.__self__
+    raise LookupError("no callback query handler registered")
+
+
+class EditLog:
+    """Records when each chat's dashboard message was edited."""
+
+    def __init__(self, api):
+        self.edits = {}
+        handle = api.handle
+
+        async def recording(method, params):
+            if method == "editMessageText":
+                self.edits.setdefault(params.get("chat_id"), []).append(time.perf_counter())
+            return await handle(method, params)
+
+        api.handle = recording
+
+    def staleness(self, changes, until):
+        """Return the delays from each change to the next edit of its chat, and the changes never shown."""
+        delays = []
+        missed = 0
+        for chat_id, changed_at in changes:
+            edits = self.edits.get(chat_id, [])
+            index = bisect.bisect_right(edits, changed_at)
+            if index < len(edits) and edits[index] <= until:
+                delays.append(edits[index] - changed_at)
+            else:
+                missed += 1
+        return delays, missed
+
+
+async def run(mode, args, main, rpc):
+    rpc.balances.clear()
+    api = FakeBotApi()
+    application = main.build_application(database=MemoryDatabase(), request=api.request())
+    await application.initialize()
+    await application.post_init(application)
+    await application.start()
+    router = find_router(application)
+    main_dashboard = router.resolve("main:show")[0].__self__
+    position_store = router.resolve("position:show")[0].__self__.position_store
+    balance_service = main_dashboard.balance_service
+    wallet_store = main_dashboard.wallet_store
+
+    simulation = Simulation(application, api, args.concurrency)
+    latencies = []
+    user_ids = list(range(1000, 1000 + args.users))
+    holders = user_ids[:int(len(user_ids) * args.position_share)]
+    watchers = user_ids[len(holders):]
+    for user_id in holders:
+        position_store.add(user_id, TOKEN_MINT, 1000.0, 1.0)
+    await asyncio.gather(*(simulation.send(user_id, "/start", latencies) for user_id in user_ids))
+    if mode == "push":
+        await asyncio.gather(*(simulation.send(user_id, "setting:live_updates", latencies) for user_id in user_ids))
+        await asyncio.gather(*(simulation.send(user_id, "setting:back", latencies) for user_id in user_ids))
+    await asyncio.gather(*(simulation.send(user_id, "position:show", latencies) for user_id in holders))
+    addresses = {user_id: await wallet_store.public_key(user_id) for user_id in watchers}
+
+    log = EditLog(api)
+    api.reset_calls()
+    rng = random.Random(3)
+    changes = []
+    started = time.perf_counter()
+    deadline = started + args.duration
+
+    async def change_balances():
+        while True:
+            await asyncio.sleep(rng.expovariate(args.balance_rate))
+            if time.perf_counter() >= deadline:
+                return
+            user_id = rng.choice(watchers)
+            rpc.balances[addresses[user_id]] = rng.randrange(10 ** 8, 10 ** 11)
+            balance_service.invalidate(addresses[user_id])
+            changes.append((user_id, time.perf_counter()))
+
+    async def tick_price():
+        price = 1.0
+        while True:
+            await asyncio.sleep(1 / args.tick_rate)
+            if time.perf_counter() >= deadline:
+                return
+            price *= rng.uniform(0.95, 1.05)
+            position_store.mark(TOKEN_MINT, price)
+            now = time.perf_counter()
+            changes.extend((user_id, now) for user_id in holders)
+
+    async def poll(user_id, step):
+        await asyncio.sleep(rng.uniform(0, args.poll_interval))
+        while time.perf_counter() < deadline:
+            await simulation.send(user_id, step, latencies)
+            await asyncio.sleep(args.poll_interval)
+
+    tasks = [change_balances(), tick_price()]
+    if mode == "poll":
+        tasks += [poll(user_id, "main:refresh") for user_id in watchers]
+        tasks += [poll(user_id, "position:refresh") for user_id in holders]
+    await asyncio.gather(*tasks)
+    # Let the last batch window flush before counting.
+    await asyncio.sleep(main_dashboard.live_updates.batch_window * 2 + 0.5)
+    until = time.perf_counter()
+
+    calls = {method: count for method, count in api.calls.items() if method not in SETUP_METHODS}
+    delays, missed = log.staleness(changes, until)
+    line = (
+        f"{mode:>4}: edits={calls.get('editMessageText', 0)} api_calls={sum(calls.values())} "
+        f"changes={len(changes)} missed={missed}"
+    )
+    if delays:
+        line += (
+            f" staleness p50={statistics.median(delays) * 1000:.0f}ms"
+            f" p99={percentile(delays, 0.99) * 1000:.0f}ms"
+        )
+    if mode == "push":
+        stats = main_dashboard.live_updates.stats()
+        line += f" pushed={stats['pushed']} unchanged={stats['unchanged']} subscriptions={stats['subscriptions']}"
+    print(line)
+
+    await application.stop()
+    await application.post_shutdown(application)
+    await application.shutdown()
+
+
+async def main_async(args):
+    rpc = StubRpcServer(latency=args.rpc_latency)
+    prices = FakePriceServer(latency=args.rpc_latency, seed=7)
+    await rpc.start()
+    await prices.start()
+    # `config` is read once, so both modes share the stubs.
+    configure(args, rpc.url, prices.source_spec("coingecko"))
+    main = importlib.import_module("main")
+    for mode in ("poll", "push"):
+        await run(mode, args, main, rpc)
+    await prices.stop()
+    await rpc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--position-share", type=float, default=0.5, help="fraction of users on the positions page")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--balance-rate", type=float, default=20.0, help="balance changes per second")
+    parser.add_argument("--tick-rate", type=float, default=0.5, help="price ticks of the held token per second")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="seconds between refresh presses")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--rpc-latency", type=float, default=0.0)
+    parser.add_argument("--session-backend", choices=("chat_data", "memory", "mongo"), default="chat_data")
+    parser.add_argument("--send-global-rate", type=float, default=1e9)
+    parser.add_argument("--send-chat-rate", type=float, default=1e9)
+    parser.add_argument("--send-chat-burst", type=int, default=1000000)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
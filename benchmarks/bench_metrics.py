@@ -0,0 +1,87 @@
+"""
+Measure the cost of handler instrumentation and of a `/metrics` scrape.
+
+A dashboard handler that does no work is called `--calls` times through
+its `instrumented` wrapper:
+
+- off: no `metrics` on the dashboard (the wrapper is a pass-through);
+- metrics: latency, error and concurrency recording;
+- profiler: the same plus the sampling profiler running at `--interval`.
+
+Then the registry is filled with `--dashboards` x `--actions` handler
+series and rendered, as Prometheus would scrape it.
+
+Usage:
+    python -m benchmarks.bench_metrics --calls 200000
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+
+from dashboards.base_dashboard import BaseDashboard
+from services.metrics import BotMetrics, SamplingProfiler
+
+
+class IdleDashboard(BaseDashboard):
+    name = "idle"
+    routes = {**BaseDashboard.routes, "noop": "noop"}
+
+    async def show(self, update, context):
+        pass
+
+    async def noop(self, update, context):
+        pass
+
+
+async def time_calls(dashboard, calls):
+    started = time.perf_counter()
+    for _ in range(calls):
+        await dashboard.noop(None, None)
+    return (time.perf_counter() - started) / calls
+
+
+async def main_async(args):
+    dashboard = IdleDashboard(None, None)
+    baseline = await time_calls(dashboard, args.calls)
+    print(f"off:      {baseline * 1e6:.2f}µs per handler call")
+
+    dashboard.metrics = BotMetrics()
+    measured = await time_calls(dashboard, args.calls)
+    print(f"metrics:  {measured * 1e6:.2f}µs per handler call (+{(measured - baseline) * 1e6:.2f}µs)")
+
+    profiler = SamplingProfiler(threshold=10.0, directory=tempfile.mkdtemp(), interval=args.interval)
+    dashboard.metrics = BotMetrics(profiler=profiler)
+    profiler.start()
+    measured = await time_calls(dashboard, args.calls)
+    profiler.stop()
+    print(
+        f"profiler: {measured * 1e6:.2f}µs per handler call (+{(measured - baseline) * 1e6:.2f}µs), "
+        f"{profiler.samples} samples taken"
+    )
+
+    metrics = BotMetrics()
+    for dashboard_number in range(args.dashboards):
+        for action_number in range(args.actions):
+            metrics.handler_seconds.observe(0.01 * action_number, f"dashboard{dashboard_number}", f"action{action_number}")
+    started = time.perf_counter()
+    body = metrics.registry.render()
+    elapsed = time.perf_counter() - started
+    print(
+        f"scrape:   {args.dashboards * args.actions} handler series, {len(body.splitlines())} lines, "
+        f"{len(body) / 1024:.0f} KiB rendered in {elapsed * 1000:.1f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--interval", type=float, default=0.005)
+    parser.add_argument("--dashboards", type=int, default=8)
+    parser.add_argument("--actions", type=int, default=15)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark the position store behind the Positions dashboard.
+
+Two shapes of load are measured, since 10k positions for each of 100k
+users (a billion records) does not fit in one process:
+
+- one heavy user with `--positions` open positions: rendering a page with a
+  min-value filter through the sorted index, compared with scanning and
+  sorting every position on each render;
+- `--users` users with `--per-user` positions each over `--mints` tokens
+  with Zipf-like popularity: a price tick on the most held mint and
+  random ticks on any mint, revalued incrementally through the mint
+  index, compared with a full mark-to-market pass over every position.
+
+Usage:
+    python -m benchmarks.bench_position_store --positions 10000 --users 100000 --per-user 5
+"""
+import argparse
+import random
+import time
+
+from services.position_store import PositionStore
+
+PAGE_SIZE = 5
+
+
+def timed(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - started) / repeat, result
+
+
+def heavy_user(args, rng):
+    store = PositionStore()
+    for n in range(args.positions):
+        mint = f"mint{n}"
+        store.mark(mint, rng.uniform(0.0001, 0.01))
+        store.add(1, mint, rng.uniform(1, 1000), rng.uniform(0.01, 1))
+    min_value = 0.5
+    pages = -(-store.count(1, min_value) // PAGE_SIZE)
+
+    def indexed():
+        page = rng.randrange(pages)
+        return store.count(1, min_value), store.page(1, page, PAGE_SIZE, min_value)
+
+    positions = list(store._books[1].positions.values())
+
+    def scan():
+        page = rng.randrange(pages)
+        kept = sorted((p for p in positions if p.value >= min_value), key=lambda p: p.value, reverse=True)
+        return len(kept), kept[page * PAGE_SIZE:(page + 1) * PAGE_SIZE]
+
+    indexed_time, _ = timed(indexed, 2000)
+    scan_time, _ = timed(scan, 50)
+    print(
+        f"heavy user ({args.positions} positions, {pages} pages above {min_value} SOL): "
+        f"indexed page={indexed_time * 1e6:.1f}µs full scan+sort={scan_time * 1e6:.0f}µs "
+        f"({scan_time / indexed_time:.0f}x)"
+    )
+
+    tick_time, revalued = timed(lambda: store.mark("mint0", rng.uniform(0.0001, 0.01)), 2000)
+    print(f"heavy user: price tick revalues {revalued} position in {tick_time * 1e6:.1f}µs")
+
+
+def many_users(args, rng):
+    mints = [f"mint{n}" for n in range(args.mints)]
+    weights = [1 / (rank + 1) for rank in range(args.mints)]
+    store = PositionStore()
+    started = time.perf_counter()
+    for user_id in range(args.users):
+        for mint in set(rng.choices(mints, weights, k=args.per_user)):
+            store.add(user_id, mint, rng.uniform(1, 1000), rng.uniform(0.01, 1))
+    build = time.perf_counter() - started
+    total = len(store)
+    print(f"{args.users} users, {total} positions over {args.mints} mints: built in {build:.1f}s")
+
+    hottest = mints[0]
+    tick_time, revalued = timed(lambda: store.mark(hottest, rng.uniform(0.0001, 0.01)), 5)
+    print(f"tick on most held mint: {revalued} positions revalued in {tick_time * 1000:.1f}ms")
+
+    ticks = 5000
+    started = time.perf_counter()
+    touched = sum(store.mark(rng.choice(mints), rng.uniform(0.0001, 0.01)) for _ in range(ticks))
+    elapsed = time.perf_counter() - started
+    print(
+        f"random ticks: {ticks / elapsed:.0f} ticks/s, {touched / ticks:.0f} positions revalued per tick on average"
+    )
+
+    books = list(store._books.values())
+    prices = store.prices
+
+    def full_mark_to_market():
+        for book in books:
+            for position in book.positions.values():
+                position.value = position.amount * prices.get(position.mint, 0.0)
+            book.index = sorted((position.value, position.mint) for position in book.positions.values())
+
+    full_time, _ = timed(full_mark_to_market, 1)
+    print(f"full mark-to-market pass over {total} positions: {full_time * 1000:.0f}ms per tick")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--positions", type=int, default=10000, help="positions of the heavy user")
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--per-user", type=int, default=5, help="positions per user in the many-users run")
+    parser.add_argument("--mints", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    heavy_user(args, rng)
+    many_users(args, rng)
+
+
+if __name__ == "__main__":
+    main()
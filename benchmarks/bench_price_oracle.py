@@ -0,0 +1,108 @@
+"""
+Measure what a dashboard pays for the SOL/USD price, and how the oracle fails over.
+
+Three fake upstreams answer with `--latencies` seconds of delay. First the
+cost of one price read is compared between fetching from the fastest
+upstream inline (what a `show()` without the oracle would do) and
+`PriceOracle.quote()`. Then the oracle refreshes every `--interval`
+seconds for `--duration` seconds while the fastest upstream goes down for
+the middle third of the run; readers sample the quote continuously and the
+script reports which upstream served each refresh, the oldest quote a
+reader saw and how long readers saw a stale quote.
+
+Usage:
+    python -m benchmarks.bench_price_oracle --duration 6 --interval 0.2
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from collections import Counter
+
+import httpx
+
+from benchmarks.fake_price_server import FakePriceServer
+from services.price_oracle import PriceOracle, build_price_sources
+
+SHAPES = ("coingecko", "binance", "kraken")
+
+
+async def inline_reads(source, reads):
+    samples = []
+    for _ in range(reads):
+        started = time.perf_counter()
+        await source.fetch()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def oracle_reads(oracle, reads):
+    started = time.perf_counter()
+    for _ in range(reads):
+        oracle.quote()
+    return (time.perf_counter() - started) / reads
+
+
+async def run(args):
+    servers = [FakePriceServer(latency=latency, seed=n) for n, latency in enumerate(args.latencies)]
+    for server in servers:
+        await server.start()
+    client = httpx.AsyncClient(timeout=args.timeout)
+    spec = ",".join(server.source_spec(shape) for server, shape in zip(servers, SHAPES))
+    sources = build_price_sources(spec, client)
+    oracle = PriceOracle(sources, interval=args.interval, max_age=args.max_age, probe_every=5, client=client)
+
+    inline = await inline_reads(sources[0], args.inline_reads)
+    await oracle.start()
+    while oracle.quote() is None:
+        await asyncio.sleep(0.01)
+    print(
+        f"read cost: inline fetch p50={statistics.median(inline) * 1000:.1f}ms, "
+        f"oracle.quote()={oracle_reads(oracle, 100000) * 1e9:.0f}ns"
+    )
+
+    served = Counter()
+    last_refreshes = oracle.refreshes
+    oldest = 0.0
+    stale_reads = reads = 0
+    started = time.perf_counter()
+    fastest = servers[0]
+    while (elapsed := time.perf_counter() - started) < args.duration:
+        fastest.failing = args.duration / 3 <= elapsed < 2 * args.duration / 3
+        quote = oracle.quote()
+        reads += 1
+        oldest = max(oldest, oracle.age(quote))
+        stale_reads += oracle.is_stale(quote)
+        if oracle.refreshes != last_refreshes:
+            last_refreshes = oracle.refreshes
+            served[quote.source] += 1
+        await asyncio.sleep(0.005)
+
+    stats = oracle.stats()
+    await oracle.stop()
+    for server in servers:
+        await server.stop()
+
+    print(
+        f"refreshes={stats['refreshes']} failovers={stats['failovers']} failed_refreshes={stats['failures']} "
+        f"served_by={dict(served)}"
+    )
+    print(f"reader samples={reads} oldest_quote={oldest * 1000:.0f}ms stale_reads={stale_reads}")
+    for name, source in stats["sources"].items():
+        latency = "-" if source["latency"] is None else f"{source['latency'] * 1000:.1f}ms"
+        print(f"  {name:>9}: latency={latency} consecutive_failures={source['failures']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latencies", type=float, nargs=3, default=[0.02, 0.08, 0.2], help="upstream delays in seconds")
+    parser.add_argument("--duration", type=float, default=6.0)
+    parser.add_argument("--interval", type=float, default=0.2, help="oracle refresh cadence in seconds")
+    parser.add_argument("--max-age", type=float, default=1.0, help="quote age in seconds before it counts as stale")
+    parser.add_argument("--timeout", type=float, default=1.0, help="HTTP timeout per upstream request")
+    parser.add_argument("--inline-reads", type=int, default=50)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
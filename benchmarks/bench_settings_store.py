@@ -0,0 +1,140 @@
+"""
+Benchmark per-user settings reads, writes and warm-up.
+
+`--users` users exist, `--override-share` of them with changed settings
+stored in an in-memory collection whose calls cost `--db-latency` seconds
+(a MongoDB round trip). Measured:
+
+- reads on the trading path: `SettingsStore.get` on a warm cache, compared
+  with a `find_one` per read;
+- writes: `--toggles` toggles per user for `--active` users within one
+  flush interval, written behind in bulk, compared with one write per toggle;
+- warm-up: `load` of every user at startup, one query per batch;
+- memory per cached user on the defaults and with overrides.
+
+Usage:
+    python -m benchmarks.bench_settings_store --users 100000 --active 10000 --toggles 20
+"""
+import argparse
+import asyncio
+import random
+import time
+import tracemalloc
+
+from benchmarks.fakes import MemoryCollection
+from services.settings_store import SettingsStore, UserSettings
+
+
+class SlowCollection(MemoryCollection):
+    """A `MemoryCollection` that counts calls and blocks for a round trip on each."""
+
+    def __init__(self, latency):
+        super().__init__()
+        self.latency = latency
+        self.calls = 0
+
+    def _round_trip(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def find_one(self, query):
+        self._round_trip()
+        return super().find_one(query)
+
+    def find(self, query=None, projection=None):
+        self._round_trip()
+        return super().find(query, projection)
+
+    def bulk_write(self, operations, ordered=True):
+        self._round_trip()
+        return super().bulk_write(operations, ordered)
+
+
+def seed(collection, args, rng):
+    for user_id in range(args.users):
+        if rng.random() < args.override_share:
+            collection.documents[user_id] = {"user_id": user_id, "overrides": {"buy_slippage": rng.randint(1, 50)}}
+
+
+async def reads(args, rng):
+    collection = SlowCollection(args.db_latency)
+    seed(collection, args, rng)
+    store = SettingsStore(collection, cache_size=args.users, max_batch_size=args.batch_size)
+
+    started = time.perf_counter()
+    await store.load(range(args.users))
+    elapsed = time.perf_counter() - started
+    print(f"warm-up: {args.users} users in {elapsed:.2f}s with {collection.calls} queries")
+
+    user_ids = [rng.randrange(args.users) for _ in range(args.reads)]
+    started = time.perf_counter()
+    for user_id in user_ids:
+        (await store.get(user_id)).buy_slippage
+    cached = (time.perf_counter() - started) / len(user_ids)
+
+    samples = user_ids[:args.naive_reads]
+    started = time.perf_counter()
+    for user_id in samples:
+        await asyncio.to_thread(collection.find_one, {"user_id": user_id})
+    naive = (time.perf_counter() - started) / len(samples)
+    print(f"reads:   cached {cached * 1e6:.2f}µs per get, find_one per read {naive * 1e6:.0f}µs ({naive / cached:.0f}x)")
+    print(f"         {store.stats()}")
+
+
+async def writes(args, rng):
+    collection = SlowCollection(args.db_latency)
+    store = SettingsStore(collection, cache_size=args.users, flush_interval=3600, max_batch_size=args.batch_size)
+    await store.load(range(args.active))
+    collection.calls = 0
+
+    started = time.perf_counter()
+    for _ in range(args.toggles):
+        for user_id in range(args.active):
+            if rng.random() < 0.5:
+                await store.toggle(user_id, "degen_mode")
+            else:
+                await store.update(user_id, buy_slippage=rng.randint(1, 50))
+    applied = time.perf_counter() - started
+    await store.flush()
+    flushed = time.perf_counter() - started - applied
+    toggles = args.toggles * args.active
+    print(
+        f"writes:  {toggles} changes applied in {applied:.2f}s, flushed in {flushed:.2f}s: "
+        f"{store.writes} documents in {collection.calls} bulk writes "
+        f"(one write per toggle: {toggles} round trips ≈ {toggles * args.db_latency:.0f}s)"
+    )
+
+
+def memory(args):
+    for name, overrides in (("defaults", None), ("overrides", {"buy_slippage": 25, "degen_mode": True})):
+        store = SettingsStore(cache_size=args.users)
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        for user_id in range(args.users):
+            store._cache.set(user_id, UserSettings(user_id, dict(overrides) if overrides else None))
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+        print(f"memory:  {size / args.users:.0f} B per cached user on {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--override-share", type=float, default=0.2)
+    parser.add_argument("--active", type=int, default=10000)
+    parser.add_argument("--toggles", type=int, default=20)
+    parser.add_argument("--reads", type=int, default=200000)
+    parser.add_argument("--naive-reads", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--db-latency", type=float, default=0.001)
+    args = parser.parse_args()
+    rng = random.Random(7)
+    asyncio.run(reads(args, rng))
+    asyncio.run(writes(args, rng))
+    memory(args)
+
+
+if __name__ == "__main__":
+    main()
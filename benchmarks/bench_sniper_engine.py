@@ -0,0 +1,116 @@
+"""
+Replay a recorded new-pool event file through the sniper engine.
+
+For each task count in `--tasks`, an engine is loaded with that many snipe
+tasks spread over users and token mints, and the events of `--events-file`
+are fed through `replay_events` into `SniperEngine.run`. The engine
+records the latency from an event being read to its tasks being fired;
+p50/p99 should stay flat as the task count grows. For comparison, the
+same events are matched by scanning every task, as a naive
+implementation would.
+
+Without `--events-file`, a synthetic recording of `--events` events is
+written first, a `--hit-rate` fraction of which list a token some task is
+waiting for. A file captured from mainnet with `record_events` can be
+replayed the same way.
+
+Usage:
+    python -m benchmarks.bench_sniper_engine --tasks 1000 10000 100000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from solders.pubkey import Pubkey
+
+from services.pool_events import RAYDIUM_AMM_V4, RAYDIUM_CPMM, WSOL_MINT, PoolEvent, replay_events
+from services.sniper_engine import SniperEngine
+
+PROGRAMS = (RAYDIUM_AMM_V4, RAYDIUM_CPMM)
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def make_mint(number):
+    return str(Pubkey(number.to_bytes(32, "big")))
+
+
+def task_mint(number, tasks):
+    # Roughly two tasks per mint, so popular listings fire several users at once.
+    return make_mint(1 + number % max(1, tasks // 2))
+
+
+def write_recording(path, events, hit_rate, max_tasks, rng):
+    with open(path, "w", encoding="utf-8") as file:
+        for slot in range(events):
+            if rng.random() < hit_rate:
+                mint = task_mint(rng.randrange(max_tasks), max_tasks)
+            else:
+                mint = make_mint(10_000_000 + slot)
+            event = PoolEvent(rng.choice(PROGRAMS), mint, WSOL_MINT, signature=f"sig{slot}", slot=300_000_000 + slot)
+            file.write(json.dumps(event.to_document()) + "\n")
+
+
+async def run(task_count, path, scan_events, rng):
+    async def buy(task, event):
+        pass
+
+    engine = SniperEngine(buy)
+    for number in range(task_count):
+        program = rng.choice(PROGRAMS + (None,))
+        await engine.add_task(number % 50_000, task_mint(number, task_count), 0.1, program)
+    tasks = list(engine._tasks.values())
+
+    started = time.perf_counter()
+    await engine.run(replay_events(path))
+    await engine.drain()
+    elapsed = time.perf_counter() - started
+    stats = engine.stats()
+
+    scan_latencies = []
+    async for event in replay_events(path):
+        mint = event.mint
+        [task for task in tasks if task.mint == mint and task.program in (None, event.program)]
+        scan_latencies.append(time.perf_counter() - event.received_at)
+        if len(scan_latencies) >= scan_events:
+            break
+
+    p50 = stats["p50"] * 1e6 if stats["p50"] is not None else float("nan")
+    p99 = stats["p99"] * 1e6 if stats["p99"] is not None else float("nan")
+    print(
+        f"tasks={task_count:>6}: events={stats['events']} fired={stats['triggered']} "
+        f"indexed p50={p50:.1f}µs p99={p99:.1f}µs ({stats['events'] / elapsed:.0f} events/s) | "
+        f"full scan p50={statistics.median(scan_latencies) * 1e6:.0f}µs p99={percentile(scan_latencies, 0.99) * 1e6:.0f}µs"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--events-file", help="recorded events (JSONL); synthesised when omitted")
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--hit-rate", type=float, default=0.2, help="fraction of synthetic events some task waits for")
+    parser.add_argument("--scan-events", type=int, default=200, help="events matched by the full-scan baseline")
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    path = args.events_file
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(), "pool_events.jsonl")
+        write_recording(path, args.events, args.hit_rate, min(args.tasks), rng)
+        print(f"synthetic recording: {args.events} events in {path}")
+
+    for task_count in args.tasks:
+        asyncio.run(run(task_count, path, args.scan_events, rng))
+
+
+if __name__ == "__main__":
+    main()
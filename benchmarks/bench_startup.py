@@ -0,0 +1,144 @@
+"""
+Measure cold start: import time and time to the first `/start` response.
+
+Every run is a fresh interpreter, as an autoscaled worker would be. The
+child imports `main`, builds the application, runs `post_init`, starts it
+and feeds it one `/start` command, then presses a dashboard that was not
+warmed up (`--first-press`) twice. Runs alternate between:
+
+- lazy: `DASHBOARD_WARMUP=main`, so other dashboards and the services only
+  they use are imported and built on their first button press;
+- eager: `DASHBOARD_WARMUP=all`, every dashboard built at startup, as
+  before the registry.
+
+Per mode the benchmark reports medians over `--runs` runs of the time to
+import `main`, to build the application, to start it, the `/start`
+response and the wall time from launching the process to that response,
+plus the first and second press of `--first-press` and the dashboards
+loaded by the time `/start` was answered. The Bot API is `FakeBotApi`,
+the database `MemoryDatabase`, the RPC node and price feed local stubs.
+
+Usage:
+    python -m benchmarks.bench_startup --runs 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+
+def child(first_press):
+    """Run one cold start and print its timings as JSON."""
+    started = time.perf_counter()
+    import main
+    imported = time.perf_counter()
+    # The benchmark helpers import telegram too; load them only after `main` is timed.
+    from benchmarks.bench_application import Simulation
+    from benchmarks.fake_telegram import FakeBotApi
+    from benchmarks.fakes import MemoryDatabase
+    from benchmarks.bench_live_updates import find_router
+
+    async def run():
+        nonlocal started
+        api = FakeBotApi()
+        build_started = time.perf_counter()
+        application = main.build_application(database=MemoryDatabase(), request=api.request())
+        built = time.perf_counter()
+        await application.initialize()
+        await application.post_init(application)
+        await application.start()
+        ready = time.perf_counter()
+        simulation = Simulation(application, api, 1)
+        latencies = []
+        await simulation.send(1000, "/start", latencies)
+        answered = time.time()
+        registry = find_router(application).registry
+        loaded = [name for name in registry if registry.loaded(name)]
+        await simulation.send(1000, first_press, latencies)
+        await simulation.send(1000, first_press, latencies)
+        if not api.calls.get("sendMessage"):
+            raise RuntimeError("/start was not answered")
+        await application.stop()
+        await application.post_shutdown(application)
+        await application.shutdown()
+        return {
+            "import": imported - started,
+            "build": built - build_started,
+            "start": ready - built,
+            "first_start": latencies[0],
+            "answered_at": answered,
+            "first_press": latencies[1],
+            "second_press": latencies[2],
+            "loaded": loaded,
+        }
+
+    print(json.dumps(asyncio.run(run())))
+
+
+async def cold_start(warmup, first_press):
+    env = dict(os.environ, DASHBOARD_WARMUP=warmup)
+    launched = time.time()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "benchmarks.bench_startup", "--child", "--first-press", first_press,
+        env=env, stdout=asyncio.subprocess.PIPE,
+    )
+    stdout, _ = await process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(f"cold start with DASHBOARD_WARMUP={warmup} failed")
+    result = json.loads(stdout.decode().strip().splitlines()[-1])
+    result["launch_to_start"] = result.pop("answered_at") - launched
+    return result
+
+
+async def main_async(args):
+    # Imported here so the children are not slowed down by the parent's imports.
+    from benchmarks.bench_application import configure
+    from benchmarks.fake_price_server import FakePriceServer
+    from benchmarks.stub_rpc import StubRpcServer
+
+    rpc = StubRpcServer()
+    prices = FakePriceServer(seed=7)
+    await rpc.start()
+    await prices.start()
+    configure(args, rpc.url, prices.source_spec("coingecko"))
+    modes = {"lazy": "main", "eager": "all"}
+    results = {mode: [] for mode in modes}
+    for _ in range(args.runs):
+        for mode, warmup in modes.items():
+            results[mode].append(await cold_start(warmup, args.first_press))
+    await prices.stop()
+    await rpc.stop()
+
+    for mode, runs in results.items():
+        median = {field: statistics.median(run[field] for run in runs) * 1000 for field in (
+            "import", "build", "start", "first_start", "launch_to_start", "first_press", "second_press",
+        )}
+        print(
+            f"{mode:>5}: import={median['import']:.0f}ms build={median['build']:.1f}ms start={median['start']:.0f}ms "
+            f"/start={median['first_start']:.1f}ms launch_to_/start={median['launch_to_start']:.0f}ms "
+            f"{args.first_press} first={median['first_press']:.1f}ms second={median['second_press']:.1f}ms "
+            f"loaded_at_/start={len(runs[0]['loaded'])}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--first-press", default="vanity:show", help="button of a dashboard not warmed up")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--session-backend", choices=("chat_data", "memory", "mongo"), default="chat_data")
+    parser.add_argument("--send-global-rate", type=float, default=1e9)
+    parser.add_argument("--send-chat-rate", type=float, default=1e9)
+    parser.add_argument("--send-chat-burst", type=int, default=1000000)
+    args = parser.parse_args()
+    if args.child:
+        child(args.first_press)
+    else:
+        asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark outbound Telegram traffic shaping with a fake Bot.
+
+Each simulated chat spams ♻️Refresh on its dashboard (interactive edits to
+one message) while background refreshes edit a second message. The same
+traffic is sent straight to the fake Bot and through `TelegramSender`; the
+fake Bot answers with `RetryAfter` whenever Telegram-like flood limits are
+exceeded.
+
+Usage:
+    python -m benchmarks.bench_telegram_sender --chats 300
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from telegram.error import RetryAfter
+
+from benchmarks.fake_telegram import FakeBot
+from services.telegram_sender import BACKGROUND, INTERACTIVE, TelegramSender
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def simulate(bot, sender, chats, clicks, refreshes):
+    latencies = {INTERACTIVE: [], BACKGROUND: []}
+    failures = 0
+
+    async def edit(chat_id, message_id, text, priority, delay):
+        nonlocal failures
+        await asyncio.sleep(delay)
+        started = time.perf_counter()
+        call = lambda: bot.edit_message_text(text, chat_id=chat_id, message_id=message_id)
+        try:
+            if sender is None:
+                await call()
+            else:
+                await sender.submit(chat_id, call, key=("edit", chat_id, message_id), priority=priority)
+        except RetryAfter:
+            failures += 1
+            return
+        latencies[priority].append(time.perf_counter() - started)
+
+    jobs = []
+    for chat_id in range(chats):
+        offset = chat_id / chats
+        jobs += [edit(chat_id, 1, f"click {n}", INTERACTIVE, offset + n * 0.05) for n in range(clicks)]
+        jobs += [edit(chat_id, 2, f"refresh {n}", BACKGROUND, offset + n * 0.2) for n in range(refreshes)]
+
+    started = time.perf_counter()
+    await asyncio.gather(*jobs)
+    return latencies, failures, time.perf_counter() - started
+
+
+async def run(mode, args):
+    bot = FakeBot(args.global_rate, args.chat_rate, args.chat_burst)
+    sender = TelegramSender(args.global_rate, args.chat_rate, args.chat_burst) if mode == "sender" else None
+    latencies, failures, elapsed = await simulate(bot, sender, args.chats, args.clicks, args.refreshes)
+    if sender is not None:
+        await sender.stop()
+
+    submitted = args.chats * (args.clicks + args.refreshes)
+    line = (
+        f"{mode:>7}: submitted={submitted} api_calls={len(bot.calls)} 429s={bot.rejected} "
+        f"failed={failures} elapsed={elapsed:.2f}s throughput={bot.throughput():.1f}/s"
+    )
+    for priority, label in ((INTERACTIVE, "interactive"), (BACKGROUND, "background")):
+        if latencies[priority]:
+            line += (
+                f" {label} p50={statistics.median(latencies[priority]) * 1000:.0f}ms"
+                f" p99={percentile(latencies[priority], 0.99) * 1000:.0f}ms"
+            )
+    if sender is not None:
+        line += f" coalesced={sender.coalesced} retried={sender.retried}"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chats", type=int, default=300)
+    parser.add_argument("--clicks", type=int, default=5, help="interactive edits per chat")
+    parser.add_argument("--refreshes", type=int, default=3, help="background edits per chat")
+    parser.add_argument("--global-rate", type=float, default=30.0)
+    parser.add_argument("--chat-rate", type=float, default=1.0)
+    parser.add_argument("--chat-burst", type=int, default=3)
+    args = parser.parse_args()
+
+    for mode in ("direct", "sender"):
+        asyncio.run(run(mode, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Measure the upstream cost of a burst of pasted contract addresses.
+
+At a token launch many users paste the same address within seconds.
+This replays `--pastes` chat messages spread over `--duration` seconds:
+most paste the address of one of `--tokens` freshly registered mints
+(the first tokens far more often than the rest, as a launch would), a
+`--chatter` fraction is ordinary chat or a wallet address. Messages go
+through `find_addresses` and then:
+
+- naive: one fetch (`getMultipleAccounts` plus a Jupiter quote) per paste;
+- service: `TokenInfoService`, with its TTL cache and shared in-flight fetches.
+
+The RPC node is a local `StubRpcServer` and Jupiter a local stub answering
+`/quote`, adding `--latency` and `--quote-latency` seconds per request.
+Finally the address finder is compared with decoding every word.
+
+Usage:
+    python -m benchmarks.bench_token_info --tokens 20 --pastes 1000 --duration 2
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from urllib.parse import parse_qs
+
+import httpx
+from solders.keypair import Keypair
+from solders.pubkey import Pubkey
+
+from benchmarks.stub_rpc import StubRpcServer
+from services.jupiter import JupiterRouter
+from services.solana_rpc import SolanaRpcClient
+from services.token_info import TokenInfoService
+from utils.http_server import HttpResponse, HttpServer
+from utils.solana_address import find_addresses
+
+CHATTER = [
+    "gm",
+    "anyone aping into this one? chart looks like it's about to send",
+    "lfg!!! 🚀🚀🚀",
+    "what's the best slippage for launches, 20 or 30?",
+    "rugged again, this is the third time this week honestly",
+]
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class StubJupiter:
+    """Answers `/quote` for the registered mints and fails like Jupiter without a route otherwise."""
+
+    def __init__(self, mints, latency):
+        self.mints = mints
+        self.latency = latency
+        self.calls = 0
+        self.http = HttpServer(self._handle, "127.0.0.1", 0)
+
+    @property
+    def url(self):
+        return f"http://{self.http.host}:{self.http.port}"
+
+    async def _handle(self, request):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        query = {name: values[0] for name, values in parse_qs(request.query).items()}
+        mint = query.get("outputMint")
+        if mint not in self.mints:
+            return HttpResponse.json({"error": "Could not find any route", "errorCode": "COULD_NOT_FIND_ANY_ROUTE"}, status=400)
+        return HttpResponse.json({
+            "inAmount": query.get("amount"),
+            "outAmount": str(self.mints[mint]),
+            "priceImpactPct": "0.0042",
+            "routePlan": [{"swapInfo": {"label": "Raydium", "ammKey": mint}, "percent": 100}],
+        })
+
+
+def build_messages(args, mints, rng):
+    wallets = [str(Keypair().pubkey()) for _ in range(20)]
+    # Launch popularity is heavily skewed: token n is pasted about 1/n as often as the first.
+    weights = [1 / rank for rank in range(1, len(mints) + 1)]
+    messages = []
+    for _ in range(args.pastes):
+        roll = rng.random()
+        if roll < args.chatter / 2:
+            messages.append(rng.choice(CHATTER))
+        elif roll < args.chatter:
+            messages.append(f"send to {rng.choice(wallets)} pls")
+        else:
+            mint = rng.choices(mints, weights)[0]
+            messages.append(rng.choice([mint, f"{mint} 🚀", f"https://dexscreener.com/solana/{mint}"]))
+    return messages
+
+
+async def replay(lookup, messages, duration, rng):
+    latencies = []
+
+    async def paste(text, delay):
+        await asyncio.sleep(delay)
+        started = time.perf_counter()
+        for address in find_addresses(text):
+            await lookup(address)
+        latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(paste(text, rng.uniform(0, duration)) for text in messages))
+    return latencies
+
+
+async def run(strategy, args, mints, messages):
+    server = StubRpcServer(latency=args.latency)
+    for number, mint in enumerate(mints):
+        server.add_mint(mint, decimals=6, supply=10 ** 15, name=f"Launch {number}", symbol=f"LCH{number}")
+    jupiter = StubJupiter({mint: 1_000_000 * 10 ** 6 for mint in mints}, args.quote_latency)
+    await server.start()
+    await jupiter.http.start()
+    limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+    client = httpx.AsyncClient(timeout=None, limits=limits)
+    rpc = SolanaRpcClient(server.url, client=client)
+    service = TokenInfoService(rpc, JupiterRouter(rpc, jupiter.url, client=client), ttl=args.ttl)
+    lookup = service._fetch if strategy == "naive" else service.get
+
+    started = time.perf_counter()
+    latencies = await replay(lookup, messages, args.duration, random.Random(11))
+    elapsed = time.perf_counter() - started
+    await client.aclose()
+    await jupiter.http.stop()
+    await server.stop()
+
+    upstream = sum(server.calls.values()) + jupiter.calls
+    line = (
+        f"{strategy:>7}: messages={len(latencies)} elapsed={elapsed:.2f}s rpc_calls={sum(server.calls.values())} "
+        f"quotes={jupiter.calls} upstream_per_token={upstream / len(mints):.1f} "
+        f"p50={statistics.median(latencies) * 1000:.1f}ms p99={percentile(latencies, 0.99) * 1000:.1f}ms"
+    )
+    if strategy == "service":
+        stats = service.stats()
+        line += (
+            f" hit_rate={stats['cache_hit_rate']:.1%} shared={stats['shared_lookups']}"
+            f" fetches={stats['fetches']} (tokens={stats['fetches'] - stats['not_mints']} not_mints={stats['not_mints']})"
+        )
+    print(line)
+
+
+def decode_words(text):
+    found = []
+    for word in text.split():
+        try:
+            found.append(str(Pubkey.from_string(word)))
+        except ValueError:
+            pass
+    return found
+
+
+def bench_finder(messages):
+    for name, finder in (("decode every word", decode_words), ("find_addresses", find_addresses)):
+        started = time.perf_counter()
+        for _ in range(20):
+            for text in messages:
+                finder(text)
+        elapsed = time.perf_counter() - started
+        print(f"{name:>17}: {elapsed / (20 * len(messages)) * 1e6:.2f}µs per message")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=20)
+    parser.add_argument("--pastes", type=int, default=1000)
+    parser.add_argument("--chatter", type=float, default=0.3, help="fraction of messages without a mint")
+    parser.add_argument("--duration", type=float, default=2.0, help="seconds the burst is spread over")
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated RPC round trip in seconds")
+    parser.add_argument("--quote-latency", type=float, default=0.1, help="simulated Jupiter round trip in seconds")
+    parser.add_argument("--connections", type=int, default=50, help="HTTP connections per upstream")
+    parser.add_argument("--ttl", type=float, default=10.0)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    mints = [str(Keypair().pubkey()) for _ in range(args.tokens)]
+    messages = build_messages(args, mints, rng)
+    for strategy in ("naive", "service"):
+        asyncio.run(run(strategy, args, mints, messages))
+    bench_finder(messages)
+
+
+if __name__ == "__main__":
+    main()
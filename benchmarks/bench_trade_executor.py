@@ -0,0 +1,137 @@
+"""
+Compare trade execution against local stub RPC nodes with injected latency.
+
+One stub node is started per `--node-latency` value; all of them share a
+ledger, so a transaction confirms `--confirm-latency` seconds after any of
+them first receives it. `--trades` swaps (alternating buy and sell, at most
+`--concurrent` in flight) are executed twice:
+
+- naive: per trade, fetch a blockhash, sign, send to the first node only
+  and poll it for the confirmation;
+- pipeline: `TradeExecutor` with a background `BlockhashCache`, sending to
+  the `--fanout` fastest nodes in parallel and keeping the first
+  confirmation.
+
+Halfway through the pipeline run the fastest node degrades to
+`--degraded-latency`; the node picked for "Buy: node" and "Sell: node" is
+printed before and after to show the latency histograms re-ranking nodes.
+Swap instructions come from a local router (a self-transfer), so only the
+transaction path is measured.
+
+Usage:
+    python -m benchmarks.bench_trade_executor --trades 200 --node-latency 0.15 0.06 0.02 0.09
+"""
+import argparse
+import asyncio
+import itertools
+import statistics
+import time
+
+import httpx
+from solders.keypair import Keypair
+from solders.system_program import TransferParams, transfer
+
+from benchmarks.stub_rpc import StubRpcServer
+from services.jupiter import SwapRoute
+from services.solana_rpc import SolanaRpcClient
+from services.trade_executor import BlockhashCache, RpcNode, TradeExecutor
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class LocalRouter:
+    def __init__(self):
+        # A distinct amount per route keeps every transaction (and signature) unique.
+        self.lamports = itertools.count(1)
+
+    async def route(self, owner, side, mint, amount, slippage_bps):
+        instruction = transfer(TransferParams(from_pubkey=owner, to_pubkey=owner, lamports=next(self.lamports)))
+        return SwapRoute([instruction], [], amount, amount * 1000)
+
+
+async def run_trades(trade, args):
+    semaphore = asyncio.Semaphore(args.concurrent)
+    latencies = []
+
+    async def one(number):
+        async with semaphore:
+            started = time.perf_counter()
+            await trade(number, "buy" if number % 2 == 0 else "sell")
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one(number) for number in range(args.trades)))
+    return latencies
+
+
+async def main_async(args):
+    ledger = {}
+    servers = [StubRpcServer(latency=latency, confirm_latency=args.confirm_latency, ledger=ledger) for latency in args.node_latency]
+    for server in servers:
+        await server.start()
+    client = httpx.AsyncClient(timeout=None, limits=httpx.Limits(max_connections=200))
+    nodes = [RpcNode(f"node{index}", SolanaRpcClient(server.url, client=client)) for index, server in enumerate(servers)]
+    keypairs = [Keypair() for _ in range(args.concurrent)]
+    router = LocalRouter()
+
+    naive_node = RpcNode("naive", nodes[0].rpc)
+    naive = TradeExecutor([naive_node], router, BlockhashCache(nodes[0].rpc, max_age=0), fanout=1, poll_interval=0.05)
+
+    async def naive_trade(number, side):
+        await naive.trade(keypairs[number % len(keypairs)], side, "mint", 0.1)
+
+    latencies = await run_trades(naive_trade, args)
+    calls = sum(server.calls["getLatestBlockhash"] for server in servers)
+    print(
+        f"naive:    p50={statistics.median(latencies) * 1000:.0f}ms p99={percentile(latencies, 0.99) * 1000:.0f}ms "
+        f"getLatestBlockhash calls={calls}"
+    )
+    for server in servers:
+        server.calls.clear()
+
+    blockhashes = BlockhashCache(nodes[0].rpc, interval=2.0)
+    await blockhashes.start()
+    executor = TradeExecutor(nodes, router, blockhashes, fanout=args.fanout, poll_interval=0.05)
+    fastest = min(range(len(servers)), key=lambda index: args.node_latency[index])
+
+    async def pipeline_trade(number, side):
+        if number == args.trades // 2:
+            print(f"  before degradation: buy -> {executor.pick_node('buy').name}, sell -> {executor.pick_node('sell').name}")
+            servers[fastest].latency = args.degraded_latency
+        await executor.trade(keypairs[number % len(keypairs)], side, "mint", 0.1)
+
+    latencies = await run_trades(pipeline_trade, args)
+    await blockhashes.stop()
+    calls = sum(server.calls["getLatestBlockhash"] for server in servers)
+    print(f"  after node{fastest} degraded to {args.degraded_latency * 1000:.0f}ms: buy -> {executor.pick_node('buy').name}, sell -> {executor.pick_node('sell').name}")
+    print(
+        f"pipeline: p50={statistics.median(latencies) * 1000:.0f}ms p99={percentile(latencies, 0.99) * 1000:.0f}ms "
+        f"getLatestBlockhash calls={calls}"
+    )
+    for name, node in executor.stats()["nodes"].items():
+        p50 = node["buy_p50"] * 1000 if node["buy_p50"] is not None else float("nan")
+        print(f"  {name}: sent={node['sent']} landed first={node['landed']} recent buy p50≈{p50:.0f}ms")
+
+    await client.aclose()
+    # Let the stubs finish requests abandoned by losing nodes before shutting down.
+    await asyncio.sleep(max(args.node_latency + [args.degraded_latency]))
+    for server in servers:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trades", type=int, default=200)
+    parser.add_argument("--concurrent", type=int, default=10, help="trades in flight at once")
+    parser.add_argument("--node-latency", type=float, nargs="+", default=[0.15, 0.06, 0.02, 0.09])
+    parser.add_argument("--confirm-latency", type=float, default=0.4)
+    parser.add_argument("--degraded-latency", type=float, default=0.5)
+    parser.add_argument("--fanout", type=int, default=2)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Measure the update journal: overhead per update, crash recovery and backpressure.
+
+1. Overhead: `--updates` callback-query updates go through
+   `UpdateQueue.put`, `get` and `complete` without a journal, and with a
+   journal fsynced every second or every record. The journal is fed the
+   raw JSON as the webhook and polling do, and once without it, so the
+   `Update` has to be serialized again.
+2. Recovery: a child process journals `--recovery-updates` updates,
+   finishes all but `--unfinished` of them and dies with `os._exit` in the
+   middle of writing a record. The parent times `UpdateQueue.open()` and
+   checks that exactly the unfinished updates are replayed, that the torn
+   record is cut off and that redelivered updates are dropped.
+3. Backpressure: a real `Application` with a `--handler-delay` handler
+   and `--concurrency` concurrent updates receives a burst of
+   `--burst` updates, once with PTB's plain queue and once with an
+   `UpdateQueue` bounded at `--max-pending`. The peak number of updates
+   accepted but not finished shows how far the backlog grows in memory.
+
+Usage:
+    python -m benchmarks.bench_update_journal --updates 20000 --recovery-updates 100000
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from telegram import Update
+from telegram.ext import ApplicationBuilder, CallbackQueryHandler
+
+from benchmarks.fake_telegram import FakeBotApi, make_callback_update
+from services.update_journal import JournalUpdateProcessor, UpdateJournal, UpdateQueue
+
+
+def make_raw_updates(count, start=1):
+    return [make_callback_update(update_id, 1000 + update_id % 500, "main:refresh", 77) for update_id in range(start, start + count)]
+
+
+def make_updates(count, start=1):
+    return [Update.de_json(data, None) for data in make_raw_updates(count, start)]
+
+
+async def measure_overhead(raw_updates, journal, raw):
+    updates = [Update.de_json(data, None) for data in raw_updates]
+    queue = UpdateQueue(journal, max_pending=len(updates) + 1)
+    queue.open(None)
+    started = time.perf_counter()
+    for data, update in zip(raw_updates, updates):
+        if raw:
+            queue.received((data,))
+        await queue.put(update)
+        queue.complete(await queue.get())
+    elapsed = time.perf_counter() - started
+    queue.close()
+    return elapsed / len(updates)
+
+
+def bench_overhead(args):
+    raw_updates = make_raw_updates(args.updates)
+    directory = tempfile.mkdtemp(prefix="journal-")
+    try:
+        for name, sync_interval, count, raw in (
+            ("no journal", None, args.updates, True),
+            ("journal, fsync every 1s", 1.0, args.updates, True),
+            ("journal, fsync every record", 0, args.fsync_updates, True),
+            ("journal, Update serialized", 1.0, args.fsync_updates, False),
+        ):
+            journal = None
+            if sync_interval is not None:
+                journal = UpdateJournal(os.path.join(directory, name.replace(" ", "-")), sync_interval=sync_interval)
+            per_update = asyncio.run(measure_overhead(raw_updates[:count], journal, raw))
+            print(f"{name:>28}: {per_update * 1e6:8.1f}µs per update")
+    finally:
+        shutil.rmtree(directory)
+
+
+def crash_while_journaling(directory, count, unfinished):
+    journal = UpdateJournal(directory, segment_size=4 * 1024 * 1024, sync_interval=1.0)
+    journal.open()
+    for data in make_raw_updates(count):
+        journal.append(data["update_id"], json.dumps(data).encode())
+        if data["update_id"] <= count - unfinished:
+            journal.complete(data["update_id"])
+    # Die halfway through writing one more record, as a killed process would.
+    os.write(journal._fd, b"\x01\x00\x00\x00")
+    os._exit(1)
+
+
+def bench_recovery(args):
+    directory = tempfile.mkdtemp(prefix="journal-")
+    try:
+        child = multiprocessing.Process(target=crash_while_journaling, args=(directory, args.recovery_updates, args.unfinished))
+        child.start()
+        child.join()
+        size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+        async def recover():
+            queue = UpdateQueue(UpdateJournal(directory), max_pending=args.unfinished)
+            started = time.perf_counter()
+            replayed = queue.open(None)
+            elapsed = time.perf_counter() - started
+            ids = [queue.get_nowait().update_id for _ in range(replayed)]
+            # Telegram redelivers the last, unconfirmed batch after a restart.
+            for update in make_updates(100, start=args.recovery_updates - 99):
+                await queue.put(update)
+            stats = queue.stats()
+            queue.close()
+            return elapsed, ids, stats
+
+        elapsed, ids, stats = asyncio.run(recover())
+        expected = list(range(args.recovery_updates - args.unfinished + 1, args.recovery_updates + 1))
+        print(
+            f"recovery: {args.recovery_updates} updates journaled ({size / 1024 / 1024:.1f} MiB on disk), "
+            f"child exit code {child.exitcode}; open() took {elapsed * 1000:.1f}ms, replayed {len(ids)} "
+            f"({'exactly the unfinished ones' if ids == expected else 'MISMATCH'}), "
+            f"torn records cut off {stats['truncated']}, redeliveries dropped {stats['duplicates']}/100"
+        )
+    finally:
+        shutil.rmtree(directory)
+
+
+async def run_burst(args, bounded):
+    api = FakeBotApi()
+    builder = ApplicationBuilder().token("1:bench").request(api.request()).get_updates_request(api.request())
+    if bounded:
+        queue = UpdateQueue(max_pending=args.max_pending)
+        builder = builder.update_queue(queue).concurrent_updates(JournalUpdateProcessor(queue, args.concurrency))
+    else:
+        builder = builder.concurrent_updates(args.concurrency)
+    application = builder.build()
+    finished = 0
+
+    async def slow_handler(update, context):
+        nonlocal finished
+        await asyncio.sleep(args.handler_delay)
+        finished += 1
+
+    application.add_handler(CallbackQueryHandler(slow_handler))
+    await application.initialize()
+    await application.start()
+
+    peak = 0
+    updates = make_updates(args.burst)
+    started = time.perf_counter()
+    for count, update in enumerate(updates, 1):
+        # The webhook server and the polling `Updater` feed the application the same way.
+        await application.update_queue.put(update)
+        peak = max(peak, count - finished)
+    while finished < len(updates):
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    await application.stop()
+    await application.shutdown()
+    name = f"UpdateQueue(max_pending={args.max_pending})" if bounded else "plain asyncio.Queue"
+    print(f"{name:>32}: peak backlog {peak:6d} updates, burst drained in {elapsed:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=20000)
+    parser.add_argument("--fsync-updates", type=int, default=2000, help="updates measured with an fsync per record")
+    parser.add_argument("--recovery-updates", type=int, default=100000)
+    parser.add_argument("--unfinished", type=int, default=500)
+    parser.add_argument("--burst", type=int, default=20000)
+    parser.add_argument("--handler-delay", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=256)
+    parser.add_argument("--max-pending", type=int, default=1000)
+    args = parser.parse_args()
+    bench_overhead(args)
+    bench_recovery(args)
+    for bounded in (False, True):
+        asyncio.run(run_burst(args, bounded))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Measure vanity search speed as worker processes are added.
+
+A `VanityGrinder` searches for a pattern that practically never matches
+for `--duration` seconds on a process pool of each size in `--workers`
+(default: 1 up to every core), and reports keys per second and the
+speed-up over one process. While it runs, a ticker measures how late the
+event loop wakes up, i.e. how much the search delays other handlers.
+
+Usage:
+    python -m benchmarks.bench_vanity --duration 5 --workers 1 2 4 8
+"""
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from services.vanity import VanityError, VanityGrinder
+
+
+async def measure_lag(stop, interval=0.01):
+    loop = asyncio.get_running_loop()
+    worst = 0.0
+    while not stop.is_set():
+        started = loop.time()
+        await asyncio.sleep(interval)
+        worst = max(worst, loop.time() - started - interval)
+    return worst
+
+
+async def run(workers, args):
+    executor = ProcessPoolExecutor(max_workers=workers)
+    # Start every worker process before timing.
+    await asyncio.gather(*(asyncio.get_running_loop().run_in_executor(executor, time.sleep, 0.1) for _ in range(workers)))
+    grinder = VanityGrinder(executor, workers=workers, batch_size=args.batch_size, timeout=args.duration)
+
+    stop = asyncio.Event()
+    lag = asyncio.create_task(measure_lag(stop))
+    job = grinder.start(0, args.pattern)
+    try:
+        await job.task
+    except VanityError:
+        pass
+    stop.set()
+    worst_lag = await lag
+    executor.shutdown()
+    return job.attempts / job.elapsed, worst_lag
+
+
+async def main_async(args):
+    print(f"pattern {args.pattern!r}, {args.duration:.0f}s per run, batches of {args.batch_size}")
+    baseline = None
+    for workers in args.workers:
+        rate, worst_lag = await run(workers, args)
+        baseline = baseline or rate
+        print(
+            f"{workers:3d} processes: {rate:10.0f} keys/s  speed-up {rate / baseline:4.1f}x  "
+            f"worst event loop lag {worst_lag * 1000:.1f}ms"
+        )
+
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, *range(2, cores + 1, 2), cores}))
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--pattern", default="zzzzzz")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Measure bulk wallet import and export throughput.
+
+A key file of `--keys` base58 private keys is written to a temporary
+directory, with `--duplicates` of the lines repeated and `--invalid` of
+them corrupted. It is streamed from disk in `--chunk-size` byte chunks
+into `WalletVault.import_stream` backed by an in-memory collection, with
+keys decoded:
+
+- thread: on the loop's default thread pool;
+- processes: on a pool of `--workers` processes, as in production.
+
+Each run reports keys per second and the worst event loop lag measured by
+a ticker while the import runs, i.e. how long other handlers could be
+delayed. The last run is repeated under `tracemalloc` to report the peak
+working memory on top of the stored documents. Finally every imported
+wallet is exported through `export_stream`.
+
+Usage:
+    python -m benchmarks.bench_wallet_vault --keys 100000 --workers 2
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import base58
+from solders.keypair import Keypair
+
+from benchmarks.fakes import MemoryCollection
+from services.wallet_vault import WalletVault
+
+
+def write_key_file(path, args):
+    rng = random.Random(7)
+    keys = []
+    with open(path, "w") as file:
+        for _ in range(args.keys):
+            if keys and rng.random() < args.duplicates:
+                line = rng.choice(keys)
+            else:
+                line = base58.b58encode(Keypair().secret()).decode("ascii")
+                keys.append(line)
+            if rng.random() < args.invalid:
+                line = line[:-4] + "0OIl"
+            file.write(line + "\n")
+    return os.path.getsize(path)
+
+
+async def read_chunks(path, chunk_size):
+    with open(path, "rb") as file:
+        while True:
+            chunk = await asyncio.to_thread(file.read, chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+async def measure_lag(stop, interval=0.01):
+    loop = asyncio.get_running_loop()
+    worst = 0.0
+    while not stop.is_set():
+        started = loop.time()
+        await asyncio.sleep(interval)
+        worst = max(worst, loop.time() - started - interval)
+    return worst
+
+
+async def run_import(name, path, executor, args):
+    vault = WalletVault(MemoryCollection(key=("user_id", "public_key")), executor=executor, batch_size=args.batch_size)
+    stop = asyncio.Event()
+    lag = asyncio.create_task(measure_lag(stop))
+    started = time.perf_counter()
+    result = await vault.import_stream(1, read_chunks(path, args.chunk_size))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    worst_lag = await lag
+    print(
+        f"{name:9} {result.processed / elapsed:8.0f} keys/s  {elapsed:.2f}s  imported={result.imported} "
+        f"duplicates={result.duplicates} invalid={result.invalid} batches={result.batches}  "
+        f"worst event loop lag {worst_lag * 1000:.1f}ms"
+    )
+    return vault
+
+
+async def main_async(args):
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "keys.txt")
+    started = time.perf_counter()
+    size = write_key_file(path, args)
+    print(f"{args.keys} keys, {size / 1024 / 1024:.1f} MiB written in {time.perf_counter() - started:.1f}s")
+
+    await run_import("thread", path, None, args)
+    executor = ProcessPoolExecutor(max_workers=args.workers)
+    vault = await run_import("processes", path, executor, args)
+
+    tracemalloc.start()
+    traced = await run_import("traced", path, executor, args)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stored = len(traced.collection.documents)
+    print(f"memory:   peak {(peak - current) / 1024 / 1024:.1f} MiB working memory above {stored} stored documents")
+    executor.shutdown()
+
+    started = time.perf_counter()
+    exported = 0
+    async for chunk in vault.export_stream(1):
+        exported += len(chunk)
+    elapsed = time.perf_counter() - started
+    print(f"export:   {vault.exported / elapsed:8.0f} keys/s  {vault.exported} wallets, {exported / 1024 / 1024:.1f} MiB in {elapsed:.2f}s")
+    os.remove(path)
+    os.rmdir(directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, default=100000)
+    parser.add_argument("--duplicates", type=float, default=0.05)
+    parser.add_argument("--invalid", type=float, default=0.01)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--chunk-size", type=int, default=64 * 1024)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
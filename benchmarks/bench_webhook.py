@@ -0,0 +1,131 @@
+"""
+Compare update delivery through polling and through the webhook server.
+
+A real `Application` runs against `FakeBotApi`, whose API calls (including
+`getUpdates`) take `--rtt` seconds. In polling mode synthetic updates are
+queued for `getUpdates`; in webhook mode a load generator posts the same
+Update JSON to `WebhookServer` over HTTP with `--connections` keep-alive
+connections, as Telegram does. The handler records when each update
+reaches it, giving end-to-end latency and updates per second.
+
+Usage:
+    python -m benchmarks.bench_webhook --updates 5000 --rtt 0.05
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from telegram.ext import Application, MessageHandler, filters
+
+from benchmarks.fake_telegram import FakeBotApi, make_command_update
+from services.webhook import WebhookServer, queue_updates
+
+SECRET = "bench-secret"
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def build_application(api, handled, total, done):
+    async def record(update, context):
+        handled.append(time.perf_counter() - float(update.message.text.split()[1]))
+        if len(handled) == total:
+            done.set()
+
+    application = (
+        Application.builder()
+        .token("1:bench")
+        .request(api.request())
+        .get_updates_request(api.request())
+        .concurrent_updates(256)
+        .build()
+    )
+    application.add_handler(MessageHandler(filters.ALL, record))
+    return application
+
+
+async def post_updates(port, bodies, connections):
+    async def client(chunk):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        for body in chunk:
+            data = json.dumps(body).encode()
+            writer.write(
+                b"POST /webhook HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                + f"X-Telegram-Bot-Api-Secret-Token: {SECRET}\r\nContent-Length: {len(data)}\r\n\r\n".encode()
+                + data
+            )
+            await writer.drain()
+            await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line == b"\r\n":
+                    break
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+            await reader.readexactly(length)
+        writer.close()
+
+    await asyncio.gather(*(client(bodies[index::connections]) for index in range(connections)))
+
+
+def make_updates(count, users):
+    return [make_command_update(n + 1, 1000 + n % users, f"/start {time.perf_counter()}") for n in range(count)]
+
+
+async def run(mode, args):
+    api = FakeBotApi(latency=args.rtt)
+    handled = []
+    done = asyncio.Event()
+    application = build_application(api, handled, args.updates, done)
+    await application.initialize()
+    await application.start()
+
+    server = None
+    if mode == "polling":
+        await application.updater.start_polling(poll_interval=0.0, timeout=10)
+    else:
+        server = WebhookServer(queue_updates(application), SECRET, "/webhook", "127.0.0.1", 0)
+        await server.start()
+
+    started = time.perf_counter()
+    if mode == "polling":
+        for update in make_updates(args.updates, args.users):
+            api.push(update)
+    else:
+        await post_updates(server.http.port, make_updates(args.updates, args.users), args.connections)
+    await asyncio.wait_for(done.wait(), 120)
+    elapsed = time.perf_counter() - started
+
+    if server is not None:
+        await server.stop()
+    else:
+        await application.updater.stop()
+    await application.stop()
+    await application.shutdown()
+
+    print(
+        f"{mode:>7}: updates={args.updates} elapsed={elapsed:.2f}s rate={args.updates / elapsed:.0f}/s "
+        f"p50={statistics.median(handled) * 1000:.1f}ms p99={percentile(handled, 0.99) * 1000:.1f}ms "
+        f"getUpdates={api.calls.get('getUpdates', 0)}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--rtt", type=float, default=0.05, help="simulated Bot API round trip in seconds")
+    parser.add_argument("--connections", type=int, default=40, help="parallel webhook connections")
+    args = parser.parse_args()
+
+    for mode in ("polling", "webhook"):
+        asyncio.run(run(mode, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Measure withdrawal throughput against a local stub RPC node.
+
+`--users` wallets each submit `--per-user` withdrawals in a burst, and every
+withdrawal is submitted twice with the same idempotency key to simulate a
+double-tapped button. The burst is run twice through `WithdrawalEngine`:
+
+- single: one transfer per transaction (`max_per_transaction=1`);
+- coalesced: up to `--max-per-transaction` transfers of the same wallet
+  in one transaction.
+
+Both runs send through `TradeExecutor.broadcast` with at most
+`--concurrency` transactions in flight; the stub confirms a transaction
+`--confirm-latency` seconds after receiving it and delays every response by
+`--latency`. Withdrawals per second, transactions sent, end-to-end latency
+and the number of double taps that were deduplicated are reported.
+
+Usage:
+    python -m benchmarks.bench_withdrawals --users 200 --per-user 5
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from solders.keypair import Keypair
+
+from benchmarks.stub_rpc import StubRpcServer
+from services.solana_rpc import LAMPORTS_PER_SOL, SolanaRpcClient
+from services.trade_executor import BlockhashCache, RpcNode, TradeExecutor
+from services.wallet_store import Wallet
+from services.withdrawals import WithdrawalEngine
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class LocalWallets:
+    def __init__(self, users):
+        self.wallets = {}
+        for user_id in range(users):
+            keypair = Keypair()
+            self.wallets[user_id] = Wallet(user_id, str(keypair.pubkey()), None, keypair)
+
+    async def get_wallet(self, user_id):
+        return self.wallets[user_id]
+
+
+async def run_burst(name, wallets, rpc, max_per_transaction, args):
+    node = RpcNode("stub", rpc)
+    blockhashes = BlockhashCache(rpc, interval=2.0)
+    await blockhashes.start()
+    executor = TradeExecutor([node], None, blockhashes, fanout=1, poll_interval=0.05)
+    engine = WithdrawalEngine(
+        wallets, rpc, blockhashes, lambda transaction: executor.broadcast(transaction, "sell"),
+        max_concurrency=args.concurrency, max_per_transaction=max_per_transaction, batch_window=args.batch_window,
+    )
+    destination = str(Keypair().pubkey())
+    for user_id in wallets.wallets:
+        await engine.set_address(user_id, destination)
+
+    latencies = []
+
+    async def one(user_id, number):
+        key = f"{user_id}:{number}"
+        started = time.perf_counter()
+        # Distinct amounts keep every transfer, and so every transaction, unique.
+        taps = [engine.withdraw(user_id, key, lamports=1000 + user_id * args.per_user + number) for _ in range(2)]
+        await asyncio.gather(*taps)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(user_id, number) for user_id in wallets.wallets for number in range(args.per_user)))
+    elapsed = time.perf_counter() - started
+    await blockhashes.stop()
+
+    stats = engine.stats()
+    print(
+        f"{name:9} {stats['completed'] / elapsed:8.0f} withdrawals/s  transactions={stats['transactions']:5d} "
+        f"p50={statistics.median(latencies) * 1000:.0f}ms p99={percentile(latencies, 0.99) * 1000:.0f}ms "
+        f"completed={stats['completed']} duplicates={stats['duplicates']} failed={stats['failed']}"
+    )
+
+
+async def main_async(args):
+    wallets = LocalWallets(args.users)
+    balances = {wallet.public_key: 1000 * LAMPORTS_PER_SOL for wallet in wallets.wallets.values()}
+    server = StubRpcServer(balances, latency=args.latency, confirm_latency=args.confirm_latency)
+    await server.start()
+    client = httpx.AsyncClient(timeout=None, limits=httpx.Limits(max_connections=args.concurrency * 2))
+    rpc = SolanaRpcClient(server.url, client=client)
+
+    print(f"{args.users} wallets x {args.per_user} withdrawals, each tapped twice")
+    await run_burst("single", wallets, rpc, 1, args)
+    await run_burst("coalesced", wallets, rpc, args.max_per_transaction, args)
+
+    await client.aclose()
+    await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--per-user", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--max-per-transaction", type=int, default=8)
+    parser.add_argument("--batch-window", type=float, default=0.05)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--confirm-latency", type=float, default=0.4)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
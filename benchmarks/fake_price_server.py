@@ -0,0 +1,87 @@
+"""
+A local fake SOL/USD price API for benchmarks and manual testing.
+
+It answers in the response shapes of the preset price sources, so a
+`PriceOracle` can be pointed at it with custom source specifications:
+
+    GET /coingecko  -> {"solana": {"usd": 172.31}}
+    GET /binance    -> {"symbol": "SOLUSDT", "price": "172.31000000"}
+    GET /kraken     -> {"error": [], "result": {"SOLUSD": {"c": ["172.31", "1.0"]}}}
+
+`latency` and `failing` can be changed while the server runs to simulate
+a slow or broken upstream.
+
+Usage:
+    python -m benchmarks.fake_price_server --port 8900 --latency 0.05
+"""
+import argparse
+import asyncio
+import random
+
+from utils.http_server import HttpResponse, HttpServer
+
+
+class FakePriceServer:
+    """In-memory price API with a random-walk SOL price."""
+
+    def __init__(self, price=150.0, latency=0.0, host="127.0.0.1", port=0, seed=None):
+        self.price = price
+        self.latency = latency
+        self.failing = False
+        self.requests = 0
+        self._random = random.Random(seed)
+        self.http = HttpServer(self._handle, host, port)
+
+    @property
+    def url(self):
+        return f"http://{self.http.host}:{self.http.port}"
+
+    def source_spec(self, shape, name=None):
+        """Return a `build_price_sources` entry pointing at this server in the given response shape."""
+        path = {"coingecko": "solana.usd", "binance": "price", "kraken": "result.SOLUSD.c.0"}[shape]
+        return f"{name or shape}={self.url}/{shape}#{path}"
+
+    async def start(self):
+        await self.http.start()
+
+    async def stop(self):
+        await self.http.stop()
+
+    async def _handle(self, request):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.failing:
+            return HttpResponse(503, "service unavailable")
+
+        self.price = max(0.01, self.price * (1 + self._random.gauss(0, 0.001)))
+        price = round(self.price, 2)
+        if request.path == "/coingecko":
+            return HttpResponse.json({"solana": {"usd": price}})
+        if request.path == "/binance":
+            return HttpResponse.json({"symbol": "SOLUSDT", "price": f"{price:.8f}"})
+        if request.path == "/kraken":
+            return HttpResponse.json({"error": [], "result": {"SOLUSD": {"c": [f"{price}", "1.0"]}}})
+        return HttpResponse(404, "not found")
+
+
+async def serve(port, latency):
+    server = FakePriceServer(latency=latency, port=port)
+    await server.start()
+    print(f"fake price API listening on {server.url} (/coingecko, /binance, /kraken)")
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.port, args.latency))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""Local stand-ins for the Telegram Bot API, used by the benchmark scripts."""
+import asyncio
+import json
+import time
+
+from telegram.error import RetryAfter
+from telegram.request import BaseRequest
+
+from services.telegram_sender import TokenBucket
+
+
+class FakeBot:
+    """
+    A fake Bot that records every call and enforces Telegram-like flood limits.
+
+    Limits are modelled as token buckets: a global one and one per chat.
+    A call that finds either bucket empty fails with `RetryAfter`, just like
+    the real API answering 429.
+    """
+
+    def __init__(self, global_rate=30.0, chat_rate=1.0, chat_burst=3, latency=0.02, clock=time.monotonic):
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.latency = latency
+        self.clock = clock
+        self.calls = []
+        self.rejected = 0
+        self._global = TokenBucket(global_rate, max(1, global_rate), clock())
+        self._chats = {}
+
+    def _admit(self, chat_id):
+        now = self.clock()
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst, now)
+        # A small tolerance absorbs clock jitter between the sender and the fake.
+        if self._global.delay(now) > 0.005 or bucket.delay(now) > 0.005:
+            self.rejected += 1
+            raise RetryAfter(1)
+        self._global.consume(now)
+        bucket.consume(now)
+
+    async def _call(self, method, chat_id, **kwargs):
+        self._admit(chat_id)
+        self.calls.append((self.clock(), method, chat_id))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return kwargs
+
+    async def edit_message_text(self, text, chat_id, message_id, **kwargs):
+        return await self._call("editMessageText", chat_id, text=text, message_id=message_id)
+
+    async def send_message(self, chat_id, text, **kwargs):
+        return await self._call("sendMessage", chat_id, text=text)
+
+    async def delete_message(self, chat_id, message_id):
+        return await self._call("deleteMessage", chat_id, message_id=message_id)
+
+    def throughput(self):
+        """Return the achieved calls per second over the recorded window."""
+        if len(self.calls) < 2:
+            return 0.0
+        return (len(self.calls) - 1) / (self.calls[-1][0] - self.calls[0][0])
+
+
+class FakeBotApi:
+    """
+    In-process Bot API used as the request backend of a real `Application`.
+
+    Hand `api.request()` to `ApplicationBuilder.request()` and
+    `ApplicationBuilder.get_updates_request()`: outgoing calls are answered
+    locally after `latency` seconds and counted per method, and `getUpdates`
+    long-polls the updates queued with `push()`. The id of the last message
+    sent to each chat is kept in `message_ids`.
+    """
+
+    def __init__(self, latency=0.0, bot_id=1):
+        self.latency = latency
+        self.bot_id = bot_id
+        self.calls = {}
+        self.message_ids = {}
+        self._pending = []
+        self._arrived = None
+        self._next_message_id = 1000
+
+    def request(self):
+        return FakeRequest(self)
+
+    def push(self, update):
+        """Queue a raw update dict for delivery through `getUpdates`."""
+        self._pending.append(update)
+        if self._arrived is not None:
+            self._arrived.set()
+
+    def reset_calls(self):
+        self.calls = {}
+
+    async def handle(self, method, params):
+        self.calls[method] = self.calls.get(method, 0) + 1
+        if method == "getUpdates":
+            return await self._get_updates(params)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if method == "getMe":
+            return {
+                "id": self.bot_id, "is_bot": True, "first_name": "Bloom", "username": "bloom_bot",
+                "can_join_groups": True, "can_read_all_group_messages": False, "supports_inline_queries": False,
+            }
+        if method in ("sendMessage", "editMessageText", "sendDocument"):
+            message_id = params.get("message_id")
+            if message_id is None:
+                self._next_message_id += 1
+                message_id = self._next_message_id
+                self.message_ids[params.get("chat_id")] = message_id
+            return {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": params.get("chat_id", 0), "type": "private"},
+                "text": params.get("text", ""),
+            }
+        return True
+
+    async def _get_updates(self, params):
+        if self._arrived is None:
+            self._arrived = asyncio.Event()
+        if not self._pending:
+            self._arrived.clear()
+            try:
+                await asyncio.wait_for(self._arrived.wait(), float(params.get("timeout") or 0))
+            except asyncio.TimeoutError:
+                return []
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        limit = int(params.get("limit") or 100)
+        batch, self._pending = self._pending[:limit], self._pending[limit:]
+        return batch
+
+
+class FakeRequest(BaseRequest):
+    """`BaseRequest` implementation that forwards every call to a `FakeBotApi`."""
+
+    def __init__(self, api):
+        self.api = api
+
+    @property
+    def read_timeout(self):
+        return 30.0
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None, write_timeout=None,
+                         connect_timeout=None, pool_timeout=None):
+        params = request_data.parameters if request_data is not None else {}
+        result = await self.api.handle(url.rsplit("/", 1)[-1], params)
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+
+def make_user(user_id):
+    return {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}
+
+
+def make_command_update(update_id, user_id, text="/start"):
+    """Build the raw JSON of a private-chat message update."""
+    entities = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}] if text.startswith("/") else []
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": make_user(user_id),
+            "text": text,
+            "entities": entities,
+        },
+    }
+
+
+def make_callback_update(update_id, user_id, data, message_id=1):
+    """Build the raw JSON of a callback query update pressed on a bot message."""
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": make_user(user_id),
+            "chat_instance": str(user_id),
+            "data": data,
+            "message": {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": {"id": 1, "is_bot": True, "first_name": "Bloom"},
+                "text": "dashboard",
+            },
+        },
+    }
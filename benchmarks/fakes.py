@@ -0,0 +1,178 @@
+"""In-memory stand-ins for external services, used by the benchmark scripts."""
+import itertools
+
+from pymongo import DeleteOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+
+def matches(document, query):
+    """Return whether a document matches a query of equality, `$in`, `$exists` and `$mod` conditions."""
+    for field, condition in query.items():
+        if isinstance(condition, dict):
+            if "$in" in condition and document.get(field) not in condition["$in"]:
+                return False
+            if "$exists" in condition and (field in document) != condition["$exists"]:
+                return False
+            if "$mod" in condition:
+                divisor, remainder = condition["$mod"]
+                if not isinstance(document.get(field), int) or document[field] % divisor != remainder:
+                    return False
+        elif document.get(field) != condition:
+            return False
+    return True
+
+
+class MemoryCursor:
+    """An iterator over query results with the `close()` of a `pymongo` cursor."""
+
+    def __init__(self, documents):
+        self._documents = iter(documents)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._documents)
+
+    def close(self):
+        self._documents = iter(())
+
+
+class MemoryCollection:
+    """
+    A minimal in-memory replacement for a `pymongo` collection.
+
+    Only the operations the services actually issue are implemented.
+    Documents are indexed by a unique key field (`user_id` by default) or a
+    tuple of fields, so queries on a single key field are dictionary lookups; other
+    queries scan every document. Documents without the key field (e.g. the
+    per-user pause markers stored next to tasks) are kept under a private id.
+    """
+
+    def __init__(self, key="user_id"):
+        self.key = key
+        self.documents = {}
+        self._ids = itertools.count()
+
+    def create_index(self, *args, **kwargs):
+        return None
+
+    def _id(self, document):
+        if isinstance(self.key, tuple):
+            if all(field in document for field in self.key):
+                return tuple(document[field] for field in self.key)
+        elif self.key in document:
+            return document[self.key]
+        return ("_id", next(self._ids))
+
+    def _find_ids(self, query):
+        if len(query) == 1 and not isinstance(self.key, tuple) and self.key in query:
+            condition = query[self.key]
+            if not isinstance(condition, dict):
+                return [condition] if condition in self.documents else []
+            if list(condition) == ["$in"]:
+                return [key for key in condition["$in"] if key in self.documents]
+        return [document_id for document_id, document in self.documents.items() if matches(document, query)]
+
+    def find_one(self, query, projection=None, sort=None):
+        found = self._find_ids(query)
+        if sort and found:
+            (field, direction), = sort
+            found.sort(key=lambda document_id: self.documents[document_id].get(field), reverse=direction < 0)
+        return self.documents[found[0]] if found else None
+
+    def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        found = self._find_ids(query)
+        document = self.documents[found[0]] if found else None
+        if document is None and upsert:
+            document = {field: value for field, value in query.items() if not isinstance(value, dict)}
+            document.update(update.get("$setOnInsert", {}))
+            self.documents[self._id(document)] = document
+        if document is not None:
+            document.update(update.get("$set", {}))
+            for field, amount in update.get("$inc", {}).items():
+                document[field] = document.get(field, 0) + amount
+            for field, value in update.get("$max", {}).items():
+                document[field] = max(document.get(field, value), value)
+        return document
+
+    def update_one(self, query, update, upsert=False):
+        self.find_one_and_update(query, update, upsert=upsert)
+
+    def update_many(self, query, update):
+        for document_id in self._find_ids(query):
+            self.find_one_and_update({self.key: document_id}, update)
+
+    def insert_one(self, document):
+        document_id = self._id(document)
+        if document_id in self.documents:
+            raise DuplicateKeyError(f"duplicate key: {document_id}")
+        self.documents[document_id] = dict(document)
+
+    def insert_many(self, documents, ordered=True):
+        inserted = 0
+        errors = []
+        for index, document in enumerate(documents):
+            try:
+                self.insert_one(document)
+            except DuplicateKeyError as error:
+                errors.append({"index": index, "code": 11000, "errmsg": str(error)})
+                if ordered:
+                    break
+            else:
+                inserted += 1
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": inserted})
+
+    def find(self, query=None, projection=None, **kwargs):
+        return MemoryCursor([dict(self.documents[document_id]) for document_id in self._find_ids(query or {})])
+
+    def count_documents(self, query):
+        return len(self._find_ids(query))
+
+    def delete_one(self, query):
+        found = self._find_ids(query)
+        if found:
+            del self.documents[found[0]]
+
+    def delete_many(self, query):
+        for document_id in self._find_ids(query):
+            del self.documents[document_id]
+
+    def bulk_write(self, operations, ordered=True):
+        # pymongo's UpdateOne and DeleteOne keep their arguments in `_filter` and `_doc`.
+        for operation in operations:
+            if isinstance(operation, DeleteOne):
+                self.delete_one(operation._filter)
+            else:
+                self.find_one_and_update(operation._filter, operation._doc, upsert=True)
+
+
+class MemoryDatabase:
+    """
+    A `pymongo` database of `MemoryCollection`s, created on first access.
+
+    Collections are keyed by the field the bot's services treat as unique;
+    collections not listed in `KEYS` are keyed by `user_id`.
+    """
+
+    KEYS = {
+        "sessions": "chat_id",
+        "snipe_tasks": "task_id",
+        "copy_configs": "config_id",
+        "afk_tasks": "task_id",
+        "withdrawals": "key",
+        "buy_keys": "key",
+        "imported_wallets": ("user_id", "public_key"),
+        "positions": ("user_id", "mint"),
+        "counters": "_id",
+    }
+
+    def __init__(self):
+        self.collections = {}
+
+    def __getitem__(self, name):
+        collection = self.collections.get(name)
+        if collection is None:
+            collection = self.collections[name] = MemoryCollection(self.KEYS.get(name, "user_id"))
+        return collection
@@ -0,0 +1,184 @@
+"""
+A local stub of the Solana JSON-RPC API for benchmarks and manual testing.
+
+Only the calls the bot needs are implemented. Reads (`getBalance`,
+`getMultipleAccounts`, `getTokenSupply`) are answered from an in-memory
+`balances` dict and the token mints registered with `add_mint`, which
+`getMultipleAccounts` also returns in `jsonParsed` form with their
+Metaplex metadata accounts, and `getLatestBlockhash` returns a blockhash that changes
+every `blockhash_interval` seconds and stays valid for 150 of them, as
+reported by `getBlockHeight`. `sendTransaction` accepts any
+well-formed transaction, which `getSignatureStatuses` reports as confirmed
+`confirm_latency` seconds after it was first received. Stubs sharing one
+`ledger` dict behave as nodes of the same cluster, and setting
+`fail_sends` makes a node reject transactions. Every response is delayed
+by an injected `latency`. Every call is counted by method and the number
+of keys requested per `getMultipleAccounts` is recorded.
+
+Usage:
+    python -m benchmarks.stub_rpc --port 8899 --latency 0.05
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import struct
+import time
+from collections import Counter
+
+from solders.hash import Hash
+from solders.pubkey import Pubkey
+from solders.transaction import VersionedTransaction
+
+from services.token_info import METADATA_PROGRAM, TOKEN_PROGRAM, metadata_address
+from utils.http_server import HttpResponse, HttpServer
+
+
+def encode_metadata(mint, name, symbol):
+    """Build the data of a Metaplex metadata account, padded as Metaplex stores it."""
+    data = bytes([4]) + bytes(32) + bytes(Pubkey.from_string(mint))
+    for value, size in ((name, 32), (symbol, 10), ("", 200)):
+        encoded = value.encode("utf-8").ljust(size, b"\x00")
+        data += struct.pack("<I", len(encoded)) + encoded
+    return data
+
+
+class StubRpcServer:
+    """In-memory Solana JSON-RPC node served over HTTP."""
+
+    def __init__(self, balances=None, latency=0.0, host="127.0.0.1", port=0, confirm_latency=0.4,
+                 blockhash_interval=0.4, ledger=None):
+        self.balances = balances if balances is not None else {}
+        self.mints = {}
+        self.metadata = {}
+        self.latency = latency
+        self.confirm_latency = confirm_latency
+        self.blockhash_interval = blockhash_interval
+        self.fail_sends = False
+        self.received = ledger if ledger is not None else {}
+        self.calls = Counter()
+        self.batch_sizes = Counter()
+        self.http = HttpServer(self._handle, host, port)
+
+    @property
+    def url(self):
+        return f"http://{self.http.host}:{self.http.port}"
+
+    def add_mint(self, mint, decimals=6, supply=10 ** 15, name=None, symbol=None, mint_authority=None):
+        """Register a token mint, with a metadata account when `name` or `symbol` is given."""
+        self.mints[mint] = {
+            "decimals": decimals,
+            "supply": str(supply),
+            "mintAuthority": mint_authority,
+            "freezeAuthority": None,
+            "isInitialized": True,
+        }
+        if name or symbol:
+            self.metadata[metadata_address(mint)] = encode_metadata(mint, name or "", symbol or "")
+
+    async def start(self):
+        await self.http.start()
+
+    async def stop(self):
+        await self.http.stop()
+
+    async def _handle(self, request):
+        if request.method != "POST":
+            return HttpResponse(405, "method not allowed")
+        payload = request.json()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if isinstance(payload, list):
+            return HttpResponse.json([self._answer(call) for call in payload])
+        return HttpResponse.json(self._answer(payload))
+
+    def _answer(self, call):
+        method = call.get("method")
+        params = call.get("params") or []
+        self.calls[method] += 1
+        context = {"slot": 1}
+
+        if method == "getBalance":
+            result = {"context": context, "value": self.balances.get(params[0], 0)}
+        elif method == "getMultipleAccounts":
+            self.batch_sizes[len(params[0])] += 1
+            parsed = len(params) > 1 and params[1].get("encoding") == "jsonParsed"
+            result = {"context": context, "value": [self._account(pubkey, parsed) for pubkey in params[0]]}
+        elif method == "getTokenSupply":
+            mint = self.mints.get(params[0], {"supply": "1000000000000000", "decimals": 6})
+            ui_amount = int(mint["supply"]) / 10 ** mint["decimals"]
+            result = {"context": context, "value": {"amount": mint["supply"], "decimals": mint["decimals"], "uiAmountString": f"{ui_amount:g}"}}
+        elif method == "getLatestBlockhash":
+            epoch = int(time.time() / self.blockhash_interval)
+            blockhash = Hash(hashlib.sha256(epoch.to_bytes(8, "big")).digest())
+            result = {"context": context, "value": {"blockhash": str(blockhash), "lastValidBlockHeight": epoch + 150}}
+        elif method == "getBlockHeight":
+            result = int(time.time() / self.blockhash_interval)
+        elif method == "sendTransaction":
+            if self.fail_sends:
+                return {"jsonrpc": "2.0", "id": call.get("id"), "error": {"code": -32005, "message": "Node is unhealthy"}}
+            transaction = VersionedTransaction.from_bytes(base64.b64decode(params[0]))
+            result = str(transaction.signatures[0])
+            self.received.setdefault(result, time.monotonic())
+        elif method == "getSignatureStatuses":
+            result = {"context": context, "value": [self._status(signature) for signature in params[0]]}
+        else:
+            return {"jsonrpc": "2.0", "id": call.get("id"), "error": {"code": -32601, "message": "Method not found"}}
+        return {"jsonrpc": "2.0", "id": call.get("id"), "result": result}
+
+    def _status(self, signature):
+        received = self.received.get(signature)
+        if received is None or time.monotonic() - received < self.confirm_latency:
+            return None
+        return {"slot": 1, "confirmations": 0, "err": None, "confirmationStatus": "confirmed"}
+
+    def _account(self, pubkey, parsed=False):
+        if pubkey in self.mints:
+            info = self.mints[pubkey]
+            data = {"program": "spl-token", "parsed": {"type": "mint", "info": info}, "space": 82}
+            if not parsed:
+                data = ["", "base64"]
+            return {"lamports": 1461600, "owner": TOKEN_PROGRAM, "data": data, "executable": False, "rentEpoch": 0, "space": 82}
+        if pubkey in self.metadata:
+            data = self.metadata[pubkey]
+            return {
+                "lamports": 5616720,
+                "owner": METADATA_PROGRAM,
+                "data": [base64.b64encode(data).decode("ascii"), "base64"],
+                "executable": False,
+                "rentEpoch": 0,
+                "space": len(data),
+            }
+        lamports = self.balances.get(pubkey)
+        if lamports is None:
+            return None
+        return {
+            "lamports": lamports,
+            "owner": "11111111111111111111111111111111",
+            "data": ["", "base64"],
+            "executable": False,
+            "rentEpoch": 0,
+            "space": 0,
+        }
+
+
+async def serve(port, latency):
+    server = StubRpcServer(latency=latency, port=port)
+    await server.start()
+    print(f"stub Solana RPC listening on {server.url}")
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8899)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.port, args.latency))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -6,3 +6,139 @@ load_dotenv()
 
 # Telegram Bot Token
 TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+
+# MongoDB connection used for persistent per-user data
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "bloom")
+
+# Maximum number of decoded wallets kept in memory
+WALLET_CACHE_SIZE = int(os.getenv("WALLET_CACHE_SIZE", "10000"))
+
+# Pre-generated wallet reserve used to absorb onboarding bursts
+KEYPAIR_POOL_RESERVE = int(os.getenv("KEYPAIR_POOL_RESERVE", "1000"))
+KEYPAIR_POOL_BATCH_SIZE = int(os.getenv("KEYPAIR_POOL_BATCH_SIZE", "250"))
+KEYPAIR_POOL_WORKERS = int(os.getenv("KEYPAIR_POOL_WORKERS", "2"))
+
+# Per-chat dashboard sessions: "chat_data" keeps them in python-telegram-bot's
+# context.chat_data, "memory" uses an in-process store with TTL eviction and
+# "mongo" persists them so several workers can share them.
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "chat_data")
+SESSION_TTL = float(os.getenv("SESSION_TTL", "86400"))
+
+# Number of updates processed concurrently (1 disables concurrency)
+CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", "64"))
+
+# Seconds during which re-rendering an unchanged dashboard message is skipped
+RENDER_SUPPRESS_WINDOW = float(os.getenv("RENDER_SUPPRESS_WINDOW", "10"))
+
+# Outbound Telegram API shaping (calls per second); the global rate is for the
+# whole bot and split evenly between webhook workers
+SEND_GLOBAL_RATE = float(os.getenv("SEND_GLOBAL_RATE", "30"))
+SEND_CHAT_RATE = float(os.getenv("SEND_CHAT_RATE", "1"))
+SEND_CHAT_BURST = int(os.getenv("SEND_CHAT_BURST", "3"))
+
+# Update delivery: "polling" or "webhook"
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or None
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "1"))
+
+# Solana JSON-RPC endpoint and how long fetched balances are reused (seconds)
+SOLANA_RPC_URL = os.getenv("SOLANA_RPC_URL", "https://api.mainnet-beta.solana.com")
+BALANCE_CACHE_TTL = float(os.getenv("BALANCE_CACHE_TTL", "3"))
+
+# SOL/USD price feed: comma-separated presets (coingecko, binance, kraken) or
+# name=url#json.path entries, refresh cadence and age before the UI warns (seconds)
+PRICE_SOURCES = os.getenv("PRICE_SOURCES", "coingecko,binance,kraken")
+PRICE_REFRESH_INTERVAL = float(os.getenv("PRICE_REFRESH_INTERVAL", "10"))
+PRICE_MAX_AGE = float(os.getenv("PRICE_MAX_AGE", "60"))
+
+# LP sniper: listen for new pools on the RPC websocket and fire matching tasks
+SNIPER_ENABLED = os.getenv("SNIPER_ENABLED", "false").lower() == "true"
+SOLANA_WS_URL = os.getenv("SOLANA_WS_URL", "wss://api.mainnet-beta.solana.com")
+SNIPER_MAX_CONCURRENT_BUYS = int(os.getenv("SNIPER_MAX_CONCURRENT_BUYS", "64"))
+
+# Copy trading: stream leader wallet trades and copy them for followers
+COPY_TRADE_ENABLED = os.getenv("COPY_TRADE_ENABLED", "false").lower() == "true"
+COPY_TRADE_MAX_CONCURRENCY = int(os.getenv("COPY_TRADE_MAX_CONCURRENCY", "256"))
+
+# AFK mode: recurring per-user tasks run from a timer wheel
+AFK_RESOLUTION = float(os.getenv("AFK_RESOLUTION", "0.1"))
+AFK_MAX_BATCH_SIZE = int(os.getenv("AFK_MAX_BATCH_SIZE", "500"))
+
+# Trade execution: swaps are routed through Jupiter and sent to TRADE_NODES in parallel;
+# users with MEV Protect on trade only through the private relays in TRADE_PRIVATE_NODES
+TRADE_EXECUTION_ENABLED = os.getenv("TRADE_EXECUTION_ENABLED", "false").lower() == "true"
+TRADE_NODES = os.getenv("TRADE_NODES", SOLANA_RPC_URL)
+TRADE_PRIVATE_NODES = os.getenv("TRADE_PRIVATE_NODES", "")
+TRADE_FANOUT = int(os.getenv("TRADE_FANOUT", "2"))
+PRIORITY_FEE_MICROLAMPORTS = int(os.getenv("PRIORITY_FEE_MICROLAMPORTS", "50000"))
+BLOCKHASH_REFRESH_INTERVAL = float(os.getenv("BLOCKHASH_REFRESH_INTERVAL", "2"))
+JUPITER_API_URL = os.getenv("JUPITER_API_URL", "https://lite-api.jup.ag/swap/v1")
+
+# Withdrawals: transfers from the same wallet are coalesced into one transaction
+WITHDRAW_MAX_CONCURRENCY = int(os.getenv("WITHDRAW_MAX_CONCURRENCY", "16"))
+WITHDRAW_MAX_PER_TRANSACTION = int(os.getenv("WITHDRAW_MAX_PER_TRANSACTION", "8"))
+WITHDRAW_BATCH_WINDOW = float(os.getenv("WITHDRAW_BATCH_WINDOW", "0.05"))
+
+# User settings: users kept in memory and seconds between write-behind flushes
+SETTINGS_CACHE_SIZE = int(os.getenv("SETTINGS_CACHE_SIZE", "100000"))
+SETTINGS_FLUSH_INTERVAL = float(os.getenv("SETTINGS_FLUSH_INTERVAL", "1"))
+
+# Metrics: Prometheus text format at http://METRICS_HOST:METRICS_PORT/metrics.
+# PROFILE_SLOW_HANDLERS > 0 samples stacks and writes folded stacks of handlers
+# slower than that many seconds to PROFILE_DIR.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+PROFILE_SLOW_HANDLERS = float(os.getenv("PROFILE_SLOW_HANDLERS", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+
+# Vanity wallets: searches run on VANITY_WORKERS processes (0 uses every core)
+VANITY_WORKERS = int(os.getenv("VANITY_WORKERS", "0")) or os.cpu_count()
+VANITY_MAX_JOBS = int(os.getenv("VANITY_MAX_JOBS", "2"))
+VANITY_MAX_LENGTH = int(os.getenv("VANITY_MAX_LENGTH", "6"))
+VANITY_TIMEOUT = float(os.getenv("VANITY_TIMEOUT", "600"))
+VANITY_BATCH_SIZE = int(os.getenv("VANITY_BATCH_SIZE", "5000"))
+
+# Bulk wallet import/export: keys decoded and written per batch and largest
+# accepted upload (the Bot API serves files of up to 20 MB)
+WALLET_IMPORT_BATCH_SIZE = int(os.getenv("WALLET_IMPORT_BATCH_SIZE", "1000"))
+WALLET_IMPORT_MAX_FILE_SIZE = int(os.getenv("WALLET_IMPORT_MAX_FILE_SIZE", str(20 * 1024 * 1024)))
+
+# Pasted contract addresses: seconds token information is cached, seconds an
+# address that is not a token mint is remembered, and addresses kept in memory
+TOKEN_INFO_TTL = float(os.getenv("TOKEN_INFO_TTL", "10"))
+TOKEN_INFO_NEGATIVE_TTL = float(os.getenv("TOKEN_INFO_NEGATIVE_TTL", "300"))
+TOKEN_INFO_CACHE_SIZE = int(os.getenv("TOKEN_INFO_CACHE_SIZE", "10000"))
+
+# Positions: seconds between marking every held token to its current price and
+# seconds changed positions are collected before they are written to MongoDB
+POSITION_MARK_INTERVAL = float(os.getenv("POSITION_MARK_INTERVAL", "15"))
+POSITION_FLUSH_INTERVAL = float(os.getenv("POSITION_FLUSH_INTERVAL", "1"))
+
+# Live dashboards: seconds an untouched dashboard keeps updating itself, seconds
+# changes are collected before edits go out and dashboards re-rendered at once
+LIVE_UPDATES_TTL = float(os.getenv("LIVE_UPDATES_TTL", "300"))
+LIVE_UPDATES_BATCH_WINDOW = float(os.getenv("LIVE_UPDATES_BATCH_WINDOW", "0.5"))
+LIVE_UPDATES_MAX_BATCH_SIZE = int(os.getenv("LIVE_UPDATES_MAX_BATCH_SIZE", "100"))
+
+# Incoming updates: accepted but unfinished updates after which polling and the
+# webhook wait. With UPDATE_JOURNAL_ENABLED, updates are journaled to
+# UPDATE_JOURNAL_DIR before dispatch and replayed after a crash; segment files
+# roll over every UPDATE_JOURNAL_SEGMENT_SIZE bytes and are fsynced every
+# UPDATE_JOURNAL_SYNC_INTERVAL seconds
+UPDATE_MAX_PENDING = int(os.getenv("UPDATE_MAX_PENDING", "1000"))
+UPDATE_JOURNAL_ENABLED = os.getenv("UPDATE_JOURNAL_ENABLED", "false").lower() == "true"
+UPDATE_JOURNAL_DIR = os.getenv("UPDATE_JOURNAL_DIR", "journal")
+UPDATE_JOURNAL_SEGMENT_SIZE = int(os.getenv("UPDATE_JOURNAL_SEGMENT_SIZE", str(16 * 1024 * 1024)))
+UPDATE_JOURNAL_SYNC_INTERVAL = float(os.getenv("UPDATE_JOURNAL_SYNC_INTERVAL", "1"))
+
+# Dashboards: modules and the services only they use are loaded on their first
+# button press; comma-separated DASHBOARD_WARMUP names ("all" for every one) are
+# loaded at startup instead
+DASHBOARD_WARMUP = os.getenv("DASHBOARD_WARMUP", "main")
@@ -1,51 +1,133 @@
+import math
+
 from .base_dashboard import BaseDashboard
-from telegram import InlineKeyboardButton
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from solders.pubkey import Pubkey
+from services.balance_service import format_sol
+from services.shards import WrongWorker
+
+MIN_INTERVAL_MINUTES = 1
 
 
 class AfkDashboard(BaseDashboard):
     """Handles the AFK Mode (ZFK Mode) dashboard."""
 
-    def __init__(self, wallet_generator, time_utils, main_dashboard):
-        super().__init__(wallet_generator, time_utils)
+    name = "afk"
+    routes = {
+        **BaseDashboard.routes,
+        "add_config": "add_config",
+        "config_input": "config_input",
+        "pause_all": "pause_all",
+        "start_all": "start_all",
+        "clear_configs": "clear_configs",
+    }
+
+    reply_markup = InlineKeyboardMarkup([
+        [InlineKeyboardButton("Add new config", callback_data="afk:add_config")],
+        [InlineKeyboardButton("Pause All", callback_data="afk:pause_all"), InlineKeyboardButton("Start All", callback_data="afk:start_all")],
+        [InlineKeyboardButton("Back", callback_data="afk:back"), InlineKeyboardButton("♻️Refresh", callback_data="afk:refresh")],
+        [InlineKeyboardButton("🗑Clear Configs", callback_data="afk:clear_configs"), InlineKeyboardButton("🚮Close", callback_data="afk:delete")],
+    ])
+
+    prompt_markup = InlineKeyboardMarkup([
+        [InlineKeyboardButton("Cancel", callback_data="afk:show")]
+    ])
+
+    def __init__(self, wallet_store, time_utils, main_dashboard, afk_scheduler=None, **kwargs):
+        super().__init__(wallet_store, time_utils, **kwargs)
         self.main_dashboard = main_dashboard
+        self.afk_scheduler = afk_scheduler
 
     async def show(self, update, context):
         """Displays the AFK dashboard."""
-        self.current_dashboard = "afk"
-        wallet_address = self.wallet_generator.public_key
+        body, reply_markup = await self.render(update.effective_user.id, None)
+        await self.display(update, context, body, reply_markup)
+        await self.watch(update, context, body, reply_markup)
+
+    async def live_keys(self, user_id):
+        return (("afk", user_id),)
 
-        keyboard = [
-            [InlineKeyboardButton("Add new config", callback_data="add_config")],
-            [InlineKeyboardButton("Pause All", callback_data="pause_all"), InlineKeyboardButton("Start All", callback_data="start_all")],
-            [InlineKeyboardButton("Back", callback_data="back_to_main"), InlineKeyboardButton("♻️Refresh", callback_data="refresh")],
-        ]
-        reply_markup = self.create_reply_markup(keyboard)
+    async def render(self, user_id, data):
+        wallet_address = await self.wallet_store.public_key(user_id)
+        scheduler = self.afk_scheduler
+        tasks = scheduler.user_tasks(user_id) if scheduler else []
 
-        last_updated = self.get_us_time()
+        if tasks and not scheduler.is_paused(user_id):
+            status = "🟢 AFK mode is *active*"
+        else:
+            status = "🔴 AFK mode is *inactive*"
+        task_lines = "".join(
+            f"{number}. `{task.mint}` — {format_sol(task.amount_sol)} SOL every {task.interval / 60:g} min\n"
+            for number, task in enumerate(tasks, start=1)
+        )
+        if task_lines:
+            task_lines += "\n"
 
         message = (
             f"🌸 *Bloom AFK*\n\n"
             f"💡 Run your bot while you are away!\n\n"
             f"AFK Wallet:\n"
             f"→ `W1: {wallet_address}`\n\n"
-            f"🟢 AFK mode is *active*\n"
-            f"🔴 AFK mode is *inactive*\n\n"
-            f"⚠️ Please wait 10 seconds after each change for it to take effect.\n\n"
-            f"⚠️ Changing your Default wallet? Remember to remake your tasks to use the new wallet for future transactions.\n\n"
-            f"🕒 Last updated: {last_updated}"
+            f"{status}\n\n"
+            f"{task_lines}"
+            f"⚡ Changes take effect immediately\n\n"
+            f"⚠️ Changing your Default wallet? Remember to remake your tasks to use the new wallet for future transactions."
         )
+        return message, self.reply_markup
 
-        await update.callback_query.message.edit_text(message, parse_mode="Markdown", reply_markup=reply_markup)
+    async def add_config(self, update, context, error=None):
+        """Ask the user for the token, SOL amount and interval of a recurring AFK buy."""
+        error_line = f"{error}\n\n" if error else ""
+        message = (
+            f"🌸 *New AFK Config*\n\n"
+            f"{error_line}"
+            f"Send the token mint address, the SOL amount to spend and how often to buy in minutes, separated by spaces:\n\n"
+            f"`<mint address> 0.1 15`"
+        )
+        await self.display(update, context, message, self.prompt_markup)
 
-    async def handle_button_click(self, update, context):
-        """Handles button clicks within the AFK dashboard."""
-        query = update.callback_query
+        session = await self.get_session(update, context)
+        session.pending_input = "afk:config_input"
+        await self.save_session(update, context, session)
 
-        if query.data == "back_to_main":
-            # Navigate back to the main dashboard
-            await self.main_dashboard.show(update, context)
-        elif query.data == "refresh":
-            # Refresh the current dashboard
-            await self.show(update, context)
-        else:
-            await query.answer()
+    async def config_input(self, update, context):
+        """Create a recurring AFK task from the text the user sent after pressing Add new config."""
+        parts = context.args[0].split() if context.args else []
+        try:
+            mint = str(Pubkey.from_string(parts[0]))
+            amount_sol = float(parts[1])
+            minutes = float(parts[2])
+        except (IndexError, ValueError):
+            await self.add_config(update, context, error="❌ Expected a mint address, a SOL amount and an interval in minutes.")
+            return
+        if not math.isfinite(amount_sol) or amount_sol <= 0:
+            await self.add_config(update, context, error="❌ The SOL amount must be greater than 0.")
+            return
+        if not math.isfinite(minutes) or minutes < MIN_INTERVAL_MINUTES:
+            await self.add_config(update, context, error=f"❌ The interval must be at least {MIN_INTERVAL_MINUTES} minute.")
+            return
+
+        try:
+            await self.afk_scheduler.add_task(update.effective_user.id, mint, amount_sol, minutes * 60)
+        except WrongWorker:
+            await self.add_config(update, context, error="❌ AFK tasks can only be added in your private chat with the bot.")
+            return
+        await self.show(update, context)
+
+    async def pause_all(self, update, context):
+        """Pause every AFK task of the user."""
+        if self.afk_scheduler is not None:
+            await self.afk_scheduler.pause_all(update.effective_user.id)
+        await self.show(update, context)
+
+    async def start_all(self, update, context):
+        """Resume every AFK task of the user."""
+        if self.afk_scheduler is not None:
+            await self.afk_scheduler.start_all(update.effective_user.id)
+        await self.show(update, context)
+
+    async def clear_configs(self, update, context):
+        """Cancel every AFK task of the user."""
+        if self.afk_scheduler is not None:
+            await self.afk_scheduler.remove_user_tasks(update.effective_user.id)
+        await self.show(update, context)
@@ -1,37 +1,125 @@
+import functools
+
 from telegram import InlineKeyboardMarkup
+from telegram.error import BadRequest
+
+from services.session_store import DashboardSession
+from services.telegram_sender import BACKGROUND, INTERACTIVE
+from .render_cache import RenderCache
+
+
+def instrumented(method):
+    """
+    Wrap a dashboard handler so that its latency, errors and concurrency are recorded.
+
+    The wrapper is a plain pass-through when the dashboard has no `metrics`.
+    """
+    action = method.__name__
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        if self.metrics is None:
+            return await method(self, *args, **kwargs)
+        return await self.metrics.observe(self.name, action, method, self, *args, **kwargs)
+
+    wrapper.instrumented = True
+    return wrapper
+
 
 class BaseDashboard:
     """
     Base class for managing dashboard functionalities.
 
     This class serves as a foundation for creating and managing interactive dashboards.
-    It provides utilities for wallet generation, time-related functionality, and
+    It provides access to per-user wallets, time-related functionality, and
     creating inline keyboards for Telegram bots.
+
+    Every dashboard has a unique `name` and a `routes` table mapping callback
+    actions to handler method names. Buttons use `callback_data` of the form
+    `"<name>:<action>"` (optionally followed by `":<argument>"`), which the
+    `CallbackRouter` resolves with a single dictionary lookup.
+
+    Dashboard instances are shared by every chat, so they hold no per-chat
+    state themselves. Which dashboard a chat is looking at, the message it
+    lives in and any pending input are kept in a `DashboardSession` obtained
+    through `get_session()`.
+
+    Keyboards that never change are built once per class and stored in the
+    `reply_markup` class attribute instead of being rebuilt on every `show()`.
+
+    Outbound Telegram API calls go through `call_api()`, which hands them to
+    the shared `TelegramSender` for rate limiting and edit coalescing.
+
+    Every routed handler, `show()` and `handle_button_click()` of a subclass
+    is wrapped with `instrumented` when the class is created, so with
+    `metrics` set their latency and errors are recorded per dashboard and
+    action without any code in the handlers themselves.
+
+    Dashboards that can be kept up to date without a ♻️Refresh press
+    implement `render()` and `live_keys()` and call `watch()` after
+    displaying themselves; `LiveUpdates` then calls `push()` whenever one of
+    the keys changes.
     """
 
-    def __init__(self, wallet_generator, time_utils):
+    name = "base"
+    routes = {
+        "show": "show",
+        "refresh": "refresh",
+        "back": "back_to_main",
+        "delete": "delete",
+    }
+
+    reply_markup = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for method_name in {*cls.routes.values(), "show", "handle_button_click"}:
+            method = getattr(cls, method_name, None)
+            if method is not None and not getattr(method, "instrumented", False):
+                setattr(cls, method_name, instrumented(method))
+
+    def __init__(self, wallet_store, time_utils, session_store=None, render_cache=None, sender=None, metrics=None,
+                 live_updates=None):
         """
         Initialize the BaseDashboard instance.
 
         Args:
-            wallet_generator (callable): A wallet generator function or object, 
-                                         typically used for creating new wallets.
+            wallet_store (WalletStore): The per-user wallet repository used to look up
+                                        (or create) the wallet of the user being served.
             time_utils (callable): A utility function to retrieve the current time,
                                    such as a function to get US Eastern Time.
+            session_store (SessionStore or None): Store for per-chat sessions. When omitted,
+                                                  sessions live in `context.chat_data`.
+            render_cache (RenderCache or None): Tracks rendered content so unchanged edits
+                                                can be suppressed. Every edit is sent when omitted.
+            sender (TelegramSender or None): Rate-limited send queue for outbound API calls.
+                                             Calls go straight to Telegram when omitted.
+            metrics (BotMetrics or None): Records handler latency and errors. Nothing is recorded when omitted.
+            live_updates (LiveUpdates or None): Registry of messages updated as their data changes.
+                                                Dashboards only change on user interaction when omitted.
 
         Attributes:
-            wallet_generator (callable): Stores the wallet generator utility.
+            wallet_store (WalletStore): Stores the wallet repository.
             get_us_time (callable): Stores the time utility function.
-            current_dashboard (str): Tracks the current active dashboard. Defaults to "main".
+            session_store (SessionStore or None): Stores the session store.
+            render_cache (RenderCache or None): Stores the render cache.
+            sender (TelegramSender or None): Stores the send queue.
+            metrics (BotMetrics or None): Stores the handler metrics.
+            live_updates (LiveUpdates or None): Stores the live update registry.
 
         Example:
-            >>> dashboard = BaseDashboard(wallet_generator=generate_solana_wallet, time_utils=get_us_time)
-            >>> dashboard.current_dashboard
+            >>> dashboard = BaseDashboard(wallet_store=wallet_store, time_utils=get_us_time)
+            >>> session = await dashboard.get_session(update, context)
+            >>> session.dashboard
             'main'
         """
-        self.wallet_generator = wallet_generator
+        self.wallet_store = wallet_store
         self.get_us_time = time_utils
-        self.current_dashboard = "main"
+        self.session_store = session_store
+        self.render_cache = render_cache
+        self.sender = sender
+        self.metrics = metrics
+        self.live_updates = live_updates
 
     def create_reply_markup(self, keyboard):
         """
@@ -53,9 +141,200 @@ class BaseDashboard:
             >>> from telegram import InlineKeyboardButton
             >>> keyboard = [[InlineKeyboardButton("Button 1", callback_data="1"),
                              InlineKeyboardButton("Button 2", callback_data="2")]]
-            >>> dashboard = BaseDashboard(wallet_generator=None, time_utils=None)
+            >>> dashboard = BaseDashboard(wallet_store=None, time_utils=None)
             >>> reply_markup = dashboard.create_reply_markup(keyboard)
             >>> type(reply_markup)
             <class 'telegram.inline.inlinekeyboardmarkup.InlineKeyboardMarkup'>
         """
         return InlineKeyboardMarkup(keyboard)
+
+    async def get_session(self, update, context):
+        """
+        Return the dashboard session of the chat the update belongs to.
+
+        Args:
+            update (telegram.Update): The incoming update.
+            context (telegram.ext.CallbackContext): The handler context.
+
+        Returns:
+            DashboardSession: The chat's session.
+        """
+        if self.session_store is not None:
+            return await self.session_store.get(update.effective_chat.id)
+
+        session = context.chat_data.get("session")
+        if session is None:
+            session = context.chat_data["session"] = DashboardSession()
+        return session
+
+    async def save_session(self, update, context, session):
+        """Persist changes made to the chat's session."""
+        if self.session_store is not None:
+            await self.session_store.save(update.effective_chat.id, session)
+
+    async def call_api(self, chat_id, call, key=None, priority=INTERACTIVE):
+        """
+        Perform an outbound Telegram API call.
+
+        Args:
+            chat_id (int): The chat the call targets.
+            call (callable): Zero-argument callable returning the API coroutine.
+            key (hashable or None): Coalescing key; queued calls with the same key are merged.
+            priority (int): `INTERACTIVE` or `BACKGROUND`.
+
+        Returns:
+            The result of the API call.
+        """
+        if self.sender is None:
+            return await call()
+        return await self.sender.submit(chat_id, call, key=key, priority=priority)
+
+    async def display(self, update, context, body, reply_markup):
+        """
+        Render the dashboard into the chat and record it in the chat's session.
+
+        Callback queries edit the message the button belongs to; commands and
+        text messages get a new reply. The "Last updated" footer is appended
+        here, and an edit whose body and keyboard are unchanged is skipped
+        when the render cache says the message was rendered recently enough.
+        Rendering a dashboard clears any input the chat was waiting to send.
+
+        Args:
+            update (telegram.Update): The incoming update.
+            context (telegram.ext.CallbackContext): The handler context.
+            body (str): The Markdown message text, without the "Last updated" footer.
+            reply_markup (InlineKeyboardMarkup): The dashboard keyboard.
+        """
+        message = f"{body}\n\n🕒 Last updated: {self.get_us_time()}"
+        digest = RenderCache.fingerprint(body, reply_markup)
+
+        if update.callback_query:
+            sent = await self._edit(update.callback_query, message, reply_markup, digest)
+        else:
+            sent = await self.call_api(
+                update.effective_chat.id,
+                lambda: update.message.reply_text(message, parse_mode="Markdown", reply_markup=reply_markup),
+            )
+            if self.render_cache is not None:
+                self.render_cache.remember((sent.chat_id, sent.message_id), digest)
+
+        session = await self.get_session(update, context)
+        session.dashboard = self.name
+        session.message_id = getattr(sent, "message_id", session.message_id)
+        # Rendering a dashboard abandons any input the chat was asked for.
+        session.pending_input = None
+        await self.save_session(update, context, session)
+        if self.live_updates is not None and session.message_id is not None:
+            # The message shows something new; a live dashboard subscribes it again through `watch()`.
+            self.live_updates.unwatch(update.effective_chat.id, session.message_id)
+
+    async def live_keys(self, user_id):
+        """
+        Return the data keys the dashboard displays for a user, e.g. `(("positions", user_id),)`.
+
+        Dashboards supporting live updates override this and implement
+        `render(user_id, data)`, returning the message body and keyboard for a
+        user without an incoming update. `watch()` ignores dashboards with no keys.
+        """
+        return ()
+
+    async def watch(self, update, context, body, reply_markup):
+        """
+        Keep the message just displayed up to date while the user has live updates on.
+
+        Args:
+            update (telegram.Update): The incoming update.
+            context (telegram.ext.CallbackContext): The handler context.
+            body (str): The body just displayed.
+            reply_markup (InlineKeyboardMarkup): The keyboard just displayed.
+        """
+        if self.live_updates is None:
+            return
+        user_id = update.effective_user.id
+        keys = await self.live_keys(user_id)
+        if not keys:
+            return
+        session = await self.get_session(update, context)
+        if session.message_id is None:
+            return
+        await self.live_updates.watch(
+            self, update.effective_chat.id, session.message_id, user_id,
+            keys, session.data, RenderCache.fingerprint(body, reply_markup),
+        )
+
+    async def push(self, subscription, bot):
+        """
+        Re-render a watched message and edit it if its content changed.
+
+        Args:
+            subscription (Subscription): The watched message.
+            bot (telegram.Bot): Bot used for the edit.
+
+        Returns:
+            bool: Whether an edit was sent.
+        """
+        body, reply_markup = await self.render(subscription.user_id, subscription.data)
+        digest = RenderCache.fingerprint(body, reply_markup)
+        if digest == subscription.digest:
+            return False
+        chat_id, message_id = subscription.chat_id, subscription.message_id
+        message = f"{body}\n\n🕒 Last updated: {self.get_us_time()}"
+        try:
+            await self.call_api(
+                chat_id,
+                lambda: bot.edit_message_text(message, chat_id, message_id, parse_mode="Markdown", reply_markup=reply_markup),
+                key=("edit", chat_id, message_id),
+                priority=BACKGROUND,
+            )
+        except BadRequest as error:
+            if "not modified" not in str(error).lower():
+                raise
+        subscription.digest = digest
+        if self.render_cache is not None:
+            self.render_cache.record((chat_id, message_id), digest)
+        return True
+
+    async def _edit(self, query, message, reply_markup, digest):
+        key = (query.message.chat_id, query.message.message_id)
+        if self.render_cache is not None and not self.render_cache.should_edit(key, digest):
+            await self.answer(query)
+            return query.message
+
+        try:
+            sent = await self.call_api(
+                query.message.chat_id,
+                lambda: query.message.edit_text(message, parse_mode="Markdown", reply_markup=reply_markup),
+                key=("edit",) + key,
+            )
+        except BadRequest as error:
+            if "not modified" not in str(error).lower():
+                raise
+            if self.render_cache is not None:
+                self.render_cache.suppressed(key, digest)
+            await self.answer(query)
+            return query.message
+
+        if self.render_cache is not None:
+            self.render_cache.record(key, digest)
+        return sent
+
+    async def refresh(self, update, context):
+        """Re-render the current dashboard."""
+        await self.show(update, context)
+
+    async def back_to_main(self, update, context):
+        """Navigate back to the main dashboard."""
+        await self.main_dashboard.show(update, context)
+
+    async def delete(self, update, context):
+        """Delete the dashboard message."""
+        message = update.callback_query.message
+        await self.call_api(message.chat_id, message.delete, key=("delete", message.chat_id, message.message_id))
+
+    async def answer(self, query, text=None):
+        """Answer a callback query so the client stops showing a spinner."""
+        await self.call_api(query.message.chat_id, lambda: query.answer(text), key=("answer", query.id))
+
+    async def handle_button_click(self, update, context):
+        """Handles button clicks that have no dedicated route yet."""
+        await self.answer(update.callback_query)
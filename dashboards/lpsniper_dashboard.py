@@ -1,49 +1,98 @@
+import math
+
 from .base_dashboard import BaseDashboard
-from telegram import InlineKeyboardButton
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from solders.pubkey import Pubkey
+from services.balance_service import format_sol
+from services.shards import WrongWorker
 
 
 class LpSniperDashboard(BaseDashboard):
     """Handles the LpSniper dashboard."""
 
-    def __init__(self, wallet_generator, time_utils, main_dashboard):
-        super().__init__(wallet_generator, time_utils)
+    name = "lpsniper"
+    routes = {
+        **BaseDashboard.routes,
+        "create_task": "create_task",
+        "task_input": "task_input",
+        "clear_tasks": "clear_tasks",
+    }
+
+    reply_markup = InlineKeyboardMarkup([
+        [InlineKeyboardButton("Sniper Wallets:0", callback_data='lpsniper:sniper_wallet'), InlineKeyboardButton("Create Task", callback_data='lpsniper:create_task')],
+        [InlineKeyboardButton("Back", callback_data='lpsniper:back'), InlineKeyboardButton("♻️Refresh", callback_data='lpsniper:refresh')],
+        [InlineKeyboardButton("🗑Clear Tasks", callback_data='lpsniper:clear_tasks'), InlineKeyboardButton("🚮Close", callback_data='lpsniper:delete')]
+    ])
+
+    prompt_markup = InlineKeyboardMarkup([
+        [InlineKeyboardButton("Cancel", callback_data='lpsniper:show')]
+    ])
+
+    def __init__(self, wallet_store, time_utils, main_dashboard, sniper_engine=None, **kwargs):
+        super().__init__(wallet_store, time_utils, **kwargs)
         self.main_dashboard = main_dashboard
+        self.sniper_engine = sniper_engine
 
     async def show(self, update, context):
         """Displays the LpSniper dashboard."""
-        self.current_dashboard = "lpsniper"
-        wallet_address = self.wallet_generator.public_key
-
-        keyboard = [
-            [InlineKeyboardButton("Sniper Wallets:0", callback_data='sniper_wallet'), InlineKeyboardButton("Create Task", callback_data='create_task')],
-            [InlineKeyboardButton("Back", callback_data='back_to_main'), InlineKeyboardButton("♻️Refresh", callback_data='refresh')],
-            [InlineKeyboardButton("🚮Close", callback_data='delete')]
-        ]
-
-        reply_markup = self.create_reply_markup(keyboard)
+        tasks = self.sniper_engine.user_tasks(update.effective_user.id) if self.sniper_engine else []
+        if not tasks:
+            message = (
+                f"🌸 Bloom Positions\n\n"
+                f"🧐 No active sniper tasks!\n\n"
+                f"📖 Learn More!"
+            )
+        else:
+            lines = "\n".join(
+                f"{number}. `{task.mint}` — {format_sol(task.amount_sol)} SOL"
+                for number, task in enumerate(tasks, start=1)
+            )
+            message = (
+                f"🌸 Bloom LP Sniper\n\n"
+                f"🎯 Active sniper tasks: {len(tasks)}\n\n"
+                f"{lines}\n\n"
+                f"Each task buys once, as soon as a pool for its token is created."
+            )
 
-        last_updated = self.get_us_time()
+        await self.display(update, context, message, self.reply_markup)
 
+    async def create_task(self, update, context, error=None):
+        """Ask the user for the token and amount of a new sniper task."""
+        error_line = f"{error}\n\n" if error else ""
         message = (
-            f"🌸 Bloom Positions\n\n"
-            f"🧐 No active sniper tasks!\n\n"
-            f"📖 Learn More!\n\n"
-            f"🕒 Last updated: {last_updated}\n\n"
+            f"🌸 New Sniper Task\n\n"
+            f"{error_line}"
+            f"Send the token mint address and the SOL amount to spend, separated by a space:\n\n"
+            f"`<mint address> 0.5`"
         )
+        await self.display(update, context, message, self.prompt_markup)
 
-        await update.callback_query.message.edit_text(message, parse_mode="Markdown", reply_markup=reply_markup)
+        session = await self.get_session(update, context)
+        session.pending_input = "lpsniper:task_input"
+        await self.save_session(update, context, session)
 
-    async def handle_button_click(self, update, context):
-        """Handles button clicks within the lpsniper dashboard."""
-        query = update.callback_query
+    async def task_input(self, update, context):
+        """Create a sniper task from the text the user sent after pressing Create Task."""
+        parts = context.args[0].split() if context.args else []
+        try:
+            mint = str(Pubkey.from_string(parts[0]))
+            amount_sol = float(parts[1])
+        except (IndexError, ValueError):
+            await self.create_task(update, context, error="❌ Expected a mint address followed by a SOL amount.")
+            return
+        if not math.isfinite(amount_sol) or amount_sol <= 0:
+            await self.create_task(update, context, error="❌ The SOL amount must be greater than 0.")
+            return
 
-        if query.data == "back_to_main":
-            # Navigate back to the main dashboard
-            await self.main_dashboard.show(update, context)
-        elif query.data == "refresh":
-            # Refresh the current dashboard
-            await self.show(update, context)
-        elif query.data == "delete":
-             await query.message.delete()
-        else:
-            await query.answer()
+        try:
+            await self.sniper_engine.add_task(update.effective_user.id, mint, amount_sol)
+        except WrongWorker:
+            await self.create_task(update, context, error="❌ Sniper tasks can only be created in your private chat with the bot.")
+            return
+        await self.show(update, context)
+
+    async def clear_tasks(self, update, context):
+        """Cancel every sniper task of the user."""
+        if self.sniper_engine is not None:
+            await self.sniper_engine.remove_user_tasks(update.effective_user.id)
+        await self.show(update, context)
@@ -1,41 +1,84 @@
 from .base_dashboard import BaseDashboard
-from telegram import InlineKeyboardButton
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from services.balance_service import BalanceUnavailable, format_sol
+from services.price_oracle import format_usd
 
 class MainDashboard(BaseDashboard):
     """Handles the main dashboard UI and functionality."""
 
+    name = "main"
+    routes = {
+        "show": "show",
+        "refresh": "refresh",
+        "close": "delete",
+    }
+
+    reply_markup = InlineKeyboardMarkup([
+        [InlineKeyboardButton("👜Positions", callback_data="position:show"), InlineKeyboardButton("🏹LP Sniper", callback_data="lpsniper:show")],
+        [InlineKeyboardButton("🤖Copy Trade", callback_data="trade:show"), InlineKeyboardButton("💤AFK Mode", callback_data="afk:show")],
+        [InlineKeyboardButton("Withdraw", callback_data="withdraw:show"), InlineKeyboardButton("⚙️Settings", callback_data="setting:show")],
+        [InlineKeyboardButton("🚮Close", callback_data="main:close"), InlineKeyboardButton("♻️Refresh", callback_data="main:refresh")],
+    ])
+
+    def __init__(self, wallet_store, time_utils, balance_service=None, price_oracle=None, **kwargs):
+        super().__init__(wallet_store, time_utils, **kwargs)
+        self.balance_service = balance_service
+        self.price_oracle = price_oracle
+
+    def usd_value(self, sol_balance):
+        """
+        Convert a SOL amount to USD using the last known price, without waiting on the network.
+
+        Returns:
+            tuple: The formatted USD value (or "unavailable") and a staleness warning line, or an empty string.
+        """
+        quote = self.price_oracle.quote() if self.price_oracle else None
+        if quote is None:
+            return "unavailable", ""
+        warning = ""
+        if self.price_oracle.is_stale(quote):
+            warning = f"⚠️ SOL price last updated {int(self.price_oracle.age(quote))}s ago\n"
+        return format_usd(sol_balance * quote.price), warning
+
     async def show(self, update, context):
-        self.current_dashboard = "main"
-        wallet_address = self.wallet_generator.public_key
-        balance = "0 SOL (USD $0)"
-        status = "🔴 You currently have no SOL in your wallet.\nTo start trading, please deposit SOL to your address."
+        body, reply_markup = await self.render(update.effective_user.id, None)
+        await self.display(update, context, body, reply_markup)
+        await self.watch(update, context, body, reply_markup)
 
-        keyboard = [
-            [InlineKeyboardButton("👜Positions", callback_data="positions"), InlineKeyboardButton("🏹LP Sniper", callback_data="lp_sniper")],
-            [InlineKeyboardButton("🤖Copy Trade", callback_data="copy_trade"), InlineKeyboardButton("💤AFK Mode", callback_data="afk_mode")],
-            [InlineKeyboardButton("Withdraw", callback_data="withdraw"), InlineKeyboardButton("⚙️Settings", callback_data="settings")],
-            [InlineKeyboardButton("🚮Close", callback_data="close"), InlineKeyboardButton("♻️Refresh", callback_data="refresh")],
-        ]
-        reply_markup = self.create_reply_markup(keyboard)
+    async def live_keys(self, user_id):
+        return (("balance", await self.wallet_store.public_key(user_id)),)
 
-        last_updated = self.get_us_time()
+    async def render(self, user_id, data):
+        wallet_address = await self.wallet_store.public_key(user_id)
+        try:
+            sol_balance = await self.balance_service.get_sol(wallet_address) if self.balance_service else 0
+        except BalanceUnavailable:
+            sol_balance = None
+
+        price_warning = ""
+        if sol_balance is None:
+            balance = "unavailable"
+            status = "⚠️ Your balance could not be loaded. Please refresh in a moment."
+        elif sol_balance > 0:
+            usd, price_warning = self.usd_value(sol_balance)
+            balance = f"{format_sol(sol_balance)} SOL (USD {usd})"
+            status = "🟢 Your wallet is funded and ready to trade."
+        else:
+            balance = "0 SOL (USD $0.00)"
+            status = "🔴 You currently have no SOL in your wallet.\nTo start trading, please deposit SOL to your address."
 
         message = (
             f"Welcome to Bloom! 🌸\n\n"
             f"Let your trading journey *blossom* with us!\n\n"
             f"💜 *Your Solana Wallet Address:*\n"
             f"`{wallet_address}`\n"
-            f"*Balance:* {balance}\n\n"
+            f"*Balance:* {balance}\n"
+            f"{price_warning}\n"
             f"{status}\n\n"
             f"📚 *Resources:*\n"
             f"[📖 Bloom Guides](https://example.com)\n"
             f"[🔔 Bloom X](https://example.com)\n"
             f"[🌐 Bloom Website](https://example.com)\n"
-            f"[💛 Bloom Portal](https://example.com)\n\n"
-            f"🕒 Last updated: {last_updated}"
+            f"[💛 Bloom Portal](https://example.com)"
         )
-
-        if update.callback_query:
-            await update.callback_query.message.edit_text(message, parse_mode="Markdown", reply_markup=reply_markup)
-        else:
-            await update.message.reply_text(message, parse_mode="Markdown", reply_markup=reply_markup)
+        return message, self.reply_markup
@@ -1,47 +1,126 @@
+from functools import lru_cache
+
 from .base_dashboard import BaseDashboard
-from telegram import InlineKeyboardButton
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.helpers import escape_markdown
+from services.balance_service import format_sol
+
+# Positions listed per page.
+PAGE_SIZE = 5
+
+# Values (in SOL) the "Min Value" button cycles through.
+MIN_VALUE_STEPS = (0.0, 0.01, 0.1, 1.0, 10.0)
 
 
 class PositionDashboard(BaseDashboard):
     """Handles the Position dashboard."""
 
-    def __init__(self, wallet_generator, time_utils, main_dashboard):
-        super().__init__(wallet_generator, time_utils)
+    name = "position"
+    routes = {
+        **BaseDashboard.routes,
+        "min_val": "cycle_min_value",
+        "page": "show_page",
+    }
+
+    reply_markup = InlineKeyboardMarkup([
+        [InlineKeyboardButton("Min Value: N/A Sol", callback_data='position:min_val'), InlineKeyboardButton("♻️Refresh", callback_data='position:refresh')],
+        [InlineKeyboardButton("HomePage", callback_data='position:back'), InlineKeyboardButton("Delete", callback_data='position:delete')]
+    ])
+
+    def __init__(self, wallet_store, time_utils, main_dashboard, position_store=None, **kwargs):
+        super().__init__(wallet_store, time_utils, **kwargs)
         self.main_dashboard = main_dashboard
+        self.position_store = position_store
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def build_reply_markup(min_value, page, pages):
+        """
+        Build the keyboard for a filter and page; keyboards are cached and shared by all chats.
+
+        Args:
+            min_value (float): The active minimum value filter in SOL.
+            page (int): Zero-based page being shown.
+            pages (int): Number of pages for the current filter.
+
+        Returns:
+            InlineKeyboardMarkup: The dashboard keyboard.
+        """
+        label = f"Min Value: {format_sol(min_value)} Sol" if min_value else "Min Value: N/A Sol"
+        keyboard = []
+        if pages > 1:
+            keyboard.append([
+                InlineKeyboardButton("⬅️", callback_data=f'position:page:{max(page - 1, 0)}'),
+                InlineKeyboardButton(f"{page + 1}/{pages}", callback_data=f'position:page:{page}'),
+                InlineKeyboardButton("➡️", callback_data=f'position:page:{min(page + 1, pages - 1)}'),
+            ])
+        keyboard.append([InlineKeyboardButton(label, callback_data='position:min_val'), InlineKeyboardButton("♻️Refresh", callback_data='position:refresh')])
+        keyboard.append([InlineKeyboardButton("HomePage", callback_data='position:back'), InlineKeyboardButton("Delete", callback_data='position:delete')])
+        return InlineKeyboardMarkup(keyboard)
 
     async def show(self, update, context):
         """Displays the Position dashboard."""
-        self.current_dashboard = "position"
-        wallet_address = self.wallet_generator.public_key
+        session = await self.get_session(update, context)
+        body, reply_markup = await self.render(update.effective_user.id, session.data)
+        await self.display(update, context, body, reply_markup)
+        await self.watch(update, context, body, reply_markup)
+
+    async def live_keys(self, user_id):
+        return (("positions", user_id),)
 
-        keyboard = [
-            [InlineKeyboardButton("Min Value: N/A Sol", callback_data='min_val'), InlineKeyboardButton("♻️Refresh", callback_data='refresh')],
-            [InlineKeyboardButton("HomePage", callback_data='back_to_main'), InlineKeyboardButton("Delete", callback_data='delete')]
-        ]
-        reply_markup = self.create_reply_markup(keyboard)
+    async def render(self, user_id, data):
+        """Build the page and filter stored in the session `data` of a user's positions."""
+        min_value = data.get("position_min_value", 0.0)
+        count = self.position_store.count(user_id, min_value) if self.position_store else 0
 
-        last_updated = self.get_us_time()
+        if not count:
+            data["position_page"] = 0
+            if min_value and self.position_store and self.position_store.count(user_id):
+                empty = f"No positions worth at least {format_sol(min_value)} SOL."
+            else:
+                empty = "No open positions yet!"
+            message = (
+                f"🌸 Bloom Positions\n\n"
+                f"{empty}\n\n"
+                f"Start your trading journey by pasting a contract address in chat."
+            )
+            return message, self.build_reply_markup(min_value, 0, 1) if min_value else self.reply_markup
 
+        pages = -(-count // PAGE_SIZE)
+        page = min(data.get("position_page", 0), pages - 1)
+        data["position_page"] = page
+        positions = self.position_store.page(user_id, page, PAGE_SIZE, min_value)
+
+        lines = []
+        for rank, position in enumerate(positions, start=page * PAGE_SIZE + 1):
+            symbol = escape_markdown(position.symbol or position.mint[:6])
+            lines.append(
+                f"{rank}. *{symbol}* — {format_sol(position.value)} SOL ({position.pnl_percent:+.1f}%)\n"
+                f"`{position.mint}`"
+            )
         message = (
             f"🌸 Bloom Positions\n\n"
-            f"No open positions yet!\n\n"
-            f"Start your trading journey by pasting a contract address in chat.\n\n"
-            f"🕒 Last updated: {last_updated}\n\n"
+            f"Total value: {format_sol(self.position_store.total_value(user_id))} SOL\n"
+            f"Positions: {count}\n\n"
+            + "\n\n".join(lines)
         )
 
-        await update.callback_query.message.edit_text(message, parse_mode="Markdown", reply_markup=reply_markup)
-
-    async def handle_button_click(self, update, context):
-        """Handles button clicks within the Position dashboard."""
-        query = update.callback_query
-
-        if query.data == "back_to_main":
-            # Navigate back to the main dashboard
-            await self.main_dashboard.show(update, context)
-        elif query.data == "refresh":
-            # Refresh the current dashboard
-            await self.show(update, context)
-        elif query.data == "delete":
-             await query.message.delete()
-        else:
-            await query.answer()
+        return message, self.build_reply_markup(min_value, page, pages)
+
+    async def cycle_min_value(self, update, context):
+        """Switch to the next minimum value filter and go back to the first page."""
+        session = await self.get_session(update, context)
+        current = session.data.get("position_min_value", 0.0)
+        step = MIN_VALUE_STEPS.index(current) + 1 if current in MIN_VALUE_STEPS else 0
+        session.data["position_min_value"] = MIN_VALUE_STEPS[step % len(MIN_VALUE_STEPS)]
+        session.data["position_page"] = 0
+        await self.show(update, context)
+
+    async def show_page(self, update, context):
+        """Show the page given as callback argument (`position:page:<n>`)."""
+        session = await self.get_session(update, context)
+        try:
+            session.data["position_page"] = max(0, int(context.args[0]))
+        except (IndexError, ValueError):
+            session.data["position_page"] = 0
+        await self.show(update, context)
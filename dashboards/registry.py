@@ -0,0 +1,226 @@
+import asyncio
+import importlib
+import inspect
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class DashboardSpec:
+    """
+    Declares a dashboard without importing it.
+
+    Attributes:
+        name (str): The dashboard's name, the prefix of its callback data.
+        path (str): `"<module>:<class>"` of the dashboard, imported the first time it is needed.
+        requires (tuple[str]): Dashboards passed positionally after the shared arguments, e.g. `("main",)`.
+        services (tuple[str]): Services passed as keyword arguments of the same name.
+        options (dict): Further keyword arguments, e.g. `{"max_file_size": 20971520}`.
+    """
+
+    __slots__ = ("name", "path", "requires", "services", "options")
+
+    def __init__(self, name, path, requires=(), services=(), options=None):
+        self.name = name
+        self.path = path
+        self.requires = tuple(requires)
+        self.services = tuple(services)
+        self.options = options or {}
+
+
+def parse_warmup(spec, registry):
+    """
+    Parse a warm-up list such as `"main,afk"`; `"all"` names every declared dashboard.
+
+    Args:
+        spec (str): Comma-separated dashboard names.
+        registry (DashboardRegistry): The registry the names must be declared in.
+
+    Returns:
+        list[str]: The dashboard names, in the order given.
+    """
+    if spec.strip() == "all":
+        return list(registry)
+    names = [name.strip() for name in spec.split(",") if name.strip()]
+    for name in names:
+        if name not in registry:
+            raise ValueError(f"Unknown dashboard '{name}' in warm-up list.")
+    return names
+
+
+class DashboardRegistry:
+    """
+    Builds dashboards, and the services only they use, the first time they are needed.
+
+    Dashboards are declared as `DashboardSpec`s naming their module, the
+    dashboards they depend on and the services they are built with. Nothing
+    is imported until `get` is first called for a dashboard: then its module
+    is imported, the dashboards it requires are built, its services resolved
+    and the instance cached. The `CallbackRouter` calls `get` on the first
+    button press, command or text message routed to a dashboard it has not
+    registered yet, so a worker that only ever serves `/start` never imports
+    or builds the rest.
+
+    Services are either ready instances shared with the rest of the bot,
+    such as the balance service the engines also use, or factories `provide`d
+    for services only dashboards need. A factory runs when the first
+    dashboard using it is built, or when `service` is called for it, and
+    its `close` callback runs at shutdown only if it did. A `start`
+    callback runs at `start()` for a service built by then, and right
+    after the build for one built later.
+    """
+
+    def __init__(self, specs, args=(), options=None, services=None):
+        """
+        Initialize the DashboardRegistry instance.
+
+        Args:
+            specs (Iterable[DashboardSpec]): The declared dashboards.
+            args (tuple): Positional arguments every dashboard takes first, e.g. `(wallet_store, time_utils)`.
+            options (dict or None): Keyword arguments every dashboard takes, such as the session store.
+            services (dict or None): Ready service instances by keyword argument name.
+
+        Attributes:
+            load_times (dict[str, float]): Seconds each built dashboard took to import and build,
+                                           including the dashboards and services it required.
+
+        Example:
+            >>> registry = DashboardRegistry(DASHBOARDS, (wallet_store, get_us_time), services={"price_oracle": oracle})
+            >>> registry.provide("token_info", lambda: TokenInfoService(rpc))
+            >>> router = CallbackRouter([], registry=registry)
+        """
+        self.specs = {}
+        for spec in specs:
+            if spec.name in self.specs:
+                raise ValueError(f"Dashboard name '{spec.name}' is declared twice.")
+            self.specs[spec.name] = spec
+        self.args = tuple(args)
+        self.options = options or {}
+        self.load_times = {}
+        self._services = dict(services or {})
+        self._factories = {}
+        self._starters = []
+        self._starting = set()
+        self._started = False
+        self._closers = []
+        self._dashboards = {}
+
+    def __contains__(self, name):
+        return name in self.specs
+
+    def __iter__(self):
+        return iter(self.specs)
+
+    def loaded(self, name):
+        """Return whether a dashboard has been built."""
+        return name in self._dashboards
+
+    def provide(self, name, factory, close=None, start=None):
+        """
+        Declare a service built on first use.
+
+        Args:
+            name (str): The keyword argument the service is passed as.
+            factory (callable): `factory()` returning the service.
+            close (callable or None): `close(service)`, sync or async, run by `close()` if the service was built.
+            start (callable or None): `start(service)`, sync or async, run once the service is built and
+                                      the registry started.
+        """
+        self._factories[name] = (factory, close, start)
+
+    def service(self, name):
+        """
+        Return a service, building it if it was provided as a factory and not built yet.
+
+        Args:
+            name (str): The service's keyword argument name.
+
+        Returns:
+            object: The service instance.
+        """
+        if name in self._services:
+            return self._services[name]
+        factory, close, start = self._factories[name]
+        service = factory()
+        self._services[name] = service
+        if close is not None:
+            self._closers.append((close, service))
+        if start is not None:
+            if self._started:
+                task = asyncio.get_running_loop().create_task(self._start_later(name, start, service))
+                self._starting.add(task)
+                task.add_done_callback(self._starting.discard)
+            else:
+                self._starters.append((start, service))
+        return service
+
+    def get(self, name):
+        """
+        Return a dashboard, importing and building it on first use.
+
+        Args:
+            name (str): The dashboard's name.
+
+        Returns:
+            BaseDashboard: The dashboard instance.
+
+        Raises:
+            KeyError: If no dashboard of that name is declared.
+        """
+        dashboard = self._dashboards.get(name)
+        if dashboard is not None:
+            return dashboard
+        spec = self.specs[name]
+        started = time.perf_counter()
+        module_name, _, class_name = spec.path.partition(":")
+        dashboard_class = getattr(importlib.import_module(module_name), class_name)
+        required = [self.get(required) for required in spec.requires]
+        services = {service: self.service(service) for service in spec.services}
+        dashboard = dashboard_class(*self.args, *required, **self.options, **services, **spec.options)
+        self._dashboards[name] = dashboard
+        self.load_times[name] = time.perf_counter() - started
+        logger.info("Loaded the %s dashboard in %.1fms", name, self.load_times[name] * 1000)
+        return dashboard
+
+    async def start(self):
+        """Start the services built so far; services built later are started as they are built."""
+        self._started = True
+        starters, self._starters = self._starters, []
+        for start, service in starters:
+            await self._call(start, service)
+
+    async def close(self):
+        """Close the services built from factories, in reverse order of creation."""
+        if self._starting:
+            await asyncio.gather(*self._starting, return_exceptions=True)
+        closers, self._closers = self._closers, []
+        for close, service in reversed(closers):
+            await self._call(close, service)
+
+    async def _start_later(self, name, start, service):
+        try:
+            await self._call(start, service)
+        except Exception:
+            logger.exception("Starting the %s service failed", name)
+
+    @staticmethod
+    async def _call(callback, service):
+        result = callback(service)
+        if inspect.isawaitable(result):
+            await result
+
+    def stats(self):
+        """
+        Return how much of the registry has been loaded.
+
+        Returns:
+            dict: Dashboards declared and built, services built from factories
+                  and total seconds spent loading dashboards.
+        """
+        return {
+            "declared": len(self.specs),
+            "loaded": len(self._dashboards),
+            "services_built": sum(1 for name in self._factories if name in self._services),
+            "load_seconds": sum(self.load_times.values()),
+        }
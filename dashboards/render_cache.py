@@ -0,0 +1,102 @@
+import time
+
+from utils.cache import LRUCache
+
+
+class RenderCache:
+    """
+    Remembers what was last rendered into each dashboard message.
+
+    Every dashboard edit is fingerprinted by hashing its body and keyboard
+    (without the "Last updated" footer). If a message is about to be edited
+    with the same fingerprint it already shows, and the previous edit is
+    younger than `window` seconds, the edit is suppressed: it would only move
+    the timestamp, costs a Telegram API call and would otherwise fail with
+    "message is not modified". Unchanged content older than the window is
+    still edited, which keeps the timestamp honest without letting a user
+    spamming Refresh burn the rate budget.
+    """
+
+    def __init__(self, window=10.0, maxsize=100000, clock=time.monotonic):
+        """
+        Initialize the RenderCache instance.
+
+        Args:
+            window (float): Seconds during which an unchanged re-render is suppressed.
+            maxsize (int): Maximum number of messages whose fingerprint is remembered.
+            clock (callable): Monotonic clock; injectable for tests.
+
+        Attributes:
+            edits_sent (int): Number of edits that went out to Telegram.
+            edits_suppressed (int): Number of edits skipped because nothing changed.
+
+        Example:
+            >>> render_cache = RenderCache(window=10)
+            >>> digest = render_cache.fingerprint(body, reply_markup)
+            >>> if render_cache.should_edit((chat_id, message_id), digest):
+            ...     await message.edit_text(...)
+            ...     render_cache.record((chat_id, message_id), digest)
+        """
+        self.window = window
+        self.clock = clock
+        self.edits_sent = 0
+        self.edits_suppressed = 0
+        self._rendered = LRUCache(maxsize)
+
+    @staticmethod
+    def fingerprint(body, reply_markup):
+        """
+        Compute the content fingerprint of a rendered dashboard.
+
+        Args:
+            body (str): The message text without the "Last updated" footer.
+            reply_markup (InlineKeyboardMarkup or None): The message keyboard.
+
+        Returns:
+            int: A hash identifying the rendered content.
+        """
+        return hash((body, reply_markup))
+
+    def should_edit(self, key, digest):
+        """
+        Decide whether a message needs to be edited.
+
+        Args:
+            key (tuple): `(chat_id, message_id)` of the message.
+            digest (int): Fingerprint of the content about to be rendered.
+
+        Returns:
+            bool: `False` if the edit should be suppressed.
+        """
+        entry = self._rendered.get(key)
+        if entry is not None and entry[0] == digest and self.clock() - entry[1] < self.window:
+            self.edits_suppressed += 1
+            return False
+        return True
+
+    def remember(self, key, digest):
+        """Remember that `digest` was just rendered into the message `key`."""
+        self._rendered.set(key, (digest, self.clock()))
+
+    def record(self, key, digest):
+        """Remember a rendered edit and count it as sent."""
+        self.remember(key, digest)
+        self.edits_sent += 1
+
+    def suppressed(self, key, digest):
+        """Record an edit that Telegram rejected because the content was unchanged."""
+        self.remember(key, digest)
+        self.edits_suppressed += 1
+
+    def stats(self):
+        """
+        Return the edit counters.
+
+        Returns:
+            dict: `edits_sent`, `edits_suppressed` and the number of tracked messages.
+        """
+        return {
+            "edits_sent": self.edits_sent,
+            "edits_suppressed": self.edits_suppressed,
+            "tracked_messages": len(self._rendered),
+        }
@@ -0,0 +1,167 @@
+class CallbackRouter:
+    """
+    Routes callback queries to dashboard handlers in constant time.
+
+    Callback data follows the structured format `"<dashboard>:<action>"`,
+    optionally followed by `":<argument>"`. At construction time the router
+    reads the `name` and `routes` of every dashboard and precompiles a flat
+    table from callback data to bound handler, so dispatching a button press
+    is a dictionary lookup no matter how many dashboards or actions exist.
+
+    Free-text messages are routed the same way: a dashboard that asks the
+    user to type something sets the chat session's `pending_input` to a
+    route such as `"lpsniper:task_input"`, and `dispatch_text` sends the next
+    text message to that handler with the text as the argument. Messages
+    sent while no input is pending go to the `default_text` route, if any.
+
+    With a `DashboardRegistry`, dashboards are registered on demand: the
+    first route naming a dashboard the table does not know yet loads it from
+    the registry and registers its routes, and later presses are plain
+    lookups again.
+    """
+
+    SEPARATOR = ":"
+
+    def __init__(self, dashboards, get_session=None, default_text=None, registry=None):
+        """
+        Initialize the CallbackRouter instance.
+
+        Args:
+            dashboards (Iterable[BaseDashboard]): The dashboards whose routes are registered.
+            get_session (callable or None): Async `get_session(update, context)` used by
+                                            `dispatch_text`; taken from the first dashboard when omitted.
+            default_text (str or None): Route receiving text messages no dashboard is waiting for,
+                                        e.g. `"token:paste"`; such messages are ignored when omitted.
+            registry (DashboardRegistry or None): Declared dashboards loaded when first routed to.
+
+        Attributes:
+            table (dict[str, callable]): Maps `"<dashboard>:<action>"` to the bound handler.
+            fallbacks (dict[str, callable]): Maps a dashboard name to its `handle_button_click`,
+                                             used for actions without a dedicated route.
+
+        Example:
+            >>> router = CallbackRouter([main_dashboard, afk_dashboard])
+            >>> application.add_handler(CallbackQueryHandler(router.dispatch))
+        """
+        self.table = {}
+        self.fallbacks = {}
+        self.get_session = get_session
+        self.default_text = default_text
+        self.registry = registry
+        for dashboard in dashboards:
+            self.register(dashboard)
+
+    def load(self, name):
+        """
+        Load a declared dashboard from the registry and register it, unless it already is.
+
+        Args:
+            name (str): The dashboard's name.
+
+        Returns:
+            bool: Whether a dashboard was newly registered.
+        """
+        if self.registry is None or name in self.fallbacks or name not in self.registry:
+            return False
+        self.register(self.registry.get(name))
+        return True
+
+    def warm(self, names):
+        """Load dashboards ahead of their first use, e.g. the ones `/start` leads to."""
+        for name in names:
+            self.load(name)
+
+    def register(self, dashboard):
+        """
+        Add every route of a dashboard to the routing table.
+
+        Args:
+            dashboard (BaseDashboard): The dashboard to register.
+        """
+        if dashboard.name in self.fallbacks:
+            raise ValueError(f"Dashboard name '{dashboard.name}' is already registered.")
+        for action, method_name in dashboard.routes.items():
+            self.table[f"{dashboard.name}{self.SEPARATOR}{action}"] = getattr(dashboard, method_name)
+        self.fallbacks[dashboard.name] = dashboard.handle_button_click
+        if self.get_session is None:
+            self.get_session = dashboard.get_session
+
+    def resolve(self, data):
+        """
+        Find the handler for a piece of callback data.
+
+        Args:
+            data (str): The callback data of the pressed button.
+
+        Returns:
+            tuple[callable or None, str or None]: The handler and the optional argument.
+        """
+        handler = self.table.get(data)
+        if handler is not None:
+            return handler, None
+
+        name, _, rest = data.partition(self.SEPARATOR)
+        action, _, argument = rest.partition(self.SEPARATOR)
+        handler = self.table.get(f"{name}{self.SEPARATOR}{action}")
+        if handler is not None:
+            return handler, argument
+        if self.load(name):
+            return self.resolve(data)
+        return self.fallbacks.get(name), None
+
+    def command(self, route):
+        """
+        Return a command callback invoking a route's handler, loading its dashboard on first use.
+
+        `context.args` keeps the command's arguments.
+
+        Example:
+            >>> application.add_handler(CommandHandler("vanity", router.command("vanity:grind")))
+        """
+        async def handle(update, context):
+            handler, _ = self.resolve(route)
+            await handler(update, context)
+
+        return handle
+
+    async def dispatch(self, update, context):
+        """
+        Handle a callback query by invoking the matching dashboard handler.
+
+        The optional argument is exposed to the handler as `context.args`.
+        """
+        query = update.callback_query
+        handler, argument = self.resolve(query.data or "")
+        if handler is None:
+            await query.answer()
+            return
+
+        context.args = [argument] if argument else []
+        await handler(update, context)
+
+    async def dispatch_text(self, update, context):
+        """
+        Handle a text message by passing it to the route the chat is waiting on, if any,
+        or else to the `default_text` route.
+
+        The text is exposed to the handler as `context.args`; for a message
+        without text, such as an uploaded file, `context.args` is empty and
+        the handler reads the message itself. Handlers clear `pending_input`
+        once the input has been accepted.
+        """
+        if self.get_session is None and self.registry is not None:
+            # Sessions are read through any dashboard; take the first declared one.
+            self.load(next(iter(self.registry)))
+        session = await self.get_session(update, context)
+        route = session.pending_input or self.default_text
+        if not route:
+            return
+        handler = self.table.get(route)
+        if handler is None and self.load(route.partition(self.SEPARATOR)[0]):
+            handler = self.table.get(route)
+        if handler is None:
+            session.pending_input = None
+            return
+        text = update.message.text
+        context.args = [text.strip()] if text else []
+        await handler(update, context)
@@ -1,54 +1,239 @@
+from functools import lru_cache
+
 from .base_dashboard import BaseDashboard
-from telegram import InlineKeyboardButton
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.helpers import escape_markdown
+from services.settings_store import DEGEN_FEE_MULTIPLIER, DEGEN_MIN_SLIPPAGE, MAX_PRESETS
+
+
+def format_latency(seconds):
+    """Format a latency percentile for display."""
+    if seconds is None:
+        return "n/a"
+    if seconds == float("inf"):
+        return "timeout"
+    return f"{seconds * 1000:.0f}ms"
+
+
+def format_presets(values):
+    """Format preset amounts for display, e.g. `0.1 / 0.5 / 1`."""
+    return " / ".join(f"{value:g}" for value in values)
 
 
 class SettingDashboard(BaseDashboard):
     """Handles the Setting dashboard."""
 
-    def __init__(self, wallet_generator, time_utils, main_dashboard):
-        super().__init__(wallet_generator, time_utils)
+    name = "setting"
+    routes = {
+        **BaseDashboard.routes,
+        "buy_node": "show_buy_nodes",
+        "sell_node": "show_sell_nodes",
+        "feesetting": "cycle_fee_level",
+        "degen_mode": "toggle_degen_mode",
+        "mev_protect": "toggle_mev_protect",
+        "live_updates": "toggle_live_updates",
+        "edit": "ask_value",
+        "value_input": "value_input",
+    }
+
+    prompts = {
+        "buy_slippage": "Send the slippage allowed on buys, in percent (1-100).",
+        "sell_slippage": "Send the slippage allowed on sells, in percent (1-100).",
+        "buy_presets": f"Send up to {MAX_PRESETS} SOL amounts for the buy buttons, separated by spaces.",
+        "sell_presets": f"Send up to {MAX_PRESETS} percentages for the sell buttons, separated by spaces.",
+        "spot_presets": f"Send up to {MAX_PRESETS} SOL amounts for spot buys, separated by spaces.",
+        "sniper_presets": f"Send up to {MAX_PRESETS} SOL amounts for snipes, separated by spaces.",
+    }
+
+    prompt_markup = InlineKeyboardMarkup([
+        [InlineKeyboardButton("Cancel", callback_data='setting:show')]
+    ])
+
+    nodes_markups = {
+        side: InlineKeyboardMarkup([
+            [InlineKeyboardButton("Back", callback_data='setting:show'), InlineKeyboardButton("♻️Refresh", callback_data=f'setting:{side}_node')]
+        ])
+        for side in ("buy", "sell")
+    }
+
+    def __init__(self, wallet_store, time_utils, main_dashboard, trade_executor=None, settings_store=None, **kwargs):
+        super().__init__(wallet_store, time_utils, **kwargs)
         self.main_dashboard = main_dashboard
+        self.trade_executor = trade_executor
+        self.settings_store = settings_store
 
-    async def show(self, update, context):
-        """Displays the Setting dashboard."""
-        self.current_dashboard = "setting"
-        wallet_address = self.wallet_generator.public_key
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def build_reply_markup(buy_node, sell_node, fee_level, degen_mode, mev_protect, buy_slippage, sell_slippage, live_updates=False):
+        """
+        Build the settings keyboard for the nodes currently picked and a user's settings.
+
+        Keyboards are cached by their values, so every user on the same
+        settings shares one keyboard object.
 
-        keyboard = [
-            [InlineKeyboardButton("Fee", callback_data='feesetting'), InlineKeyboardButton("💰Wallet", callback_data='wallet')],
-            [InlineKeyboardButton("Buy Presets", callback_data='buy_presets'), InlineKeyboardButton("Sell Presets", callback_data='sell_presets')],
-            [InlineKeyboardButton("Spot Presets", callback_data='spot_presets'), InlineKeyboardButton("Sniper Presets", callback_data='sniper_presets')],
-            [InlineKeyboardButton("Degen Mode", callback_data='degen_mode'), InlineKeyboardButton("MEV Protect", callback_data='mev_protect')],
-            [InlineKeyboardButton("Buy: node", callback_data='buy_node'), InlineKeyboardButton("Sell: node", callback_data='sell_node')],
-            [InlineKeyboardButton("Buy Slippage: 20%", callback_data='buy_slippage'), InlineKeyboardButton("Sell Slippage: 15%", callback_data='sell_slippage')],
-            [InlineKeyboardButton("Back", callback_data='back_to_main'), InlineKeyboardButton("🚮Close", callback_data='delete')],
-        ]
+        Args:
+            buy_node (str): Name of the node preferred for buys.
+            sell_node (str): Name of the node preferred for sells.
+            fee_level (str): Priority fee level, a key of `FEE_LEVELS`.
+            degen_mode (bool): Whether Degen Mode is on.
+            mev_protect (bool): Whether MEV Protect is on.
+            buy_slippage (int): Buy slippage in percent.
+            sell_slippage (int): Sell slippage in percent.
+            live_updates (bool): Whether dashboards refresh themselves.
 
-        reply_markup = self.create_reply_markup(keyboard)
+        Returns:
+            InlineKeyboardMarkup: The dashboard keyboard.
+        """
+        def status(enabled):
+            return "🟢" if enabled else "🔴"
 
-        last_updated = self.get_us_time()
+        return InlineKeyboardMarkup([
+            [InlineKeyboardButton(f"Fee: {fee_level.capitalize()}", callback_data='setting:feesetting'), InlineKeyboardButton("💰Wallet", callback_data='wallet:show')],
+            [InlineKeyboardButton("Buy Presets", callback_data='setting:edit:buy_presets'), InlineKeyboardButton("Sell Presets", callback_data='setting:edit:sell_presets')],
+            [InlineKeyboardButton("Spot Presets", callback_data='setting:edit:spot_presets'), InlineKeyboardButton("Sniper Presets", callback_data='setting:edit:sniper_presets')],
+            [InlineKeyboardButton(f"{status(degen_mode)} Degen Mode", callback_data='setting:degen_mode'), InlineKeyboardButton(f"{status(mev_protect)} MEV Protect", callback_data='setting:mev_protect')],
+            [InlineKeyboardButton(f"{status(live_updates)} Auto Refresh", callback_data='setting:live_updates')],
+            [InlineKeyboardButton(f"Buy: {buy_node}", callback_data='setting:buy_node'), InlineKeyboardButton(f"Sell: {sell_node}", callback_data='setting:sell_node')],
+            [InlineKeyboardButton(f"Buy Slippage: {buy_slippage}%", callback_data='setting:edit:buy_slippage'), InlineKeyboardButton(f"Sell Slippage: {sell_slippage}%", callback_data='setting:edit:sell_slippage')],
+            [InlineKeyboardButton("Back", callback_data='setting:back'), InlineKeyboardButton("🚮Close", callback_data='setting:delete')],
+        ])
 
+    async def user_settings(self, update):
+        """Return the settings of the user an update comes from, or `None` without a settings store."""
+        if self.settings_store is None:
+            return None
+        return await self.settings_store.get(update.effective_user.id)
+
+    async def show(self, update, context, notice=None):
+        """Displays the Setting dashboard."""
+        settings = await self.user_settings(update)
+        notice_line = f"{notice}\n\n" if notice else ""
+        preset_lines = ""
+        if settings is not None:
+            preset_lines = (
+                f"Buy presets: {format_presets(settings.buy_presets)} SOL\n"
+                f"Sell presets: {format_presets(settings.sell_presets)} %\n"
+                f"Spot presets: {format_presets(settings.spot_presets)} SOL\n"
+                f"Sniper presets: {format_presets(settings.sniper_presets)} SOL\n\n"
+            )
         message = (
             f"🌸 *Bloom Settings*\n\n"
+            f"{notice_line}"
+            f"{preset_lines}"
             f"🟢 : The feature/mode is turned *ON*\n"
             f"🔴 : The feature/mode is turned *OFF*\n\n"
-            f"[Learn More!](https://example.com)\n\n"
-            f"🕒 Last updated: {last_updated}"
+            f"Degen Mode trades with at least {DEGEN_MIN_SLIPPAGE}% slippage and a {DEGEN_FEE_MULTIPLIER}x priority fee.\n"
+            f"MEV Protect sends trades only through private relays, never to public nodes.\n\n"
+            f"[Learn More!](https://example.com)"
+        )
+
+        executor = self.trade_executor
+        nodes = ("node", "node") if executor is None else (executor.pick_node("buy").name, executor.pick_node("sell").name)
+        values = (
+            (settings.fee_level, settings.degen_mode, settings.mev_protect, settings.buy_slippage, settings.sell_slippage,
+             settings.live_updates)
+            if settings is not None else ("normal", False, False, 20, 15, False)
         )
+        await self.display(update, context, message, self.build_reply_markup(*nodes, *values))
+
+    async def cycle_fee_level(self, update, context):
+        """Switch to the next priority fee level."""
+        if self.settings_store is not None:
+            await self.settings_store.cycle_fee_level(update.effective_user.id)
+        await self.show(update, context)
+
+    async def toggle_degen_mode(self, update, context):
+        """Turn Degen Mode on or off."""
+        if self.settings_store is not None:
+            await self.settings_store.toggle(update.effective_user.id, "degen_mode")
+        await self.show(update, context)
+
+    async def toggle_mev_protect(self, update, context):
+        """Turn MEV Protect on or off; it can only be turned on when the bot has a private relay."""
+        if self.settings_store is not None:
+            settings = await self.settings_store.get(update.effective_user.id)
+            if not settings.mev_protect and (self.trade_executor is None or not self.trade_executor.private_nodes):
+                await self.answer(update.callback_query, "MEV Protect is not available: this bot has no private relay.")
+                return
+            await self.settings_store.toggle(update.effective_user.id, "mev_protect")
+        await self.show(update, context)
 
-        await update.callback_query.message.edit_text(message, parse_mode="Markdown", reply_markup=reply_markup)
+    async def toggle_live_updates(self, update, context):
+        """Turn automatic refreshing of the balance, positions and AFK dashboards on or off."""
+        if self.settings_store is not None:
+            await self.settings_store.toggle(update.effective_user.id, "live_updates")
+        await self.show(update, context)
+
+    async def ask_value(self, update, context, name=None, error=None):
+        """Ask the user for a new value of the setting named in the callback data."""
+        name = name or (context.args[0] if context.args else None)
+        if name not in self.prompts or self.settings_store is None:
+            await self.answer(update.callback_query)
+            return
+        error_line = f"{error}\n\n" if error else ""
+        title = name.replace("_", " ").title()
+        message = (
+            f"🌸 *{title}*\n\n"
+            f"{error_line}"
+            f"{self.prompts[name]}"
+        )
+        await self.display(update, context, message, self.prompt_markup)
 
-    async def handle_button_click(self, update, context):
-        """Handles button clicks within the setting dashboard."""
-        query = update.callback_query
+        session = await self.get_session(update, context)
+        session.pending_input = "setting:value_input"
+        session.data["setting"] = name
+        await self.save_session(update, context, session)
 
-        if query.data == "back_to_main":
-            # Navigate back to the main dashboard
-            await self.main_dashboard.show(update, context)
-        elif query.data == "refresh":
-            # Refresh the current dashboard
+    async def value_input(self, update, context):
+        """Save the value the user sent after pressing a slippage or presets button."""
+        session = await self.get_session(update, context)
+        name = session.data.pop("setting", None)
+        if name not in self.prompts:
             await self.show(update, context)
-        elif query.data == "delete":
-             await query.message.delete()
-        else:
-            await query.answer()
+            return
+        try:
+            await self.settings_store.update(update.effective_user.id, **{name: context.args[0] if context.args else ""})
+        except ValueError as error:
+            await self.ask_value(update, context, name=name, error=f"❌ {escape_markdown(str(error))}")
+            return
+        await self.show(update, context, notice="✅ Settings saved.")
+
+    async def show_buy_nodes(self, update, context):
+        """Show the nodes used for buys, fastest first."""
+        await self.show_nodes(update, context, "buy")
+
+    async def show_sell_nodes(self, update, context):
+        """Show the nodes used for sells, fastest first."""
+        await self.show_nodes(update, context, "sell")
+
+    async def show_nodes(self, update, context, side):
+        """
+        List the send nodes for a side in the order they are currently picked.
+
+        Args:
+            update (telegram.Update): The incoming update.
+            context (telegram.ext.CallbackContext): The callback context.
+            side (str): `"buy"` or `"sell"`.
+        """
+        executor = self.trade_executor
+        if executor is None:
+            await self.answer(update.callback_query, "Trading is not enabled.")
+            return
+
+        lines = []
+        for number, node in enumerate(executor.ranked_nodes(side), start=1):
+            histogram = node.histograms[side]
+            marker = "🟢" if number <= executor.fanout else "⚪"
+            lines.append(
+                f"{marker} {escape_markdown(node.name)} — p50 {format_latency(histogram.percentile(0.5))}, "
+                f"p99 {format_latency(histogram.percentile(0.99))}, landed first {node.landed}"
+            )
+        node_lines = "\n".join(lines)
+        fanout = min(executor.fanout, len(executor.nodes))
+        message = (
+            f"🌸 *{side.capitalize()} Nodes*\n\n"
+            f"{node_lines}\n\n"
+            f"🟢 Every {side} is sent to these {fanout} nodes at once and the first confirmation wins. "
+            f"Nodes are ranked by their recent latency."
+        )
+        await self.display(update, context, message, self.nodes_markups[side])
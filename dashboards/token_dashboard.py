@@ -0,0 +1,179 @@
+import asyncio
+import math
+from functools import lru_cache
+
+from .base_dashboard import BaseDashboard
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.helpers import escape_markdown
+from services.balance_service import format_sol
+from services.settings_store import DEFAULT_SETTINGS
+from services.token_info import TOKEN_2022_PROGRAM, TokenInfoUnavailable
+from utils.solana_address import find_addresses
+
+
+def format_amount(value):
+    """Format a token amount compactly, e.g. `1.2B` or `950.5`."""
+    for threshold, unit in ((1e12, "T"), (1e9, "B"), (1e6, "M"), (1e3, "k")):
+        if value >= threshold:
+            return f"{value / threshold:.1f}{unit}"
+    return f"{value:,.4g}"
+
+
+class TokenDashboard(BaseDashboard):
+    """Handles the buy card shown when a user pastes a token contract address in chat."""
+
+    name = "token"
+    routes = {
+        **BaseDashboard.routes,
+        "paste": "paste",
+        "buy": "buy",
+    }
+
+    not_found_markup = InlineKeyboardMarkup([
+        [InlineKeyboardButton("HomePage", callback_data='token:back'), InlineKeyboardButton("🚮Close", callback_data='token:delete')]
+    ])
+
+    def __init__(self, wallet_store, time_utils, main_dashboard, token_info=None, settings_store=None, buy=None,
+                 buy_keys=None, **kwargs):
+        """
+        Initialize the TokenDashboard instance.
+
+        Args:
+            main_dashboard (MainDashboard): Target of the HomePage button; its SOL price values the market cap.
+            token_info (TokenInfoService or None): Resolves pasted addresses.
+            settings_store (SettingsStore or None): Provides the user's buy presets; the defaults when omitted.
+            buy (callable or None): Async `buy(user_id, mint, amount_sol, reason)` run by the buy buttons.
+            buy_keys (IdempotencyKeys or None): Claims each button press once, so a press replayed after
+                                                a crash or redelivered by Telegram does not buy again.
+        """
+        super().__init__(wallet_store, time_utils, **kwargs)
+        self.main_dashboard = main_dashboard
+        self.token_info = token_info
+        self.settings_store = settings_store
+        self.buy_token = buy
+        self.buy_keys = buy_keys
+        self._pending = set()
+        # Buttons whose buy is still running, as `(chat_id, message_id, callback data)`.
+        self._buying = set()
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def build_reply_markup(mint, presets):
+        """
+        Build the buy card keyboard; keyboards are cached per token and presets and shared by all chats.
+
+        The amount and the mint travel in the callback data, so the buttons of
+        an older card still buy what their labels say after the user changes
+        presets. Amounts are shown and sent with 4 significant digits, at most
+        9 characters, which with a 44-character mint fills the 64 bytes
+        Telegram allows.
+        """
+        amounts = [f"{value:.4g}" for value in presets]
+        buttons = [
+            InlineKeyboardButton(f"Buy {amount} SOL", callback_data=f'token:buy:{amount}:{mint}')
+            for amount in amounts
+        ]
+        keyboard = [buttons[start:start + 3] for start in range(0, len(buttons), 3)]
+        keyboard.append([InlineKeyboardButton("HomePage", callback_data='token:back'), InlineKeyboardButton("♻️Refresh", callback_data=f'token:refresh:{mint}')])
+        keyboard.append([InlineKeyboardButton("🚮Close", callback_data='token:delete')])
+        return InlineKeyboardMarkup(keyboard)
+
+    async def buy_presets(self, user_id):
+        if self.settings_store is None:
+            return DEFAULT_SETTINGS["buy_presets"]
+        return (await self.settings_store.get(user_id)).buy_presets
+
+    async def paste(self, update, context):
+        """Show the buy card of the first address in a free-text message; other messages are ignored."""
+        addresses = find_addresses(context.args[0] if context.args else None)
+        if not addresses:
+            return
+        context.args = addresses
+        await self.show(update, context)
+
+    async def show(self, update, context):
+        """Displays the buy card of the token in `context.args`, or of the last token shown in the chat."""
+        session = await self.get_session(update, context)
+        mint = context.args[0] if context.args else session.data.get("token_mint")
+        if mint is None or self.token_info is None:
+            await self.main_dashboard.show(update, context)
+            return
+
+        try:
+            info = await self.token_info.get(mint)
+        except TokenInfoUnavailable:
+            message = (
+                f"🌸 Bloom Token\n\n`{mint}`\n\n"
+                f"⚠️ Token information could not be loaded. Please refresh in a moment."
+            )
+            await self.display(update, context, message, self.build_reply_markup(mint, ()))
+            return
+        if info is None:
+            message = (
+                f"🌸 Bloom Token\n\n`{mint}`\n\n"
+                f"This address is not a token mint. Paste the contract address of the token you want to buy."
+            )
+            await self.display(update, context, message, self.not_found_markup)
+            return
+
+        session.data["token_mint"] = mint
+        name = escape_markdown(info.name or "Unknown token")
+        symbol = escape_markdown(info.symbol or mint[:6])
+        program = " (Token-2022)" if info.program == TOKEN_2022_PROGRAM else ""
+        lines = [
+            f"Supply: {format_amount(info.ui_supply)} {symbol} ({info.decimals} decimals){program}",
+            f"Mint authority: {'⚠️ active' if info.mint_authority else '✅ renounced'}",
+            f"Freeze authority: {'⚠️ active' if info.freeze_authority else '✅ renounced'}",
+        ]
+        if info.pool is None:
+            lines.append("\n🔴 No liquidity pool found yet.")
+        else:
+            market_cap = info.market_cap_sol
+            usd, _ = self.main_dashboard.usd_value(market_cap)
+            lines.append(f"\nPool: {escape_markdown(info.pool)}")
+            lines.append(f"Price: {format_sol(round(info.price_sol, 9))} SOL")
+            lines.append(f"Market cap: {format_amount(market_cap)} SOL (USD {usd})")
+            lines.append(f"1 SOL buys {format_amount(info.tokens_per_sol)} {symbol} ({info.price_impact:.2f}% impact)")
+
+        message = f"🌸 *{name}* ({symbol})\n`{mint}`\n\n" + "\n".join(lines)
+        presets = await self.buy_presets(update.effective_user.id)
+        await self.display(update, context, message, self.build_reply_markup(mint, presets))
+
+    async def buy(self, update, context):
+        """Buy the token of the card for the amount on the pressed button (`token:buy:<amount>:<mint>`)."""
+        query = update.callback_query
+        try:
+            amount, mint = context.args[0].split(":", 1)
+            amount_sol = float(amount)
+        except (IndexError, ValueError):
+            amount_sol = None
+        if amount_sol is None or not math.isfinite(amount_sol) or amount_sol <= 0:
+            await self.answer(query, "This button has expired. Paste the address again.")
+            return
+        if self.buy_token is None:
+            await self.answer(query, "Trading is not available right now.")
+            return
+        # A double tap is a second press of the same button while its buy is running.
+        tap = (query.message.chat_id, query.message.message_id, query.data)
+        if tap in self._buying:
+            await self.answer(query, "This buy is already being processed.")
+            return
+        self._buying.add(tap)
+        try:
+            # A replayed or redelivered press has the same callback query id.
+            if self.buy_keys is not None and not await self.buy_keys.claim(f"buy:{query.id}", user_id=update.effective_user.id):
+                self._buying.discard(tap)
+                await self.answer(query, "This buy was already placed.")
+                return
+            task = self.spawn(self.buy_token(update.effective_user.id, mint, amount_sol, "🛒 Buy:"))
+        except BaseException:
+            self._buying.discard(tap)
+            raise
+        task.add_done_callback(lambda _: self._buying.discard(tap))
+        await self.answer(query, f"Buying {amount_sol:g} SOL…")
+
+    def spawn(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        return task
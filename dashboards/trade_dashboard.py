@@ -1,53 +1,118 @@
+import math
+
 from .base_dashboard import BaseDashboard
-from telegram import InlineKeyboardButton
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from solders.pubkey import Pubkey
+from services.balance_service import format_sol
+from services.shards import WrongWorker
 
 
 class TradeDashboard(BaseDashboard):
     """Handles the Trade dashboard."""
 
-    def __init__(self, wallet_generator, time_utils, main_dashboard):
-        super().__init__(wallet_generator, time_utils)
+    name = "trade"
+    routes = {
+        **BaseDashboard.routes,
+        "new_config": "new_config",
+        "config_input": "config_input",
+        "pause_all": "pause_all",
+        "start_all": "start_all",
+        "clear_configs": "clear_configs",
+    }
+
+    reply_markup = InlineKeyboardMarkup([
+        [InlineKeyboardButton("Add new config", callback_data='trade:new_config')],
+        [InlineKeyboardButton("Pause All", callback_data='trade:pause_all'), InlineKeyboardButton("Start All", callback_data='trade:start_all')],
+        [InlineKeyboardButton("Back", callback_data='trade:back'), InlineKeyboardButton("♻️Refresh", callback_data='trade:refresh')],
+        [InlineKeyboardButton("🗑Clear Configs", callback_data='trade:clear_configs'), InlineKeyboardButton("🚮Close", callback_data='trade:delete')]
+    ])
+
+    prompt_markup = InlineKeyboardMarkup([
+        [InlineKeyboardButton("Cancel", callback_data='trade:show')]
+    ])
+
+    def __init__(self, wallet_store, time_utils, main_dashboard, copy_trade_engine=None, **kwargs):
+        super().__init__(wallet_store, time_utils, **kwargs)
         self.main_dashboard = main_dashboard
+        self.copy_trade_engine = copy_trade_engine
 
     async def show(self, update, context):
         """Displays the Trade dashboard."""
-        self.current_dashboard = "trade"
-        wallet_address = self.wallet_generator.public_key
+        user_id = update.effective_user.id
+        engine = self.copy_trade_engine
+        configs = engine.user_configs(user_id) if engine else []
 
-        keyboard = [
-            [InlineKeyboardButton("Add new config", callback_data='new_config')],
-            [InlineKeyboardButton("Pause All", callback_data='pause_all'), InlineKeyboardButton("Start All", callback_data='start_all')],
-            [InlineKeyboardButton("Back", callback_data='back_to_main'), InlineKeyboardButton("♻️Refresh", callback_data='refresh')],
-            [InlineKeyboardButton("🚮Close", callback_data='delete')]
-        ]
-
-        reply_markup = self.create_reply_markup(keyboard)
-
-        last_updated = self.get_us_time()
+        if configs and not engine.is_paused(user_id):
+            status = "🟢 Copy trade setup is active"
+        else:
+            status = "🔴 Copy trade setup is inactive"
+        config_lines = "".join(
+            f"{number}. `{config.leader}` — {format_sol(config.amount_sol)} SOL per buy\n"
+            for number, config in enumerate(configs, start=1)
+        )
+        if config_lines:
+            config_lines += "\n"
 
         message = (
             f"🌸 Bloom Copy Trade\n\n"
             f"💡 Copy the best traders with Bloom!\n\n"
-            f"🟢 Copy trade setup is active\n\n"
-            f"🔴 Copy trade setup is inactive\n\n"
-            f"⏱️ Please wait 10 seconds after each change for it to take effect\n\n"
-            f"⚠️ Changing your copy wallet? Remember to remake your tasks to use the new wallet for future transactions.\n\n"
-            f"🕒 Last updated: {last_updated}\n\n"
+            f"{status}\n\n"
+            f"{config_lines}"
+            f"⚡ Changes take effect immediately\n\n"
+            f"⚠️ Changing your copy wallet? Remember to remake your tasks to use the new wallet for future transactions."
         )
 
-        await update.callback_query.message.edit_text(message, parse_mode="Markdown", reply_markup=reply_markup)
+        await self.display(update, context, message, self.reply_markup)
 
-    async def handle_button_click(self, update, context):
-        """Handles button clicks within the Trade dashboard."""
-        query = update.callback_query
+    async def new_config(self, update, context, error=None):
+        """Ask the user for the wallet to copy and the SOL amount per copied buy."""
+        error_line = f"{error}\n\n" if error else ""
+        message = (
+            f"🌸 New Copy Trade Config\n\n"
+            f"{error_line}"
+            f"Send the wallet address to copy and the SOL amount to spend per copied buy, separated by a space:\n\n"
+            f"`<wallet address> 0.2`"
+        )
+        await self.display(update, context, message, self.prompt_markup)
 
-        if query.data == "back_to_main":
-            # Navigate back to the main dashboard
-            await self.main_dashboard.show(update, context)
-        elif query.data == "refresh":
-            # Refresh the current dashboard
-            await self.show(update, context)
-        elif query.data == "delete":
-             await query.message.delete()
-        else:
-            await query.answer()
+        session = await self.get_session(update, context)
+        session.pending_input = "trade:config_input"
+        await self.save_session(update, context, session)
+
+    async def config_input(self, update, context):
+        """Create a copy trade config from the text the user sent after pressing Add new config."""
+        parts = context.args[0].split() if context.args else []
+        try:
+            leader = str(Pubkey.from_string(parts[0]))
+            amount_sol = float(parts[1])
+        except (IndexError, ValueError):
+            await self.new_config(update, context, error="❌ Expected a wallet address followed by a SOL amount.")
+            return
+        if not math.isfinite(amount_sol) or amount_sol <= 0:
+            await self.new_config(update, context, error="❌ The SOL amount must be greater than 0.")
+            return
+
+        try:
+            await self.copy_trade_engine.add_config(update.effective_user.id, leader, amount_sol)
+        except WrongWorker:
+            await self.new_config(update, context, error="❌ Copy trade configs can only be added in your private chat with the bot.")
+            return
+        await self.show(update, context)
+
+    async def pause_all(self, update, context):
+        """Pause every copy trade config of the user."""
+        if self.copy_trade_engine is not None:
+            await self.copy_trade_engine.pause_all(update.effective_user.id)
+        await self.show(update, context)
+
+    async def start_all(self, update, context):
+        """Resume every copy trade config of the user."""
+        if self.copy_trade_engine is not None:
+            await self.copy_trade_engine.start_all(update.effective_user.id)
+        await self.show(update, context)
+
+    async def clear_configs(self, update, context):
+        """Remove every copy trade config of the user."""
+        if self.copy_trade_engine is not None:
+            await self.copy_trade_engine.remove_user_configs(update.effective_user.id)
+        await self.show(update, context)
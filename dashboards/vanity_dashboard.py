@@ -0,0 +1,160 @@
+import asyncio
+
+from .base_dashboard import BaseDashboard
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.helpers import escape_markdown
+from services.telegram_sender import BACKGROUND
+from services.vanity import VanityError
+
+
+def format_count(value):
+    """Format a large count compactly, e.g. `1.2M`."""
+    for threshold, unit in ((1e9, "B"), (1e6, "M"), (1e3, "k")):
+        if value >= threshold:
+            return f"{value / threshold:.1f}{unit}"
+    return f"{value:.0f}"
+
+
+def format_duration(seconds):
+    """Format seconds as `45s`, `12m` or `3.5h`."""
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f}m"
+    return f"{seconds / 3600:.1f}h"
+
+
+class VanityDashboard(BaseDashboard):
+    """Handles the Vanity Wallet dashboard, opened with `/vanity`."""
+
+    name = "vanity"
+    routes = {
+        **BaseDashboard.routes,
+        "grind": "grind",
+        "pattern_input": "pattern_input",
+        "cancel": "cancel",
+    }
+
+    reply_markup = InlineKeyboardMarkup([
+        [InlineKeyboardButton("Back", callback_data='vanity:back'), InlineKeyboardButton("🚮Close", callback_data='vanity:delete')]
+    ])
+
+    progress_markup = InlineKeyboardMarkup([
+        [InlineKeyboardButton("⛔️Cancel Search", callback_data='vanity:cancel')]
+    ])
+
+    def __init__(self, wallet_store, time_utils, main_dashboard, vanity_grinder=None, **kwargs):
+        super().__init__(wallet_store, time_utils, **kwargs)
+        self.main_dashboard = main_dashboard
+        self.vanity_grinder = vanity_grinder
+        self._pending = set()
+
+    async def show(self, update, context, notice=None):
+        """Displays the Vanity Wallet dashboard and waits for a pattern."""
+        grinder = self.vanity_grinder
+        job = grinder.job(update.effective_user.id) if grinder else None
+        if job is not None:
+            await self.display(update, context, self.progress_body(job), self.progress_markup)
+            return
+
+        notice_line = f"{notice}\n\n" if notice else ""
+        max_length = grinder.max_length if grinder else 0
+        message = (
+            f"🌸 Vanity Wallet\n\n"
+            f"{notice_line}"
+            f"Send the start of the address you want, optionally followed by `*` and its end, "
+            f"e.g. `Bloom`, `*pump` or `ab*cd`. Add `-i` to ignore case, which is much faster.\n\n"
+            f"Up to {max_length} characters; every extra character makes the search about 58 times longer."
+        )
+        await self.display(update, context, message, self.reply_markup)
+
+        session = await self.get_session(update, context)
+        session.pending_input = "vanity:pattern_input"
+        await self.save_session(update, context, session)
+
+    @staticmethod
+    def progress_body(job):
+        rate = job.rate
+        remaining = max(job.expected - job.attempts, 0) / rate if rate else None
+        estimate = f"~{format_duration(remaining)} left (estimate)" if remaining is not None else "measuring speed…"
+        case = " (any case)" if job.ignore_case else ""
+        return (
+            f"🌸 Vanity Wallet\n\n"
+            f"⛏ Searching for `{job.pattern}`{case}\n\n"
+            f"Tried: {format_count(job.attempts)} keys in {format_duration(job.elapsed)}\n"
+            f"Speed: {format_count(rate)} keys/s\n"
+            f"{estimate}"
+        )
+
+    async def grind(self, update, context):
+        """Start a search for the pattern given as argument, e.g. `/vanity -i bloom`."""
+        if not context.args:
+            await self.show(update, context)
+            return
+        await self.start_search(update, context, " ".join(context.args))
+
+    async def pattern_input(self, update, context):
+        """Start a search for the pattern the user sent."""
+        await self.start_search(update, context, context.args[0] if context.args else "")
+
+    async def start_search(self, update, context, text):
+        grinder = self.vanity_grinder
+        if grinder is None:
+            await self.show(update, context, notice="❌ Vanity wallets are not enabled.")
+            return
+        try:
+            prefix, suffix, ignore_case = grinder.parse(text)
+        except ValueError as error:
+            await self.show(update, context, notice=f"❌ {error}")
+            return
+
+        chat_id = update.effective_chat.id
+        message_ids = []
+
+        async def on_progress(job):
+            # Only edit the dashboard while the chat still shows this search.
+            session = await self.get_session(update, context)
+            if session.dashboard != self.name or session.message_id not in message_ids:
+                return
+            await self.call_api(
+                chat_id,
+                lambda: context.bot.edit_message_text(
+                    f"{self.progress_body(job)}\n\n🕒 Last updated: {self.get_us_time()}", chat_id, message_ids[0],
+                    parse_mode="Markdown", reply_markup=self.progress_markup,
+                ),
+                key=("vanity", chat_id),
+                priority=BACKGROUND,
+            )
+
+        try:
+            job = grinder.start(update.effective_user.id, prefix, suffix, ignore_case, on_progress=on_progress)
+        except VanityError as error:
+            await self.show(update, context, notice=f"❌ {escape_markdown(str(error))}")
+            return
+        await self.display(update, context, self.progress_body(job), self.progress_markup)
+        message_ids.append((await self.get_session(update, context)).message_id)
+
+        task = asyncio.create_task(self.report(chat_id, context, job))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def cancel(self, update, context):
+        """Cancel the user's running search."""
+        cancelled = self.vanity_grinder.cancel(update.effective_user.id) if self.vanity_grinder else False
+        await self.show(update, context, notice="⛔️ Search cancelled." if cancelled else "No search is running.")
+
+    async def report(self, chat_id, context, job):
+        """Send the wallet a search found, or why it stopped, to the user."""
+        try:
+            public_key, private_key = await job.task
+        except asyncio.CancelledError:
+            return
+        except VanityError as error:
+            text = f"❌ {escape_markdown(str(error))}"
+        else:
+            text = (
+                f"✅ Found `{public_key}` after {format_count(job.attempts)} keys in {format_duration(job.elapsed)}.\n\n"
+                f"Private key: `{private_key}`\n\n"
+                f"Import it into your wallet app, then delete this message."
+            )
+        await self.call_api(chat_id, lambda: context.bot.send_message(chat_id, text, parse_mode="Markdown"), priority=BACKGROUND)
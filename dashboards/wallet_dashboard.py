@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import tempfile
+import time
+
+import httpx
+
+from .base_dashboard import BaseDashboard
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.helpers import escape_markdown
+from services.telegram_sender import BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+
+class WalletDashboard(BaseDashboard):
+    """Handles the Wallet dashboard, opened from Settings: bulk import and export of extra wallets."""
+
+    name = "wallet"
+    routes = {
+        **BaseDashboard.routes,
+        "import": "ask_import",
+        "import_file": "import_file",
+        "export": "export",
+    }
+
+    reply_markup = InlineKeyboardMarkup([
+        [InlineKeyboardButton("📥Import Keys", callback_data='wallet:import'), InlineKeyboardButton("📤Export Keys", callback_data='wallet:export')],
+        [InlineKeyboardButton("Back", callback_data='setting:show'), InlineKeyboardButton("♻️Refresh", callback_data='wallet:refresh')],
+        [InlineKeyboardButton("🚮Close", callback_data='wallet:delete')]
+    ])
+
+    prompt_markup = InlineKeyboardMarkup([
+        [InlineKeyboardButton("Cancel", callback_data='wallet:show')]
+    ])
+
+    progress_interval = 2.0
+
+    def __init__(self, wallet_store, time_utils, main_dashboard, wallet_vault=None, max_file_size=20 * 1024 * 1024, **kwargs):
+        super().__init__(wallet_store, time_utils, **kwargs)
+        self.main_dashboard = main_dashboard
+        self.wallet_vault = wallet_vault
+        self.max_file_size = max_file_size
+        self._pending = set()
+
+    async def show(self, update, context, notice=None):
+        """Displays the Wallet dashboard."""
+        user_id = update.effective_user.id
+        wallet_address = await self.wallet_store.public_key(user_id)
+        vault = self.wallet_vault
+        imported = await vault.count(user_id) if vault else 0
+        status = "\n⏳ An import or export is running." if vault and vault.is_running(user_id) else ""
+        notice_line = f"{notice}\n\n" if notice else ""
+
+        message = (
+            f"🌸 *Bloom Wallets*\n\n"
+            f"{notice_line}"
+            f"Bot wallet: `{wallet_address}`\n"
+            f"Imported wallets: {imported}{status}\n\n"
+            f"Import a .txt file with one private key per line, or export your imported wallets "
+            f"as `address,private_key` lines."
+        )
+        await self.display(update, context, message, self.reply_markup)
+
+    async def ask_import(self, update, context, error=None):
+        """Ask the user to upload a key file."""
+        error_line = f"{error}\n\n" if error else ""
+        message = (
+            f"🌸 *Import Wallets*\n\n"
+            f"{error_line}"
+            f"Send a .txt file with one private key per line: base58 (as exported by wallet apps) "
+            f"or a `solana-keygen` byte array. Keys you already imported are skipped."
+        )
+        await self.display(update, context, message, self.prompt_markup)
+
+        session = await self.get_session(update, context)
+        session.pending_input = "wallet:import_file"
+        await self.save_session(update, context, session)
+
+    async def import_file(self, update, context):
+        """Start importing the key file the user sent after pressing Import Keys."""
+        document = update.message.document if update.message else None
+        if document is None:
+            await self.ask_import(update, context, error="❌ Send the keys as a file, not as a message.")
+            return
+        if document.file_size and document.file_size > self.max_file_size:
+            await self.ask_import(update, context, error=f"❌ Files are limited to {self.max_file_size // (1024 * 1024)} MB.")
+            return
+        vault = self.wallet_vault
+        user_id = update.effective_user.id
+        if vault is None or vault.is_running(user_id):
+            await self.show(update, context, notice="❌ Imports are not available right now.")
+            return
+
+        file = await document.get_file()
+        chat_id = update.effective_chat.id
+        await self.show(update, context, notice="⏳ Importing…")
+        message_id = (await self.get_session(update, context)).message_id
+
+        last_progress = time.monotonic()
+
+        async def on_progress(result):
+            nonlocal last_progress
+            if time.monotonic() - last_progress < self.progress_interval:
+                return
+            last_progress = time.monotonic()
+            # Progress edits are coalesced per chat and sent at background priority.
+            text = (
+                f"🌸 *Bloom Wallets*\n\n⏳ Importing… {result.processed} keys read "
+                f"({result.imported} new, {result.duplicates} duplicates, {result.invalid} invalid), "
+                f"{result.rate:.0f} keys/s"
+            )
+            self.spawn(self.call_api(
+                chat_id,
+                lambda: context.bot.edit_message_text(text, chat_id, message_id, parse_mode="Markdown"),
+                key=("wallet", chat_id),
+                priority=BACKGROUND,
+            ))
+
+        async def run():
+            try:
+                result = await vault.import_url(user_id, file.file_path, on_progress)
+            except ValueError as error:
+                text = f"❌ Import failed: {escape_markdown(str(error))}"
+            except httpx.HTTPError as error:
+                # Download errors quote the file URL, which contains the bot token: never echo or log the message.
+                status = error.response.status_code if isinstance(error, httpx.HTTPStatusError) else None
+                logger.warning("Wallet import for user %s: download failed (%s, status %s)", user_id, type(error).__name__, status)
+                text = "❌ Import failed: the file could not be downloaded. Please try again."
+            except Exception:
+                logger.exception("Wallet import for user %s failed", user_id)
+                text = "❌ Import failed. Please try again."
+            else:
+                text = (
+                    f"✅ Imported {result.imported} wallets. "
+                    f"{result.duplicates} duplicates and {result.invalid} invalid lines were skipped."
+                )
+            await self.call_api(chat_id, lambda: context.bot.send_message(chat_id, text, parse_mode="Markdown"), priority=BACKGROUND)
+
+        self.spawn(run())
+
+    async def export(self, update, context):
+        """Send the user's imported wallets as a file."""
+        vault = self.wallet_vault
+        user_id = update.effective_user.id
+        if vault is None or vault.is_running(user_id):
+            await self.answer(update.callback_query, "An import or export is already running.")
+            return
+        chat_id = update.effective_chat.id
+
+        async def run():
+            # Chunks are spooled to a temporary file as they are generated; only the upload reads it whole.
+            with tempfile.TemporaryFile() as file:
+                written = 0
+                try:
+                    async for chunk in vault.export_stream(user_id):
+                        written += await asyncio.to_thread(file.write, chunk)
+                except Exception:
+                    logger.exception("Wallet export for user %s failed", user_id)
+                    text = "❌ Export failed. Please try again."
+                    await self.call_api(chat_id, lambda: context.bot.send_message(chat_id, text, parse_mode="Markdown"), priority=BACKGROUND)
+                    return
+                if not written:
+                    await self.call_api(chat_id, lambda: context.bot.send_message(chat_id, "You have no imported wallets to export."), priority=BACKGROUND)
+                    return
+                file.seek(0)
+                await self.call_api(
+                    chat_id,
+                    lambda: context.bot.send_document(
+                        chat_id, file, filename="wallets.txt",
+                        caption="🔐 Your imported wallets. Keep this file private and delete this message once saved.",
+                    ),
+                    priority=BACKGROUND,
+                )
+
+        self.spawn(run())
+        await self.show(update, context, notice="⏳ Preparing your export…")
+
+    def spawn(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
@@ -1,51 +1,204 @@
+import asyncio
+import math
+from functools import lru_cache
+
 from .base_dashboard import BaseDashboard
-from telegram import InlineKeyboardButton
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.helpers import escape_markdown
+from services.balance_service import BalanceUnavailable, format_sol
+from services.solana_rpc import LAMPORTS_PER_SOL
+from services.telegram_sender import BACKGROUND
+from services.withdrawals import WithdrawalFailed
 
 
 class WithdrawDashboard(BaseDashboard):
     """Handles the Withdraw dashboard."""
 
-    def __init__(self, wallet_generator, time_utils, main_dashboard):
-        super().__init__(wallet_generator, time_utils)
+    name = "withdraw"
+    routes = {
+        **BaseDashboard.routes,
+        "fifty_precent": "withdraw_half",
+        "hundred_percent": "withdraw_all",
+        "x_sol": "ask_amount",
+        "amount_input": "amount_input",
+        "set_address": "ask_address",
+        "address_input": "address_input",
+    }
+
+    prompt_markup = InlineKeyboardMarkup([
+        [InlineKeyboardButton("Cancel", callback_data='withdraw:show')]
+    ])
+
+    def __init__(self, wallet_store, time_utils, main_dashboard, balance_service=None, withdrawal_engine=None, **kwargs):
+        super().__init__(wallet_store, time_utils, **kwargs)
         self.main_dashboard = main_dashboard
+        self.balance_service = balance_service
+        self.withdrawal_engine = withdrawal_engine
+        self._pending = set()
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def build_reply_markup(seq):
+        """
+        Build the withdraw keyboard for a user's withdrawal sequence number.
+
+        The amount buttons carry `seq`, so every tap on the same rendered
+        keyboard maps to the same idempotency key and withdraws at most once.
+
+        Args:
+            seq (int): Withdrawals the user has made so far.
 
-    async def show(self, update, context):
+        Returns:
+            InlineKeyboardMarkup: The dashboard keyboard.
+        """
+        return InlineKeyboardMarkup([
+            [InlineKeyboardButton("50%", callback_data=f'withdraw:fifty_precent:{seq}'), InlineKeyboardButton("100 %", callback_data=f'withdraw:hundred_percent:{seq}'), InlineKeyboardButton("X SOL", callback_data='withdraw:x_sol')],
+            [InlineKeyboardButton("Set Address", callback_data='withdraw:set_address')],
+            [InlineKeyboardButton("Back", callback_data='withdraw:back'), InlineKeyboardButton("♻️Refresh", callback_data='withdraw:refresh')],
+            [InlineKeyboardButton("🚮Close", callback_data='withdraw:delete')]
+        ])
+
+    async def show(self, update, context, notice=None):
         """Displays the Withdraw dashboard."""
-        self.current_dashboard = "withdraw"
-        wallet_address = self.wallet_generator.public_key
+        body, reply_markup = await self.render(update.effective_user.id, None, notice)
+        await self.display(update, context, body, reply_markup)
+        await self.watch(update, context, body, reply_markup)
 
-        keyboard = [
-            [InlineKeyboardButton("50%", callback_data='fifty_precent'), InlineKeyboardButton("100 %", callback_data='hundred_percent'), InlineKeyboardButton("X SOL", callback_data='x_sol')],
-            [InlineKeyboardButton("Set Address", callback_data='set_address')],
-            [InlineKeyboardButton("Back", callback_data='back_to_main'), InlineKeyboardButton("♻️Refresh", callback_data='refresh')],
-            [InlineKeyboardButton("🚮Close", callback_data='delete')] 
-        ]
+    async def live_keys(self, user_id):
+        return (("balance", await self.wallet_store.public_key(user_id)),)
 
-        reply_markup = self.create_reply_markup(keyboard)
+    async def render(self, user_id, data, notice=None):
+        wallet_address = await self.wallet_store.public_key(user_id)
+        try:
+            sol_balance = await self.balance_service.get_sol(wallet_address) if self.balance_service else 0
+            balance = f"{format_sol(sol_balance)} SOL"
+        except BalanceUnavailable:
+            balance = "unavailable"
 
-        last_updated = self.get_us_time()
+        engine = self.withdrawal_engine
+        state = await engine.state(user_id) if engine else None
+        address = f"`{state.address}`" if state and state.address else ""
+        edited = state.address_updated_at.strftime("%Y-%m-%d %H:%M UTC") if state and state.address_updated_at else "-"
+        notice_line = f"{notice}\n\n" if notice else ""
 
         message = (
             f"🌸 Withdraw Solana\n\n"
-            f"Balance: 0 SOL\n\n"
-            f"Current withdrawal address: \n\n"
-            f"🔧 Last address edit: -\n\n"
-            f"🕒 Last updated: {last_updated}\n\n"
+            f"{notice_line}"
+            f"Balance: {balance}\n\n"
+            f"Current withdrawal address: {address}\n\n"
+            f"🔧 Last address edit: {edited}"
         )
+        return message, self.build_reply_markup(state.seq if state else 0)
+
+    async def withdraw_half(self, update, context):
+        """Withdraw half of the balance to the withdrawal address."""
+        await self.withdraw(update, context, self.tap_key(update, context), fraction=0.5)
+
+    async def withdraw_all(self, update, context):
+        """Withdraw the whole balance to the withdrawal address."""
+        await self.withdraw(update, context, self.tap_key(update, context), fraction=1.0)
+
+    @staticmethod
+    def tap_key(update, context):
+        """Return the idempotency key of a 50% or 100% tap."""
+        if context.args:
+            return f"{update.effective_user.id}:{context.args[0]}"
+        # Keyboards rendered before sequence numbers were added carry none: key
+        # on the message instead. The withdrawal re-renders it with a sequence number.
+        message = update.callback_query.message
+        return f"{update.effective_user.id}:keyboard:{message.chat_id}:{message.message_id}"
+
+    async def ask_amount(self, update, context, error=None):
+        """Ask the user how much SOL to withdraw."""
+        error_line = f"{error}\n\n" if error else ""
+        message = (
+            f"🌸 *Withdraw X SOL*\n\n"
+            f"{error_line}"
+            f"Send the amount of SOL to withdraw, e.g. `0.5`"
+        )
+        await self.display(update, context, message, self.prompt_markup)
+
+        session = await self.get_session(update, context)
+        session.pending_input = "withdraw:amount_input"
+        await self.save_session(update, context, session)
+
+    async def amount_input(self, update, context):
+        """Withdraw the amount of SOL the user sent after pressing X SOL."""
+        try:
+            amount_sol = float(context.args[0]) if context.args else 0
+        except ValueError:
+            amount_sol = 0
+        if not math.isfinite(amount_sol) or amount_sol <= 0:
+            await self.ask_amount(update, context, error="❌ Expected an amount of SOL greater than 0.")
+            return
+        # A redelivered message has the same id, so it cannot withdraw twice either.
+        key = f"{update.effective_user.id}:message:{update.message.message_id}"
+        await self.withdraw(update, context, key, lamports=int(amount_sol * LAMPORTS_PER_SOL))
+
+    async def ask_address(self, update, context, error=None):
+        """Ask the user for a new withdrawal address."""
+        error_line = f"{error}\n\n" if error else ""
+        message = (
+            f"🌸 *Set Withdrawal Address*\n\n"
+            f"{error_line}"
+            f"Send the Solana address your withdrawals should go to."
+        )
+        await self.display(update, context, message, self.prompt_markup)
+
+        session = await self.get_session(update, context)
+        session.pending_input = "withdraw:address_input"
+        await self.save_session(update, context, session)
+
+    async def address_input(self, update, context):
+        """Save the withdrawal address the user sent after pressing Set Address."""
+        try:
+            await self.withdrawal_engine.set_address(update.effective_user.id, context.args[0] if context.args else "")
+        except ValueError:
+            await self.ask_address(update, context, error="❌ That is not a valid Solana address.")
+            return
+        await self.show(update, context, notice="✅ Withdrawal address saved.")
+
+    async def withdraw(self, update, context, key, lamports=None, fraction=None):
+        """
+        Queue a withdrawal and report its outcome to the user once it confirms.
 
-        await update.callback_query.message.edit_text(message, parse_mode="Markdown", reply_markup=reply_markup)
+        Args:
+            update (telegram.Update): The incoming update.
+            context (telegram.ext.CallbackContext): The handler context.
+            key (str): Idempotency key of the withdrawal.
+            lamports (int or None): Fixed amount to withdraw.
+            fraction (float or None): Share of the balance to withdraw.
+        """
+        engine = self.withdrawal_engine
+        if engine is None:
+            if update.callback_query:
+                await self.answer(update.callback_query, "Withdrawals are not enabled.")
+            return
+        repeated = engine.is_pending(key)
+        try:
+            withdrawal = await engine.submit(update.effective_user.id, key, lamports=lamports, fraction=fraction)
+        except WithdrawalFailed as error:
+            await self.show(update, context, notice=f"❌ {escape_markdown(str(error))}")
+            return
+        if repeated:
+            # A repeated tap: the withdrawal is already on its way.
+            if update.callback_query:
+                await self.answer(update.callback_query, "This withdrawal is already being processed.")
+            return
 
-    async def handle_button_click(self, update, context):
-        """Handles button clicks within the withdraw dashboard."""
-        query = update.callback_query
+        task = asyncio.create_task(self.report(update.effective_chat.id, context, withdrawal))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        await self.show(update, context, notice="⏳ Withdrawal submitted.")
 
-        if query.data == "back_to_main":
-            # Navigate back to the main dashboard
-            await self.main_dashboard.show(update, context)
-        elif query.data == "refresh":
-            # Refresh the current dashboard
-            await self.show(update, context)
-        elif query.data == "delete":
-             await query.message.delete()
+    async def report(self, chat_id, context, withdrawal):
+        """Tell the user whether a withdrawal confirmed."""
+        try:
+            signature = await withdrawal.future
+        except WithdrawalFailed as error:
+            text = f"❌ Withdrawal failed: {escape_markdown(str(error))}"
         else:
-            await query.answer()
+            text = f"✅ Withdrawal to `{withdrawal.destination}` confirmed.\n`{signature}`"
+            if self.balance_service is not None:
+                self.balance_service.invalidate(await self.wallet_store.public_key(withdrawal.user_id))
+        await self.call_api(chat_id, lambda: context.bot.send_message(chat_id, text, parse_mode="Markdown"), priority=BACKGROUND)
@@ -1,53 +1,449 @@
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler
-from config import TOKEN
-from utils.solana_keygen import generate_solana_wallet
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+import httpx
+from pymongo import MongoClient
+from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters
+from telegram.helpers import escape_markdown
+from config import (
+    TOKEN, MONGO_URI, MONGO_DB_NAME, WALLET_CACHE_SIZE,
+    KEYPAIR_POOL_RESERVE, KEYPAIR_POOL_BATCH_SIZE, KEYPAIR_POOL_WORKERS,
+    SESSION_BACKEND, SESSION_TTL, CONCURRENT_UPDATES, RENDER_SUPPRESS_WINDOW,
+    SEND_GLOBAL_RATE, SEND_CHAT_RATE, SEND_CHAT_BURST,
+    BOT_MODE, WEBHOOK_URL, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET, WEBHOOK_WORKERS,
+    SOLANA_RPC_URL, BALANCE_CACHE_TTL, PRICE_SOURCES, PRICE_REFRESH_INTERVAL, PRICE_MAX_AGE,
+    SNIPER_ENABLED, SOLANA_WS_URL, SNIPER_MAX_CONCURRENT_BUYS, COPY_TRADE_ENABLED, COPY_TRADE_MAX_CONCURRENCY,
+    AFK_RESOLUTION, AFK_MAX_BATCH_SIZE, TRADE_EXECUTION_ENABLED, TRADE_NODES, TRADE_PRIVATE_NODES, TRADE_FANOUT,
+    PRIORITY_FEE_MICROLAMPORTS, BLOCKHASH_REFRESH_INTERVAL, JUPITER_API_URL,
+    WITHDRAW_MAX_CONCURRENCY, WITHDRAW_MAX_PER_TRANSACTION, WITHDRAW_BATCH_WINDOW,
+    SETTINGS_CACHE_SIZE, SETTINGS_FLUSH_INTERVAL,
+    METRICS_ENABLED, METRICS_HOST, METRICS_PORT, PROFILE_SLOW_HANDLERS, PROFILE_DIR, PROFILE_INTERVAL,
+    VANITY_WORKERS, VANITY_MAX_JOBS, VANITY_MAX_LENGTH, VANITY_TIMEOUT, VANITY_BATCH_SIZE,
+    WALLET_IMPORT_BATCH_SIZE, WALLET_IMPORT_MAX_FILE_SIZE,
+    TOKEN_INFO_TTL, TOKEN_INFO_NEGATIVE_TTL, TOKEN_INFO_CACHE_SIZE, POSITION_MARK_INTERVAL, POSITION_FLUSH_INTERVAL,
+    LIVE_UPDATES_TTL, LIVE_UPDATES_BATCH_WINDOW, LIVE_UPDATES_MAX_BATCH_SIZE,
+    UPDATE_MAX_PENDING, UPDATE_JOURNAL_ENABLED, UPDATE_JOURNAL_DIR, UPDATE_JOURNAL_SEGMENT_SIZE,
+    UPDATE_JOURNAL_SYNC_INTERVAL, DASHBOARD_WARMUP,
+)
+from services.balance_service import BalanceService
+from services.idempotency import IdempotencyKeys
+from services.jupiter import JupiterRouter
+from services.keypair_pool import KeypairPool
+from services.live_updates import LiveUpdates
+from services.metrics import BotMetrics, InstrumentedRequest, MetricsServer, SamplingProfiler
+from services.position_marker import PositionMarker
+from services.position_store import PositionStore
+from services.price_oracle import PriceOracle
+from services.session_store import SessionStore, MongoSessionStore
+from services.settings_store import SettingsStore
+from services.shards import IdCounter, WorkerShard
+from services.solana_rpc import SolanaRpcClient
+from services.telegram_sender import BACKGROUND, INTERACTIVE, TelegramSender
+from services.token_info import TokenInfoService
+from services.update_journal import JournalUpdateProcessor, UpdateJournal, UpdateQueue, UpdatesRequest
+from services.trade_executor import BlockhashCache, TradeExecutor, build_nodes
+from services.wallet_store import WalletStore
+from services.webhook import run_webhook
 from utils.time_utils import get_us_time
-from dashboards.main_dashboard import MainDashboard
-from dashboards.afk_dashboard import AfkDashboard
-from dashboards.position_dashboard import PositionDashboard
-from dashboards.trade_dashboard import TradeDashboard
-from dashboards.withdraw_dashboard import WithdrawDashboard
-from dashboards.setting_dashboard import SettingDashboard
-from dashboards.lpsniper_dashboard import LpSniperDashboard
+from dashboards.registry import DashboardRegistry, DashboardSpec, parse_warmup
+from dashboards.render_cache import RenderCache
+from dashboards.router import CallbackRouter
 
-def main():
-    """Run the bot."""
-    wallet_generator = generate_solana_wallet()
-    time_utils = get_us_time
+# Every dashboard, imported and built the first time one of its routes is hit.
+# Services named here are passed as keyword arguments of the same name.
+DASHBOARDS = (
+    DashboardSpec("main", "dashboards.main_dashboard:MainDashboard", services=("balance_service", "price_oracle")),
+    DashboardSpec("afk", "dashboards.afk_dashboard:AfkDashboard", requires=("main",), services=("afk_scheduler",)),
+    DashboardSpec(
+        "position", "dashboards.position_dashboard:PositionDashboard", requires=("main",), services=("position_store",)
+    ),
+    DashboardSpec("trade", "dashboards.trade_dashboard:TradeDashboard", requires=("main",), services=("copy_trade_engine",)),
+    DashboardSpec(
+        "withdraw", "dashboards.withdraw_dashboard:WithdrawDashboard", requires=("main",),
+        services=("balance_service", "withdrawal_engine"),
+    ),
+    DashboardSpec(
+        "setting", "dashboards.setting_dashboard:SettingDashboard", requires=("main",),
+        services=("trade_executor", "settings_store"),
+    ),
+    DashboardSpec("lpsniper", "dashboards.lpsniper_dashboard:LpSniperDashboard", requires=("main",), services=("sniper_engine",)),
+    DashboardSpec("vanity", "dashboards.vanity_dashboard:VanityDashboard", requires=("main",), services=("vanity_grinder",)),
+    DashboardSpec(
+        "wallet", "dashboards.wallet_dashboard:WalletDashboard", requires=("main",), services=("wallet_vault",),
+        options={"max_file_size": WALLET_IMPORT_MAX_FILE_SIZE},
+    ),
+    DashboardSpec(
+        "token", "dashboards.token_dashboard:TokenDashboard", requires=("main",),
+        services=("token_info", "settings_store", "buy", "buy_keys"),
+    ),
+)
+
+# Engines and the collection of the tasks they run. An engine is built at startup if this
+# worker's users have tasks in it, and otherwise with the first dashboard that needs it.
+ENGINES = (("sniper_engine", "snipe_tasks"), ("copy_trade_engine", "copy_configs"), ("afk_scheduler", "afk_tasks"))
+
+
+def build_session_store(database):
+    """Create the session store selected by `SESSION_BACKEND`."""
+    if SESSION_BACKEND == "memory":
+        return SessionStore(ttl=SESSION_TTL)
+    if SESSION_BACKEND == "mongo":
+        session_store = MongoSessionStore(database["sessions"], ttl=SESSION_TTL)
+        session_store.ensure_indexes()
+        return session_store
+    return None
+
+
+def build_update_queue(worker=None):
+    """Create the update queue, journaled to `UPDATE_JOURNAL_DIR` (one subdirectory per webhook worker) if enabled."""
+    journal = None
+    if UPDATE_JOURNAL_ENABLED:
+        directory = UPDATE_JOURNAL_DIR if worker is None else os.path.join(UPDATE_JOURNAL_DIR, f"worker-{worker}")
+        journal = UpdateJournal(directory, segment_size=UPDATE_JOURNAL_SEGMENT_SIZE, sync_interval=UPDATE_JOURNAL_SYNC_INTERVAL)
+    return UpdateQueue(journal, max_pending=UPDATE_MAX_PENDING)
+
+
+def build_application(database=None, request=None, worker=None):
+    """
+    Build the bot `Application` with every handler registered.
+
+    Dashboards are declared in `DASHBOARDS` and loaded on first use; the
+    ones listed in `DASHBOARD_WARMUP` are built here.
+
+    Args:
+        database (pymongo.database.Database or None): Database holding every collection;
+                                                      `MONGO_URI`/`MONGO_DB_NAME` when omitted.
+        request (telegram.request.BaseRequest or None): Request backend for Bot API calls and
+                                                        `getUpdates`; HTTPX when omitted.
+        worker (int or None): Index of the webhook worker process, which keeps its own update journal.
+
+    Returns:
+        telegram.ext.Application: The configured application.
+    """
+    if database is None:
+        database = MongoClient(MONGO_URI)[MONGO_DB_NAME]
+    # Each webhook worker runs the automated tasks of the users whose chats it serves.
+    shard = WorkerShard() if worker is None else WorkerShard(worker, WEBHOOK_WORKERS)
+    keypair_executor = ProcessPoolExecutor(max_workers=KEYPAIR_POOL_WORKERS)
+    keypair_pool = KeypairPool(KEYPAIR_POOL_RESERVE, KEYPAIR_POOL_BATCH_SIZE, executor=keypair_executor)
+    wallet_store = WalletStore(database["wallets"], cache_size=WALLET_CACHE_SIZE, keypair_pool=keypair_pool)
+    wallet_store.ensure_indexes()
+    session_store = build_session_store(database)
+    render_cache = RenderCache(window=RENDER_SUPPRESS_WINDOW)
+    # The global limit is the bot's, so webhook workers split it; a chat is only ever served by one worker.
+    sender = TelegramSender(SEND_GLOBAL_RATE / shard.count, SEND_CHAT_RATE, SEND_CHAT_BURST)
+
+    async def live_updates_enabled(user_id):
+        return (await settings_store.get(user_id)).live_updates
+
+    # Balances, positions and AFK tasks publish their changes to the dashboards watching them.
+    live_updates = LiveUpdates(
+        ttl=LIVE_UPDATES_TTL,
+        batch_window=LIVE_UPDATES_BATCH_WINDOW,
+        max_batch_size=LIVE_UPDATES_MAX_BATCH_SIZE,
+        enabled=live_updates_enabled,
+    )
+    rpc = SolanaRpcClient(SOLANA_RPC_URL)
+    balance_service = BalanceService(rpc, ttl=BALANCE_CACHE_TTL, on_change=live_updates.publisher("balance"))
+    price_oracle = PriceOracle.from_spec(PRICE_SOURCES, interval=PRICE_REFRESH_INTERVAL, max_age=PRICE_MAX_AGE)
+    position_store = PositionStore(
+        on_change=live_updates.publisher("positions"), collection=database["positions"],
+        flush_interval=POSITION_FLUSH_INTERVAL, shard=shard,
+    )
+    position_store.ensure_indexes()
+    settings_store = SettingsStore(
+        database["user_settings"], cache_size=SETTINGS_CACHE_SIZE, flush_interval=SETTINGS_FLUSH_INTERVAL
+    )
+    settings_store.ensure_indexes()
+
+    trade_client = httpx.AsyncClient(timeout=10.0)
+    blockhashes = BlockhashCache(rpc, interval=BLOCKHASH_REFRESH_INTERVAL)
+    jupiter = JupiterRouter(rpc, JUPITER_API_URL, client=trade_client)
+    trade_executor = TradeExecutor(
+        build_nodes(TRADE_NODES, trade_client),
+        jupiter,
+        blockhashes,
+        fanout=TRADE_FANOUT,
+        priority_fee=PRIORITY_FEE_MICROLAMPORTS,
+        private_nodes=build_nodes(TRADE_PRIVATE_NODES, trade_client),
+    )
+    token_info = TokenInfoService(
+        rpc, jupiter, ttl=TOKEN_INFO_TTL, negative_ttl=TOKEN_INFO_NEGATIVE_TTL, cache_size=TOKEN_INFO_CACHE_SIZE
+    )
+    position_marker = PositionMarker(position_store, token_info, interval=POSITION_MARK_INTERVAL)
+
+    buy_keys = IdempotencyKeys(database["buy_keys"])
+    buy_keys.ensure_indexes()
+
+    async def buy_for(user_id, mint, amount_sol, reason, priority=INTERACTIVE):
+        """Buy a token with the user's wallet, record the position and tell the user."""
+        if not TRADE_EXECUTION_ENABLED:
+            text = f"{reason} ⚠️ Trading is disabled on this bot, so nothing was bought."
+        else:
+            wallet = await wallet_store.get_wallet(user_id)
+            settings = await settings_store.get(user_id)
+            try:
+                result = await trade_executor.trade(
+                    wallet.keypair, "buy", mint, amount_sol, **settings.trade_options("buy", PRIORITY_FEE_MICROLAMPORTS)
+                )
+            except Exception as error:
+                text = f"{reason} ❌ Buying {amount_sol} SOL of `{mint}` failed: {escape_markdown(str(error))}"
+            else:
+                if result.out_amount > 0:
+                    # The fill is the freshest price there is until the next round of marks.
+                    position_store.mark(mint, result.in_amount / result.out_amount)
+                position_store.add(user_id, mint, result.out_amount, cost=result.in_amount)
+                balance_service.invalidate(wallet.public_key)
+                text = f"{reason} ✅ Bought {result.out_amount:g} of `{mint}` for {amount_sol} SOL via {escape_markdown(result.node)}."
+        await sender.submit(user_id, lambda: application.bot.send_message(user_id, text, parse_mode="Markdown"), priority=priority)
+
+    update_queue = build_update_queue(worker)
+    background_tasks = []
+
+    metrics = metrics_server = profiler = None
+    if METRICS_ENABLED:
+        if PROFILE_SLOW_HANDLERS > 0:
+            profiler = SamplingProfiler(PROFILE_SLOW_HANDLERS, PROFILE_DIR, interval=PROFILE_INTERVAL)
+        metrics = BotMetrics(profiler=profiler)
+        for name, component in (
+            ("sender", sender), ("render_cache", render_cache), ("balances", balance_service),
+            ("price_oracle", price_oracle), ("trade_executor", trade_executor), ("settings", settings_store),
+            ("positions", position_store), ("token_info", token_info), ("position_marker", position_marker),
+            ("buy_keys", buy_keys),
+            ("live_updates", live_updates), ("updates", update_queue),
+        ):
+            metrics.registry.register_stats(name, component.stats)
+        if profiler is not None:
+            metrics.registry.register_stats("profiler", profiler.stats)
+        metrics_server = MetricsServer(metrics.registry, METRICS_HOST, METRICS_PORT)
+
+    dashboard_options = {
+        "session_store": session_store, "render_cache": render_cache, "sender": sender, "metrics": metrics,
+        "live_updates": live_updates,
+    }
+    dashboards = DashboardRegistry(DASHBOARDS, (wallet_store, get_us_time), dashboard_options, services={
+        "balance_service": balance_service, "price_oracle": price_oracle, "position_store": position_store,
+        "trade_executor": trade_executor, "settings_store": settings_store, "buy": buy_for,
+        "token_info": token_info, "buy_keys": buy_keys,
+    })
+    if metrics is not None:
+        metrics.registry.register_stats("dashboards", dashboards.stats)
 
-    main_dashboard = MainDashboard(wallet_generator, time_utils)
-    afk_dashboard = AfkDashboard(wallet_generator, time_utils, main_dashboard)
-    position_dashboard = PositionDashboard(wallet_generator, time_utils, main_dashboard)
-    trade_dashboard = TradeDashboard(wallet_generator, time_utils, main_dashboard)
-    withdraw_dashboard = WithdrawDashboard(wallet_generator, time_utils, main_dashboard)
-    setting_dashboard = SettingDashboard(wallet_generator, time_utils, main_dashboard)
-    lpsniper_dashboard = LpSniperDashboard(wallet_generator, time_utils, main_dashboard)
+    # Engines and services only dashboards use are built with the first dashboard needing them.
+    def build_sniper_engine():
+        from services.sniper_engine import SniperEngine
 
-    application = Application.builder().token(TOKEN).build()
+        async def snipe_buy(task, event):
+            await buy_for(task.user_id, task.mint, task.amount_sol, f"🎯 Sniper triggered: a pool for `{task.mint}` was just created.")
 
-    application.add_handler(CommandHandler("start", main_dashboard.show))
-    application.add_handler(CallbackQueryHandler(main_dashboard.show, pattern="main"))
+        sniper_engine = SniperEngine(
+            snipe_buy, database["snipe_tasks"], max_concurrent_buys=SNIPER_MAX_CONCURRENT_BUYS,
+            shard=shard, ids=IdCounter(database["counters"], "snipe_tasks"),
+        )
+        sniper_engine.ensure_indexes()
+        if metrics is not None:
+            metrics.registry.register_stats("sniper", sniper_engine.stats)
+        return sniper_engine
 
-    application.add_handler(CallbackQueryHandler(afk_dashboard.show, pattern="afk_mode"))
-    application.add_handler(CallbackQueryHandler(afk_dashboard.handle_button_click, pattern="afk_mode|back_to_main|refresh"))
+    def start_sniper_engine(sniper_engine):
+        if SNIPER_ENABLED:
+            from services.pool_events import stream_pool_events
 
-    application.add_handler(CallbackQueryHandler(position_dashboard.show, pattern="positions"))
-    application.add_handler(CallbackQueryHandler(position_dashboard.handle_button_click, pattern="back_to_main|refresh"))
+            background_tasks.append(asyncio.create_task(sniper_engine.run(stream_pool_events(SOLANA_WS_URL, rpc))))
 
-    application.add_handler(CallbackQueryHandler(trade_dashboard.show, pattern="copy_trade"))
-    application.add_handler(CallbackQueryHandler(trade_dashboard.handle_button_click, pattern="back_to_main|refresh"))
+    def build_copy_trade_engine():
+        from services.copy_trade import CopyTradeEngine
+        from services.leader_feed import LeaderFeed
 
-    application.add_handler(CallbackQueryHandler(withdraw_dashboard.show, pattern="withdraw"))
-    application.add_handler(CallbackQueryHandler(withdraw_dashboard.handle_button_click, pattern="back_to_main|refresh"))
+        async def copy_buy(config, trade):
+            if trade.side == "buy":
+                await buy_for(config.user_id, trade.mint, config.amount_sol, f"🤖 Copy trade: `{config.leader}` bought `{trade.mint}`.")
 
-    application.add_handler(CallbackQueryHandler(setting_dashboard.show, pattern="settings"))
-    application.add_handler(CallbackQueryHandler(setting_dashboard.handle_button_click, pattern="back_to_main|refresh"))
+        copy_trade_engine = CopyTradeEngine(
+            copy_buy, feed=LeaderFeed(SOLANA_WS_URL, rpc), collection=database["copy_configs"],
+            max_concurrency=COPY_TRADE_MAX_CONCURRENCY, shard=shard, ids=IdCounter(database["counters"], "copy_configs"),
+        )
+        copy_trade_engine.ensure_indexes()
+        if metrics is not None:
+            metrics.registry.register_stats("copy_trade", copy_trade_engine.stats)
+        return copy_trade_engine
 
-    application.add_handler(CallbackQueryHandler(lpsniper_dashboard.show, pattern="lp_sniper"))
-    application.add_handler(CallbackQueryHandler(lpsniper_dashboard.handle_button_click, pattern="back_to_main|refresh"))
+    def start_copy_trade_engine(copy_trade_engine):
+        if COPY_TRADE_ENABLED:
+            background_tasks.append(asyncio.create_task(copy_trade_engine.run(copy_trade_engine.feed.trades())))
 
+    def build_afk_scheduler():
+        from services.afk_scheduler import AfkScheduler
 
-    application.run_polling()
+        async def afk_run(tasks):
+            await asyncio.gather(*(
+                buy_for(task.user_id, task.mint, task.amount_sol, "💤 AFK:", priority=BACKGROUND) for task in tasks
+            ), return_exceptions=True)
+
+        afk_scheduler = AfkScheduler(
+            afk_run, collection=database["afk_tasks"], resolution=AFK_RESOLUTION, max_batch_size=AFK_MAX_BATCH_SIZE,
+            on_change=live_updates.publisher("afk"), shard=shard, ids=IdCounter(database["counters"], "afk_tasks"),
+        )
+        afk_scheduler.ensure_indexes()
+        if metrics is not None:
+            metrics.registry.register_stats("afk", afk_scheduler.stats)
+        return afk_scheduler
+
+    def build_withdrawal_engine():
+        from services.withdrawals import WithdrawalEngine
+
+        withdrawal_engine = WithdrawalEngine(
+            wallet_store,
+            rpc,
+            blockhashes,
+            lambda transaction: trade_executor.broadcast(transaction, "sell"),
+            collection=database["withdrawals"],
+            state_collection=database["withdraw_states"],
+            max_concurrency=WITHDRAW_MAX_CONCURRENCY,
+            max_per_transaction=WITHDRAW_MAX_PER_TRANSACTION,
+            batch_window=WITHDRAW_BATCH_WINDOW,
+        )
+        withdrawal_engine.ensure_indexes()
+        if metrics is not None:
+            metrics.registry.register_stats("withdrawals", withdrawal_engine.stats)
+        return withdrawal_engine
+
+    def build_wallet_vault():
+        from services.wallet_vault import WalletVault
+
+        # Imported keys are decoded on the keypair pool's processes.
+        wallet_vault = WalletVault(
+            database["imported_wallets"], wallet_store, executor=keypair_executor, batch_size=WALLET_IMPORT_BATCH_SIZE,
+            client=httpx.AsyncClient(timeout=30.0),
+        )
+        wallet_vault.ensure_indexes()
+        if metrics is not None:
+            metrics.registry.register_stats("wallet_vault", wallet_vault.stats)
+        return wallet_vault
+
+    def build_vanity_grinder():
+        from services.vanity import VanityGrinder
+
+        # Vanity searches get their own processes so they never delay wallet generation for new users.
+        vanity_grinder = VanityGrinder(
+            ProcessPoolExecutor(max_workers=VANITY_WORKERS),
+            workers=VANITY_WORKERS,
+            batch_size=VANITY_BATCH_SIZE,
+            max_jobs=VANITY_MAX_JOBS,
+            max_length=VANITY_MAX_LENGTH,
+            timeout=VANITY_TIMEOUT,
+        )
+        if metrics is not None:
+            metrics.registry.register_stats("vanity", vanity_grinder.stats)
+        return vanity_grinder
+
+    async def stop_vanity_grinder(vanity_grinder):
+        await vanity_grinder.stop()
+        vanity_grinder.executor.shutdown(cancel_futures=True)
+
+    dashboards.provide("wallet_vault", build_wallet_vault, close=lambda wallet_vault: wallet_vault.client.aclose())
+    dashboards.provide("vanity_grinder", build_vanity_grinder, close=stop_vanity_grinder)
+    dashboards.provide("sniper_engine", build_sniper_engine, start=start_sniper_engine)
+    dashboards.provide("copy_trade_engine", build_copy_trade_engine, start=start_copy_trade_engine)
+    dashboards.provide(
+        "afk_scheduler", build_afk_scheduler,
+        start=lambda afk_scheduler: afk_scheduler.start(), close=lambda afk_scheduler: afk_scheduler.stop(),
+    )
+    dashboards.provide("withdrawal_engine", build_withdrawal_engine)
+
+    async def post_init(application):
+        if metrics_server is not None:
+            await metrics_server.start()
+        if profiler is not None:
+            profiler.start()
+        await keypair_pool.start()
+        await price_oracle.start()
+        await position_store.load()
+        await position_store.start()
+        await position_marker.start()
+        if TRADE_EXECUTION_ENABLED:
+            await blockhashes.start()
+        # An engine built later has nothing of this worker's to load: only this worker adds its users' tasks.
+        automated_users = set()
+        for name, collection in ENGINES:
+            if await asyncio.to_thread(database[collection].find_one, shard.query()) is not None:
+                engine = dashboards.service(name)
+                await engine.load()
+                automated_users.update(engine.users())
+        # Runs the engines built so far; the others run once built.
+        await dashboards.start()
+        # Users with automated trades hit their settings first; load them in bulk.
+        await settings_store.load(automated_users)
+        await settings_store.start()
+        # Last, so replayed button presses find every service ready.
+        update_queue.open(application.bot)
+
+    async def post_shutdown(application):
+        for task in background_tasks:
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+        await dashboards.close()
+        await position_marker.stop()
+        await position_store.stop()
+        await settings_store.stop()
+        update_queue.close()
+        await live_updates.stop()
+        await blockhashes.stop()
+        await sender.stop()
+        await trade_client.aclose()
+        await rpc.close()
+        await price_oracle.stop()
+        await keypair_pool.stop()
+        keypair_executor.shutdown(cancel_futures=True)
+        if profiler is not None:
+            profiler.stop()
+        if metrics_server is not None:
+            await metrics_server.stop()
+
+    builder = Application.builder().token(TOKEN)
+    if request is not None:
+        builder = builder.request(request).get_updates_request(request)
+    else:
+        if metrics is not None:
+            builder = builder.request(InstrumentedRequest(metrics))
+        # Polled updates are journaled from the raw response.
+        builder = builder.get_updates_request(UpdatesRequest(update_queue, connection_pool_size=1))
+    application = (
+        builder
+        .update_queue(update_queue)
+        .concurrent_updates(JournalUpdateProcessor(update_queue, CONCURRENT_UPDATES))
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
+    live_updates.bot = application.bot
+
+    router = CallbackRouter([], default_text="token:paste", registry=dashboards)
+    router.warm(parse_warmup(DASHBOARD_WARMUP, dashboards))
+
+    application.add_handler(CommandHandler("start", router.command("main:show")))
+    application.add_handler(CommandHandler("vanity", router.command("vanity:grind")))
+    application.add_handler(CallbackQueryHandler(router.dispatch))
+    application.add_handler(MessageHandler((filters.TEXT & ~filters.COMMAND) | filters.Document.ALL, router.dispatch_text))
+
+    return application
+
+
+def main():
+    """Run the bot."""
+    if BOT_MODE == "webhook":
+        run_webhook(
+            build_application,
+            TOKEN,
+            WEBHOOK_URL,
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            path=WEBHOOK_PATH,
+            secret_token=WEBHOOK_SECRET,
+            workers=WEBHOOK_WORKERS,
+        )
+    else:
+        build_application().run_polling()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,367 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from .shards import IdCounter, WorkerShard
+
+logger = logging.getLogger(__name__)
+
+
+class AfkTask:
+    """
+    A recurring AFK order: buy a token for a fixed SOL amount every `interval` seconds.
+
+    Attributes:
+        task_id (int): Unique id of the task.
+        user_id (int): Telegram user id of the owner.
+        mint (str): The token to buy.
+        amount_sol (float): SOL spent on every run.
+        interval (float): Seconds between runs.
+        anchor (float): Unix time of the first run; later runs fall on `anchor + k * interval`.
+        due (float): Unix time of the next run.
+        tick (int or None): Wheel bucket the task is currently scheduled in.
+    """
+
+    __slots__ = ("task_id", "user_id", "mint", "amount_sol", "interval", "anchor", "due", "tick")
+
+    def __init__(self, task_id, user_id, mint, amount_sol, interval, anchor):
+        self.task_id = task_id
+        self.user_id = user_id
+        self.mint = mint
+        self.amount_sol = amount_sol
+        self.interval = interval
+        self.anchor = anchor
+        self.due = anchor
+        self.tick = None
+
+    def next_due(self, now):
+        """Return the first run time after `now` on the task's cadence."""
+        if self.anchor > now:
+            return self.anchor
+        return self.anchor + self.interval * (math.floor((now - self.anchor) / self.interval) + 1)
+
+    def to_document(self):
+        return {
+            "task_id": self.task_id,
+            "user_id": self.user_id,
+            "mint": self.mint,
+            "amount_sol": self.amount_sol,
+            "interval": self.interval,
+            "anchor": self.anchor,
+            "created_at": datetime.now(timezone.utc),
+        }
+
+    @classmethod
+    def from_document(cls, document):
+        return cls(
+            document["task_id"], document["user_id"], document["mint"],
+            document["amount_sol"], document["interval"], document["anchor"],
+        )
+
+
+class AfkScheduler:
+    """
+    Runs every user's recurring AFK tasks from a single timer wheel.
+
+    Instead of one sleeping asyncio task per AFK task, tasks are hashed into
+    wheel buckets of `resolution` seconds keyed by tick number. One loop
+    wakes once per tick, pops the buckets that have come due and hands
+    their tasks to `execute` in batches of up to `max_batch_size`, so
+    scheduling, cancelling and firing a task are all O(1) and a tick costs
+    only the tasks it fires. Fired tasks are re-inserted at their next run
+    on a fixed cadence (`anchor + k * interval`); runs missed while the bot
+    was down or lagging are skipped rather than replayed in a burst.
+
+    "Pause All" and "Start All" add or remove the user from a paused set
+    that is checked when a task comes due, so both are O(1); paused tasks
+    keep their cadence and simply do not execute.
+
+    Only the cadence of a task is persisted, never its next run, so firing
+    does not write to the database and `load()` rebuilds the whole schedule
+    after a restart from the task documents alone. With several webhook
+    workers, each scheduler loads and fires only the tasks of its `shard`'s
+    users, and task ids come from a counter shared by every worker.
+    """
+
+    def __init__(self, execute, collection=None, resolution=0.1, max_batch_size=500,
+                 max_concurrent_batches=16, clock=time.time, lag_samples=10000, on_change=None, shard=None, ids=None):
+        """
+        Initialize the AfkScheduler instance.
+
+        Args:
+            execute (callable): Async callable `execute(tasks)` running a batch of due `AfkTask`s.
+            collection (pymongo.collection.Collection or None): Persists tasks and paused users.
+            resolution (float): Width of a wheel bucket in seconds; tasks fire at most this late.
+            max_batch_size (int): Largest batch passed to `execute`.
+            max_concurrent_batches (int): Batches executing at the same time.
+            clock (callable): Returns the current Unix time.
+            lag_samples (int): Number of recent scheduling lags kept for `stats()`.
+            on_change (callable or None): `on_change(user_id)` called when a user's tasks are added,
+                                          removed, paused or started.
+            shard (WorkerShard or None): The users whose tasks this process runs; every user when omitted.
+            ids (IdCounter or None): Allocates task ids; an in-process counter when omitted.
+
+        Attributes:
+            fired (int): Task runs handed to `execute`.
+            skipped (int): Task runs skipped because the owner was paused.
+            batches (int): Calls made to `execute`.
+            failed (int): Batches whose `execute` raised.
+            pending (int): Task runs handed to `execute` that have not finished, i.e. the queue depth.
+            lags (collections.deque): Seconds between each run being due and being fired.
+
+        Example:
+            >>> scheduler = AfkScheduler(execute, collection=database["afk_tasks"])
+            >>> await scheduler.load()
+            >>> await scheduler.start()
+            >>> await scheduler.add_task(user_id, mint, 0.1, interval=900)
+        """
+        self.execute = execute
+        self.collection = collection
+        self.resolution = resolution
+        self.max_batch_size = max_batch_size
+        self.clock = clock
+        self.on_change = on_change
+        self.shard = shard or WorkerShard()
+        self.ids = ids or IdCounter()
+        self.fired = 0
+        self.skipped = 0
+        self.batches = 0
+        self.failed = 0
+        self.pending = 0
+        self.lags = deque(maxlen=lag_samples)
+        self._wheel = {}
+        self._current = int(clock() // resolution)
+        self._tasks = {}
+        self._by_user = {}
+        self._paused = set()
+        self._semaphore = asyncio.Semaphore(max_concurrent_batches)
+        self._running = set()
+        self._task = None
+
+    def ensure_indexes(self):
+        self.collection.create_index("task_id", unique=True, sparse=True)
+        self.collection.create_index("user_id")
+
+    async def load(self):
+        """Rebuild the schedule from the persisted tasks and paused users of this shard."""
+        if self.collection is None:
+            return
+        documents = await asyncio.to_thread(lambda: list(self.collection.find(self.shard.query(), {"_id": 0})))
+        now = self.clock()
+        for document in documents:
+            if document.get("paused"):
+                self._paused.add(document["user_id"])
+            elif "task_id" in document:
+                task = AfkTask.from_document(document)
+                task.due = task.next_due(now)
+                self._insert(task)
+        await self.ids.skip_stored(self.collection, "task_id")
+
+    async def add_task(self, user_id, mint, amount_sol, interval, start=None):
+        """
+        Schedule a new recurring AFK task.
+
+        Args:
+            user_id (int): Telegram user id of the owner.
+            mint (str): The token to buy.
+            amount_sol (float): SOL spent on every run.
+            interval (float): Seconds between runs.
+            start (float or None): Unix time of the first run; one interval from now when omitted.
+
+        Returns:
+            AfkTask: The scheduled task.
+
+        Raises:
+            WrongWorker: If the user belongs to another worker's shard.
+        """
+        self.shard.check(user_id)
+        anchor = self.clock() + interval if start is None else start
+        task = AfkTask(await self.ids.next(), user_id, mint, amount_sol, interval, anchor)
+        self._insert(task)
+        self._changed(user_id)
+        if self.collection is not None:
+            await asyncio.to_thread(self.collection.insert_one, task.to_document())
+        return task
+
+    async def remove_user_tasks(self, user_id):
+        """Cancel every AFK task of a user. Returns how many were cancelled."""
+        tasks = list(self._by_user.pop(user_id, {}).values())
+        for task in tasks:
+            self._unlink(task)
+        if tasks:
+            self._changed(user_id)
+        if tasks and self.collection is not None:
+            await asyncio.to_thread(self.collection.delete_many, {"user_id": user_id, "task_id": {"$exists": True}})
+        return len(tasks)
+
+    def _insert(self, task):
+        task.tick = max(int(task.due // self.resolution), self._current)
+        bucket = self._wheel.get(task.tick)
+        if bucket is None:
+            bucket = self._wheel[task.tick] = {}
+        bucket[task.task_id] = task
+        self._tasks[task.task_id] = task
+        self._by_user.setdefault(task.user_id, {})[task.task_id] = task
+
+    def _unlink(self, task):
+        del self._tasks[task.task_id]
+        bucket = self._wheel.get(task.tick)
+        if bucket is not None:
+            bucket.pop(task.task_id, None)
+            if not bucket:
+                del self._wheel[task.tick]
+
+    def user_tasks(self, user_id):
+        """Return the AFK tasks of a user, oldest first."""
+        tasks = self._by_user.get(user_id, {})
+        return [tasks[task_id] for task_id in sorted(tasks)]
+
+    def users(self):
+        """Return the ids of users with AFK tasks."""
+        return list(self._by_user)
+
+    def is_paused(self, user_id):
+        return user_id in self._paused
+
+    async def pause_all(self, user_id):
+        """Stop running every AFK task of a user until `start_all`."""
+        self._paused.add(user_id)
+        self._changed(user_id)
+        await self._save_paused(user_id, True)
+
+    async def start_all(self, user_id):
+        """Resume every AFK task of a user from its next scheduled run."""
+        self._paused.discard(user_id)
+        self._changed(user_id)
+        await self._save_paused(user_id, False)
+
+    def _changed(self, user_id):
+        if self.on_change is not None:
+            self.on_change(user_id)
+
+    async def _save_paused(self, user_id, paused):
+        if self.collection is None:
+            return
+        if paused:
+            await asyncio.to_thread(
+                self.collection.update_one, {"user_id": user_id, "paused": True}, {"$set": {"paused": True}}, upsert=True
+            )
+        else:
+            await asyncio.to_thread(self.collection.delete_many, {"user_id": user_id, "paused": True})
+
+    def advance(self, now=None):
+        """
+        Fire every task whose bucket has fully elapsed.
+
+        Args:
+            now (float or None): The current Unix time; read from `clock` when omitted.
+
+        Returns:
+            int: The number of task runs handed to `execute`.
+        """
+        now = self.clock() if now is None else now
+        last = int(now // self.resolution) - 1
+        if last < self._current:
+            return 0
+        if last - self._current > len(self._wheel):
+            # Far behind (e.g. the clock jumped): visit occupied buckets only.
+            ticks = sorted(tick for tick in self._wheel if tick <= last)
+        else:
+            ticks = range(self._current, last + 1)
+        self._current = last + 1
+
+        due = []
+        for tick in ticks:
+            bucket = self._wheel.pop(tick, None)
+            if bucket:
+                due.extend(bucket.values())
+
+        ready = []
+        paused = self._paused
+        for task in due:
+            if task.user_id in paused:
+                self.skipped += 1
+            else:
+                self.lags.append(now - task.due)
+                ready.append(task)
+            task.due = task.next_due(now)
+            self._insert(task)
+
+        if ready:
+            loop = asyncio.get_running_loop()
+            for start in range(0, len(ready), self.max_batch_size):
+                batch = ready[start:start + self.max_batch_size]
+                self.pending += len(batch)
+                running = loop.create_task(self._fire(batch))
+                self._running.add(running)
+                running.add_done_callback(self._running.discard)
+            self.fired += len(ready)
+        return len(ready)
+
+    async def _fire(self, batch):
+        try:
+            async with self._semaphore:
+                self.batches += 1
+                await self.execute(batch)
+        except Exception:
+            self.failed += 1
+            logger.exception("AFK batch of %d tasks failed", len(batch))
+        finally:
+            self.pending -= len(batch)
+
+    async def start(self):
+        """Start the scheduling loop."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the scheduling loop; batches already handed to `execute` keep running."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                self.advance()
+            except Exception:
+                logger.exception("AFK scheduler tick failed")
+            await asyncio.sleep(max(0.0, self._current * self.resolution + self.resolution - self.clock()))
+
+    async def drain(self):
+        """Wait for every batch that has been handed to `execute`."""
+        while self._running:
+            await asyncio.gather(*list(self._running), return_exceptions=True)
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def stats(self):
+        """
+        Return scheduler counters, queue depth and scheduling lag percentiles.
+
+        Returns:
+            dict: Scheduled tasks, occupied buckets, paused users, queue depth,
+                  run counters and p50/p99/max lag in seconds.
+        """
+        ordered = sorted(self.lags)
+        return {
+            "scheduled": len(self._tasks),
+            "buckets": len(self._wheel),
+            "paused_users": len(self._paused),
+            "depth": self.pending,
+            "fired": self.fired,
+            "skipped": self.skipped,
+            "batches": self.batches,
+            "failed": self.failed,
+            "lag_p50": ordered[len(ordered) // 2] if ordered else None,
+            "lag_p99": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] if ordered else None,
+            "lag_max": ordered[-1] if ordered else None,
+        }
@@ -0,0 +1,172 @@
+import asyncio
+from collections import Counter
+
+from utils.cache import TTLCache
+from .solana_rpc import LAMPORTS_PER_SOL
+
+# getMultipleAccounts accepts at most 100 keys per call.
+MAX_BATCH_SIZE = 100
+
+
+class BalanceUnavailable(Exception):
+    """Raised when a balance could not be fetched from the RPC node."""
+
+
+def format_sol(amount):
+    """
+    Format a SOL amount for display, without trailing zeros.
+
+    Example:
+        >>> format_sol(1.25)
+        '1.25'
+        >>> format_sol(0)
+        '0'
+    """
+    return f"{amount:.9f}".rstrip("0").rstrip(".")
+
+
+class BalanceService:
+    """
+    Live SOL balances for wallet addresses, shared by every dashboard.
+
+    Lookups go through three layers, cheapest first:
+
+    1. a short TTL cache, so a storm of ♻️Refresh presses within the TTL is
+       answered from memory;
+    2. an in-flight table, so concurrent requests for the same address share
+       one pending fetch;
+    3. a batcher that collects the remaining addresses for a few milliseconds
+       and resolves them with a single `getMultipleAccounts` call per 100 keys.
+    """
+
+    def __init__(self, rpc, ttl=3.0, batch_window=0.005, max_batch_size=MAX_BATCH_SIZE, cache_size=100000, on_change=None):
+        """
+        Initialize the BalanceService instance.
+
+        Args:
+            rpc (SolanaRpcClient): Client used for `getMultipleAccounts`.
+            ttl (float): Seconds a fetched balance is served from the cache.
+            batch_window (float): Seconds to wait for more addresses before sending a batch.
+            max_batch_size (int): Addresses per RPC call; a full batch is sent immediately.
+            cache_size (int): Maximum number of cached balances.
+            on_change (callable or None): `on_change(pubkey)` called when a balance is invalidated
+                                          because the bot changed it, e.g. after a trade.
+
+        Attributes:
+            batch_sizes (collections.Counter): Histogram of RPC batch sizes.
+
+        Example:
+            >>> balances = BalanceService(SolanaRpcClient(SOLANA_RPC_URL))
+            >>> await balances.get_sol(wallet_address)
+            1.25
+        """
+        self.rpc = rpc
+        self.batch_window = batch_window
+        self.max_batch_size = min(max_batch_size, MAX_BATCH_SIZE)
+        self.cache = TTLCache(cache_size, ttl)
+        self.on_change = on_change
+        self.batch_sizes = Counter()
+        self.shared = 0
+        self._inflight = {}
+        self._queued = []
+        self._flush_handle = None
+        # The loop only keeps weak references to tasks; batches in flight are held here until done.
+        self._running = set()
+
+    async def get_lamports(self, pubkey):
+        """
+        Return the balance of an account in lamports.
+
+        Args:
+            pubkey (str): Base58 account address.
+
+        Returns:
+            int: The account balance in lamports.
+
+        Raises:
+            BalanceUnavailable: If the RPC lookup failed.
+        """
+        lamports = self.cache.get(pubkey)
+        if lamports is not None:
+            return lamports
+
+        future = self._inflight.get(pubkey)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[pubkey] = future
+            self._queue(pubkey)
+        else:
+            self.shared += 1
+        return await asyncio.shield(future)
+
+    async def get_sol(self, pubkey):
+        """Return the balance of an account in SOL."""
+        return await self.get_lamports(pubkey) / LAMPORTS_PER_SOL
+
+    def invalidate(self, pubkey):
+        """Forget the cached balance of an account, e.g. after a transfer."""
+        self.cache.pop(pubkey)
+        if self.on_change is not None:
+            self.on_change(pubkey)
+
+    def _queue(self, pubkey):
+        self._queued.append(pubkey)
+        loop = asyncio.get_running_loop()
+        if len(self._queued) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_window, self._flush)
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        while self._queued:
+            batch = self._queued[:self.max_batch_size]
+            del self._queued[:self.max_batch_size]
+            task = asyncio.get_running_loop().create_task(self._fetch(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _fetch(self, batch):
+        self.batch_sizes[len(batch)] += 1
+        try:
+            balances = await self.rpc.get_multiple_lamports(batch)
+        except Exception as error:
+            self._fail(batch, BalanceUnavailable(str(error)))
+            return
+
+        for pubkey, lamports in zip(batch, balances):
+            self.cache.set(pubkey, lamports)
+            future = self._inflight.pop(pubkey)
+            if not future.done():
+                future.set_result(lamports)
+        if len(balances) < len(batch):
+            self._fail(batch[len(balances):], BalanceUnavailable(
+                f"The RPC node returned {len(balances)} balances for {len(batch)} accounts."
+            ))
+
+    def _fail(self, pubkeys, error):
+        for pubkey in pubkeys:
+            future = self._inflight.pop(pubkey)
+            if not future.done():
+                future.set_exception(error)
+                # Mark the exception as retrieved if nobody awaits it any more.
+                future.exception()
+
+    def stats(self):
+        """
+        Return cache and batching statistics.
+
+        Returns:
+            dict: Cache hit rate, shared in-flight lookups, RPC calls and average batch size.
+        """
+        lookups = self.cache.hits + self.cache.misses
+        calls = sum(self.batch_sizes.values())
+        keys = sum(size * count for size, count in self.batch_sizes.items())
+        return {
+            "cache_hit_rate": self.cache.hits / lookups if lookups else 0.0,
+            "shared_lookups": self.shared,
+            "rpc_calls": calls,
+            "average_batch_size": keys / calls if calls else 0.0,
+        }
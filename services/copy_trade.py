@@ -0,0 +1,284 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from .shards import IdCounter, WorkerShard
+
+logger = logging.getLogger(__name__)
+
+
+class CopyConfig:
+    """
+    One user's instruction to copy the trades of a leader wallet.
+
+    Attributes:
+        config_id (int): Unique id of the config.
+        user_id (int): Telegram user id of the follower.
+        leader (str): The wallet being copied.
+        amount_sol (float): SOL spent on each copied buy.
+    """
+
+    __slots__ = ("config_id", "user_id", "leader", "amount_sol")
+
+    def __init__(self, config_id, user_id, leader, amount_sol):
+        self.config_id = config_id
+        self.user_id = user_id
+        self.leader = leader
+        self.amount_sol = amount_sol
+
+    def to_document(self):
+        return {
+            "config_id": self.config_id,
+            "user_id": self.user_id,
+            "leader": self.leader,
+            "amount_sol": self.amount_sol,
+            "created_at": datetime.now(timezone.utc),
+        }
+
+    @classmethod
+    def from_document(cls, document):
+        return cls(document["config_id"], document["user_id"], document["leader"], document["amount_sol"])
+
+
+class CopyTradeEngine:
+    """
+    Fans every trade of a leader wallet out to the users copying it.
+
+    Configs are kept in an inverted index from leader to follower configs,
+    so a leader trade reaches exactly its followers. The leader feed is
+    subscribed once per distinct leader: when the first config for a leader
+    is added, and unsubscribed when the last one is removed, however many
+    users copy it. Followers are served concurrently with at most
+    `max_concurrency` copies in flight. "Pause All" and "Start All" add or
+    remove the user from a paused set, which the fan-out checks right
+    before each copy, so both are O(1) and take effect for trades already
+    being fanned out. Config changes update the index in place and apply to
+    the very next trade. With several webhook workers, each engine holds
+    and subscribes only the configs of its `shard`'s users, so every
+    follower's order is placed by exactly one process.
+    """
+
+    def __init__(self, execute, feed=None, collection=None, max_concurrency=256, latency_samples=10000, shard=None, ids=None):
+        """
+        Initialize the CopyTradeEngine instance.
+
+        Args:
+            execute (callable): Async callable `execute(config, trade)` placing the follower's order.
+            feed (LeaderFeed or None): Provides `subscribe(leader)` and `unsubscribe(leader)`.
+            collection (pymongo.collection.Collection or None): Persists configs and paused users.
+            max_concurrency (int): Copies executing at the same time across all leaders.
+            latency_samples (int): Number of recent fan-out latencies kept for `stats()`.
+            shard (WorkerShard or None): The users whose configs this process holds; every user when omitted.
+            ids (IdCounter or None): Allocates config ids; an in-process counter when omitted.
+
+        Attributes:
+            trades (int): Leader trades received.
+            copies (int): Follower orders started.
+            failed (int): Follower orders that raised.
+            dispatch_latencies (collections.deque): Seconds from a trade being received to each copy starting.
+
+        Example:
+            >>> engine = CopyTradeEngine(execute, feed=LeaderFeed(ws_url, rpc))
+            >>> await engine.add_config(user_id, leader_wallet, 0.2)
+            >>> await engine.run(feed.trades())
+        """
+        self.execute = execute
+        self.feed = feed
+        self.collection = collection
+        self.shard = shard or WorkerShard()
+        self.ids = ids or IdCounter()
+        self.trades = 0
+        self.copies = 0
+        self.failed = 0
+        self.dispatch_latencies = deque(maxlen=latency_samples)
+        self._followers = {}
+        # Leaders whose feed subscription is being set up, shared by concurrent inserts.
+        self._subscribing = {}
+        self._by_user = {}
+        self._paused = set()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._running = set()
+
+    def ensure_indexes(self):
+        self.collection.create_index("config_id", unique=True, sparse=True)
+        self.collection.create_index("user_id")
+
+    async def load(self):
+        """Load the persisted configs and paused users of this shard, subscribing to their leaders."""
+        if self.collection is None:
+            return
+        documents = await asyncio.to_thread(lambda: list(self.collection.find(self.shard.query(), {"_id": 0})))
+        for document in documents:
+            if document.get("paused"):
+                self._paused.add(document["user_id"])
+            elif "config_id" in document:
+                await self._insert(CopyConfig.from_document(document))
+        await self.ids.skip_stored(self.collection, "config_id")
+
+    async def add_config(self, user_id, leader, amount_sol):
+        """
+        Start copying a leader wallet.
+
+        Args:
+            user_id (int): Telegram user id of the follower.
+            leader (str): The wallet to copy.
+            amount_sol (float): SOL spent on each copied buy.
+
+        Returns:
+            CopyConfig: The new config, effective for the next leader trade.
+
+        Raises:
+            WrongWorker: If the user belongs to another worker's shard.
+        """
+        self.shard.check(user_id)
+        config = CopyConfig(await self.ids.next(), user_id, leader, amount_sol)
+        await self._insert(config)
+        if self.collection is not None:
+            await asyncio.to_thread(self.collection.insert_one, config.to_document())
+        return config
+
+    async def remove_user_configs(self, user_id):
+        """Stop every copy config of a user. Returns how many were removed."""
+        configs = list(self._by_user.pop(user_id, {}).values())
+        for config in configs:
+            followers = self._followers[config.leader]
+            del followers[config.config_id]
+            if not followers:
+                del self._followers[config.leader]
+                if self.feed is not None:
+                    await self.feed.unsubscribe(config.leader)
+        if configs and self.collection is not None:
+            await asyncio.to_thread(self.collection.delete_many, {"user_id": user_id, "config_id": {"$exists": True}})
+        return len(configs)
+
+    async def _insert(self, config):
+        # A leader is only followed once subscribed: a failed subscription must not leave
+        # an entry that keeps later configs of the leader from subscribing again.
+        if config.leader not in self._followers and self.feed is not None:
+            subscribing = self._subscribing.get(config.leader)
+            if subscribing is None:
+                subscribing = asyncio.get_running_loop().create_task(self._subscribe(config.leader))
+                self._subscribing[config.leader] = subscribing
+            await asyncio.shield(subscribing)
+        self._followers.setdefault(config.leader, {})[config.config_id] = config
+        self._by_user.setdefault(config.user_id, {})[config.config_id] = config
+
+    async def _subscribe(self, leader):
+        try:
+            await self.feed.subscribe(leader)
+        except Exception:
+            # Keep the feed from subscribing the leader again after a reconnect.
+            try:
+                await self.feed.unsubscribe(leader)
+            except Exception as error:
+                logger.warning("Unsubscribing %s after a failed subscription failed: %s", leader, error)
+            raise
+        finally:
+            del self._subscribing[leader]
+
+    def user_configs(self, user_id):
+        """Return the copy configs of a user, oldest first."""
+        configs = self._by_user.get(user_id, {})
+        return [configs[config_id] for config_id in sorted(configs)]
+
+    def users(self):
+        """Return the ids of users with copy configs."""
+        return list(self._by_user)
+
+    def is_paused(self, user_id):
+        return user_id in self._paused
+
+    async def pause_all(self, user_id):
+        """Stop copying for every config of a user, including trades being fanned out right now."""
+        self._paused.add(user_id)
+        await self._save_paused(user_id, True)
+
+    async def start_all(self, user_id):
+        """Resume copying for every config of a user."""
+        self._paused.discard(user_id)
+        await self._save_paused(user_id, False)
+
+    async def _save_paused(self, user_id, paused):
+        if self.collection is None:
+            return
+        if paused:
+            await asyncio.to_thread(
+                self.collection.update_one, {"user_id": user_id, "paused": True}, {"$set": {"paused": True}}, upsert=True
+            )
+        else:
+            await asyncio.to_thread(self.collection.delete_many, {"user_id": user_id, "paused": True})
+
+    @property
+    def leaders(self):
+        """Number of distinct leaders being followed, i.e. live feed subscriptions."""
+        return len(self._followers)
+
+    def on_trade(self, trade):
+        """
+        Fan a leader trade out to its followers.
+
+        Args:
+            trade (LeaderTrade): The trade observed on the leader wallet.
+
+        Returns:
+            int: The number of follower configs the trade was dispatched to.
+        """
+        self.trades += 1
+        followers = self._followers.get(trade.leader)
+        if not followers:
+            return 0
+        loop = asyncio.get_running_loop()
+        configs = list(followers.values())
+        for config in configs:
+            running = loop.create_task(self._copy(config, trade))
+            self._running.add(running)
+            running.add_done_callback(self._running.discard)
+        return len(configs)
+
+    async def _copy(self, config, trade):
+        async with self._semaphore:
+            if config.user_id in self._paused or config.config_id not in self._by_user.get(config.user_id, ()):
+                return
+            self.copies += 1
+            self.dispatch_latencies.append(time.perf_counter() - trade.received_at)
+            try:
+                await self.execute(config, trade)
+            except Exception:
+                self.failed += 1
+                logger.exception("Copy trade failed for config %s (leader %s)", config.config_id, config.leader)
+
+    async def run(self, trades):
+        """
+        Consume a stream of leader trades until it ends.
+
+        Args:
+            trades (AsyncIterator[LeaderTrade]): e.g. `LeaderFeed.trades()`.
+        """
+        async for trade in trades:
+            self.on_trade(trade)
+
+    async def drain(self):
+        """Wait for every copy that has been dispatched."""
+        while self._running:
+            await asyncio.gather(*list(self._running), return_exceptions=True)
+
+    def stats(self):
+        """
+        Return engine counters and dispatch latency percentiles.
+
+        Returns:
+            dict: Leaders, configs, paused users, trades, copies, failures and p50/p99 dispatch latency in seconds.
+        """
+        ordered = sorted(self.dispatch_latencies)
+        return {
+            "leaders": len(self._followers),
+            "configs": sum(len(configs) for configs in self._by_user.values()),
+            "paused_users": len(self._paused),
+            "trades": self.trades,
+            "copies": self.copies,
+            "failed": self.failed,
+            "p50": ordered[len(ordered) // 2] if ordered else None,
+            "p99": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] if ordered else None,
+        }
@@ -0,0 +1,88 @@
+import asyncio
+from datetime import datetime, timezone
+
+from pymongo.errors import DuplicateKeyError
+
+from utils.cache import TTLCache
+
+
+class IdempotencyKeys:
+    """
+    Claims idempotency keys so an action keyed by them runs at most once.
+
+    A key is claimed in memory first, so a concurrent second claim fails
+    without touching MongoDB, and then recorded under a unique index, so
+    the claim also holds in other workers and after a restart. That is
+    what keeps a button press replayed from the update journal, or
+    redelivered by Telegram, from trading a second time.
+
+    A key is claimed before the action runs: if the process dies in
+    between, the action is lost rather than repeated.
+    """
+
+    def __init__(self, collection=None, ttl=600.0, cache_size=100000, expire_after=86400):
+        """
+        Initialize the IdempotencyKeys instance.
+
+        Args:
+            collection (pymongo.collection.Collection or None): Records claimed keys; memory only when omitted.
+            ttl (float): Seconds a claimed key is remembered in memory.
+            cache_size (int): Maximum number of keys kept in memory.
+            expire_after (int): Seconds after which MongoDB deletes a recorded key.
+
+        Attributes:
+            claimed (int): Keys claimed.
+            duplicates (int): Claims rejected because the key was claimed before.
+
+        Example:
+            >>> keys = IdempotencyKeys(database["buy_keys"])
+            >>> if await keys.claim(f"buy:{query.id}", user_id=user_id):
+            ...     await buy(user_id, mint, amount_sol)
+        """
+        self.collection = collection
+        self.expire_after = expire_after
+        self.claimed = 0
+        self.duplicates = 0
+        self._keys = TTLCache(cache_size, ttl)
+
+    def ensure_indexes(self):
+        self.collection.create_index("key", unique=True)
+        self.collection.create_index("created_at", expireAfterSeconds=self.expire_after)
+
+    async def claim(self, key, **fields):
+        """
+        Claim a key.
+
+        Args:
+            key (str): The idempotency key.
+            **fields: Extra fields recorded with the key, e.g. `user_id`.
+
+        Returns:
+            bool: `True` if the key was free and is now claimed, `False` if it was claimed before.
+        """
+        if key in self._keys:
+            self.duplicates += 1
+            return False
+        self._keys.set(key, True)
+        if self.collection is not None:
+            document = {"key": key, **fields, "created_at": datetime.now(timezone.utc)}
+            try:
+                await asyncio.to_thread(self.collection.insert_one, document)
+            except DuplicateKeyError:
+                self.duplicates += 1
+                return False
+            except BaseException:
+                # Not recorded: let a retry claim it again.
+                self._keys.pop(key)
+                raise
+        self.claimed += 1
+        return True
+
+    def stats(self):
+        """
+        Return claim counters.
+
+        Returns:
+            dict: Keys claimed and duplicate claims rejected.
+        """
+        return {"claimed": self.claimed, "duplicates": self.duplicates}
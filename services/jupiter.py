@@ -0,0 +1,160 @@
+import asyncio
+import base64
+
+import httpx
+from solders.address_lookup_table_account import AddressLookupTable, AddressLookupTableAccount
+from solders.instruction import AccountMeta, Instruction
+from solders.pubkey import Pubkey
+
+from utils.cache import LRUCache
+from .pool_events import WSOL_MINT
+from .solana_rpc import LAMPORTS_PER_SOL
+
+DEFAULT_JUPITER_URL = "https://lite-api.jup.ag/swap/v1"
+
+
+class SwapRoute:
+    """
+    The instructions of a swap and its quoted amounts.
+
+    Attributes:
+        instructions (list[Instruction]): Swap instructions, without a compute unit price.
+        lookup_tables (list[AddressLookupTableAccount]): Tables the instructions reference.
+        in_amount (float): SOL (buys) or tokens (sells) spent.
+        out_amount (float): Tokens (buys) or SOL (sells) quoted to be received.
+    """
+
+    __slots__ = ("instructions", "lookup_tables", "in_amount", "out_amount")
+
+    def __init__(self, instructions, lookup_tables, in_amount, out_amount):
+        self.instructions = instructions
+        self.lookup_tables = lookup_tables
+        self.in_amount = in_amount
+        self.out_amount = out_amount
+
+
+def instruction_from_json(data):
+    """Convert an instruction in Jupiter's JSON form into a `solders` `Instruction`."""
+    accounts = [
+        AccountMeta(Pubkey.from_string(account["pubkey"]), account["isSigner"], account["isWritable"])
+        for account in data["accounts"]
+    ]
+    return Instruction(Pubkey.from_string(data["programId"]), base64.b64decode(data["data"]), accounts)
+
+
+class JupiterRouter:
+    """
+    Builds swap instructions from the Jupiter swap API.
+
+    Only the instructions are requested (`/swap-instructions`), not a
+    finished transaction, so the caller can compile them with its own
+    cached blockhash and sign locally. Address lookup tables and token
+    decimals never change for a given address and are cached, so a route
+    normally costs the two Jupiter requests and no RPC call.
+    """
+
+    def __init__(self, rpc, base_url=DEFAULT_JUPITER_URL, client=None, timeout=5.0, cache_size=4096):
+        """
+        Initialize the JupiterRouter instance.
+
+        Args:
+            rpc (SolanaRpcClient): Client used to load lookup tables and token decimals.
+            base_url (str): The Jupiter swap API base URL.
+            client (httpx.AsyncClient or None): HTTP client for Jupiter; one is created when omitted.
+            timeout (float): Request timeout in seconds for the created client.
+            cache_size (int): Lookup tables and token decimals kept in memory.
+        """
+        self.rpc = rpc
+        self.base_url = base_url.rstrip("/")
+        self.client = client or httpx.AsyncClient(timeout=timeout)
+        self._tables = LRUCache(maxsize=cache_size)
+        self._decimals = LRUCache(maxsize=cache_size)
+
+    async def close(self):
+        """Close the HTTP client."""
+        await self.client.aclose()
+
+    async def decimals(self, mint):
+        """Return the number of decimals of a token mint."""
+        if mint == WSOL_MINT:
+            return 9
+        decimals = self._decimals.get(mint)
+        if decimals is None:
+            supply = await self.rpc.call("getTokenSupply", [mint])
+            decimals = supply["value"]["decimals"]
+            self._decimals.set(mint, decimals)
+        return decimals
+
+    async def lookup_tables(self, addresses):
+        """Return the lookup table accounts for `addresses`, loading unknown ones in one RPC call."""
+        missing = [address for address in addresses if address not in self._tables]
+        if missing:
+            result = await self.rpc.call("getMultipleAccounts", [missing, {"encoding": "base64"}])
+            for address, account in zip(missing, result["value"]):
+                if account is not None:
+                    table = AddressLookupTable.deserialize(base64.b64decode(account["data"][0]))
+                    self._tables.set(address, AddressLookupTableAccount(Pubkey.from_string(address), table.addresses))
+        return [self._tables.get(address) for address in addresses if address in self._tables]
+
+    async def quote(self, input_mint, output_mint, raw_amount, slippage_bps=50):
+        """
+        Ask Jupiter for the best route of a swap.
+
+        Args:
+            input_mint (str): The token spent.
+            output_mint (str): The token received.
+            raw_amount (int): Amount of `input_mint` in its smallest unit.
+            slippage_bps (int): Allowed slippage in basis points.
+
+        Returns:
+            dict: Jupiter's quote response, with `outAmount`, `priceImpactPct` and `routePlan`.
+
+        Raises:
+            httpx.HTTPStatusError: If Jupiter found no route or failed.
+        """
+        response = await self.client.get(f"{self.base_url}/quote", params={
+            "inputMint": input_mint, "outputMint": output_mint, "amount": raw_amount, "slippageBps": slippage_bps,
+        })
+        response.raise_for_status()
+        return response.json()
+
+    async def route(self, owner, side, mint, amount, slippage_bps):
+        """
+        Quote a swap and return its instructions.
+
+        Args:
+            owner (Pubkey): The wallet swapping.
+            side (str): `"buy"` spends `amount` SOL on `mint`; `"sell"` sells `amount` tokens of `mint` for SOL.
+            mint (str): The token traded.
+            amount (float): SOL for buys, tokens for sells.
+            slippage_bps (int): Allowed slippage in basis points.
+
+        Returns:
+            SwapRoute: The instructions and quoted amounts.
+        """
+        input_mint, output_mint = (WSOL_MINT, mint) if side == "buy" else (mint, WSOL_MINT)
+        in_decimals, out_decimals = await asyncio.gather(self.decimals(input_mint), self.decimals(output_mint))
+        raw_amount = int(amount * LAMPORTS_PER_SOL) if side == "buy" else int(amount * 10 ** in_decimals)
+
+        quote = await self.quote(input_mint, output_mint, raw_amount, slippage_bps)
+
+        response = await self.client.post(f"{self.base_url}/swap-instructions", json={
+            "quoteResponse": quote,
+            "userPublicKey": str(owner),
+            "wrapAndUnwrapSol": True,
+            "dynamicComputeUnitLimit": True,
+        })
+        response.raise_for_status()
+        swap = response.json()
+
+        parts = swap.get("computeBudgetInstructions", []) + swap.get("setupInstructions", []) + [swap["swapInstruction"]]
+        if swap.get("cleanupInstruction"):
+            parts.append(swap["cleanupInstruction"])
+        instructions = [instruction_from_json(part) for part in parts]
+        lookup_tables = await self.lookup_tables(swap.get("addressLookupTableAddresses", []))
+        return SwapRoute(
+            instructions,
+            lookup_tables,
+            int(quote["inAmount"]) / 10 ** in_decimals,
+            int(quote["outAmount"]) / 10 ** out_decimals,
+        )
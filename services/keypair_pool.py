@@ -0,0 +1,126 @@
+import asyncio
+from collections import deque
+
+from utils.solana_keygen import generate_solana_wallet
+
+
+def generate_wallet_batch(count):
+    """
+    Generate a batch of new Solana wallets.
+
+    This function is executed inside an executor worker, so it only returns
+    plain strings that can be pickled back to the event loop process.
+
+    Args:
+        count (int): Number of wallets to generate.
+
+    Returns:
+        list[tuple[str, str]]: `(public_key, private_key_base58)` pairs.
+
+    Example:
+        >>> generate_wallet_batch(1)
+        [('9G3iq2UC9Xa1sfU5DiGwNf7oeRugQvrD1Wn6hKQHFk8Y', '5xW9XThBbReiGhys4HJzZYLBHStztd9yTTqf2HwF6Pwq')]
+    """
+    batch = []
+    for _ in range(count):
+        generator = generate_solana_wallet()
+        batch.append((generator.public_key, generator.private_key_base58))
+    return batch
+
+
+class KeypairPool:
+    """
+    A reserve of pre-generated wallets for onboarding bursts.
+
+    Generating a keypair and base58-encoding it is cheap on its own, but a
+    promotion can deliver thousands of `/start` commands within seconds and
+    doing that work inline serialises every new user behind the event loop.
+    The pool keeps `reserve` ready wallets in a deque so that `pop()` is O(1),
+    and tops itself up in the background by running `generate_wallet_batch`
+    on an executor (a process pool in production) in parallel batches.
+    """
+
+    def __init__(self, reserve=1000, batch_size=250, executor=None, refill_threshold=None):
+        """
+        Initialize the KeypairPool instance.
+
+        Args:
+            reserve (int): Number of ready wallets the pool tries to keep.
+            batch_size (int): Number of wallets generated per executor job.
+            executor (concurrent.futures.Executor or None): Executor running the batches.
+                                                            `None` uses the loop's default executor.
+            refill_threshold (int or None): Refill starts once the pool drops below this size.
+                                            Defaults to half of `reserve`.
+
+        Attributes:
+            generated_inline (int): Number of wallets generated on the event loop because
+                                    the pool was empty.
+
+        Example:
+            >>> pool = KeypairPool(reserve=500, executor=ProcessPoolExecutor())
+            >>> await pool.start()
+            >>> public_key, private_key = pool.pop()
+        """
+        self.reserve = reserve
+        self.batch_size = batch_size
+        self.executor = executor
+        self.refill_threshold = reserve // 2 if refill_threshold is None else refill_threshold
+        self.generated_inline = 0
+        self._ready = deque()
+        self._refill_task = None
+
+    def __len__(self):
+        return len(self._ready)
+
+    async def start(self):
+        """Fill the pool up to its reserve. Call once the event loop is running."""
+        await self._refill()
+
+    async def stop(self):
+        """Cancel any background refill that is still running."""
+        if self._refill_task is not None:
+            self._refill_task.cancel()
+            try:
+                await self._refill_task
+            except asyncio.CancelledError:
+                pass
+            self._refill_task = None
+
+    def pop(self):
+        """
+        Take one ready wallet out of the pool.
+
+        If the pool has been drained the wallet is generated inline, so callers
+        never wait on the background refill.
+
+        Returns:
+            tuple[str, str]: A `(public_key, private_key_base58)` pair.
+        """
+        try:
+            wallet = self._ready.popleft()
+        except IndexError:
+            self.generated_inline += 1
+            wallet = generate_wallet_batch(1)[0]
+        if len(self._ready) < self.refill_threshold:
+            self._schedule_refill()
+        return wallet
+
+    def _schedule_refill(self):
+        if self._refill_task is not None and not self._refill_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._refill_task = loop.create_task(self._refill())
+
+    async def _refill(self):
+        loop = asyncio.get_running_loop()
+        while len(self._ready) < self.reserve:
+            missing = self.reserve - len(self._ready)
+            jobs = [
+                loop.run_in_executor(self.executor, generate_wallet_batch, min(self.batch_size, missing - offset))
+                for offset in range(0, missing, self.batch_size)
+            ]
+            for batch in await asyncio.gather(*jobs):
+                self._ready.extend(batch)
@@ -0,0 +1,182 @@
+import asyncio
+import functools
+import itertools
+import json
+import logging
+import time
+
+from .solana_rpc import LAMPORTS_PER_SOL, TransactionFetcher
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderTrade:
+    """
+    A swap made by a copied wallet.
+
+    Attributes:
+        leader (str): The wallet that traded.
+        mint (str): The token bought or sold.
+        side (str): `"buy"` or `"sell"`.
+        token_amount (float): Tokens bought or sold.
+        amount_sol (float): SOL spent or received.
+        signature (str or None): The leader's transaction.
+        received_at (float): `time.perf_counter()` when the trade reached the bot.
+    """
+
+    __slots__ = ("leader", "mint", "side", "token_amount", "amount_sol", "signature", "received_at")
+
+    def __init__(self, leader, mint, side, token_amount, amount_sol, signature=None, received_at=None):
+        self.leader = leader
+        self.mint = mint
+        self.side = side
+        self.token_amount = token_amount
+        self.amount_sol = amount_sol
+        self.signature = signature
+        self.received_at = time.perf_counter() if received_at is None else received_at
+
+
+def parse_leader_trade(leader, signature, transaction):
+    """
+    Extract the leader's swap from a `jsonParsed` transaction.
+
+    The token whose balance owned by the leader changed the most is taken as
+    the traded token; a growing balance is a buy, a shrinking one a sell.
+
+    Returns:
+        LeaderTrade or None: `None` if the leader's token balances did not change.
+    """
+    meta = transaction.get("meta") or {}
+    deltas = {}
+    for sign, balances in ((-1, meta.get("preTokenBalances")), (1, meta.get("postTokenBalances"))):
+        for balance in balances or ():
+            if balance.get("owner") == leader:
+                amount = float(balance["uiTokenAmount"].get("uiAmountString") or 0)
+                deltas[balance["mint"]] = deltas.get(balance["mint"], 0.0) + sign * amount
+    if not deltas:
+        return None
+    mint, delta = max(deltas.items(), key=lambda item: abs(item[1]))
+    if not delta:
+        return None
+
+    amount_sol = 0.0
+    keys = [key["pubkey"] if isinstance(key, dict) else key for key in transaction["transaction"]["message"]["accountKeys"]]
+    if leader in keys:
+        index = keys.index(leader)
+        amount_sol = abs(meta["postBalances"][index] - meta["preBalances"][index]) / LAMPORTS_PER_SOL
+    return LeaderTrade(leader, mint, "buy" if delta > 0 else "sell", abs(delta), amount_sol, signature)
+
+
+class LeaderFeed:
+    """
+    Streams the trades of a changing set of leader wallets over one websocket.
+
+    Each leader gets one `logsSubscribe` subscription on a shared
+    connection; `subscribe` and `unsubscribe` take effect immediately on a
+    live connection and the whole set is re-subscribed after a reconnect.
+    Only successful transactions are fetched and parsed, by a
+    `TransactionFetcher` off the socket's read loop, so a slow or failing
+    fetch neither delays other leaders' trades nor drops the connection.
+    """
+
+    def __init__(self, ws_url, rpc, reconnect_delay=1.0, max_fetches=16):
+        """
+        Initialize the LeaderFeed instance.
+
+        Args:
+            ws_url (str): The RPC websocket endpoint.
+            rpc (SolanaRpcClient): Client used to fetch leader transactions.
+            reconnect_delay (float): Initial delay before reconnecting, doubled on every failure.
+            max_fetches (int): Transactions fetched concurrently.
+        """
+        self.ws_url = ws_url
+        self.rpc = rpc
+        self.reconnect_delay = reconnect_delay
+        self.max_fetches = max_fetches
+        self.leaders = set()
+        self._socket = None
+        self._ids = itertools.count(1)
+        self._requests = {}
+        self._subscriptions = {}
+        self._leader_subscription = {}
+
+    async def subscribe(self, leader):
+        """Start receiving the trades of a leader."""
+        self.leaders.add(leader)
+        if self._socket is not None:
+            await self._send_subscribe(leader)
+
+    async def unsubscribe(self, leader):
+        """Stop receiving the trades of a leader."""
+        self.leaders.discard(leader)
+        subscription = self._leader_subscription.pop(leader, None)
+        if subscription is not None:
+            self._subscriptions.pop(subscription, None)
+            if self._socket is not None:
+                await self._send("logsUnsubscribe", [subscription])
+
+    async def _send(self, method, params):
+        request_id = next(self._ids)
+        await self._socket.send(json.dumps({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}))
+        return request_id
+
+    async def _send_subscribe(self, leader):
+        request_id = await self._send("logsSubscribe", [{"mentions": [leader]}, {"commitment": "confirmed"}])
+        self._requests[request_id] = leader
+
+    async def trades(self):
+        """
+        Yield leader trades as they happen, reconnecting when the connection drops.
+
+        Trades are yielded in the order their transactions are fetched.
+
+        Yields:
+            LeaderTrade: Every trade of a subscribed leader.
+        """
+        fetcher = TransactionFetcher(self.rpc, max_concurrency=self.max_fetches)
+        reader = asyncio.get_running_loop().create_task(self._read(fetcher))
+        try:
+            while True:
+                yield await fetcher.get()
+        finally:
+            reader.cancel()
+            fetcher.close()
+
+    async def _read(self, fetcher):
+        import websockets
+
+        delay = self.reconnect_delay
+        while True:
+            try:
+                async with websockets.connect(self.ws_url, ping_interval=20, max_size=None) as socket:
+                    self._socket = socket
+                    self._requests.clear()
+                    self._subscriptions.clear()
+                    self._leader_subscription.clear()
+                    for leader in list(self.leaders):
+                        await self._send_subscribe(leader)
+                    delay = self.reconnect_delay
+
+                    async for raw in socket:
+                        message = json.loads(raw)
+                        if "id" in message:
+                            leader = self._requests.pop(message["id"], None)
+                            if leader is not None and leader in self.leaders and "result" in message:
+                                self._subscriptions[message["result"]] = leader
+                                self._leader_subscription[leader] = message["result"]
+                            continue
+                        params = message.get("params") or {}
+                        leader = self._subscriptions.get(params.get("subscription"))
+                        value = (params.get("result") or {}).get("value") or {}
+                        if leader is None or value.get("err") is not None:
+                            continue
+                        signature = value.get("signature")
+                        fetcher.submit(signature, functools.partial(parse_leader_trade, leader, signature))
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                logger.warning("Leader feed dropped (%s); reconnecting in %.0fs", error, delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60.0)
+            finally:
+                self._socket = None
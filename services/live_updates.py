@@ -0,0 +1,250 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+from telegram.error import BadRequest, Forbidden
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    An open dashboard message that is re-rendered when its data changes.
+
+    Attributes:
+        chat_id (int): The chat the message is in.
+        message_id (int): The dashboard message.
+        dashboard (BaseDashboard): The dashboard the message shows.
+        user_id (int): The user the dashboard is rendered for.
+        keys (tuple): The data keys the message displays, e.g. `("balance", address)`.
+        data (dict): The chat session's data (filters, page), passed back to `render()`.
+        digest (int): Fingerprint of the content the message currently shows.
+        expires_at (float): When the subscription lapses unless the user interacts again.
+    """
+
+    __slots__ = ("chat_id", "message_id", "dashboard", "user_id", "keys", "data", "digest", "expires_at")
+
+    def __init__(self, chat_id, message_id, dashboard, user_id, keys, data, digest, expires_at):
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.dashboard = dashboard
+        self.user_id = user_id
+        self.keys = keys
+        self.data = data
+        self.digest = digest
+        self.expires_at = expires_at
+
+
+class LiveUpdates:
+    """
+    Pushes fresh data into open dashboard messages instead of waiting for ♻️Refresh.
+
+    Dashboards that support live updates `watch` the message they were just
+    rendered into, with the data keys it displays (such as a wallet balance,
+    a user's positions or AFK status). Services `publish` a key when its data
+    changes. Only the subscribed messages are marked dirty. Every dirty
+    message is re-rendered once per `batch_window`, however many of its keys
+    changed in that time, and edited only if the content actually changed.
+    The edits go out in batches of `max_batch_size` through the
+    dashboard's send queue at background priority.
+
+    Subscriptions lapse `ttl` seconds after the user last interacted with
+    the message. They are kept in interaction order, so expiring them pops
+    from the front and never scans. Rendering another dashboard or a prompt
+    into the message drops its subscription.
+    """
+
+    def __init__(self, ttl=300.0, batch_window=0.5, max_batch_size=100, max_subscriptions=100000,
+                 enabled=None, clock=time.monotonic):
+        """
+        Initialize the LiveUpdates instance.
+
+        Args:
+            ttl (float): Seconds of inactivity after which a message stops being updated.
+            batch_window (float): Seconds changes are collected before dirty messages are re-rendered.
+            max_batch_size (int): Messages re-rendered concurrently.
+            max_subscriptions (int): Messages updated at most; the least recently active are dropped.
+            enabled (callable or None): Async `enabled(user_id)` telling whether a user opted in;
+                                        every user is subscribed when omitted.
+            clock (callable): Monotonic clock; injectable for tests.
+
+        Attributes:
+            bot (telegram.Bot or None): Bot used for the edits, set once the application is built.
+            published (int): Keys published.
+            pushed (int): Messages edited with new content.
+            unchanged (int): Dirty messages whose content turned out the same.
+            expired (int): Subscriptions that lapsed.
+
+        Example:
+            >>> live = LiveUpdates(ttl=300, enabled=settings_enabled)
+            >>> balances = BalanceService(rpc, on_change=live.publisher("balance"))
+            >>> live.bot = application.bot
+        """
+        self.ttl = ttl
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self.max_subscriptions = max_subscriptions
+        self.enabled = enabled
+        self.clock = clock
+        self.bot = None
+        self.published = 0
+        self.pushed = 0
+        self.unchanged = 0
+        self.expired = 0
+        self.failures = 0
+        self._subscriptions = OrderedDict()
+        self._by_key = {}
+        self._dirty = {}
+        self._flush_handle = None
+        self._pushing = set()
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+    async def watch(self, dashboard, chat_id, message_id, user_id, keys, data, digest):
+        """
+        Subscribe a message the user just interacted with, or renew its subscription.
+
+        Args:
+            dashboard (BaseDashboard): The dashboard rendered into the message.
+            chat_id (int): The chat the message is in.
+            message_id (int): The dashboard message.
+            user_id (int): The user the dashboard was rendered for.
+            keys (Iterable): The data keys the dashboard displays.
+            data (dict): The chat session's data, handed back to `dashboard.render()`.
+            digest (int): Fingerprint of the content just rendered.
+        """
+        message = (chat_id, message_id)
+        if self.enabled is not None and not await self.enabled(user_id):
+            self.unwatch(chat_id, message_id)
+            return
+        keys = tuple(keys)
+        subscription = self._subscriptions.get(message)
+        if subscription is not None and subscription.keys != keys:
+            self._unlink(message, subscription)
+            subscription = None
+        expires_at = self.clock() + self.ttl
+        if subscription is None:
+            subscription = Subscription(chat_id, message_id, dashboard, user_id, keys, data, digest, expires_at)
+            self._subscriptions[message] = subscription
+            for key in keys:
+                self._by_key.setdefault(key, set()).add(message)
+        else:
+            subscription.dashboard = dashboard
+            subscription.data = data
+            subscription.digest = digest
+            subscription.expires_at = expires_at
+            self._subscriptions.move_to_end(message)
+        self.expire()
+        while len(self._subscriptions) > self.max_subscriptions:
+            self._unlink(*self._subscriptions.popitem(last=False))
+
+    def unwatch(self, chat_id, message_id):
+        """Stop updating a message, e.g. because it now shows another dashboard."""
+        message = (chat_id, message_id)
+        subscription = self._subscriptions.pop(message, None)
+        if subscription is not None:
+            self._unlink(message, subscription)
+
+    def _unlink(self, message, subscription):
+        self._dirty.pop(message, None)
+        for key in subscription.keys:
+            messages = self._by_key.get(key)
+            if messages is not None:
+                messages.discard(message)
+                if not messages:
+                    del self._by_key[key]
+
+    def expire(self, now=None):
+        """Drop the subscriptions whose user has been inactive for `ttl` seconds."""
+        now = self.clock() if now is None else now
+        subscriptions = self._subscriptions
+        while subscriptions:
+            message, subscription = next(iter(subscriptions.items()))
+            if subscription.expires_at > now:
+                break
+            del subscriptions[message]
+            self._unlink(message, subscription)
+            self.expired += 1
+
+    def publish(self, key):
+        """
+        Report that the data behind a key changed.
+
+        Cheap when nobody watches the key: a dictionary lookup. Otherwise the
+        watching messages are marked dirty and re-rendered at the end of the
+        current batch window.
+
+        Args:
+            key (hashable): The changed data, e.g. `("positions", user_id)`.
+        """
+        self.published += 1
+        messages = self._by_key.get(key)
+        if not messages:
+            return
+        self._dirty.update(dict.fromkeys(messages))
+        if self._flush_handle is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                # Published outside the event loop (e.g. at startup); the next publish schedules the flush.
+                return
+            self._flush_handle = loop.call_later(self.batch_window, self._flush)
+
+    def publisher(self, kind):
+        """Return a `publish` callback for one kind of key, e.g. `publisher("balance")(address)`."""
+        return lambda key: self.publish((kind, key))
+
+    def _flush(self):
+        self._flush_handle = None
+        self.expire()
+        dirty = [self._subscriptions[message] for message in self._dirty if message in self._subscriptions]
+        self._dirty = {}
+        if dirty and self.bot is not None:
+            task = asyncio.get_running_loop().create_task(self._push(dirty))
+            self._pushing.add(task)
+            task.add_done_callback(self._pushing.discard)
+
+    async def _push(self, subscriptions):
+        for start in range(0, len(subscriptions), self.max_batch_size):
+            batch = subscriptions[start:start + self.max_batch_size]
+            results = await asyncio.gather(*(self._push_one(subscription) for subscription in batch), return_exceptions=True)
+            for subscription, result in zip(batch, results):
+                if isinstance(result, (BadRequest, Forbidden)):
+                    # The message was deleted or the bot was blocked: stop updating it.
+                    self.unwatch(subscription.chat_id, subscription.message_id)
+                elif isinstance(result, Exception):
+                    self.failures += 1
+                    logger.warning("Live update of %s failed: %s", subscription.dashboard.name, result)
+
+    async def _push_one(self, subscription):
+        if await subscription.dashboard.push(subscription, self.bot):
+            self.pushed += 1
+        else:
+            self.unchanged += 1
+
+    async def stop(self):
+        """Cancel the pending flush and wait for edits in progress."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        await asyncio.gather(*self._pushing, return_exceptions=True)
+
+    def stats(self):
+        """
+        Return subscription and push counters.
+
+        Returns:
+            dict: Open subscriptions, watched keys, keys published, messages edited or found
+                  unchanged, subscriptions expired and failed pushes.
+        """
+        return {
+            "subscriptions": len(self._subscriptions),
+            "watched_keys": len(self._by_key),
+            "published": self.published,
+            "pushed": self.pushed,
+            "unchanged": self.unchanged,
+            "expired": self.expired,
+            "failures": self.failures,
+        }
@@ -0,0 +1,489 @@
+import contextvars
+import logging
+import math
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter as TallyCounter
+
+from telegram.request import HTTPXRequest
+
+from utils.http_server import HttpResponse, HttpServer
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of handler and API latency buckets.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Set while a handler is being observed, so handlers calling other handlers are counted once.
+_observing = contextvars.ContextVar("observing", default=False)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+def metric_name(text):
+    """Turn arbitrary text into a valid metric name component."""
+    return re.sub(r"[^a-zA-Z0-9_]", "_", str(text)).strip("_").lower()
+
+
+class Metric:
+    """
+    A named family of samples keyed by label values.
+
+    Attributes:
+        name (str): The full metric name.
+        help (str): One-line description shown in the exposition.
+        labels (tuple[str]): Label names; values are passed positionally in the same order.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+
+    def value(self, *labels):
+        """Return the current value for a set of label values."""
+        return self._values.get(labels, 0.0)
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.help}")
+        lines.append(f"# TYPE {self.name} {self.kind}")
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(tuple(zip(self.labels, labels)))} {_format_value(value)}")
+
+
+class Counter(Metric):
+    """A value that only goes up."""
+
+    kind = "counter"
+
+    def inc(self, *labels, amount=1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+
+class Gauge(Metric):
+    """A value that goes up and down."""
+
+    kind = "gauge"
+
+    def set(self, value, *labels):
+        self._values[labels] = value
+
+    def inc(self, *labels, amount=1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels, amount=1.0):
+        self._values[labels] = self._values.get(labels, 0.0) - amount
+
+
+class Histogram(Metric):
+    """
+    Bucketed observations with a running sum, rendered with cumulative buckets.
+
+    Observing is one scan over at most a dozen bounds; per label set the
+    memory is one list of bucket counts.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        entry = self._values.get(labels)
+        if entry is None:
+            # Bucket counts, then the overflow bucket, then the sum.
+            entry = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            index = len(self.buckets)
+        entry[index] += 1
+        entry[-1] += value
+
+    def count(self, *labels):
+        """Return the number of observations for a set of label values."""
+        entry = self._values.get(labels)
+        return sum(entry[:-1]) if entry else 0
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.help}")
+        lines.append(f"# TYPE {self.name} {self.kind}")
+        for labels, entry in self._values.items():
+            pairs = tuple(zip(self.labels, labels))
+            seen = 0
+            for bound, count in zip(self.buckets + (math.inf,), entry[:-1]):
+                seen += count
+                lines.append(f"{self.name}_bucket{_format_labels(pairs + (('le', _format_value(bound)),))} {seen}")
+            lines.append(f"{self.name}_sum{_format_labels(pairs)} {_format_value(entry[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(pairs)} {seen}")
+
+
+class MetricsRegistry:
+    """
+    Holds every metric of the process and renders the Prometheus text format.
+
+    Besides metrics updated as events happen, existing `stats()` methods can
+    be registered: they are called on every scrape and each numeric value
+    becomes an untyped sample, so components keep their own counters and
+    pay nothing between scrapes.
+    """
+
+    def __init__(self, namespace="bloom"):
+        """
+        Initialize the MetricsRegistry instance.
+
+        Args:
+            namespace (str): Prefix of every metric name.
+
+        Example:
+            >>> registry = MetricsRegistry()
+            >>> updates = registry.counter("updates_total", "Updates handled.")
+            >>> updates.inc()
+            >>> registry.register_stats("sender", sender.stats)
+            >>> print(registry.render())
+        """
+        self.namespace = namespace
+        self._metrics = {}
+        self._stats = {}
+
+    def _add(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric '{metric.name}' is already registered.")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self._add(Counter(f"{self.namespace}_{name}", help, labels))
+
+    def gauge(self, name, help, labels=()):
+        return self._add(Gauge(f"{self.namespace}_{name}", help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(f"{self.namespace}_{name}", help, labels, buckets))
+
+    def register_stats(self, name, stats):
+        """
+        Export the result of a `stats()` callable on every scrape.
+
+        Numbers become samples named `<namespace>_<name>_<key>`. Nested
+        dicts (such as per-node stats) become samples of the inner keys,
+        labelled with `name` set to the outer key. Other values are skipped.
+
+        Args:
+            name (str): Component name, e.g. `"sender"`.
+            stats (callable): Returns a dict of counters.
+        """
+        self._stats[f"{self.namespace}_{metric_name(name)}"] = stats
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics.values():
+            metric.render(lines)
+        for prefix, stats in self._stats.items():
+            try:
+                values = stats()
+            except Exception as error:
+                logger.warning("Collecting %s failed: %s", prefix, error)
+                continue
+            samples = {}
+            for key, value in values.items():
+                if isinstance(value, dict):
+                    for label, inner in value.items():
+                        if isinstance(inner, dict):
+                            for inner_key, number in inner.items():
+                                samples.setdefault(f"{prefix}_{metric_name(key)}_{metric_name(inner_key)}", []).append(((("name", label),), number))
+                        else:
+                            samples.setdefault(f"{prefix}_{metric_name(key)}", []).append(((("name", label),), inner))
+                else:
+                    samples.setdefault(f"{prefix}_{metric_name(key)}", []).append(((), value))
+            for name, entries in samples.items():
+                entries = [(labels, value) for labels, value in entries if isinstance(value, (int, float)) and not math.isnan(value)]
+                if entries:
+                    lines.append(f"# TYPE {name} untyped")
+                    lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in entries)
+        lines.append("")
+        return "\n".join(lines)
+
+
+class BotMetrics:
+    """
+    The bot's standard metrics: handler latency, errors and concurrency and Telegram API calls.
+
+    Dashboards call `observe` around every routed handler (see
+    `BaseDashboard`), and `InstrumentedRequest` calls `record_api` around
+    every Telegram Bot API request. A handler invoked from inside another
+    observed handler (e.g. a button handler re-rendering with `show()`) is
+    not counted a second time.
+    """
+
+    def __init__(self, registry=None, profiler=None):
+        """
+        Initialize the BotMetrics instance.
+
+        Args:
+            registry (MetricsRegistry or None): Where the metrics are registered; a new one when omitted.
+            profiler (SamplingProfiler or None): Records stacks of slow handlers when given.
+
+        Attributes:
+            in_flight (int): Handlers currently running.
+            peak_in_flight (int): Most handlers seen running at once.
+        """
+        self.registry = registry or MetricsRegistry()
+        self.profiler = profiler
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        registry = self.registry
+        self.handler_seconds = registry.histogram(
+            "handler_seconds", "Time spent in dashboard handlers.", ("dashboard", "action")
+        )
+        self.handler_errors = registry.counter(
+            "handler_errors_total", "Dashboard handlers that raised.", ("dashboard", "action", "error")
+        )
+        self.handlers_in_flight = registry.gauge("handlers_in_flight", "Dashboard handlers currently running.")
+        self.handlers_peak = registry.gauge("handlers_in_flight_peak", "Most dashboard handlers running at once.")
+        self.api_seconds = registry.histogram("telegram_api_seconds", "Duration of Telegram Bot API calls.", ("method",))
+        self.api_errors = registry.counter("telegram_api_errors_total", "Telegram Bot API calls that failed.", ("method", "error"))
+
+    async def observe(self, dashboard, action, handler, *args, **kwargs):
+        """
+        Run a handler and record its latency, errors and concurrency.
+
+        Args:
+            dashboard (str): Dashboard name.
+            action (str): Handler name.
+            handler (callable): The async handler.
+            *args, **kwargs: Passed to the handler.
+
+        Returns:
+            The handler's result.
+        """
+        if _observing.get():
+            return await handler(*args, **kwargs)
+        token = _observing.set(True)
+        self.in_flight += 1
+        self.handlers_in_flight.set(self.in_flight)
+        if self.in_flight > self.peak_in_flight:
+            self.peak_in_flight = self.in_flight
+            self.handlers_peak.set(self.in_flight)
+        recording = self.profiler.begin(f"{dashboard}:{action}", sys._getframe()) if self.profiler else None
+        started = time.perf_counter()
+        try:
+            return await handler(*args, **kwargs)
+        except Exception as error:
+            self.handler_errors.inc(dashboard, action, type(error).__name__)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.handler_seconds.observe(elapsed, dashboard, action)
+            self.in_flight -= 1
+            self.handlers_in_flight.set(self.in_flight)
+            _observing.reset(token)
+            if recording is not None:
+                self.profiler.end(recording, elapsed)
+
+    def record_api(self, method, seconds, error=None):
+        """Record one Telegram Bot API call."""
+        self.api_seconds.observe(seconds, method)
+        if error is not None:
+            self.api_errors.inc(method, type(error).__name__)
+
+
+class InstrumentedRequest(HTTPXRequest):
+    """
+    The default python-telegram-bot request backend, timing every Bot API call.
+
+    Pass it to `Application.builder().request(...)`; the API method is taken
+    from the request URL, so every call made through the bot is covered,
+    whether it comes from a dashboard, the send queue or a background
+    notification.
+    """
+
+    def __init__(self, metrics, **kwargs):
+        super().__init__(**kwargs)
+        self.metrics = metrics
+
+    async def post(self, url, *args, **kwargs):
+        method = url.rsplit("/", 1)[-1]
+        started = time.perf_counter()
+        try:
+            result = await super().post(url, *args, **kwargs)
+        except Exception as error:
+            self.metrics.record_api(method, time.perf_counter() - started, error)
+            raise
+        self.metrics.record_api(method, time.perf_counter() - started)
+        return result
+
+
+class _Recording:
+    __slots__ = ("name", "frame", "stacks", "started")
+
+    def __init__(self, name, frame):
+        self.name = name
+        self.frame = frame
+        self.stacks = TallyCounter()
+        self.started = time.time()
+
+
+class SamplingProfiler:
+    """
+    Samples the event loop thread and dumps the stacks of slow handlers.
+
+    A background thread reads the loop thread's Python stack every
+    `interval` seconds. A sample is attributed to a running handler when
+    the handler's frame is on the stack, i.e. when that handler was on the
+    CPU at that moment; time spent awaiting I/O is not sampled. When a
+    handler finishes after more than `threshold` seconds, its samples are
+    written to `directory` in the folded-stack format read by
+    `flamegraph.pl`, speedscope and similar tools. Handlers below the
+    threshold cost one dictionary insert and delete.
+    """
+
+    def __init__(self, threshold, directory="profiles", interval=0.005, max_files=1000):
+        """
+        Initialize the SamplingProfiler instance.
+
+        Args:
+            threshold (float): Handlers slower than this many seconds are dumped.
+            directory (str): Where the `.folded` files are written.
+            interval (float): Seconds between two samples.
+            max_files (int): Files written at most, so a slow period cannot fill the disk.
+
+        Attributes:
+            samples (int): Stacks sampled.
+            dumped (int): Slow handlers written out.
+        """
+        self.threshold = threshold
+        self.directory = directory
+        self.interval = interval
+        self.max_files = max_files
+        self.samples = 0
+        self.dumped = 0
+        self._active = {}
+        self._thread = None
+        self._target = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Start sampling the calling thread, which should run the event loop."""
+        if self._thread is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._target = threading.get_ident()
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stopped.set()
+            self._thread.join()
+            self._thread = None
+
+    def begin(self, name, frame):
+        """Start attributing samples to a handler whose frame is `frame`."""
+        recording = _Recording(name, frame)
+        self._active[id(frame)] = recording
+        return recording
+
+    def end(self, recording, elapsed):
+        """Stop sampling a handler and dump its stacks if it was slow."""
+        self._active.pop(id(recording.frame), None)
+        recording.frame = None
+        if elapsed >= self.threshold and self.dumped < self.max_files:
+            self.dump(recording, elapsed)
+
+    def dump(self, recording, elapsed):
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(recording.started))
+        path = os.path.join(self.directory, f"{stamp}-{metric_name(recording.name)}-{elapsed * 1000:.0f}ms.folded")
+        with open(path, "w") as file:
+            for stack, count in recording.stacks.items():
+                file.write(f"{recording.name};{stack} {count}\n")
+        self.dumped += 1
+        logger.info("Slow handler %s took %.0fms; stacks written to %s", recording.name, elapsed * 1000, path)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            if not self._active:
+                continue
+            frame = sys._current_frames().get(self._target)
+            names = []
+            owner = None
+            active = self._active
+            while frame is not None:
+                if owner is None:
+                    owner = active.get(id(frame))
+                    if owner is not None and owner.frame is not frame:
+                        owner = None
+                if owner is not None:
+                    break
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if owner is not None:
+                owner.stacks[";".join(reversed(names))] += 1
+                self.samples += 1
+
+    def stats(self):
+        return {"samples": self.samples, "dumped": self.dumped, "active": len(self._active)}
+
+
+class MetricsServer:
+    """
+    Serves a registry at `GET /metrics` for Prometheus to scrape.
+
+    When the port is taken, e.g. by another webhook worker process of the
+    same bot, the next of `port_attempts` consecutive ports is used.
+    """
+
+    def __init__(self, registry, host="127.0.0.1", port=9108, path="/metrics", port_attempts=16):
+        self.registry = registry
+        self.path = path
+        self.port_attempts = port_attempts
+        self.http = HttpServer(self._handle, host, port)
+
+    async def start(self):
+        first = self.http.port
+        for attempt in range(self.port_attempts):
+            self.http.port = first + attempt if first else 0
+            try:
+                await self.http.start()
+            except OSError:
+                if attempt == self.port_attempts - 1:
+                    raise
+                continue
+            logger.info("Serving metrics on http://%s:%d%s", self.http.host, self.http.port, self.path)
+            return
+
+    async def stop(self):
+        await self.http.stop()
+
+    async def _handle(self, request):
+        if request.path != self.path:
+            return HttpResponse(404, "not found")
+        if request.method != "GET":
+            return HttpResponse(405, "method not allowed")
+        return HttpResponse(200, self.registry.render(), CONTENT_TYPE)
@@ -0,0 +1,206 @@
+import asyncio
+import functools
+import json
+import logging
+import time
+
+from .solana_rpc import TransactionFetcher
+
+logger = logging.getLogger(__name__)
+
+WSOL_MINT = "So11111111111111111111111111111111111111112"
+
+# Liquidity pool programs whose new pools the sniper listens for, with the
+# log line their pool initialisation instruction emits.
+RAYDIUM_AMM_V4 = "675kPX9MHTjS2zt1qfr1NYHuzeLXfQM9H24wFSUt1Mp8"
+RAYDIUM_CPMM = "CPMMoo8L3F4NbTegBCKVNunggL7H1ZpdTHKxQB5qKP1C"
+POOL_PROGRAMS = {
+    RAYDIUM_AMM_V4: "initialize2",
+    RAYDIUM_CPMM: "Instruction: Initialize",
+}
+
+
+class PoolEvent:
+    """
+    A newly created liquidity pool.
+
+    Attributes:
+        program (str): The pool program id.
+        pool (str or None): The pool account, when known.
+        base_mint (str): One side of the pair.
+        quote_mint (str): The other side of the pair.
+        signature (str or None): The creating transaction.
+        slot (int or None): The slot the pool was created in.
+        received_at (float): `time.perf_counter()` when the event reached the bot.
+    """
+
+    __slots__ = ("program", "pool", "base_mint", "quote_mint", "signature", "slot", "received_at")
+
+    def __init__(self, program, base_mint, quote_mint, pool=None, signature=None, slot=None, received_at=None):
+        self.program = program
+        self.pool = pool
+        self.base_mint = base_mint
+        self.quote_mint = quote_mint
+        self.signature = signature
+        self.slot = slot
+        self.received_at = time.perf_counter() if received_at is None else received_at
+
+    @property
+    def mint(self):
+        """The token being listed: the side of the pair that is not wrapped SOL."""
+        return self.quote_mint if self.base_mint == WSOL_MINT else self.base_mint
+
+    def to_document(self):
+        """Serialise the event for a recorded event file."""
+        return {
+            "program": self.program,
+            "pool": self.pool,
+            "base_mint": self.base_mint,
+            "quote_mint": self.quote_mint,
+            "signature": self.signature,
+            "slot": self.slot,
+        }
+
+    @classmethod
+    def from_document(cls, document):
+        """Rebuild an event from a dict produced by `to_document`."""
+        return cls(
+            document["program"],
+            document["base_mint"],
+            document["quote_mint"],
+            pool=document.get("pool"),
+            signature=document.get("signature"),
+            slot=document.get("slot"),
+        )
+
+
+def _pool_from_transaction(program, signature, slot, transaction):
+    mints = []
+    for balance in (transaction.get("meta") or {}).get("postTokenBalances") or []:
+        if balance["mint"] not in mints:
+            mints.append(balance["mint"])
+    if len(mints) < 2:
+        return None
+    base_mint, quote_mint = (mints[0], mints[1]) if mints[1] == WSOL_MINT else (mints[1], mints[0])
+    return PoolEvent(program, base_mint, quote_mint, signature=signature, slot=slot)
+
+
+async def stream_pool_events(ws_url, rpc, programs=None, reconnect_delay=1.0, max_fetches=16):
+    """
+    Yield new pools as they are created, from a Solana websocket `logsSubscribe` stream.
+
+    Log notifications are filtered on the initialisation log line of each
+    pool program; only matching transactions are fetched with
+    `getTransaction` to learn the pair's mints. Notifications arrive at
+    `processed` commitment, before the transaction can be fetched, so a
+    `TransactionFetcher` retries each fetch until it is confirmed, up to
+    `max_fetches` at a time and off the socket's read loop. Pools are
+    yielded in the order their fetches complete. The connection is
+    re-opened with exponential backoff if it drops.
+
+    Args:
+        ws_url (str): The RPC websocket endpoint, e.g. `wss://api.mainnet-beta.solana.com`.
+        rpc (SolanaRpcClient): Client used to fetch the creating transactions.
+        programs (dict[str, str] or None): Program id to initialisation log line;
+                                           `POOL_PROGRAMS` when omitted.
+        reconnect_delay (float): Initial delay before reconnecting, doubled on every failure.
+        max_fetches (int): Transactions fetched concurrently.
+
+    Yields:
+        PoolEvent: Every newly created pool.
+    """
+    programs = programs or POOL_PROGRAMS
+    fetcher = TransactionFetcher(rpc, max_concurrency=max_fetches)
+    reader = asyncio.get_running_loop().create_task(_read_pool_logs(ws_url, programs, reconnect_delay, fetcher))
+    try:
+        while True:
+            yield await fetcher.get()
+    finally:
+        reader.cancel()
+        fetcher.close()
+
+
+async def _read_pool_logs(ws_url, programs, reconnect_delay, fetcher):
+    import websockets
+
+    delay = reconnect_delay
+    while True:
+        try:
+            async with websockets.connect(ws_url, ping_interval=20, max_size=None) as socket:
+                subscriptions = {}
+                for request_id, program in enumerate(programs, start=1):
+                    await socket.send(json.dumps({
+                        "jsonrpc": "2.0",
+                        "id": request_id,
+                        "method": "logsSubscribe",
+                        "params": [{"mentions": [program]}, {"commitment": "processed"}],
+                    }))
+                    subscriptions[request_id] = program
+                delay = reconnect_delay
+                by_subscription = {}
+
+                async for raw in socket:
+                    message = json.loads(raw)
+                    if "id" in message:
+                        by_subscription[message.get("result")] = subscriptions.get(message["id"])
+                        continue
+                    params = message.get("params") or {}
+                    program = by_subscription.get(params.get("subscription"))
+                    value = (params.get("result") or {}).get("value") or {}
+                    if program is None or value.get("err") is not None:
+                        continue
+                    marker = programs[program]
+                    if not any(marker in line for line in value.get("logs") or ()):
+                        continue
+                    signature = value.get("signature")
+                    slot = params["result"]["context"]["slot"]
+                    fetcher.submit(signature, functools.partial(_pool_from_transaction, program, signature, slot))
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            logger.warning("Pool event stream dropped (%s); reconnecting in %.0fs", error, delay)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60.0)
+
+
+async def replay_events(path, speed=None):
+    """
+    Yield the events of a recorded event file (one JSON document per line).
+
+    Args:
+        path (str): The JSONL file, as written by `record_events`.
+        speed (float or None): Replay the recorded slot spacing this many times
+                               faster (400ms per slot at 1.0); as fast as possible when `None`.
+
+    Yields:
+        PoolEvent: The recorded events, stamped with the time they are replayed.
+    """
+    previous_slot = None
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            document = json.loads(line)
+            slot = document.get("slot")
+            if speed and previous_slot is not None and slot is not None and slot > previous_slot:
+                await asyncio.sleep((slot - previous_slot) * 0.4 / speed)
+            previous_slot = slot if slot is not None else previous_slot
+            yield PoolEvent.from_document(document)
+
+
+async def record_events(events, path):
+    """
+    Pass events through unchanged while appending them to a recorded event file.
+
+    Args:
+        events (AsyncIterator[PoolEvent]): The source stream.
+        path (str): The JSONL file to append to.
+
+    Yields:
+        PoolEvent: The events of `events`.
+    """
+    with open(path, "a", encoding="utf-8") as file:
+        async for event in events:
+            file.write(json.dumps(event.to_document()) + "\n")
+            file.flush()
+            yield event
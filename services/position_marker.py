@@ -0,0 +1,115 @@
+import asyncio
+import logging
+
+from .token_info import TokenInfoUnavailable
+
+logger = logging.getLogger(__name__)
+
+
+class PositionMarker:
+    """
+    Marks open positions to market on an interval.
+
+    Every `interval` seconds the price of each mint someone holds is looked
+    up, at most `max_concurrency` at a time, and handed to
+    `PositionStore.mark`, which revalues only the positions in that mint.
+    Prices come from `TokenInfoService`, whose cache and shared in-flight
+    lookups also serve the buy cards, so a token that is both held and
+    being pasted is fetched once. A mint whose lookup fails or that has no
+    route keeps its last mark.
+    """
+
+    def __init__(self, store, token_info, interval=15.0, max_concurrency=8):
+        """
+        Initialize the PositionMarker instance.
+
+        Args:
+            store (PositionStore): The positions to revalue.
+            token_info (TokenInfoService): Provides `price_sol` per mint.
+            interval (float): Seconds between two rounds of marks.
+            max_concurrency (int): Lookups in flight at the same time.
+
+        Attributes:
+            rounds (int): Rounds completed.
+            marked (int): Mints marked.
+            unpriced (int): Mints without a price (no route, or not a mint).
+            failures (int): Lookups that failed.
+
+        Example:
+            >>> marker = PositionMarker(position_store, token_info, interval=15)
+            >>> await marker.start()
+        """
+        self.store = store
+        self.token_info = token_info
+        self.interval = interval
+        self.rounds = 0
+        self.marked = 0
+        self.unpriced = 0
+        self.failures = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._task = None
+
+    async def mark_all(self):
+        """
+        Mark every held mint once.
+
+        Returns:
+            int: The number of mints marked.
+        """
+        results = await asyncio.gather(*(self._mark(mint) for mint in self.store.mints()))
+        self.rounds += 1
+        return sum(results)
+
+    async def _mark(self, mint):
+        async with self._semaphore:
+            try:
+                info = await self.token_info.get(mint)
+            except TokenInfoUnavailable as error:
+                self.failures += 1
+                logger.debug("Marking %s failed: %s", mint, error)
+                return False
+        price = info.price_sol if info is not None else None
+        if not price:
+            self.unpriced += 1
+            return False
+        self.store.mark(mint, price)
+        self.marked += 1
+        return True
+
+    async def start(self):
+        """Start marking in the background."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop marking."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.mark_all()
+            except Exception:
+                logger.exception("Marking positions failed")
+
+    def stats(self):
+        """
+        Return marking counters.
+
+        Returns:
+            dict: Held mints, rounds completed, mints marked, mints without a price and failed lookups.
+        """
+        return {
+            "mints": len(self.store.mints()),
+            "rounds": self.rounds,
+            "marked": self.marked,
+            "unpriced": self.unpriced,
+            "failures": self.failures,
+        }
@@ -0,0 +1,381 @@
+import asyncio
+import logging
+from bisect import bisect_left, insort
+
+from pymongo import DeleteOne, UpdateOne
+
+from .shards import WorkerShard
+
+logger = logging.getLogger(__name__)
+
+
+class Position:
+    """
+    One user's holding of one token.
+
+    Attributes:
+        user_id (int): Telegram user id of the holder.
+        mint (str): Token mint address.
+        symbol (str or None): Token ticker, for display.
+        amount (float): Tokens held.
+        cost (float): SOL spent on the tokens still held.
+        price (float): Last mark price in SOL per token.
+        value (float): `amount * price`, kept up to date by the store.
+    """
+
+    __slots__ = ("user_id", "mint", "symbol", "amount", "cost", "price", "value")
+
+    def __init__(self, user_id, mint, amount, cost, price=0.0, symbol=None):
+        self.user_id = user_id
+        self.mint = mint
+        self.symbol = symbol
+        self.amount = amount
+        self.cost = cost
+        self.price = price
+        self.value = amount * price
+
+    @classmethod
+    def from_document(cls, document):
+        return cls(
+            document["user_id"], document["mint"], document["amount"], document["cost"],
+            document.get("price", 0.0), document.get("symbol"),
+        )
+
+    def to_document(self):
+        return {
+            "user_id": self.user_id,
+            "mint": self.mint,
+            "symbol": self.symbol,
+            "amount": self.amount,
+            "cost": self.cost,
+            "price": self.price,
+        }
+
+    @property
+    def pnl(self):
+        """Unrealised profit in SOL."""
+        return self.value - self.cost
+
+    @property
+    def pnl_percent(self):
+        """Unrealised profit relative to the cost, in percent."""
+        return self.pnl / self.cost * 100 if self.cost else 0.0
+
+
+class _Book:
+    """The positions of one user plus their value index, sorted ascending by `(value, mint)`."""
+
+    __slots__ = ("positions", "index", "total")
+
+    def __init__(self):
+        self.positions = {}
+        self.index = []
+        self.total = 0.0
+
+
+class PositionStore:
+    """
+    Open positions, keyed by user and token mint, kept in MongoDB and indexed in memory.
+
+    Two indexes are maintained incrementally:
+
+    - per user, a list of `(value, mint)` kept sorted with `bisect`, so the
+      number of positions above a minimum value and any page of them in
+      descending value order are found in O(log n + page size);
+    - per mint, the positions holding it, so a price tick only revalues the
+      positions in that mint instead of every position in the store.
+
+    Fills are applied to memory at once and written behind, like settings:
+    every `flush_interval` seconds the positions changed since the last
+    flush are upserted, and closed ones deleted, in one unordered
+    `bulk_write`. `load` rebuilds the indexes from the collection at
+    startup. Price marks are not written; a loaded position shows the price
+    it was last filled at until the next mark.
+    """
+
+    def __init__(self, on_change=None, collection=None, flush_interval=1.0, max_batch_size=1000, shard=None):
+        """
+        Initialize the PositionStore instance.
+
+        Args:
+            on_change (callable or None): `on_change(user_id)` called when a user's positions change,
+                                          e.g. `LiveUpdates.publisher("positions")`.
+            collection (pymongo.collection.Collection or None): Stores one document per position;
+                                                               memory only when omitted.
+            flush_interval (float): Seconds between two write-behind flushes.
+            max_batch_size (int): Positions written per MongoDB round trip.
+            shard (WorkerShard or None): The users whose positions this process loads.
+
+        Attributes:
+            prices (dict[str, float]): Last mark price of every mint, in SOL per token.
+            revalued (int): Positions revalued by price ticks so far.
+            writes (int): Position documents written or deleted.
+
+        Example:
+            >>> store = PositionStore()
+            >>> position = store.add(user_id, mint, amount=1000, cost=0.5, symbol="BONK")
+            >>> store.mark(mint, 0.0006)
+            1
+            >>> store.page(user_id, page=0, page_size=5)[0].value
+            0.6
+        """
+        self.on_change = on_change
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+        self.shard = shard or WorkerShard()
+        self.prices = {}
+        self.revalued = 0
+        self.writes = 0
+        self._books = {}
+        self._by_mint = {}
+        self._dirty = {}
+        self._task = None
+
+    def ensure_indexes(self):
+        self.collection.create_index([("user_id", 1), ("mint", 1)], unique=True)
+
+    async def load(self):
+        """
+        Load this worker's positions from the collection.
+
+        Returns:
+            int: The number of positions loaded.
+        """
+        if self.collection is None:
+            return 0
+        documents = await asyncio.to_thread(lambda: list(self.collection.find(self.shard.query(), {"_id": 0})))
+        for document in documents:
+            position = Position.from_document(document)
+            self.prices.setdefault(position.mint, position.price)
+            self._open(position)
+        return len(documents)
+
+    async def start(self):
+        """Start flushing changes in the background."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background task and write any pending changes."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def flush(self):
+        """Write every changed position to MongoDB now."""
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, {}
+        if self.collection is None:
+            return
+        changes = list(dirty.items())
+        for start in range(0, len(changes), self.max_batch_size):
+            batch = changes[start:start + self.max_batch_size]
+            operations = [
+                UpdateOne({"user_id": user_id, "mint": mint}, {"$set": position.to_document()}, upsert=True)
+                if position is not None else DeleteOne({"user_id": user_id, "mint": mint})
+                for (user_id, mint), position in batch
+            ]
+            try:
+                await asyncio.to_thread(self.collection.bulk_write, operations, ordered=False)
+            except Exception as error:
+                logger.warning("Writing %d positions failed: %s", len(batch), error)
+                # Retry on the next flush unless the position changed again meanwhile.
+                for key, position in batch:
+                    self._dirty.setdefault(key, position)
+                continue
+            self.writes += len(batch)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def add(self, user_id, mint, amount, cost=0.0, symbol=None):
+        """
+        Apply a fill to a position, opening or closing it as needed.
+
+        Args:
+            user_id (int): Telegram user id.
+            mint (str): Token mint address.
+            amount (float): Tokens bought (positive) or sold (negative).
+            cost (float): SOL spent on a buy; ignored for sells, which reduce
+                          the cost basis proportionally.
+            symbol (str or None): Token ticker.
+
+        Returns:
+            Position or None: The updated position, or `None` if it was closed.
+        """
+        book = self._books.get(user_id)
+        position = book.positions.get(mint) if book is not None else None
+        if position is None:
+            if amount <= 0:
+                return None
+            position = Position(user_id, mint, amount, cost, self.prices.get(mint, 0.0), symbol)
+            self._open(position)
+            self._changed(user_id, mint, position)
+            if self.on_change is not None:
+                self.on_change(user_id)
+            return position
+
+        remaining = position.amount + amount
+        if remaining <= 0:
+            self.close(user_id, mint)
+            return None
+        if amount < 0:
+            position.cost *= remaining / position.amount
+        else:
+            position.cost += cost
+        position.amount = remaining
+        if symbol:
+            position.symbol = symbol
+        self._revalue(book, position, remaining * position.price)
+        self._changed(user_id, mint, position)
+        if self.on_change is not None:
+            self.on_change(user_id)
+        return position
+
+    def _changed(self, user_id, mint, position):
+        # Only a store backed by a collection has anything to write.
+        if self.collection is not None:
+            self._dirty[(user_id, mint)] = position
+
+    def _open(self, position):
+        book = self._books.get(position.user_id)
+        if book is None:
+            book = self._books[position.user_id] = _Book()
+        book.positions[position.mint] = position
+        insort(book.index, (position.value, position.mint))
+        book.total += position.value
+        self._by_mint.setdefault(position.mint, {})[position.user_id] = position
+
+    def close(self, user_id, mint):
+        """
+        Remove a position.
+
+        Returns:
+            Position or None: The removed position, or `None` if there was none.
+        """
+        book = self._books.get(user_id)
+        position = book.positions.pop(mint, None) if book is not None else None
+        if position is None:
+            return None
+        del book.index[bisect_left(book.index, (position.value, mint))]
+        book.total -= position.value
+        if not book.positions:
+            del self._books[user_id]
+        holders = self._by_mint[mint]
+        del holders[user_id]
+        if not holders:
+            del self._by_mint[mint]
+        self._changed(user_id, mint, None)
+        if self.on_change is not None:
+            self.on_change(user_id)
+        return position
+
+    def get(self, user_id, mint):
+        """Return a user's position in a mint, or `None`."""
+        book = self._books.get(user_id)
+        return book.positions.get(mint) if book is not None else None
+
+    def mark(self, mint, price):
+        """
+        Record a new price for a mint and revalue only the positions holding it.
+
+        Args:
+            mint (str): Token mint address.
+            price (float): Price in SOL per token.
+
+        Returns:
+            int: The number of positions revalued; 0 when the price did not change.
+        """
+        if self.prices.get(mint) == price:
+            return 0
+        self.prices[mint] = price
+        holders = self._by_mint.get(mint)
+        if not holders:
+            return 0
+        books = self._books
+        on_change = self.on_change
+        for position in holders.values():
+            position.price = price
+            self._revalue(books[position.user_id], position, position.amount * price)
+            if on_change is not None:
+                on_change(position.user_id)
+        self.revalued += len(holders)
+        return len(holders)
+
+    def _revalue(self, book, position, value):
+        if value == position.value:
+            return
+        index = book.index
+        del index[bisect_left(index, (position.value, position.mint))]
+        book.total += value - position.value
+        position.value = value
+        insort(index, (value, position.mint))
+
+    def count(self, user_id, min_value=0.0):
+        """Return how many of a user's positions are worth at least `min_value` SOL."""
+        book = self._books.get(user_id)
+        if book is None:
+            return 0
+        return len(book.index) - bisect_left(book.index, (min_value,))
+
+    def page(self, user_id, page=0, page_size=5, min_value=0.0):
+        """
+        Return one page of a user's positions, most valuable first.
+
+        Args:
+            user_id (int): Telegram user id.
+            page (int): Zero-based page number.
+            page_size (int): Positions per page.
+            min_value (float): Positions worth less than this many SOL are skipped.
+
+        Returns:
+            list[Position]: At most `page_size` positions.
+        """
+        book = self._books.get(user_id)
+        if book is None or page < 0:
+            return []
+        index = book.index
+        low = bisect_left(index, (min_value,))
+        stop = len(index) - page * page_size
+        start = max(low, stop - page_size)
+        if stop <= start:
+            return []
+        positions = book.positions
+        return [positions[mint] for _, mint in reversed(index[start:stop])]
+
+    def total_value(self, user_id):
+        """Return the combined value of a user's positions in SOL."""
+        book = self._books.get(user_id)
+        return book.total if book is not None else 0.0
+
+    def mints(self):
+        """Return the mints with at least one open position."""
+        return list(self._by_mint)
+
+    def holders(self, mint):
+        """Return the number of open positions in a mint."""
+        return len(self._by_mint.get(mint, ()))
+
+    def stats(self):
+        """
+        Return position and persistence counters.
+
+        Returns:
+            dict: Open positions, mints held, positions revalued, pending and written position documents.
+        """
+        return {
+            "positions": len(self),
+            "mints": len(self._by_mint),
+            "revalued": self.revalued,
+            "pending": len(self._dirty),
+            "writes": self.writes,
+        }
+
+    def __len__(self):
+        return sum(len(book.positions) for book in self._books.values())
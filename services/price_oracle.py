@@ -0,0 +1,330 @@
+import asyncio
+import time
+
+import httpx
+
+# Public SOL/USD endpoints understood out of the box, as (url, path to the price).
+PRESET_SOURCES = {
+    "coingecko": ("https://api.coingecko.com/api/v3/simple/price?ids=solana&vs_currencies=usd", "solana.usd"),
+    "binance": ("https://api.binance.com/api/v3/ticker/price?symbol=SOLUSDT", "price"),
+    "kraken": ("https://api.kraken.com/0/public/Ticker?pair=SOLUSD", "result.SOLUSD.c.0"),
+}
+
+
+def format_usd(amount):
+    """
+    Format a USD amount for display.
+
+    Example:
+        >>> format_usd(1234.5)
+        '$1,234.50'
+    """
+    return f"${amount:,.2f}"
+
+
+class PriceSource:
+    """
+    One upstream SOL/USD endpoint and its observed health.
+
+    The price is read from the JSON response by a dotted `path`; numeric
+    segments index into lists, so `"result.SOLUSD.c.0"` reads
+    `body["result"]["SOLUSD"]["c"][0]`. Latency is tracked as an
+    exponentially weighted moving average, and a source that fails is
+    benched for a backoff that doubles with every consecutive failure.
+    """
+
+    def __init__(self, name, url, path, client, max_backoff=300.0, clock=time.monotonic):
+        """
+        Initialize the PriceSource instance.
+
+        Args:
+            name (str): Label used in logs and stats.
+            url (str): The endpoint returning JSON.
+            path (str): Dotted path to the price inside the response.
+            client (httpx.AsyncClient): Shared HTTP client.
+            max_backoff (float): Longest time a failing source is benched, in seconds.
+            clock (callable): Monotonic clock; injectable for tests.
+
+        Attributes:
+            latency (float or None): Smoothed response time in seconds.
+            failures (int): Consecutive failed fetches.
+        """
+        self.name = name
+        self.url = url
+        self.path = [int(part) if part.isdigit() else part for part in path.split(".")]
+        self.client = client
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.latency = None
+        self.failures = 0
+        self.retry_at = 0.0
+
+    def healthy(self, now):
+        return self.failures == 0 or now >= self.retry_at
+
+    async def fetch(self):
+        """
+        Fetch the current price and update the health statistics.
+
+        Returns:
+            float: The SOL price in USD.
+
+        Raises:
+            Exception: Any transport, HTTP or parsing error.
+        """
+        started = self.clock()
+        try:
+            response = await self.client.get(self.url)
+            response.raise_for_status()
+            value = response.json()
+            for part in self.path:
+                value = value[part]
+            price = float(value)
+            if price <= 0:
+                raise ValueError(f"{self.name} returned a non-positive price: {price}")
+        except Exception:
+            self.failures += 1
+            self.retry_at = self.clock() + min(self.max_backoff, 2 ** (self.failures - 1))
+            raise
+        elapsed = self.clock() - started
+        self.latency = elapsed if self.latency is None else 0.8 * self.latency + 0.2 * elapsed
+        self.failures = 0
+        return price
+
+
+def build_price_sources(spec, client):
+    """
+    Create price sources from a comma-separated specification.
+
+    Each entry is either a preset name (see `PRESET_SOURCES`) or
+    `name=url#path` for a custom endpoint.
+
+    Args:
+        spec (str): e.g. `"coingecko,binance"` or `"local=http://127.0.0.1:8900/price#usd"`.
+        client (httpx.AsyncClient): Shared HTTP client.
+
+    Returns:
+        list[PriceSource]: The configured sources.
+
+    Raises:
+        ValueError: If an entry is neither a preset nor a valid custom source.
+    """
+    sources = []
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        if entry in PRESET_SOURCES:
+            url, path = PRESET_SOURCES[entry]
+            sources.append(PriceSource(entry, url, path, client))
+            continue
+        name, _, target = entry.partition("=")
+        url, _, path = target.partition("#")
+        if not (name and url and path):
+            raise ValueError(f"Invalid price source {entry!r}; expected a preset or name=url#path.")
+        sources.append(PriceSource(name, url, path, client))
+    return sources
+
+
+class PriceQuote:
+    """The last good price and where and when it was obtained."""
+
+    __slots__ = ("price", "source", "updated_at")
+
+    def __init__(self, price, source, updated_at):
+        self.price = price
+        self.source = source
+        self.updated_at = updated_at
+
+
+class PriceOracle:
+    """
+    SOL/USD price kept fresh by a background task.
+
+    The refresh task polls the healthy sources every `interval` seconds,
+    fastest first, and falls through to the next source when one fails.
+    Every `probe_every` refreshes it queries all healthy sources at once and
+    keeps the first answer, which refreshes the latency ranking. Readers
+    never wait on the network: `quote()` returns the last good price in O(1),
+    however old it is (stale-while-revalidate). A quote older than `max_age`
+    is flagged as stale, and a read that finds one wakes the refresh task
+    early.
+    """
+
+    def __init__(self, sources, interval=10.0, max_age=60.0, probe_every=10, client=None, clock=time.monotonic):
+        """
+        Initialize the PriceOracle instance.
+
+        Args:
+            sources (list[PriceSource]): Upstream endpoints, in initial order of preference.
+            interval (float): Seconds between refreshes.
+            max_age (float): Age in seconds after which a quote is reported as stale.
+            probe_every (int): Refreshes between two parallel probes of every source.
+            client (httpx.AsyncClient or None): HTTP client closed together with the oracle.
+            clock (callable): Monotonic clock; injectable for tests.
+
+        Attributes:
+            refreshes (int): Successful refreshes.
+            failovers (int): Refreshes that needed more than one source.
+            failures (int): Refreshes where every source failed.
+
+        Example:
+            >>> client = httpx.AsyncClient(timeout=5)
+            >>> oracle = PriceOracle(build_price_sources("coingecko,binance", client), client=client)
+            >>> await oracle.start()
+            >>> oracle.quote().price  # once the first refresh has completed
+            172.31
+        """
+        if not sources:
+            raise ValueError("At least one price source is required.")
+        self.sources = list(sources)
+        self.interval = interval
+        self.max_age = max_age
+        self.probe_every = probe_every
+        self.client = client
+        self.clock = clock
+        self.refreshes = 0
+        self.failovers = 0
+        self.failures = 0
+        self._quote = None
+        self._cycle = 0
+        self._wakeup = asyncio.Event()
+        self._task = None
+        # Probe fetches still running after the first answer; cancelled by `stop()`.
+        self._probes = set()
+
+    @classmethod
+    def from_spec(cls, spec, timeout=5.0, **kwargs):
+        """Build an oracle with its own HTTP client from a `build_price_sources` specification."""
+        client = httpx.AsyncClient(timeout=timeout)
+        return cls(build_price_sources(spec, client), client=client, **kwargs)
+
+    async def start(self):
+        """Start the background refresh task; the first price is fetched right away."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop refreshing, cancel probe fetches still running and close the HTTP client, if the oracle owns one."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for task in list(self._probes):
+            task.cancel()
+        if self._probes:
+            await asyncio.gather(*self._probes, return_exceptions=True)
+        if self.client is not None:
+            await self.client.aclose()
+
+    def quote(self):
+        """
+        Return the last good quote without waiting.
+
+        Returns:
+            PriceQuote or None: `None` until a price was fetched once.
+        """
+        quote = self._quote
+        if quote is not None and self._task is not None and self.clock() - quote.updated_at >= self.max_age:
+            self._wakeup.set()
+        return quote
+
+    def is_stale(self, quote=None):
+        """Return `True` if there is no quote or it is older than `max_age`."""
+        quote = quote or self._quote
+        return quote is None or self.clock() - quote.updated_at >= self.max_age
+
+    def age(self, quote=None):
+        """Return the age of a quote (the current one by default) in seconds."""
+        quote = quote or self._quote
+        return None if quote is None else self.clock() - quote.updated_at
+
+    def ranked_sources(self):
+        """Return the healthy sources, fastest first; unmeasured sources keep their configured order."""
+        now = self.clock()
+        healthy = [source for source in self.sources if source.healthy(now)]
+        return sorted(healthy, key=lambda source: float("inf") if source.latency is None else source.latency)
+
+    async def refresh(self):
+        """
+        Fetch a new price now.
+
+        Returns:
+            bool: `True` if a price was obtained.
+        """
+        ranked = self.ranked_sources()
+        self._cycle += 1
+        if not ranked:
+            # Every source is backing off; keep serving the last good quote.
+            quote = None
+        elif len(ranked) > 1 and self._cycle % self.probe_every == 1:
+            quote = await self._probe(ranked)
+        else:
+            quote = await self._failover(ranked)
+        if quote is None:
+            self.failures += 1
+            return False
+        self._quote = quote
+        self.refreshes += 1
+        return True
+
+    async def _failover(self, ranked):
+        for attempt, source in enumerate(ranked):
+            try:
+                price = await source.fetch()
+            except Exception:
+                continue
+            if attempt:
+                self.failovers += 1
+            return PriceQuote(price, source.name, self.clock())
+        return None
+
+    async def _probe(self, ranked):
+        async def fetch(source):
+            return source, await source.fetch()
+
+        # The slower fetches are left running so every source's latency gets measured.
+        tasks = [asyncio.ensure_future(fetch(source)) for source in ranked]
+        for task in tasks:
+            self._probes.add(task)
+            task.add_done_callback(self._probes.discard)
+            task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        for done in asyncio.as_completed(tasks):
+            try:
+                source, price = await done
+            except Exception:
+                continue
+            return PriceQuote(price, source.name, self.clock())
+        return None
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            await self.refresh()
+            # Not `wait_for`: it swallows a cancellation that arrives as the wakeup is set,
+            # and `stop()` would then wait another `interval`.
+            wakeup = asyncio.ensure_future(self._wakeup.wait())
+            try:
+                await asyncio.wait({wakeup}, timeout=self.interval)
+            finally:
+                wakeup.cancel()
+
+    def stats(self):
+        """
+        Return refresh counters and per-source health.
+
+        Returns:
+            dict: Refresh counters, the current source and age, and each source's latency and failures.
+        """
+        quote = self._quote
+        return {
+            "refreshes": self.refreshes,
+            "failovers": self.failovers,
+            "failures": self.failures,
+            "source": quote.source if quote else None,
+            "age": self.age(),
+            "sources": {
+                source.name: {"latency": source.latency, "failures": source.failures}
+                for source in self.sources
+            },
+        }
@@ -0,0 +1,174 @@
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+
+class DashboardSession:
+    """
+    Per-chat dashboard state.
+
+    Attributes:
+        dashboard (str): Name of the dashboard currently shown in the chat.
+        message_id (int or None): Id of the last message the dashboard was rendered into.
+        pending_input (str or None): What the next free-text message from the chat answers,
+                                     e.g. `"withdraw:address"`, or `None` if nothing is awaited.
+        data (dict): Small per-dashboard view state such as filters or the current page.
+        touched_at (float): Unix timestamp of the last access, used for TTL eviction.
+    """
+
+    __slots__ = ("dashboard", "message_id", "pending_input", "data", "touched_at")
+
+    def __init__(self, dashboard="main", message_id=None, pending_input=None, data=None, touched_at=None):
+        self.dashboard = dashboard
+        self.message_id = message_id
+        self.pending_input = pending_input
+        self.data = {} if data is None else data
+        self.touched_at = time.time() if touched_at is None else touched_at
+
+    def to_document(self):
+        """Serialise the session into a plain dict suitable for persistence."""
+        return {
+            "dashboard": self.dashboard,
+            "message_id": self.message_id,
+            "pending_input": self.pending_input,
+            "data": self.data,
+            "touched_at": datetime.fromtimestamp(self.touched_at, timezone.utc),
+        }
+
+    @classmethod
+    def from_document(cls, document):
+        """Rebuild a session from a dict produced by `to_document`."""
+        touched_at = document.get("touched_at")
+        if touched_at is not None:
+            # pymongo returns naive datetimes that are in UTC.
+            touched_at = touched_at.replace(tzinfo=timezone.utc).timestamp()
+        return cls(
+            dashboard=document.get("dashboard", "main"),
+            message_id=document.get("message_id"),
+            pending_input=document.get("pending_input"),
+            data=document.get("data") or {},
+            touched_at=touched_at,
+        )
+
+
+class SessionStore:
+    """
+    In-process store of `DashboardSession` objects keyed by chat id.
+
+    Sessions are kept in access order, so expired entries always sit at the
+    front and `evict_expired()` only ever looks at sessions it removes. When
+    `ttl` is `None` sessions live for the lifetime of the process.
+    """
+
+    def __init__(self, ttl=None, clock=time.time):
+        """
+        Initialize the SessionStore instance.
+
+        Args:
+            ttl (float or None): Seconds of inactivity after which a session is dropped.
+            clock (callable): Returns the current Unix time; injectable for tests.
+
+        Example:
+            >>> store = SessionStore(ttl=3600)
+            >>> session = await store.get(chat_id)
+            >>> session.dashboard = "withdraw"
+            >>> await store.save(chat_id, session)
+        """
+        self.ttl = ttl
+        self.clock = clock
+        self._sessions = OrderedDict()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    async def get(self, chat_id):
+        """
+        Return the session for a chat, creating a fresh one if needed.
+
+        Args:
+            chat_id (int): The Telegram chat id.
+
+        Returns:
+            DashboardSession: The chat's session.
+        """
+        self.evict_expired()
+        session = self._sessions.get(chat_id)
+        if session is None:
+            loaded = await self._load(chat_id) or DashboardSession()
+            session = self._sessions.setdefault(chat_id, loaded)
+        else:
+            self._sessions.move_to_end(chat_id)
+        session.touched_at = self.clock()
+        return session
+
+    async def save(self, chat_id, session):
+        """
+        Record changes made to a chat's session.
+
+        Args:
+            chat_id (int): The Telegram chat id.
+            session (DashboardSession): The updated session.
+        """
+        session.touched_at = self.clock()
+        self._sessions[chat_id] = session
+        self._sessions.move_to_end(chat_id)
+
+    def evict_expired(self):
+        """Drop every session that has been idle for longer than `ttl`."""
+        if self.ttl is None:
+            return
+        deadline = self.clock() - self.ttl
+        sessions = self._sessions
+        while sessions:
+            chat_id, session = next(iter(sessions.items()))
+            if session.touched_at > deadline:
+                break
+            del sessions[chat_id]
+
+    async def _load(self, chat_id):
+        return None
+
+
+class MongoSessionStore(SessionStore):
+    """
+    Session store that writes sessions through to a MongoDB collection.
+
+    The in-process dictionary acts as a cache, so a session is only read from
+    the database the first time a chat is seen by this process (for example
+    after a restart, or when another worker handled the chat before). When a
+    `ttl` is configured, a MongoDB TTL index expires idle sessions server-side.
+    """
+
+    def __init__(self, collection, ttl=None, clock=time.time):
+        """
+        Initialize the MongoSessionStore instance.
+
+        Args:
+            collection (pymongo.collection.Collection): The collection holding session documents.
+            ttl (float or None): Seconds of inactivity after which a session is dropped.
+            clock (callable): Returns the current Unix time.
+        """
+        super().__init__(ttl=ttl, clock=clock)
+        self.collection = collection
+
+    def ensure_indexes(self):
+        """Create the chat id index and, if a TTL is set, the expiry index."""
+        self.collection.create_index("chat_id", unique=True)
+        if self.ttl is not None:
+            self.collection.create_index("touched_at", expireAfterSeconds=int(self.ttl))
+
+    async def save(self, chat_id, session):
+        await super().save(chat_id, session)
+        await asyncio.to_thread(
+            self.collection.update_one,
+            {"chat_id": chat_id},
+            {"$set": session.to_document()},
+            upsert=True,
+        )
+
+    async def _load(self, chat_id):
+        document = await asyncio.to_thread(self.collection.find_one, {"chat_id": chat_id})
+        if document is None:
+            return None
+        return DashboardSession.from_document(document)
@@ -0,0 +1,344 @@
+import asyncio
+import logging
+import math
+from datetime import datetime, timezone
+
+from pymongo import DeleteOne, UpdateOne
+
+from utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Priority fee multipliers applied to PRIORITY_FEE_MICROLAMPORTS, in the order the Fee button cycles through them.
+FEE_LEVELS = {"normal": 1, "fast": 2, "turbo": 4}
+
+# Degen Mode trades through volatile launches: slippage of at least this many percent
+# and a priority fee this many times higher than the fee level alone gives.
+DEGEN_MIN_SLIPPAGE = 50
+DEGEN_FEE_MULTIPLIER = 2
+
+MAX_PRESETS = 6
+
+# Every user setting and its default. Defaults live here once; users only store what they changed.
+DEFAULT_SETTINGS = {
+    "buy_slippage": 20,
+    "sell_slippage": 15,
+    "degen_mode": False,
+    "mev_protect": False,
+    "live_updates": False,
+    "fee_level": "normal",
+    "buy_presets": (0.1, 0.5, 1.0),
+    "sell_presets": (25.0, 50.0, 100.0),
+    "spot_presets": (0.1, 0.5, 1.0),
+    "sniper_presets": (0.1, 0.5, 1.0),
+}
+
+
+def parse_setting(name, value):
+    """
+    Convert a value, typically text typed by the user, to the type of a setting.
+
+    Args:
+        name (str): The setting name, a key of `DEFAULT_SETTINGS`.
+        value: The raw value, e.g. `"25"`, `"0.1 0.5 1"` or `True`.
+
+    Returns:
+        The validated value.
+
+    Raises:
+        KeyError: If the setting does not exist.
+        ValueError: If the value is not valid for the setting.
+    """
+    default = DEFAULT_SETTINGS[name]
+    if isinstance(default, bool):
+        return value if isinstance(value, bool) else str(value).lower() in ("1", "true", "on", "yes")
+    if name.endswith("_slippage"):
+        try:
+            value = int(float(str(value).rstrip("%")))
+        except (OverflowError, ValueError):
+            raise ValueError("Slippage must be a number.") from None
+        if not 1 <= value <= 100:
+            raise ValueError("Slippage must be between 1% and 100%.")
+        return value
+    if name == "fee_level":
+        if value not in FEE_LEVELS:
+            raise ValueError(f"Fee level must be one of {', '.join(FEE_LEVELS)}.")
+        return value
+    try:
+        values = tuple(float(part) for part in (value.replace(",", " ").split() if isinstance(value, str) else value))
+    except (TypeError, ValueError):
+        values = ()
+    if not values or len(values) > MAX_PRESETS or any(not math.isfinite(part) or part <= 0 for part in values):
+        raise ValueError(f"Send between 1 and {MAX_PRESETS} positive numbers.")
+    if name == "sell_presets" and any(part > 100 for part in values):
+        raise ValueError("Sell presets are percentages of 100 or less.")
+    return values
+
+
+class UserSettings:
+    """
+    The settings of one user: the defaults plus the user's overrides.
+
+    Settings are read as attributes (`settings.buy_slippage`); anything the
+    user never changed falls through to `DEFAULT_SETTINGS`, so a user on the
+    defaults costs one small object with no dictionary of its own.
+
+    Attributes:
+        user_id (int): Telegram user id.
+        overrides (dict or None): Settings that differ from the defaults.
+    """
+
+    __slots__ = ("user_id", "overrides")
+
+    def __init__(self, user_id, overrides=None):
+        self.user_id = user_id
+        self.overrides = overrides or None
+
+    def __getattr__(self, name):
+        if self.overrides is not None and name in self.overrides:
+            return self.overrides[name]
+        try:
+            return DEFAULT_SETTINGS[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def trade_options(self, side, priority_fee):
+        """
+        Return the `TradeExecutor.trade` keyword arguments these settings give a trade.
+
+        Args:
+            side (str): `"buy"` or `"sell"`.
+            priority_fee (int): Base compute unit price in micro-lamports, before the fee level.
+
+        Returns:
+            dict: `slippage_bps`, `priority_fee` and `private`, which is set with MEV Protect on.
+        """
+        slippage = getattr(self, f"{side}_slippage")
+        priority_fee *= FEE_LEVELS[self.fee_level]
+        if self.degen_mode:
+            slippage = max(slippage, DEGEN_MIN_SLIPPAGE)
+            priority_fee *= DEGEN_FEE_MULTIPLIER
+        return {"slippage_bps": slippage * 100, "priority_fee": priority_fee, "private": self.mev_protect}
+
+    @classmethod
+    def from_document(cls, document):
+        overrides = {}
+        for name, value in document.get("overrides", {}).items():
+            if name in DEFAULT_SETTINGS:
+                overrides[name] = tuple(value) if isinstance(value, list) else value
+        return cls(document["user_id"], overrides)
+
+    def to_document(self):
+        return {
+            "user_id": self.user_id,
+            "overrides": {name: list(value) if isinstance(value, tuple) else value for name, value in (self.overrides or {}).items()},
+            "updated_at": datetime.now(timezone.utc),
+        }
+
+
+class SettingsStore:
+    """
+    Per-user settings read through an in-memory cache with write-behind persistence.
+
+    Reads of cached users are a dictionary lookup, so the trading path can
+    consult settings on every trade without touching MongoDB. Changes are
+    applied to the cached object immediately and the user is marked dirty;
+    a background task writes all dirty users every `flush_interval` seconds
+    in one unordered `bulk_write`, so repeated toggles of the same user
+    collapse into a single write. Only overrides are stored, and a user
+    back on the defaults has their document deleted.
+
+    `load` warms the cache for many users at once, e.g. every user with an
+    AFK, sniper or copy-trade task at startup.
+    """
+
+    def __init__(self, collection=None, cache_size=100000, flush_interval=1.0, max_batch_size=1000):
+        """
+        Initialize the SettingsStore instance.
+
+        Args:
+            collection (pymongo.collection.Collection or None): Stores one override document per user.
+            cache_size (int): Maximum number of users kept in memory.
+            flush_interval (float): Seconds between two write-behind flushes.
+            max_batch_size (int): Users loaded or written per MongoDB round trip.
+
+        Attributes:
+            loads (int): Users read from MongoDB.
+            updates (int): Setting changes applied.
+            writes (int): Documents written or deleted.
+            flushes (int): Bulk writes issued.
+
+        Example:
+            >>> settings_store = SettingsStore(database["user_settings"])
+            >>> await settings_store.update(user_id, buy_slippage=25)
+            >>> (await settings_store.get(user_id)).buy_slippage
+            25
+        """
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+        self.loads = 0
+        self.updates = 0
+        self.writes = 0
+        self.flushes = 0
+        self._cache = LRUCache(cache_size)
+        self._dirty = {}
+        self._task = None
+
+    def ensure_indexes(self):
+        self.collection.create_index("user_id", unique=True)
+
+    async def start(self):
+        """Start flushing changes in the background."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background task and write any pending changes."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    def cached(self, user_id):
+        """Return the cached settings of a user, or `None` if they are not in memory."""
+        return self._cache.get(user_id) or self._dirty.get(user_id)
+
+    async def get(self, user_id):
+        """
+        Return the settings of a user, loading them on a cache miss.
+
+        Args:
+            user_id (int): Telegram user id.
+
+        Returns:
+            UserSettings: The user's settings.
+        """
+        settings = self.cached(user_id)
+        if settings is not None:
+            return settings
+        document = None
+        if self.collection is not None:
+            document = await asyncio.to_thread(self.collection.find_one, {"user_id": user_id})
+            self.loads += 1
+        # Another request may have loaded or changed the user while we waited.
+        settings = self.cached(user_id)
+        if settings is None:
+            settings = UserSettings.from_document(document) if document else UserSettings(user_id)
+            self._cache.set(user_id, settings)
+        return settings
+
+    async def load(self, user_ids):
+        """
+        Warm the cache for many users with one query per `max_batch_size` users.
+
+        Args:
+            user_ids (Iterable[int]): Users to load; users already cached are skipped.
+
+        Returns:
+            int: The number of users loaded.
+        """
+        missing = [user_id for user_id in set(user_ids) if user_id not in self._cache and user_id not in self._dirty]
+        for start in range(0, len(missing), self.max_batch_size):
+            chunk = missing[start:start + self.max_batch_size]
+            documents = {}
+            if self.collection is not None:
+                found = await asyncio.to_thread(lambda: list(self.collection.find({"user_id": {"$in": chunk}}, {"_id": 0})))
+                documents = {document["user_id"]: document for document in found}
+                self.loads += len(found)
+            for user_id in chunk:
+                if user_id not in self._cache and user_id not in self._dirty:
+                    document = documents.get(user_id)
+                    self._cache.set(user_id, UserSettings.from_document(document) if document else UserSettings(user_id))
+        return len(missing)
+
+    async def update(self, user_id, **changes):
+        """
+        Change settings of a user; the change is persisted by the next flush.
+
+        Args:
+            user_id (int): Telegram user id.
+            **changes: Setting names and raw values, validated with `parse_setting`.
+
+        Returns:
+            UserSettings: The updated settings.
+
+        Raises:
+            KeyError: If a setting does not exist.
+            ValueError: If a value is not valid.
+        """
+        parsed = {name: parse_setting(name, value) for name, value in changes.items()}
+        settings = await self.get(user_id)
+        overrides = dict(settings.overrides or {})
+        for name, value in parsed.items():
+            if value == DEFAULT_SETTINGS[name]:
+                overrides.pop(name, None)
+            else:
+                overrides[name] = value
+        settings.overrides = overrides or None
+        self.updates += len(parsed)
+        self._dirty[user_id] = settings
+        return settings
+
+    async def toggle(self, user_id, name):
+        """Flip a boolean setting of a user and return the updated settings."""
+        settings = await self.get(user_id)
+        return await self.update(user_id, **{name: not getattr(settings, name)})
+
+    async def cycle_fee_level(self, user_id):
+        """Move a user to the next fee level and return the updated settings."""
+        levels = list(FEE_LEVELS)
+        settings = await self.get(user_id)
+        return await self.update(user_id, fee_level=levels[(levels.index(settings.fee_level) + 1) % len(levels)])
+
+    async def flush(self):
+        """Write every dirty user to MongoDB now."""
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, {}
+        if self.collection is None:
+            return
+        users = list(dirty.values())
+        for start in range(0, len(users), self.max_batch_size):
+            batch = users[start:start + self.max_batch_size]
+            operations = [
+                UpdateOne({"user_id": settings.user_id}, {"$set": settings.to_document()}, upsert=True)
+                if settings.overrides else DeleteOne({"user_id": settings.user_id})
+                for settings in batch
+            ]
+            try:
+                await asyncio.to_thread(self.collection.bulk_write, operations, ordered=False)
+            except Exception as error:
+                logger.warning("Writing %d user settings failed: %s", len(batch), error)
+                # Retry on the next flush unless the user changed again meanwhile.
+                for settings in batch:
+                    self._dirty.setdefault(settings.user_id, settings)
+                continue
+            self.flushes += 1
+            self.writes += len(batch)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def stats(self):
+        """
+        Return cache and persistence counters.
+
+        Returns:
+            dict: Cached users, cache hit rate, users loaded, changes applied,
+                  pending users and documents written per bulk write.
+        """
+        cache = self._cache
+        lookups = cache.hits + cache.misses
+        return {
+            "cached": len(cache),
+            "hit_rate": cache.hits / lookups if lookups else 0.0,
+            "loads": self.loads,
+            "updates": self.updates,
+            "pending": len(self._dirty),
+            "writes": self.writes,
+            "flushes": self.flushes,
+        }
@@ -0,0 +1,113 @@
+import asyncio
+import itertools
+
+from pymongo import ReturnDocument
+
+
+class WrongWorker(Exception):
+    """Raised when a worker is asked to add state for a user another worker owns."""
+
+
+class WorkerShard:
+    """
+    The users whose engine state one bot process owns.
+
+    With several webhook workers, the `StickyRouter` sends every chat to
+    worker `chat_id % workers`. A user's private chat has the user's id, so
+    the worker that adds, pauses or removes a user's tasks is worker
+    `user_id % workers`. Engines load and run only the tasks of their own
+    users, and every task fires in exactly one process.
+
+    Attributes:
+        index (int): This worker's index.
+        count (int): Number of workers; 1 owns every user.
+    """
+
+    __slots__ = ("index", "count")
+
+    def __init__(self, index=0, count=1):
+        if not 0 <= index < max(count, 1):
+            raise ValueError(f"Worker {index} is out of range for {count} workers.")
+        self.index = index
+        self.count = count
+
+    def owns(self, user_id):
+        return self.count <= 1 or user_id % self.count == self.index
+
+    def check(self, user_id):
+        """
+        Make sure this worker owns a user.
+
+        Updates are routed by chat, so a user writing from a group chat can
+        reach a worker that does not own them; state added there would
+        never fire.
+
+        Raises:
+            WrongWorker: If another worker owns the user.
+        """
+        if not self.owns(user_id):
+            raise WrongWorker(f"User {user_id} belongs to worker {user_id % self.count}, not {self.index}.")
+
+    def query(self):
+        """Return the MongoDB filter selecting the documents of this worker's users."""
+        if self.count <= 1:
+            return {}
+        return {"user_id": {"$mod": [self.count, self.index]}}
+
+
+class IdCounter:
+    """
+    Hands out increasing integer ids that are unique across processes.
+
+    With a collection, ids come from a counter document incremented
+    atomically with `$inc`, so several workers never hand out the same id.
+    Without one, ids come from an in-process counter.
+    """
+
+    def __init__(self, collection=None, name="ids"):
+        """
+        Initialize the IdCounter instance.
+
+        Args:
+            collection (pymongo.collection.Collection or None): Holds one counter document per name.
+            name (str): The counter's `_id`, e.g. `"afk_tasks"`.
+
+        Example:
+            >>> ids = IdCounter(database["counters"], "afk_tasks")
+            >>> task_id = await ids.next()
+        """
+        self.collection = collection
+        self.name = name
+        self._local = itertools.count(1)
+
+    async def next(self):
+        """Return a new id."""
+        if self.collection is None:
+            return next(self._local)
+        document = await asyncio.to_thread(
+            self.collection.find_one_and_update,
+            {"_id": self.name},
+            {"$inc": {"seq": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return document["seq"]
+
+    async def skip_stored(self, collection, field):
+        """
+        Make later ids greater than every id already stored, whichever worker stored it.
+
+        Args:
+            collection (pymongo.collection.Collection): The collection holding the ids.
+            field (str): The id field, e.g. `"task_id"`.
+        """
+        document = await asyncio.to_thread(
+            collection.find_one, {field: {"$exists": True}}, {field: 1}, sort=[(field, -1)]
+        )
+        if document is None:
+            return
+        largest = document[field]
+        if self.collection is None:
+            self._local = itertools.count(max(largest + 1, next(self._local)))
+            return
+        await asyncio.to_thread(self.collection.update_one, {"_id": self.name}, {"$max": {"seq": largest}}, upsert=True)
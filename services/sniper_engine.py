@@ -0,0 +1,265 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from .shards import IdCounter, WorkerShard
+
+logger = logging.getLogger(__name__)
+
+
+class SnipeTask:
+    """
+    A user's standing order to buy a token as soon as a pool for it appears.
+
+    Attributes:
+        task_id (int): Unique id of the task.
+        user_id (int): Telegram user id of the owner.
+        mint (str): The token to buy.
+        amount_sol (float): SOL to spend.
+        program (str or None): Only trigger on pools of this program; any program when `None`.
+    """
+
+    __slots__ = ("task_id", "user_id", "mint", "amount_sol", "program")
+
+    def __init__(self, task_id, user_id, mint, amount_sol, program=None):
+        self.task_id = task_id
+        self.user_id = user_id
+        self.mint = mint
+        self.amount_sol = amount_sol
+        self.program = program
+
+    def to_document(self):
+        return {
+            "task_id": self.task_id,
+            "user_id": self.user_id,
+            "mint": self.mint,
+            "amount_sol": self.amount_sol,
+            "program": self.program,
+            "created_at": datetime.now(timezone.utc),
+        }
+
+    @classmethod
+    def from_document(cls, document):
+        return cls(document["task_id"], document["user_id"], document["mint"], document["amount_sol"], document.get("program"))
+
+
+class SniperEngine:
+    """
+    Matches new-pool events against every user's snipe tasks and fires the buys.
+
+    Tasks are indexed by `(program, mint)`, with `program` `None` for tasks
+    that accept any pool program, so matching an event costs two dictionary
+    lookups whatever the number of tasks. Tasks are one-shot: a matched task
+    is removed from the index before its buy is started, so a mint listed in
+    two pools never triggers the same task twice. Buys run concurrently,
+    bounded by `max_concurrent_buys`. With several webhook workers, each
+    engine holds only the tasks of its `shard`'s users, so a pool event fires
+    each matching task in exactly one process.
+    """
+
+    def __init__(self, buy, collection=None, max_concurrent_buys=64, latency_samples=10000, shard=None, ids=None):
+        """
+        Initialize the SniperEngine instance.
+
+        Args:
+            buy (callable): Async callable `buy(task, event)` performing the purchase.
+            collection (pymongo.collection.Collection or None): Persists tasks across restarts.
+            max_concurrent_buys (int): Buys allowed to run at the same time.
+            latency_samples (int): Number of recent event-to-trigger latencies kept for `stats()`.
+            shard (WorkerShard or None): The users whose tasks this process holds; every user when omitted.
+            ids (IdCounter or None): Allocates task ids; an in-process counter when omitted.
+
+        Attributes:
+            events (int): Events processed.
+            triggered (int): Tasks fired.
+            failed (int): Buys that raised.
+
+        Example:
+            >>> engine = SniperEngine(buy)
+            >>> await engine.add_task(user_id, mint, 0.5)
+            >>> await engine.run(stream_pool_events(ws_url, rpc))
+        """
+        self.buy = buy
+        self.collection = collection
+        self.shard = shard or WorkerShard()
+        self.ids = ids or IdCounter()
+        self.events = 0
+        self.triggered = 0
+        self.failed = 0
+        self.latencies = deque(maxlen=latency_samples)
+        self._index = {}
+        self._tasks = {}
+        self._by_user = {}
+        self._semaphore = asyncio.Semaphore(max_concurrent_buys)
+        self._running = set()
+
+    def ensure_indexes(self):
+        self.collection.create_index("task_id", unique=True)
+        self.collection.create_index("user_id")
+
+    async def load(self):
+        """Load the persisted tasks of this shard into the index."""
+        if self.collection is None:
+            return
+        documents = await asyncio.to_thread(lambda: list(self.collection.find(self.shard.query(), {"_id": 0})))
+        for document in documents:
+            self._insert(SnipeTask.from_document(document))
+        await self.ids.skip_stored(self.collection, "task_id")
+
+    async def add_task(self, user_id, mint, amount_sol, program=None):
+        """
+        Create a snipe task.
+
+        Args:
+            user_id (int): Telegram user id.
+            mint (str): The token to buy.
+            amount_sol (float): SOL to spend.
+            program (str or None): Restrict to pools of one program.
+
+        Returns:
+            SnipeTask: The new task.
+
+        Raises:
+            WrongWorker: If the user belongs to another worker's shard.
+        """
+        self.shard.check(user_id)
+        task = SnipeTask(await self.ids.next(), user_id, mint, amount_sol, program)
+        self._insert(task)
+        if self.collection is not None:
+            await asyncio.to_thread(self.collection.insert_one, task.to_document())
+        return task
+
+    async def remove_task(self, task_id):
+        """Cancel a task. Returns the removed task, or `None`."""
+        task = self._discard(task_id)
+        if task is not None and self.collection is not None:
+            await asyncio.to_thread(self.collection.delete_one, {"task_id": task_id})
+        return task
+
+    async def remove_user_tasks(self, user_id):
+        """Cancel every task of a user. Returns how many were removed."""
+        task_ids = list(self._by_user.get(user_id, ()))
+        for task_id in task_ids:
+            self._discard(task_id)
+        if task_ids and self.collection is not None:
+            await asyncio.to_thread(self.collection.delete_many, {"user_id": user_id})
+        return len(task_ids)
+
+    def user_tasks(self, user_id):
+        """Return the active tasks of a user, oldest first."""
+        return [self._tasks[task_id] for task_id in sorted(self._by_user.get(user_id, ()))]
+
+    def users(self):
+        """Return the ids of users with snipe tasks."""
+        return list(self._by_user)
+
+    def _insert(self, task):
+        self._tasks[task.task_id] = task
+        self._index.setdefault((task.program, task.mint), {})[task.task_id] = task
+        self._by_user.setdefault(task.user_id, set()).add(task.task_id)
+
+    def _discard(self, task_id):
+        task = self._tasks.pop(task_id, None)
+        if task is None:
+            return None
+        key = (task.program, task.mint)
+        bucket = self._index[key]
+        del bucket[task_id]
+        if not bucket:
+            del self._index[key]
+        owned = self._by_user[task.user_id]
+        owned.discard(task_id)
+        if not owned:
+            del self._by_user[task.user_id]
+        return task
+
+    def match(self, event):
+        """
+        Return the tasks an event triggers, without removing them.
+
+        Args:
+            event (PoolEvent): The new pool.
+
+        Returns:
+            list[SnipeTask]: Tasks for the event's mint on its program or on any program.
+        """
+        mint = event.mint
+        matched = []
+        for key in ((event.program, mint), (None, mint)):
+            bucket = self._index.get(key)
+            if bucket:
+                matched.extend(bucket.values())
+        return matched
+
+    def trigger(self, event):
+        """
+        Fire every task matching an event.
+
+        Matched tasks are removed from the index and their buys scheduled.
+
+        Returns:
+            list[SnipeTask]: The tasks fired.
+        """
+        self.events += 1
+        tasks = self.match(event)
+        if not tasks:
+            return tasks
+        loop = asyncio.get_running_loop()
+        for task in tasks:
+            self._discard(task.task_id)
+            running = loop.create_task(self._fire(task, event))
+            self._running.add(running)
+            running.add_done_callback(self._running.discard)
+        self.triggered += len(tasks)
+        self.latencies.append(time.perf_counter() - event.received_at)
+        if self.collection is not None:
+            ids = [task.task_id for task in tasks]
+            running = loop.create_task(asyncio.to_thread(self.collection.delete_many, {"task_id": {"$in": ids}}))
+            self._running.add(running)
+            running.add_done_callback(self._running.discard)
+        return tasks
+
+    async def _fire(self, task, event):
+        async with self._semaphore:
+            try:
+                await self.buy(task, event)
+            except Exception:
+                self.failed += 1
+                logger.exception("Snipe buy failed for task %s (%s)", task.task_id, task.mint)
+
+    async def run(self, events):
+        """
+        Consume an event stream until it ends, firing matching tasks as events arrive.
+
+        Args:
+            events (AsyncIterator[PoolEvent]): e.g. `stream_pool_events(...)` or `replay_events(path)`.
+        """
+        async for event in events:
+            self.trigger(event)
+
+    async def drain(self):
+        """Wait for every buy that has been started."""
+        while self._running:
+            await asyncio.gather(*list(self._running), return_exceptions=True)
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def stats(self):
+        """
+        Return engine counters and event-to-trigger latency percentiles.
+
+        Returns:
+            dict: Active tasks, events, triggered and failed buys, and p50/p99 latency in seconds.
+        """
+        ordered = sorted(self.latencies)
+        return {
+            "tasks": len(self._tasks),
+            "events": self.events,
+            "triggered": self.triggered,
+            "failed": self.failed,
+            "p50": ordered[len(ordered) // 2] if ordered else None,
+            "p99": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] if ordered else None,
+        }
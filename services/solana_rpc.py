@@ -0,0 +1,216 @@
+import asyncio
+import itertools
+import logging
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+LAMPORTS_PER_SOL = 1_000_000_000
+
+
+class RpcError(Exception):
+    """Raised when a Solana JSON-RPC call returns an error object."""
+
+    def __init__(self, method, error):
+        self.method = method
+        self.code = error.get("code")
+        super().__init__(f"{method} failed: {error.get('message', error)}")
+
+
+class SolanaRpcClient:
+    """
+    Thin async client for the Solana JSON-RPC API.
+
+    A single `httpx.AsyncClient` is shared by every call so connections to
+    the RPC node are pooled and kept alive.
+    """
+
+    def __init__(self, url, timeout=10.0, client=None):
+        """
+        Initialize the SolanaRpcClient instance.
+
+        Args:
+            url (str): The JSON-RPC endpoint, e.g. `https://api.mainnet-beta.solana.com`.
+            timeout (float): Request timeout in seconds.
+            client (httpx.AsyncClient or None): HTTP client to use; one is created when omitted.
+
+        Example:
+            >>> rpc = SolanaRpcClient("https://api.mainnet-beta.solana.com")
+            >>> await rpc.call("getBalance", ["9G3iq2UC9Xa1sfU5DiGwNf7oeRugQvrD1Wn6hKQHFk8Y"])
+            {'context': {'slot': 1}, 'value': 0}
+        """
+        self.url = url
+        self.client = client or httpx.AsyncClient(timeout=timeout)
+        self._ids = itertools.count(1)
+
+    async def close(self):
+        """Close the underlying HTTP client."""
+        await self.client.aclose()
+
+    async def call(self, method, params=None):
+        """
+        Perform a single JSON-RPC call.
+
+        Args:
+            method (str): The RPC method name.
+            params (list or None): The positional RPC parameters.
+
+        Returns:
+            The `result` member of the response.
+
+        Raises:
+            RpcError: If the node answered with an error.
+        """
+        payload = {"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": params or []}
+        response = await self.client.post(self.url, json=payload)
+        response.raise_for_status()
+        body = response.json()
+        if "error" in body:
+            raise RpcError(method, body["error"])
+        return body["result"]
+
+    async def get_multiple_lamports(self, pubkeys):
+        """
+        Fetch the lamport balances of up to 100 accounts in one round trip.
+
+        Args:
+            pubkeys (list[str]): Base58 account addresses.
+
+        Returns:
+            list[int]: The balance of each account, `0` for accounts that do not exist.
+        """
+        result = await self.call(
+            "getMultipleAccounts",
+            [pubkeys, {"encoding": "base64", "dataSlice": {"offset": 0, "length": 0}}],
+        )
+        return [account["lamports"] if account else 0 for account in result["value"]]
+
+    async def get_transaction(self, signature, commitment="confirmed", attempts=1, retry_delay=0.25, max_delay=2.0):
+        """
+        Fetch a transaction in `jsonParsed` encoding, retrying until the node has it.
+
+        A websocket notification can arrive before the transaction reaches
+        `commitment`, and the node answers `null` until it does. Such
+        answers, and failed calls, are retried with exponential backoff.
+
+        Args:
+            signature (str): The transaction signature.
+            commitment (str): The commitment the transaction must have reached.
+            attempts (int): Calls made at most.
+            retry_delay (float): Seconds before the first retry, doubled after each one.
+            max_delay (float): Longest wait between retries.
+
+        Returns:
+            dict or None: The transaction, or `None` if it never appeared.
+
+        Raises:
+            RpcError: If the last attempt failed with an RPC error.
+            httpx.HTTPError: If the last attempt failed to reach the node.
+        """
+        params = [signature, {"encoding": "jsonParsed", "maxSupportedTransactionVersion": 0, "commitment": commitment}]
+        delay = retry_delay
+        for attempt in range(1, attempts + 1):
+            try:
+                transaction = await self.call("getTransaction", params)
+            except (RpcError, httpx.HTTPError):
+                if attempt == attempts:
+                    raise
+                transaction = None
+            if transaction is not None or attempt == attempts:
+                return transaction
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_delay)
+
+
+class TransactionFetcher:
+    """
+    Fetches notified transactions concurrently, off the notification stream.
+
+    Websocket readers `submit` each signature and go straight back to the
+    socket. The fetch runs as its own task, with at most `max_concurrency`
+    calls in flight, and is retried by `get_transaction` until the
+    transaction is confirmed. So one slow fetch no longer delays the
+    notifications behind it, and a failed fetch only loses its own
+    transaction. `parse(transaction)` turns each fetched transaction into
+    an item, and `get` returns the items in the order they complete.
+    Beyond `max_pending` unfinished fetches, new signatures are dropped.
+    """
+
+    def __init__(self, rpc, max_concurrency=16, max_pending=1000, attempts=8, retry_delay=0.25):
+        """
+        Initialize the TransactionFetcher instance.
+
+        Args:
+            rpc (SolanaRpcClient): Client used to fetch the transactions.
+            max_concurrency (int): `getTransaction` calls in flight at most.
+            max_pending (int): Unfinished fetches at most.
+            attempts (int): Calls made per transaction before giving up.
+            retry_delay (float): Seconds before the first retry.
+
+        Attributes:
+            fetched (int): Transactions fetched.
+            not_found (int): Transactions still unknown to the node after every attempt.
+            failed (int): Fetches that failed with an error.
+            dropped (int): Signatures dropped because `max_pending` fetches were unfinished.
+        """
+        self.rpc = rpc
+        self.max_pending = max_pending
+        self.attempts = attempts
+        self.retry_delay = retry_delay
+        self.fetched = 0
+        self.not_found = 0
+        self.failed = 0
+        self.dropped = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._results = asyncio.Queue()
+        self._running = set()
+
+    def submit(self, signature, parse):
+        """
+        Start fetching a transaction without waiting for it.
+
+        Args:
+            signature (str): The transaction signature.
+            parse (callable): `parse(transaction)` returning the item to hand out, or `None` to skip it.
+        """
+        if len(self._running) >= self.max_pending:
+            self.dropped += 1
+            return
+        task = asyncio.get_running_loop().create_task(self._fetch(signature, parse))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _fetch(self, signature, parse):
+        try:
+            async with self._semaphore:
+                transaction = await self.rpc.get_transaction(signature, attempts=self.attempts, retry_delay=self.retry_delay)
+            item = transaction and parse(transaction)
+        except Exception as error:
+            self.failed += 1
+            logger.warning("Fetching transaction %s failed: %s", signature, error)
+            return
+        if transaction is None:
+            self.not_found += 1
+            return
+        self.fetched += 1
+        if item is not None:
+            self._results.put_nowait(item)
+
+    async def get(self):
+        """Wait for the next parsed item."""
+        return await self._results.get()
+
+    def close(self):
+        """Cancel the unfinished fetches."""
+        for task in list(self._running):
+            task.cancel()
+
+    def stats(self):
+        return {
+            "pending": len(self._running),
+            "fetched": self.fetched,
+            "not_found": self.not_found,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
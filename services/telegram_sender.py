@@ -0,0 +1,282 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+from telegram.error import RetryAfter
+
+# Send priorities: lower values go out first.
+INTERACTIVE = 0
+BACKGROUND = 1
+
+
+class TokenBucket:
+    """
+    Classic token bucket: `rate` tokens per second, holding at most `capacity`.
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate, capacity, now):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def delay(self, now):
+        """Return how many seconds to wait until a token is available."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self, now):
+        """Take one token. Callers must check `delay()` first."""
+        self._refill(now)
+        self.tokens -= 1
+
+    def pause(self, now, seconds):
+        """Empty the bucket so that no token is available for `seconds`."""
+        self._refill(now)
+        self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+    def is_full(self, now):
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+def _propagate(source, target):
+    if target.done():
+        return
+    if source.cancelled():
+        target.cancel()
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+
+class _Job:
+    __slots__ = ("priority", "seq", "chat_id", "key", "call", "future", "started")
+
+    def __init__(self, priority, seq, chat_id, key, call, future):
+        self.priority = priority
+        self.seq = seq
+        self.chat_id = chat_id
+        self.key = key
+        self.call = call
+        self.future = future
+        self.started = False
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class TelegramSender:
+    """
+    Shapes every outbound Telegram API call the dashboards make.
+
+    Calls are queued by priority (interactive replies before background
+    refreshes) and only released when both the global token bucket and the
+    bucket of the target chat have a token, so the bot stays under Telegram's
+    flood limits instead of collecting 429 errors. Calls submitted with the
+    same `key` while an earlier one is still queued are coalesced: only the
+    latest call runs and every submitter receives its result, so a burst of
+    edits to one message costs a single API call. A `RetryAfter` from
+    Telegram pauses the offending chat and re-queues the call.
+    """
+
+    def __init__(self, global_rate=30.0, chat_rate=1.0, chat_burst=3, max_buckets=50000, clock=time.monotonic):
+        """
+        Initialize the TelegramSender instance.
+
+        Args:
+            global_rate (float): Maximum API calls per second across all chats.
+            chat_rate (float): Sustained API calls per second to a single chat.
+            chat_burst (int): Calls a single chat may receive back to back.
+            max_buckets (int): Idle per-chat buckets are pruned beyond this many.
+            clock (callable): Monotonic clock; injectable for tests.
+
+        Attributes:
+            sent (int): Calls executed.
+            coalesced (int): Calls dropped because a later call with the same key replaced them.
+            retried (int): Calls re-queued after a `RetryAfter` error.
+
+        Example:
+            >>> sender = TelegramSender(global_rate=30, chat_rate=1)
+            >>> await sender.submit(chat_id, lambda: message.edit_text("hi"), key=("edit", chat_id, message.message_id))
+        """
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_buckets = max_buckets
+        self.clock = clock
+        self.sent = 0
+        self.coalesced = 0
+        self.retried = 0
+        self._global = TokenBucket(global_rate, max(1, global_rate), clock())
+        self._chats = {}
+        self._ready = []
+        self._deferred = []
+        self._pending = {}
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._worker = None
+        # The loop only keeps weak references to tasks; calls in flight are held here until done.
+        self._running = set()
+
+    def __len__(self):
+        return len(self._ready) + len(self._deferred)
+
+    async def submit(self, chat_id, call, key=None, priority=INTERACTIVE):
+        """
+        Queue an API call and wait for its result.
+
+        Args:
+            chat_id (int): The chat the call targets.
+            call (callable): Zero-argument callable returning the API coroutine.
+            key (hashable or None): Coalescing key; queued calls with the same key are merged.
+            priority (int): `INTERACTIVE` or `BACKGROUND`.
+
+        Returns:
+            The result of the call that was finally executed for this key.
+        """
+        if key is not None:
+            job = self._pending.get(key)
+            if job is not None and not job.started:
+                job.call = call
+                self.coalesced += 1
+                if priority < job.priority:
+                    # Re-queue with the higher priority; the stale heap entry is skipped.
+                    job.started = True
+                    job = self._enqueue(chat_id, key, call, priority, job.future)
+                return await asyncio.shield(job.future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._enqueue(chat_id, key, call, priority, future)
+        return await asyncio.shield(future)
+
+    async def stop(self):
+        """Stop the dispatch loop. Queued calls are cancelled."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        for _, job in self._deferred:
+            self._cancel(job)
+        for job in self._ready:
+            self._cancel(job)
+        self._ready.clear()
+        self._deferred.clear()
+        self._pending.clear()
+
+    def _cancel(self, job):
+        if not job.started and not job.future.done():
+            job.future.cancel()
+
+    def _enqueue(self, chat_id, key, call, priority, future):
+        job = _Job(priority, next(self._seq), chat_id, key, call, future)
+        if key is not None:
+            self._pending[key] = job
+        heapq.heappush(self._ready, job)
+        self._wakeup.set()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.get_running_loop().create_task(self._dispatch())
+        return job
+
+    def _chat_bucket(self, chat_id, now):
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= self.max_buckets:
+                self._prune(now)
+            bucket = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst, now)
+        return bucket
+
+    def _prune(self, now):
+        # A full bucket behaves exactly like a brand new one, so it can go.
+        for chat_id in [chat_id for chat_id, bucket in self._chats.items() if bucket.is_full(now)]:
+            del self._chats[chat_id]
+
+    async def _dispatch(self):
+        while True:
+            now = self.clock()
+            while self._deferred and self._deferred[0][0] <= now:
+                heapq.heappush(self._ready, heapq.heappop(self._deferred)[1])
+
+            if not self._ready:
+                self._wakeup.clear()
+                timeout = self._deferred[0][0] - now if self._deferred else None
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            global_delay = self._global.delay(now)
+            if global_delay > 0:
+                await asyncio.sleep(global_delay)
+                continue
+
+            job = heapq.heappop(self._ready)
+            if job.started:
+                continue
+            bucket = self._chat_bucket(job.chat_id, now)
+            chat_delay = bucket.delay(now)
+            if chat_delay > 0:
+                heapq.heappush(self._deferred, (now + chat_delay, job))
+                continue
+
+            self._global.consume(now)
+            bucket.consume(now)
+            job.started = True
+            if job.key is not None and self._pending.get(job.key) is job:
+                del self._pending[job.key]
+            task = asyncio.get_running_loop().create_task(self._run(job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, job):
+        try:
+            result = await job.call()
+        except RetryAfter as error:
+            self.retried += 1
+            retry_after = error.retry_after
+            seconds = retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else retry_after
+            now = self.clock()
+            self._chat_bucket(job.chat_id, now).pause(now, seconds)
+            newer = self._pending.get(job.key) if job.key is not None else None
+            if newer is not None and not newer.started:
+                # A newer call for the same key is already queued; it supersedes this one.
+                newer.future.add_done_callback(lambda done: _propagate(done, job.future))
+                return
+            self._enqueue(job.chat_id, job.key, job.call, job.priority, job.future)
+            return
+        except Exception as error:
+            if not job.future.done():
+                job.future.set_exception(error)
+            return
+        self.sent += 1
+        if not job.future.done():
+            job.future.set_result(result)
+
+    def stats(self):
+        """
+        Return the sender counters.
+
+        Returns:
+            dict: Calls sent, coalesced and retried, plus the current queue depth.
+        """
+        return {
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "retried": self.retried,
+            "queued": len(self),
+        }
@@ -0,0 +1,287 @@
+import asyncio
+import base64
+import struct
+import time
+
+import httpx
+from solders.pubkey import Pubkey
+
+from utils.cache import LRUCache, TTLCache
+from .pool_events import WSOL_MINT
+from .solana_rpc import LAMPORTS_PER_SOL
+
+TOKEN_PROGRAM = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+TOKEN_2022_PROGRAM = "TokenzQdBNbLqP5VEhdkAS6EPFLC1PHnBqCXEpPxuEb"
+TOKEN_PROGRAMS = {TOKEN_PROGRAM, TOKEN_2022_PROGRAM}
+METADATA_PROGRAM = "metaqbxxUerdq28cj1RbAWkYQm3ybzjb6a8bt518x1s"
+METADATA_PROGRAM_ID = Pubkey.from_string(METADATA_PROGRAM)
+
+# Metaplex metadata accounts start with a key byte, the update authority and the mint.
+METADATA_NAME_OFFSET = 1 + 32 + 32
+
+_MISSING = object()
+
+
+class TokenInfoUnavailable(Exception):
+    """Raised when token information could not be fetched from the RPC node."""
+
+
+def metadata_address(mint):
+    """Return the address of the Metaplex metadata account of a mint."""
+    seeds = [b"metadata", bytes(METADATA_PROGRAM_ID), bytes(Pubkey.from_string(mint))]
+    return str(Pubkey.find_program_address(seeds, METADATA_PROGRAM_ID)[0])
+
+
+def parse_metadata(data):
+    """
+    Read the name and symbol of a Metaplex metadata account.
+
+    Args:
+        data (bytes): The account data.
+
+    Returns:
+        tuple[str, str]: The name and symbol, without the padding Metaplex stores.
+    """
+    fields = []
+    offset = METADATA_NAME_OFFSET
+    for _ in range(2):
+        (length,) = struct.unpack_from("<I", data, offset)
+        offset += 4
+        fields.append(data[offset:offset + length].decode("utf-8", "replace").strip("\x00").strip())
+        offset += length
+    return fields[0], fields[1]
+
+
+class TokenInfo:
+    """
+    What the buy card shows about a token mint.
+
+    Attributes:
+        mint (str): The mint address.
+        program (str): The token program owning the mint.
+        decimals (int): Decimals of the token.
+        supply (int): Total supply in the smallest unit.
+        name (str or None): Token name from its metadata.
+        symbol (str or None): Token symbol from its metadata.
+        mint_authority (str or None): Who can mint more tokens; `None` once renounced.
+        freeze_authority (str or None): Who can freeze token accounts; `None` once renounced.
+        pool (str or None): The pools Jupiter routes a 1 SOL buy through, `None` without liquidity.
+        tokens_per_sol (float or None): Tokens a 1 SOL buy is quoted to receive.
+        price_impact (float or None): Price impact of a 1 SOL buy in percent.
+        fetched_at (float): `time.monotonic()` when the information was fetched.
+    """
+
+    __slots__ = (
+        "mint", "program", "decimals", "supply", "name", "symbol", "mint_authority", "freeze_authority",
+        "pool", "tokens_per_sol", "price_impact", "fetched_at",
+    )
+
+    def __init__(self, mint, program, decimals, supply, name=None, symbol=None, mint_authority=None,
+                 freeze_authority=None, pool=None, tokens_per_sol=None, price_impact=None):
+        self.mint = mint
+        self.program = program
+        self.decimals = decimals
+        self.supply = supply
+        self.name = name
+        self.symbol = symbol
+        self.mint_authority = mint_authority
+        self.freeze_authority = freeze_authority
+        self.pool = pool
+        self.tokens_per_sol = tokens_per_sol
+        self.price_impact = price_impact
+        self.fetched_at = time.monotonic()
+
+    @property
+    def ui_supply(self):
+        """Total supply in whole tokens."""
+        return self.supply / 10 ** self.decimals
+
+    @property
+    def price_sol(self):
+        """Price of one token in SOL, `None` without a pool."""
+        return 1 / self.tokens_per_sol if self.tokens_per_sol else None
+
+    @property
+    def market_cap_sol(self):
+        """Fully diluted market cap in SOL, `None` without a pool."""
+        price = self.price_sol
+        return price * self.ui_supply if price is not None else None
+
+
+class TokenInfoService:
+    """
+    Token metadata, supply and pool information for pasted mint addresses.
+
+    Tokens are pasted in bursts: at launch, hundreds of users paste the same
+    address within seconds. Lookups therefore go through two layers before
+    anything is sent upstream:
+
+    1. a bounded TTL cache, which also remembers addresses that are not
+       token mints (wallets, programs) for `negative_ttl` seconds;
+    2. an in-flight table, so every paste arriving while a mint is being
+       fetched shares that one fetch.
+
+    A fetch is one `getMultipleAccounts` call for the mint and its metadata
+    account, run concurrently with one Jupiter quote for a 1 SOL buy, so the
+    first paste of a token costs one RPC round trip plus one Jupiter request.
+    """
+
+    def __init__(self, rpc, router=None, ttl=10.0, negative_ttl=300.0, cache_size=10000, clock=time.monotonic):
+        """
+        Initialize the TokenInfoService instance.
+
+        Args:
+            rpc (SolanaRpcClient): Client used for `getMultipleAccounts`.
+            router (JupiterRouter or None): Quotes a 1 SOL buy for the pool information; skipped when omitted.
+            ttl (float): Seconds the information of a token is served from the cache.
+            negative_ttl (float): Seconds an address that is not a mint is remembered.
+            cache_size (int): Maximum number of cached addresses.
+            clock (callable): Monotonic clock; injectable for tests.
+
+        Attributes:
+            fetches (int): Upstream fetches started.
+            shared (int): Lookups that joined a fetch already in flight.
+            not_mints (int): Fetches that found an address that is not a token mint.
+
+        Example:
+            >>> tokens = TokenInfoService(SolanaRpcClient(SOLANA_RPC_URL), JupiterRouter(rpc))
+            >>> info = await tokens.get("EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v")
+            >>> info.symbol
+            'USDC'
+        """
+        self.rpc = rpc
+        self.router = router
+        self.negative_ttl = negative_ttl
+        self.cache = TTLCache(cache_size, ttl, clock=clock)
+        self.fetches = 0
+        self.shared = 0
+        self.not_mints = 0
+        self.failures = 0
+        self._metadata_addresses = LRUCache(maxsize=cache_size)
+        self._inflight = {}
+
+    async def get(self, mint):
+        """
+        Return the information of a token mint.
+
+        Args:
+            mint (str): A valid base58 address.
+
+        Returns:
+            TokenInfo or None: The token, or `None` if the address is not a token mint.
+
+        Raises:
+            TokenInfoUnavailable: If the RPC lookup failed.
+        """
+        info = self.cache.get(mint, _MISSING)
+        if info is not _MISSING:
+            return info
+
+        task = self._inflight.get(mint)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._fetch(mint))
+            self._inflight[mint] = task
+            task.add_done_callback(lambda _: self._done(mint, task))
+        else:
+            self.shared += 1
+        # Shielded so that a cancelled handler does not cancel the fetch other pastes wait on.
+        return await asyncio.shield(task)
+
+    def _done(self, mint, task):
+        self._inflight.pop(mint, None)
+        if not task.cancelled() and task.exception() is not None:
+            self.failures += 1
+
+    async def _fetch(self, mint):
+        self.fetches += 1
+        metadata = self._metadata_addresses.get(mint)
+        if metadata is None:
+            metadata = metadata_address(mint)
+            self._metadata_addresses.set(mint, metadata)
+        accounts, quote = await asyncio.gather(
+            self._accounts([mint, metadata]),
+            self._quote(mint),
+        )
+        info = self._parse(mint, accounts[0], accounts[1], quote)
+        if info is None:
+            self.not_mints += 1
+            self.cache.set(mint, None, ttl=self.negative_ttl)
+        else:
+            self.cache.set(mint, info)
+        return info
+
+    async def _accounts(self, addresses):
+        try:
+            result = await self.rpc.call("getMultipleAccounts", [addresses, {"encoding": "jsonParsed"}])
+        except Exception as error:
+            raise TokenInfoUnavailable(str(error)) from error
+        return result["value"]
+
+    async def _quote(self, mint):
+        if self.router is None or mint == WSOL_MINT:
+            return None
+        try:
+            return await self.router.quote(WSOL_MINT, mint, LAMPORTS_PER_SOL, slippage_bps=100)
+        except (httpx.HTTPError, ValueError):
+            # No route yet (e.g. a token without a pool) or Jupiter is down; the card is shown without a pool.
+            return None
+
+    @staticmethod
+    def _parse(mint, account, metadata, quote):
+        if account is None or account.get("owner") not in TOKEN_PROGRAMS:
+            return None
+        data = account["data"]
+        if not isinstance(data, dict) or data.get("parsed", {}).get("type") != "mint":
+            return None
+        parsed = data["parsed"]["info"]
+
+        name = symbol = None
+        if metadata is not None and metadata.get("owner") == METADATA_PROGRAM:
+            try:
+                name, symbol = parse_metadata(base64.b64decode(metadata["data"][0]))
+            except (struct.error, IndexError, ValueError):
+                pass
+        for extension in parsed.get("extensions", ()):
+            # Token-2022 mints can carry their metadata themselves.
+            if extension.get("extension") == "tokenMetadata":
+                name = extension["state"].get("name") or name
+                symbol = extension["state"].get("symbol") or symbol
+
+        info = TokenInfo(
+            mint,
+            account["owner"],
+            parsed["decimals"],
+            int(parsed["supply"]),
+            name=name or None,
+            symbol=symbol or None,
+            mint_authority=parsed.get("mintAuthority"),
+            freeze_authority=parsed.get("freezeAuthority"),
+        )
+        if quote is not None:
+            try:
+                labels = [step["swapInfo"]["label"] for step in quote["routePlan"]]
+                info.pool = " → ".join(dict.fromkeys(labels))
+                info.tokens_per_sol = int(quote["outAmount"]) / 10 ** info.decimals
+                info.price_impact = float(quote.get("priceImpactPct") or 0) * 100
+            except (KeyError, TypeError, ValueError):
+                info.pool = info.tokens_per_sol = info.price_impact = None
+        return info
+
+    def stats(self):
+        """
+        Return cache and deduplication statistics.
+
+        Returns:
+            dict: Cache hit rate, shared in-flight lookups, upstream fetches, addresses that
+                  were not mints and failures.
+        """
+        lookups = self.cache.hits + self.cache.misses
+        return {
+            "cache_hit_rate": self.cache.hits / lookups if lookups else 0.0,
+            "cached": len(self.cache),
+            "shared_lookups": self.shared,
+            "fetches": self.fetches,
+            "not_mints": self.not_mints,
+            "failures": self.failures,
+            "in_flight": len(self._inflight),
+        }
@@ -0,0 +1,503 @@
+import asyncio
+import base64
+import logging
+import time
+
+from solders.compute_budget import set_compute_unit_price
+from solders.hash import Hash
+from solders.message import MessageV0
+from solders.transaction import VersionedTransaction
+
+from utils.histogram import LatencyHistogram
+from .solana_rpc import SolanaRpcClient
+
+logger = logging.getLogger(__name__)
+
+SIDES = ("buy", "sell")
+
+# Matches the "Buy Slippage: 20%" and "Sell Slippage: 15%" settings.
+DEFAULT_SLIPPAGE_BPS = {"buy": 2000, "sell": 1500}
+
+# Latency recorded for a node whose send failed, so it drops down the ranking.
+FAILURE_PENALTY = 10.0
+
+
+class TradeFailed(Exception):
+    """Raised when a trade could not be sent or was not confirmed."""
+
+
+class BlockhashCache:
+    """
+    The latest blockhash, refreshed by a background task.
+
+    Trades read the cached blockhash instead of calling
+    `getLatestBlockhash` on the hot path. A blockhash stays valid for about
+    150 slots (~60s), so refreshing every few seconds keeps it well within
+    its lifetime. If refreshes keep failing and the cached value becomes
+    older than `max_age`, readers fetch one inline.
+    """
+
+    def __init__(self, rpc, interval=2.0, max_age=30.0, clock=time.monotonic):
+        """
+        Initialize the BlockhashCache instance.
+
+        Args:
+            rpc (SolanaRpcClient): Client used for `getLatestBlockhash`.
+            interval (float): Seconds between background refreshes.
+            max_age (float): Age in seconds after which a reader refreshes inline.
+            clock (callable): Monotonic clock; injectable for tests.
+
+        Attributes:
+            refreshes (int): Successful refreshes.
+            failures (int): Failed refreshes.
+        """
+        self.rpc = rpc
+        self.interval = interval
+        self.max_age = max_age
+        self.clock = clock
+        self.refreshes = 0
+        self.failures = 0
+        self._value = None
+        self._updated_at = None
+        self._task = None
+
+    async def start(self):
+        """Start the background refresh task; the first blockhash is fetched right away."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop refreshing."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def age(self):
+        """Seconds since the cached blockhash was fetched, or `None` before the first fetch."""
+        return None if self._updated_at is None else self.clock() - self._updated_at
+
+    async def refresh(self):
+        """Fetch the latest blockhash now."""
+        result = await self.rpc.call("getLatestBlockhash", [{"commitment": "confirmed"}])
+        value = result["value"]
+        self._value = (Hash.from_string(value["blockhash"]), value["lastValidBlockHeight"])
+        self._updated_at = self.clock()
+        self.refreshes += 1
+        return self._value
+
+    async def get(self):
+        """
+        Return the cached blockhash, fetching one only if none is fresh enough.
+
+        Returns:
+            tuple[Hash, int]: The blockhash and the last block height it is valid for.
+        """
+        age = self.age()
+        if age is None or age > self.max_age:
+            return await self.refresh()
+        return self._value
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as error:
+                self.failures += 1
+                logger.warning("Blockhash refresh failed: %s", error)
+            await asyncio.sleep(self.interval)
+
+
+class RpcNode:
+    """
+    An RPC or relay endpoint transactions are sent to, with its observed latency.
+
+    Send latency is kept in a `LatencyHistogram` per side, so buys and sells
+    can prefer different nodes. A failed send is recorded as a
+    `FAILURE_PENALTY`-second sample, which pushes the node down the ranking
+    until it has recovered for a while.
+    """
+
+    def __init__(self, name, rpc, decay_after=50):
+        """
+        Initialize the RpcNode instance.
+
+        Args:
+            name (str): Label shown in settings and stats.
+            rpc (SolanaRpcClient): Client for the endpoint.
+            decay_after (int): Samples after which old latency samples are halved in weight.
+
+        Attributes:
+            histograms (dict[str, LatencyHistogram]): Send latency per side.
+            sent (int): Transactions sent.
+            failed (int): Sends that raised.
+            landed (int): Trades this node confirmed first.
+        """
+        self.name = name
+        self.rpc = rpc
+        self.histograms = {side: LatencyHistogram(decay_after=decay_after) for side in SIDES}
+        self.sent = 0
+        self.failed = 0
+        self.landed = 0
+
+    def expected_latency(self, side):
+        """Median send latency for a side, falling back to the other side; `None` if never used."""
+        latency = self.histograms[side].percentile(0.5)
+        if latency is None:
+            other = SIDES[1 - SIDES.index(side)]
+            latency = self.histograms[other].percentile(0.5)
+        return latency
+
+    async def send(self, side, raw):
+        """Send a base64-encoded transaction and record the latency. Returns the signature."""
+        started = time.perf_counter()
+        self.sent += 1
+        try:
+            signature = await self.rpc.call(
+                "sendTransaction", [raw, {"encoding": "base64", "skipPreflight": True, "maxRetries": 0}]
+            )
+        except asyncio.CancelledError:
+            # Another node confirmed first: this one took at least this long.
+            self.histograms[side].record(time.perf_counter() - started)
+            raise
+        except Exception:
+            self.failed += 1
+            self.histograms[side].record(FAILURE_PENALTY)
+            raise
+        self.histograms[side].record(time.perf_counter() - started)
+        return signature
+
+    async def wait_confirmed(self, signature, deadline, poll_interval):
+        """
+        Poll the node until the signature is confirmed.
+
+        Raises:
+            TradeFailed: If the transaction failed on chain or the deadline passed.
+        """
+        while time.perf_counter() < deadline:
+            result = await self.rpc.call("getSignatureStatuses", [[signature]])
+            status = result["value"][0]
+            if status is not None:
+                if status.get("err") is not None:
+                    raise TradeFailed(f"Transaction {signature} failed: {status['err']}")
+                if status.get("confirmationStatus") in ("confirmed", "finalized"):
+                    return
+            await asyncio.sleep(poll_interval)
+        raise TradeFailed(f"Transaction {signature} was not confirmed in time.")
+
+
+def build_nodes(spec, client):
+    """
+    Create send nodes from a comma-separated specification.
+
+    Each entry is `name=url`, or a bare URL named after its host.
+
+    Args:
+        spec (str): e.g. `"helius=https://mainnet.helius-rpc.com/?api-key=...,public=https://api.mainnet-beta.solana.com"`.
+        client (httpx.AsyncClient): Shared HTTP client.
+
+    Returns:
+        list[RpcNode]: The configured nodes.
+    """
+    nodes = []
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        name, separator, url = entry.partition("=")
+        if not separator or "://" in name:
+            name, url = entry.split("://", 1)[-1].split("/", 1)[0], entry
+        nodes.append(RpcNode(name, SolanaRpcClient(url, client=client)))
+    return nodes
+
+
+class PreparedTransaction:
+    """
+    A signed swap transaction, ready to be sent.
+
+    Attributes:
+        side (str): `"buy"` or `"sell"`.
+        mint (str): The token traded.
+        route (SwapRoute): The route the transaction was built from.
+        transaction (VersionedTransaction): The signed transaction.
+        signature (str): Its signature, identical on every node it is sent to.
+        signed_at (float): `time.monotonic()` when it was signed.
+        priority_fee (int): Compute unit price in micro-lamports it was signed with.
+    """
+
+    __slots__ = ("side", "mint", "route", "transaction", "signature", "signed_at", "keypair", "priority_fee")
+
+    def __init__(self, side, mint, route, transaction, signed_at, keypair, priority_fee=0):
+        self.side = side
+        self.mint = mint
+        self.route = route
+        self.transaction = transaction
+        self.signature = str(transaction.signatures[0])
+        self.signed_at = signed_at
+        self.keypair = keypair
+        self.priority_fee = priority_fee
+
+
+class TradeResult:
+    """
+    A confirmed trade.
+
+    Attributes:
+        side (str): `"buy"` or `"sell"`.
+        mint (str): The token traded.
+        signature (str): The transaction signature.
+        node (str): The node that reported the confirmation first.
+        in_amount (float): SOL (buys) or tokens (sells) spent, as quoted.
+        out_amount (float): Tokens (buys) or SOL (sells) received, as quoted.
+        latency (float): Seconds from sending to confirmation.
+    """
+
+    __slots__ = ("side", "mint", "signature", "node", "in_amount", "out_amount", "latency")
+
+    def __init__(self, side, mint, signature, node, in_amount, out_amount, latency):
+        self.side = side
+        self.mint = mint
+        self.signature = signature
+        self.node = node
+        self.in_amount = in_amount
+        self.out_amount = out_amount
+        self.latency = latency
+
+
+class TradeExecutor:
+    """
+    Builds, signs and sends swap transactions.
+
+    A trade is prepared by fetching a route and compiling it into a v0
+    transaction against the `BlockhashCache`, then signed locally: no RPC
+    call is made on the hot path besides the route itself. Callers that
+    know a trade ahead of time can `prepare` it early and `send` it later;
+    a prepared transaction whose blockhash has aged out is re-signed on
+    send.
+
+    The signed bytes are sent to the `fanout` fastest nodes for the side in
+    parallel. The same transaction lands at most once, so the first node
+    to report a confirmation wins and the others are abandoned. Each send
+    feeds the node's latency histogram, which ranks the nodes for the next
+    trade (the "Buy: node" / "Sell: node" choice). Every `probe_every`
+    trades the transaction goes to every node, so the latency of nodes
+    outside the fan-out stays current.
+
+    Private trades (MEV Protect) go only to the `private_nodes`, relays
+    that forward transactions straight to the block producer instead of
+    through the public nodes, and never to a public node, not even when
+    probing. Without private nodes a private trade fails instead of being
+    sent publicly.
+    """
+
+    def __init__(self, nodes, router, blockhashes, fanout=2, priority_fee=0, confirm_timeout=30.0,
+                 poll_interval=0.4, probe_every=20, private_nodes=(), clock=time.monotonic):
+        """
+        Initialize the TradeExecutor instance.
+
+        Args:
+            nodes (list[RpcNode]): Endpoints transactions are sent to.
+            router (JupiterRouter): Provides `route(owner, side, mint, amount, slippage_bps)`.
+            blockhashes (BlockhashCache): Source of recent blockhashes.
+            fanout (int): Nodes each transaction is sent to.
+            priority_fee (int): Compute unit price in micro-lamports; no priority fee when 0.
+            confirm_timeout (float): Seconds to wait for a confirmation.
+            poll_interval (float): Seconds between two confirmation polls of a node.
+            probe_every (int): Trades between two sends to every node.
+            private_nodes (list[RpcNode]): Private relays used for private trades only.
+            clock (callable): Monotonic clock; injectable for tests.
+
+        Attributes:
+            trades (int): Trades sent.
+            confirmed (int): Trades confirmed.
+            failed (int): Trades that raised `TradeFailed`.
+
+        Example:
+            >>> executor = TradeExecutor(build_nodes(TRADE_NODES, client), JupiterRouter(rpc), BlockhashCache(rpc))
+            >>> result = await executor.trade(wallet.keypair, "buy", mint, 0.5)
+            >>> result.node, result.out_amount
+            ('helius', 18250.4)
+        """
+        if not nodes:
+            raise ValueError("At least one node is required.")
+        self.nodes = list(nodes)
+        self.private_nodes = list(private_nodes)
+        self.router = router
+        self.blockhashes = blockhashes
+        self.fanout = fanout
+        self.priority_fee = priority_fee
+        self.confirm_timeout = confirm_timeout
+        self.poll_interval = poll_interval
+        self.probe_every = probe_every
+        self.clock = clock
+        self.trades = 0
+        self.confirmed = 0
+        self.failed = 0
+        self._broadcasts = 0
+
+    def ranked_nodes(self, side, private=False):
+        """
+        Return the nodes fastest first for a side.
+
+        Nodes that have never been used rank first so that they get measured.
+
+        Args:
+            side (str): `"buy"` or `"sell"`.
+            private (bool): Rank the private relays instead of the public nodes.
+        """
+        nodes = self.private_nodes if private else self.nodes
+        return sorted(nodes, key=lambda node: node.expected_latency(side) or 0.0)
+
+    def _require_private_nodes(self, private):
+        if private and not self.private_nodes:
+            raise TradeFailed("MEV Protect is on, but this bot has no private relay to send through.")
+
+    def pick_node(self, side):
+        """Return the node currently preferred for a side."""
+        return self.ranked_nodes(side)[0]
+
+    async def prepare(self, keypair, side, mint, amount, slippage_bps=None, priority_fee=None):
+        """
+        Build and sign a swap transaction without sending it.
+
+        Args:
+            keypair (Keypair): The wallet trading; also pays the fees.
+            side (str): `"buy"` or `"sell"`.
+            mint (str): The token traded.
+            amount (float): SOL to spend for buys, tokens to sell for sells.
+            slippage_bps (int or None): Allowed slippage; `DEFAULT_SLIPPAGE_BPS` for the side when omitted.
+            priority_fee (int or None): Compute unit price in micro-lamports; the executor's `priority_fee` when omitted.
+
+        Returns:
+            PreparedTransaction: The signed transaction.
+        """
+        slippage_bps = DEFAULT_SLIPPAGE_BPS[side] if slippage_bps is None else slippage_bps
+        priority_fee = self.priority_fee if priority_fee is None else priority_fee
+        route, (blockhash, _) = await asyncio.gather(
+            self.router.route(keypair.pubkey(), side, mint, amount, slippage_bps),
+            self.blockhashes.get(),
+        )
+        transaction = self._sign(keypair, route, blockhash, priority_fee)
+        return PreparedTransaction(side, mint, route, transaction, self.clock(), keypair, priority_fee)
+
+    def _sign(self, keypair, route, blockhash, priority_fee):
+        instructions = list(route.instructions)
+        if priority_fee:
+            instructions.insert(0, set_compute_unit_price(priority_fee))
+        message = MessageV0.try_compile(keypair.pubkey(), instructions, route.lookup_tables, blockhash)
+        return VersionedTransaction(message, [keypair])
+
+    async def send(self, prepared, private=False):
+        """
+        Send a prepared transaction to the fastest nodes and wait for the first confirmation.
+
+        Args:
+            prepared (PreparedTransaction): The transaction to send.
+            private (bool): Send only to the private relays.
+
+        Returns:
+            TradeResult: The confirmed trade.
+
+        Raises:
+            TradeFailed: If every node failed or nothing confirmed within `confirm_timeout`.
+        """
+        if self.clock() - prepared.signed_at > self.blockhashes.max_age:
+            blockhash, _ = await self.blockhashes.get()
+            prepared.transaction = self._sign(prepared.keypair, prepared.route, blockhash, prepared.priority_fee)
+            prepared.signature = str(prepared.transaction.signatures[0])
+            prepared.signed_at = self.clock()
+
+        self.trades += 1
+        started = time.perf_counter()
+        try:
+            node = await self.broadcast(prepared.transaction, prepared.side, private)
+        except TradeFailed:
+            self.failed += 1
+            raise
+        self.confirmed += 1
+        route = prepared.route
+        return TradeResult(
+            prepared.side, prepared.mint, prepared.signature, node.name,
+            route.in_amount, route.out_amount, time.perf_counter() - started,
+        )
+
+    async def broadcast(self, transaction, side, private=False):
+        """
+        Send a signed transaction to the fastest nodes for a side and wait for the first confirmation.
+
+        Args:
+            transaction (VersionedTransaction): The signed transaction.
+            side (str): `"buy"` or `"sell"`; selects the latency ranking used and updated.
+            private (bool): Send only to the private relays.
+
+        Returns:
+            RpcNode: The node that reported the confirmation first.
+
+        Raises:
+            TradeFailed: If every node failed, nothing confirmed within `confirm_timeout`,
+                         or the trade is private and there is no private relay.
+        """
+        self._require_private_nodes(private)
+        self._broadcasts += 1
+        ranked = self.ranked_nodes(side, private)
+        targets = ranked if self._broadcasts % self.probe_every == 0 else ranked[:self.fanout]
+        signature = str(transaction.signatures[0])
+        raw = base64.b64encode(bytes(transaction)).decode()
+        deadline = time.perf_counter() + self.confirm_timeout
+
+        async def submit(node):
+            await node.send(side, raw)
+            await node.wait_confirmed(signature, deadline, self.poll_interval)
+            return node
+
+        pending = {asyncio.ensure_future(submit(node)) for node in targets}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        node = task.result()
+                        node.landed += 1
+                        return node
+                    error = task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+        if isinstance(error, TradeFailed):
+            raise error
+        raise TradeFailed(f"Every node rejected {signature}: {error}")
+
+    async def trade(self, keypair, side, mint, amount, slippage_bps=None, priority_fee=None, private=False):
+        """Prepare and send a swap. See `prepare` and `send`."""
+        # Fail before fetching a route that could never be sent.
+        self._require_private_nodes(private)
+        return await self.send(await self.prepare(keypair, side, mint, amount, slippage_bps, priority_fee), private)
+
+    def stats(self):
+        """
+        Return trade counters and per-node latency.
+
+        Returns:
+            dict: Trade counters, blockhash refreshes and, per node, sends,
+                  failures, confirmations won and p50/p99 send latency per side.
+        """
+        return {
+            "trades": self.trades,
+            "confirmed": self.confirmed,
+            "failed": self.failed,
+            "blockhash_refreshes": self.blockhashes.refreshes,
+            "nodes": {
+                node.name: {
+                    "sent": node.sent,
+                    "failed": node.failed,
+                    "landed": node.landed,
+                    **{
+                        f"{side}_{name}": node.histograms[side].percentile(fraction)
+                        for side in SIDES
+                        for name, fraction in (("p50", 0.5), ("p99", 0.99))
+                    },
+                }
+                for node in self.nodes + self.private_nodes
+            },
+        }
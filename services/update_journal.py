@@ -0,0 +1,457 @@
+import asyncio
+import json
+import logging
+import os
+import struct
+import time
+import zlib
+from collections import OrderedDict, deque
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+from telegram.request import HTTPXRequest
+
+logger = logging.getLogger(__name__)
+
+# Record header: kind, CRC-32 of the update id and payload, update id, payload length.
+RECORD_HEADER = struct.Struct("<BIqI")
+RECORD_ID = struct.Struct("<q")
+ACCEPTED = 1
+COMPLETED = 2
+
+SEGMENT_SUFFIX = ".journal"
+
+
+def _checksum(update_id, payload):
+    return zlib.crc32(payload, zlib.crc32(RECORD_ID.pack(update_id)))
+
+
+class UpdateJournal:
+    """
+    Append-only journal of incoming updates, kept in segment files on local disk.
+
+    Every update is appended as an `ACCEPTED` record holding its JSON before
+    it is dispatched, and a small `COMPLETED` record is appended once its
+    handler finished. Records are written with a single unbuffered `write`,
+    so they survive a crash or a redeploy of the process as soon as the call
+    returns; `os.fsync` runs at most every `sync_interval` seconds to also
+    survive a power loss.
+
+    The journal rolls over to a new segment file every `segment_size` bytes.
+    The oldest segments are deleted as soon as every update they accepted
+    has completed, so the directory only holds the recent past plus
+    whatever is still in flight. Opening the journal scans the segments,
+    cuts off a record torn by a crash mid-write (detected by length and
+    checksum) and returns the updates that never completed.
+    """
+
+    def __init__(self, directory, segment_size=16 * 1024 * 1024, sync_interval=1.0, dedup_window=100000,
+                 clock=time.monotonic):
+        """
+        Initialize the UpdateJournal instance.
+
+        Args:
+            directory (str): Directory holding the segment files; created if missing.
+            segment_size (int): Bytes after which the journal rolls over to a new segment.
+            sync_interval (float): Seconds between fsyncs; `0` fsyncs every record.
+            dedup_window (int): Number of recent update ids remembered to drop redelivered updates.
+            clock (callable): Monotonic clock; injectable for tests.
+
+        Attributes:
+            appended (int): Updates journaled.
+            completed (int): Updates marked completed.
+            duplicates (int): Updates dropped because their id was journaled before.
+            syncs (int): fsync calls.
+            truncated (int): Torn records cut off when opening the journal.
+
+        Example:
+            >>> journal = UpdateJournal("journal")
+            >>> unfinished = journal.open()
+            >>> journal.append(update.update_id, payload)
+            >>> journal.complete(update.update_id)
+        """
+        self.directory = directory
+        self.segment_size = segment_size
+        self.sync_interval = sync_interval
+        self.dedup_window = dedup_window
+        self.clock = clock
+        self.appended = 0
+        self.completed = 0
+        self.duplicates = 0
+        self.syncs = 0
+        self.truncated = 0
+        self._fd = None
+        self._segment = 0
+        self._size = 0
+        self._last_sync = 0.0
+        self._dirty = False
+        self._pending = OrderedDict()
+        self._segment_pending = {}
+        self._segments = deque()
+        self._recent = set()
+        self._recent_order = deque()
+
+    def _path(self, segment):
+        return os.path.join(self.directory, f"{segment:010d}{SEGMENT_SUFFIX}")
+
+    def _list_segments(self):
+        return sorted(
+            int(name[:-len(SEGMENT_SUFFIX)]) for name in os.listdir(self.directory)
+            if name.endswith(SEGMENT_SUFFIX) and name[:-len(SEGMENT_SUFFIX)].isdigit()
+        )
+
+    def open(self):
+        """
+        Open the journal for appending and recover the state of the previous run.
+
+        Returns:
+            list[tuple[int, bytes]]: The `(update_id, payload)` of every update that was
+                                     journaled but never completed, oldest first.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        segments = self._list_segments()
+        for segment in segments:
+            self._load(segment)
+        self._segments = deque(segments or [1])
+        self._segment = self._segments[-1]
+        self._fd = os.open(self._path(self._segment), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        self._size = os.fstat(self._fd).st_size
+        self._last_sync = self.clock()
+        self._trim()
+        return [(update_id, payload) for update_id, (_, payload) in self._pending.items()]
+
+    def _load(self, segment):
+        path = self._path(segment)
+        with open(path, "rb") as file:
+            data = file.read()
+        offset = 0
+        while offset + RECORD_HEADER.size <= len(data):
+            kind, checksum, update_id, length = RECORD_HEADER.unpack_from(data, offset)
+            start = offset + RECORD_HEADER.size
+            payload = data[start:start + length]
+            if len(payload) < length or _checksum(update_id, payload) != checksum:
+                break
+            if kind == ACCEPTED:
+                self._pending[update_id] = (segment, payload)
+                self._segment_pending[segment] = self._segment_pending.get(segment, 0) + 1
+                self._remember(update_id)
+            elif kind == COMPLETED:
+                self._forget(update_id)
+            offset = start + length
+        if offset < len(data):
+            # The process died in the middle of a write; drop the torn record.
+            self.truncated += 1
+            logger.warning("Truncating torn record at byte %d of %s", offset, path)
+            with open(path, "r+b") as file:
+                file.truncate(offset)
+
+    def _remember(self, update_id):
+        self._recent.add(update_id)
+        self._recent_order.append(update_id)
+        if len(self._recent_order) > self.dedup_window:
+            self._recent.discard(self._recent_order.popleft())
+
+    def _forget(self, update_id):
+        entry = self._pending.pop(update_id, None)
+        if entry is None:
+            return None
+        segment = entry[0]
+        self._segment_pending[segment] -= 1
+        if not self._segment_pending[segment]:
+            del self._segment_pending[segment]
+        return segment
+
+    def __contains__(self, update_id):
+        return update_id in self._recent
+
+    def append(self, update_id, payload):
+        """
+        Journal an update before it is dispatched.
+
+        Args:
+            update_id (int): The update's id.
+            payload (bytes): The update's JSON.
+
+        Returns:
+            bool: `False` if the update was journaled before (a redelivery) and was not appended.
+        """
+        if update_id in self._recent:
+            self.duplicates += 1
+            return False
+        self._write(ACCEPTED, update_id, payload)
+        self._pending[update_id] = (self._segment, payload)
+        self._segment_pending[self._segment] = self._segment_pending.get(self._segment, 0) + 1
+        self._remember(update_id)
+        self.appended += 1
+        return True
+
+    def complete(self, update_id):
+        """Record that the handler of a journaled update finished."""
+        segment = self._forget(update_id)
+        if segment is None:
+            return
+        self._write(COMPLETED, update_id, b"")
+        self.completed += 1
+        if segment == self._segments[0]:
+            self._trim()
+
+    def _trim(self):
+        # Only a prefix is deleted: a later segment may hold the completions of updates in an earlier one.
+        while len(self._segments) > 1 and not self._segment_pending.get(self._segments[0]):
+            os.remove(self._path(self._segments.popleft()))
+
+    def _write(self, kind, update_id, payload):
+        if self._size >= self.segment_size:
+            self._roll()
+        os.write(self._fd, RECORD_HEADER.pack(kind, _checksum(update_id, payload), update_id, len(payload)) + payload)
+        self._size += RECORD_HEADER.size + len(payload)
+        self._dirty = True
+        now = self.clock()
+        if now - self._last_sync >= self.sync_interval:
+            self.sync(now)
+
+    def sync(self, now=None):
+        """Flush the active segment to disk."""
+        if self._fd is None or not self._dirty:
+            return
+        os.fsync(self._fd)
+        self.syncs += 1
+        self._dirty = False
+        self._last_sync = self.clock() if now is None else now
+
+    def _roll(self):
+        self.sync()
+        os.close(self._fd)
+        self._segment += 1
+        self._segments.append(self._segment)
+        self._fd = os.open(self._path(self._segment), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        self._size = 0
+        self._trim()
+
+    def close(self):
+        """Flush and close the active segment."""
+        if self._fd is None:
+            return
+        self.sync()
+        os.close(self._fd)
+        self._fd = None
+
+    def stats(self):
+        """
+        Return journal counters.
+
+        Returns:
+            dict: Pending updates, updates appended and completed, duplicates dropped,
+                  segment files, fsyncs and torn records truncated.
+        """
+        return {
+            "pending": len(self._pending),
+            "appended": self.appended,
+            "completed": self.completed,
+            "duplicates": self.duplicates,
+            "segments": len(self._segments),
+            "syncs": self.syncs,
+            "truncated": self.truncated,
+        }
+
+
+class UpdateQueue(asyncio.Queue):
+    """
+    `Application.update_queue` that bounds unfinished updates and optionally journals them.
+
+    Updates put on the queue by the `Updater` (polling) or the webhook
+    server count as unfinished until `complete()` is called for them, which
+    `JournalUpdateProcessor` does when their handler returns. Once
+    `max_pending` updates are unfinished, `put` waits for one to finish:
+    polling stops fetching and the webhook stops answering, so a burst stays
+    queued at Telegram instead of growing this process's memory and latency.
+
+    With a `journal`, each update is appended to it before it is queued,
+    updates whose id was journaled before (redeliveries after a crash) are
+    dropped, and `open()` queues the updates a crashed run left unfinished.
+    Serializing an `Update` back to JSON costs more than the rest of the
+    journaling together, so the raw JSON is journaled where it is at hand:
+    the webhook passes the request body to `received()`, and polling reads
+    it off the `getUpdates` response through `UpdatesRequest`.
+    """
+
+    def __init__(self, journal=None, max_pending=1000):
+        """
+        Initialize the UpdateQueue instance.
+
+        Args:
+            journal (UpdateJournal or None): Makes updates survive a crash; nothing is written when omitted.
+            max_pending (int): Unfinished updates after which `put` waits.
+
+        Attributes:
+            accepted (int): Updates queued.
+            duplicates (int): Redelivered updates dropped.
+            throttled (int): `put` calls that had to wait for room.
+            replayed (int): Unfinished updates of the previous run queued again.
+
+        Example:
+            >>> updates = UpdateQueue(UpdateJournal("journal"), max_pending=1000)
+            >>> builder.update_queue(updates).concurrent_updates(JournalUpdateProcessor(updates, 256))
+        """
+        super().__init__()
+        self.journal = journal
+        self.max_pending = max_pending
+        self.accepted = 0
+        self.duplicates = 0
+        self.throttled = 0
+        self.replayed = 0
+        self._unfinished = set()
+        self._raw = {}
+        self._room = asyncio.Event()
+
+    def open(self, bot):
+        """
+        Open the journal and queue the updates the previous run left unfinished.
+
+        Must be called before updates arrive, e.g. in `post_init`.
+
+        Args:
+            bot (telegram.Bot): Bot the replayed updates are bound to.
+
+        Returns:
+            int: The number of updates replayed.
+        """
+        if self.journal is None:
+            return 0
+        for update_id, payload in self.journal.open():
+            try:
+                update = Update.de_json(json.loads(payload), bot)
+            except (ValueError, KeyError, TypeError) as error:
+                logger.warning("Dropping unreadable journaled update %s: %s", update_id, error)
+                self.journal.complete(update_id)
+                continue
+            # Queued past `max_pending`: nothing is processing yet to make room.
+            self._unfinished.add(update_id)
+            self.put_nowait(update)
+            self.replayed += 1
+        if self.replayed:
+            logger.info("Replaying %d updates left unfinished by the previous run", self.replayed)
+        return self.replayed
+
+    def close(self):
+        self._raw.clear()
+        if self.journal is not None:
+            self.journal.close()
+
+    def received(self, updates):
+        """Hand over the raw JSON of updates about to be put on the queue, to journal it as is."""
+        if self.journal is not None:
+            for data in updates:
+                self._raw[data["update_id"]] = data
+
+    def _payload(self, update):
+        data = self._raw.pop(update.update_id, None)
+        if data is None:
+            return update.to_json().encode()
+        return json.dumps(data, separators=(",", ":")).encode()
+
+    async def put(self, item):
+        if isinstance(item, Update) and not await self._accept(item):
+            return
+        await super().put(item)
+
+    def _duplicate(self, update_id):
+        return update_id in self._unfinished or (self.journal is not None and update_id in self.journal)
+
+    async def _accept(self, update):
+        update_id = update.update_id
+        throttled = False
+        # Duplicates are dropped before waiting: a redelivery must not wait for room it would not use.
+        while not self._duplicate(update_id):
+            if len(self._unfinished) < self.max_pending:
+                if self.journal is not None:
+                    self.journal.append(update_id, self._payload(update))
+                self._unfinished.add(update_id)
+                self.accepted += 1
+                return True
+            if not throttled:
+                self.throttled += 1
+                throttled = True
+            self._room.clear()
+            await self._room.wait()
+        self._raw.pop(update_id, None)
+        self.duplicates += 1
+        return False
+
+    def complete(self, update):
+        """Mark an update's handler as finished, making room for the next `put`."""
+        if not isinstance(update, Update) or update.update_id not in self._unfinished:
+            return
+        self._unfinished.discard(update.update_id)
+        if self.journal is not None:
+            self.journal.complete(update.update_id)
+        if len(self._unfinished) < self.max_pending:
+            self._room.set()
+
+    def stats(self):
+        """
+        Return backpressure and journal counters.
+
+        Returns:
+            dict: Unfinished updates, updates queued, duplicates dropped, throttled puts and
+                  replayed updates, plus the journal's segments, fsyncs and torn records.
+        """
+        stats = {
+            "unfinished": len(self._unfinished),
+            "queued": self.qsize(),
+            "accepted": self.accepted,
+            "duplicates": self.duplicates,
+            "throttled": self.throttled,
+            "replayed": self.replayed,
+        }
+        if self.journal is not None:
+            journal = self.journal.stats()
+            stats.update(segments=journal["segments"], syncs=journal["syncs"], truncated=journal["truncated"])
+        return stats
+
+
+class UpdatesRequest(HTTPXRequest):
+    """
+    `getUpdates` request backend that hands the raw JSON of polled updates to an `UpdateQueue`.
+
+    Pass it to `ApplicationBuilder.get_updates_request()`; it accepts the
+    keyword arguments of `HTTPXRequest`.
+    """
+
+    def __init__(self, update_queue, **kwargs):
+        super().__init__(**kwargs)
+        self.update_queue = update_queue
+
+    async def post(self, url, request_data=None, **kwargs):
+        result = await super().post(url, request_data, **kwargs)
+        if isinstance(result, list) and url.endswith("/getUpdates"):
+            self.update_queue.received(result)
+        return result
+
+
+class JournalUpdateProcessor(BaseUpdateProcessor):
+    """
+    Update processor that reports finished handlers to an `UpdateQueue`.
+
+    Runs up to `max_concurrent_updates` handlers at once, like PTB's
+    `SimpleUpdateProcessor`. A handler that returns or raises completes its
+    update; one cancelled by a shutdown leaves it unfinished, so a journaled
+    update is replayed on the next start.
+    """
+
+    def __init__(self, queue, max_concurrent_updates):
+        super().__init__(max_concurrent_updates)
+        self.queue = queue
+
+    async def do_process_update(self, update, coroutine):
+        try:
+            await coroutine
+        finally:
+            if not asyncio.current_task().cancelling():
+                self.queue.complete(update)
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
@@ -0,0 +1,295 @@
+import asyncio
+import time
+
+from telegram.helpers import escape_markdown
+
+from utils.solana_keygen import SolanaKeyGenerator
+
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+
+class VanityError(Exception):
+    """Raised when a vanity search cannot be started or did not finish in time."""
+
+
+def parse_pattern(text, max_length=6):
+    """
+    Parse a vanity pattern typed by a user.
+
+    The pattern is a prefix, optionally followed by `*` and a suffix
+    (`Bloom`, `*pump`, `ab*cd`). A leading `-i` makes the match
+    case-insensitive.
+
+    Args:
+        text (str): The pattern, e.g. `"-i bloom*x"`.
+        max_length (int): Maximum number of characters in prefix and suffix together.
+
+    Returns:
+        tuple[str, str, bool]: The prefix, the suffix and whether case is ignored.
+
+    Raises:
+        ValueError: If the pattern is empty, too long or not base58. The message is Markdown,
+                    shown to the user as is.
+    """
+    parts = text.split()
+    ignore_case = "-i" in parts
+    pattern = "".join(part for part in parts if part != "-i")
+    prefix, _, suffix = pattern.partition("*")
+    if not prefix and not suffix:
+        raise ValueError("Send a prefix, a suffix or both, e.g. `Bloom`, `*pump` or `ab*cd`.")
+    if len(prefix) + len(suffix) > max_length:
+        raise ValueError(f"Patterns are limited to {max_length} characters.")
+    for character in prefix + suffix:
+        if variants(character, ignore_case) == 0:
+            raise ValueError(f"'{escape_markdown(character)}' never appears in a Solana address (no 0, O, I or l).")
+    return prefix, suffix, ignore_case
+
+
+def variants(character, ignore_case):
+    """Return how many base58 characters match `character`."""
+    if not ignore_case:
+        return 1 if character in BASE58_ALPHABET else 0
+    return sum(1 for candidate in BASE58_ALPHABET if candidate.lower() == character.lower())
+
+
+def expected_attempts(prefix, suffix, ignore_case):
+    """
+    Estimate the number of keypairs to generate before one matches.
+
+    Every position of an address is treated as a uniform base58 character;
+    the first character of real addresses is skewed towards low digits, so
+    prefixes starting with a late letter take longer than estimated.
+    """
+    attempts = 1.0
+    for character in prefix + suffix:
+        attempts *= len(BASE58_ALPHABET) / variants(character, ignore_case)
+    return attempts
+
+
+def grind_batch(prefix, suffix, ignore_case, count):
+    """
+    Generate up to `count` keypairs and return the first whose address matches.
+
+    This function is executed inside an executor worker, so it only takes and
+    returns plain values that can be pickled across processes.
+
+    Args:
+        prefix (str): Required start of the address.
+        suffix (str): Required end of the address.
+        ignore_case (bool): Whether letters match regardless of case.
+        count (int): Number of keypairs to try.
+
+    Returns:
+        tuple[tuple[str, str] or None, int]: The matching `(public_key, private_key_base58)`
+                                             or `None`, and the number of keypairs tried.
+    """
+    if ignore_case:
+        prefix, suffix = prefix.lower(), suffix.lower()
+    generator = SolanaKeyGenerator()
+    for attempt in range(1, count + 1):
+        address = generator.generate_new_keypair().public_key
+        if ignore_case:
+            address = address.lower()
+        if address.startswith(prefix) and address.endswith(suffix):
+            return (generator.public_key, generator.private_key_base58), attempt
+    return None, count
+
+
+class VanityJob:
+    """
+    A running vanity search of one user.
+
+    Attributes:
+        user_id (int): Telegram user id of the requester.
+        prefix (str): Required start of the address.
+        suffix (str): Required end of the address.
+        ignore_case (bool): Whether letters match regardless of case.
+        expected (float): Estimated keypairs to try, see `expected_attempts`.
+        attempts (int): Keypairs tried so far.
+        started (float): `time.monotonic()` when the search started.
+        task (asyncio.Task or None): Resolves to the `(public_key, private_key_base58)` found.
+    """
+
+    __slots__ = ("user_id", "prefix", "suffix", "ignore_case", "expected", "attempts", "started", "task")
+
+    def __init__(self, user_id, prefix, suffix, ignore_case):
+        self.user_id = user_id
+        self.prefix = prefix
+        self.suffix = suffix
+        self.ignore_case = ignore_case
+        self.expected = expected_attempts(prefix, suffix, ignore_case)
+        self.attempts = 0
+        self.started = time.monotonic()
+        self.task = None
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def rate(self):
+        """Keypairs tried per second."""
+        elapsed = self.elapsed
+        return self.attempts / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def pattern(self):
+        return f"{self.prefix}…{self.suffix}" if self.suffix else f"{self.prefix}…"
+
+
+class VanityGrinder:
+    """
+    Searches for wallets whose address starts or ends with a chosen pattern.
+
+    Each search keeps one batch of `batch_size` keypairs per worker in flight
+    on an executor (a process pool using every core in production), so the
+    event loop only waits on futures and other users' handlers are never
+    blocked. Batches are short, so a search stops within one batch of being
+    cancelled or timing out. At most one search runs per user and at most
+    `max_jobs` at once; concurrent searches share the workers.
+    """
+
+    def __init__(self, executor=None, workers=1, batch_size=5000, max_jobs=2, max_length=6, timeout=600.0,
+                 progress_interval=2.0):
+        """
+        Initialize the VanityGrinder instance.
+
+        Args:
+            executor (concurrent.futures.Executor or None): Executor running `grind_batch`.
+                                                            `None` uses the loop's default executor.
+            workers (int): Batches each search keeps in flight, normally the executor's worker count.
+            batch_size (int): Keypairs tried per executor job.
+            max_jobs (int): Searches allowed to run at the same time.
+            max_length (int): Maximum pattern length accepted by `parse_pattern`.
+            timeout (float): Seconds after which a search gives up.
+            progress_interval (float): Seconds between two progress callbacks.
+
+        Attributes:
+            found (int): Searches that found an address.
+            timed_out (int): Searches that gave up after `timeout`.
+            cancelled (int): Searches cancelled by their user.
+            attempts (int): Keypairs tried by every search.
+
+        Example:
+            >>> grinder = VanityGrinder(ProcessPoolExecutor(), workers=os.cpu_count())
+            >>> job = grinder.start(user_id, "Bl", "", ignore_case=True)
+            >>> public_key, private_key = await job.task
+        """
+        self.executor = executor
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_jobs = max_jobs
+        self.max_length = max_length
+        self.timeout = timeout
+        self.progress_interval = progress_interval
+        self.found = 0
+        self.timed_out = 0
+        self.cancelled = 0
+        self.attempts = 0
+        self._jobs = {}
+
+    def parse(self, text):
+        """Parse a pattern with this grinder's length limit, see `parse_pattern`."""
+        return parse_pattern(text, self.max_length)
+
+    def job(self, user_id):
+        """Return the running search of a user, or `None`."""
+        return self._jobs.get(user_id)
+
+    def start(self, user_id, prefix, suffix="", ignore_case=False, on_progress=None):
+        """
+        Start a search for a user.
+
+        Args:
+            user_id (int): Telegram user id of the requester.
+            prefix (str): Required start of the address.
+            suffix (str): Required end of the address.
+            ignore_case (bool): Whether letters match regardless of case.
+            on_progress (callable or None): Async `on_progress(job)` called every
+                                            `progress_interval` seconds while the search runs.
+
+        Returns:
+            VanityJob: The search; await `job.task` for the result.
+
+        Raises:
+            VanityError: If the user already has a search or too many are running.
+        """
+        if user_id in self._jobs:
+            raise VanityError("You already have a vanity search running.")
+        if len(self._jobs) >= self.max_jobs:
+            raise VanityError("All vanity workers are busy, please try again in a few minutes.")
+        job = VanityJob(user_id, prefix, suffix, ignore_case)
+        self._jobs[user_id] = job
+        job.task = asyncio.create_task(self._grind(job, on_progress))
+        job.task.add_done_callback(lambda _: self._jobs.pop(user_id, None))
+        return job
+
+    def cancel(self, user_id):
+        """Cancel the search of a user; return whether one was running."""
+        job = self._jobs.pop(user_id, None)
+        if job is None:
+            return False
+        job.task.cancel()
+        self.cancelled += 1
+        return True
+
+    async def stop(self):
+        """Cancel every running search."""
+        tasks = [job.task for job in self._jobs.values()]
+        self._jobs.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _grind(self, job, on_progress):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        next_progress = loop.time() + self.progress_interval
+        progress = None
+        in_flight = set()
+        try:
+            while True:
+                while len(in_flight) < self.workers:
+                    in_flight.add(loop.run_in_executor(
+                        self.executor, grind_batch, job.prefix, job.suffix, job.ignore_case, self.batch_size
+                    ))
+                done, in_flight = await asyncio.wait(
+                    in_flight, timeout=max(0.0, min(next_progress, deadline) - loop.time()),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for future in done:
+                    match, tried = future.result()
+                    job.attempts += tried
+                    self.attempts += tried
+                    if match is not None:
+                        self.found += 1
+                        return match
+                now = loop.time()
+                if now >= deadline:
+                    self.timed_out += 1
+                    raise VanityError(f"No address matching {job.pattern} was found within {self.timeout:.0f}s.")
+                if now >= next_progress:
+                    next_progress = now + self.progress_interval
+                    # A slow progress report is skipped rather than queued behind the search.
+                    if on_progress is not None and (progress is None or progress.done()):
+                        progress = asyncio.create_task(on_progress(job))
+        finally:
+            for future in in_flight:
+                future.cancel()
+            if progress is not None and not progress.done():
+                progress.cancel()
+
+    def stats(self):
+        """
+        Return search counters.
+
+        Returns:
+            dict: Running searches, outcomes so far and keypairs tried.
+        """
+        return {
+            "running": len(self._jobs),
+            "found": self.found,
+            "timed_out": self.timed_out,
+            "cancelled": self.cancelled,
+            "attempts": self.attempts,
+        }
@@ -0,0 +1,148 @@
+import asyncio
+from datetime import datetime, timezone
+
+from pymongo import ReturnDocument
+
+from utils.cache import LRUCache
+from utils.solana_keygen import SolanaKeyGenerator, generate_solana_wallet
+
+
+class Wallet:
+    """
+    A single user's Solana wallet as held in the wallet cache.
+
+    The public key is kept as a ready-made string because it is rendered on
+    almost every dashboard. The `Keypair` is only decoded from the stored
+    base58 private key the first time it is needed and then kept on the entry,
+    so a cached user never pays for base58 decoding twice.
+    """
+
+    __slots__ = ("user_id", "public_key", "private_key", "_keypair")
+
+    def __init__(self, user_id, public_key, private_key, keypair=None):
+        self.user_id = user_id
+        self.public_key = public_key
+        self.private_key = private_key
+        self._keypair = keypair
+
+    @property
+    def keypair(self):
+        """
+        Retrieve the decoded `solders.keypair.Keypair` for this wallet.
+
+        Returns:
+            Keypair: The wallet keypair, decoded on first access.
+        """
+        if self._keypair is None:
+            self._keypair = SolanaKeyGenerator().load_private_key_base58(self.private_key).keypair
+        return self._keypair
+
+
+class WalletStore:
+    """
+    Per-user wallet repository backed by MongoDB.
+
+    Every Telegram user owns exactly one wallet document, keyed by their user
+    id. A bounded LRU cache of `Wallet` entries sits in front of the
+    collection so that users who are actively pressing buttons are served
+    from memory, while the total number of cached wallets stays capped.
+    Database access runs in a worker thread so a cache miss never blocks the
+    event loop. New wallets are taken from a `KeypairPool` when one is
+    configured, so onboarding a user costs a deque pop instead of a keypair
+    generation.
+    """
+
+    def __init__(self, collection, cache_size=10000, keypair_pool=None):
+        """
+        Initialize the WalletStore instance.
+
+        Args:
+            collection (pymongo.collection.Collection): The collection holding wallet documents.
+            cache_size (int): Maximum number of wallets kept in the in-memory LRU cache.
+            keypair_pool (KeypairPool or None): Source of pre-generated wallets for new users.
+                                                Wallets are generated inline when omitted.
+
+        Attributes:
+            collection (pymongo.collection.Collection): The backing collection.
+            cache (LRUCache): Cache of `Wallet` entries keyed by Telegram user id.
+
+        Example:
+            >>> store = WalletStore(MongoClient()["bloom"]["wallets"])
+            >>> wallet = await store.get_wallet(12345)
+            >>> wallet.public_key
+            '3n3f5gFWzQmr1BRkgLXZWzFzK9V1NcXTujHobkrPXjwa'
+        """
+        self.collection = collection
+        self.cache = LRUCache(cache_size)
+        self.keypair_pool = keypair_pool
+
+    def ensure_indexes(self):
+        """Create the unique index on `user_id` that the upsert logic relies on."""
+        self.collection.create_index("user_id", unique=True)
+
+    async def get_wallet(self, user_id):
+        """
+        Return the wallet for a Telegram user, creating it on first use.
+
+        Args:
+            user_id (int): The Telegram user id.
+
+        Returns:
+            Wallet: The user's wallet.
+        """
+        wallet = self.cache.get(user_id)
+        if wallet is None:
+            wallet = await asyncio.to_thread(self._load, user_id)
+            if wallet is None:
+                wallet = await self._create(user_id)
+            self.cache.set(user_id, wallet)
+        return wallet
+
+    async def public_key(self, user_id):
+        """
+        Return the base58 wallet address for a Telegram user.
+
+        Args:
+            user_id (int): The Telegram user id.
+
+        Returns:
+            str: The base58-encoded public key.
+        """
+        wallet = await self.get_wallet(user_id)
+        return wallet.public_key
+
+    def _load(self, user_id):
+        document = self.collection.find_one({"user_id": user_id})
+        if document is None:
+            return None
+        return Wallet(user_id, document["public_key"], document["private_key"])
+
+    async def _create(self, user_id):
+        if self.keypair_pool is not None:
+            public_key, private_key = self.keypair_pool.pop()
+            keypair = None
+        else:
+            generator = generate_solana_wallet()
+            public_key, private_key, keypair = generator.public_key, generator.private_key_base58, generator.keypair
+
+        document = await asyncio.to_thread(self._insert, user_id, public_key, private_key)
+        if document["public_key"] != public_key:
+            return Wallet(user_id, document["public_key"], document["private_key"])
+        return Wallet(user_id, public_key, private_key, keypair)
+
+    def _insert(self, user_id, public_key, private_key):
+        # `$setOnInsert` makes concurrent first requests for the same user agree
+        # on a single wallet: whichever upsert lands first wins.
+        return self.collection.find_one_and_update(
+            {"user_id": user_id},
+            {
+                "$setOnInsert": {
+                    "user_id": user_id,
+                    "public_key": public_key,
+                    "private_key": private_key,
+                    "created_at": datetime.now(timezone.utc),
+                }
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
@@ -0,0 +1,296 @@
+import asyncio
+import itertools
+import json
+import time
+from datetime import datetime, timezone
+
+import base58
+from pymongo.errors import BulkWriteError
+from solders.keypair import Keypair
+
+# MongoDB error code of a unique index violation.
+DUPLICATE_KEY = 11000
+
+
+def decode_private_key(text):
+    """
+    Decode and validate one private key.
+
+    Accepted formats are a base58 32-byte seed (what the bot stores), a
+    base58 64-byte secret key (what wallet apps export) and a JSON byte
+    array (what `solana-keygen` writes). A line exported by `WalletVault`,
+    `public_key,private_key`, is accepted too.
+
+    Args:
+        text (str): The key, without surrounding whitespace.
+
+    Returns:
+        Keypair: The validated keypair.
+
+    Raises:
+        ValueError: If the text is not a valid private key.
+    """
+    if text.startswith("["):
+        secret = bytes(json.loads(text))
+    else:
+        secret = base58.b58decode(text.rsplit(",", 1)[-1].strip())
+    if len(secret) == 32:
+        return Keypair.from_seed(secret)
+    if len(secret) == 64:
+        # Rejects secret keys whose public half does not belong to the seed.
+        return Keypair.from_bytes(secret)
+    raise ValueError(f"expected 32 or 64 bytes, got {len(secret)}")
+
+
+def decode_batch(lines):
+    """
+    Decode a batch of key lines.
+
+    This function is executed inside an executor worker, so it only takes and
+    returns plain values that can be pickled across processes. Blank lines and
+    lines starting with `#` are skipped.
+
+    Args:
+        lines (list[str]): Lines of an uploaded key file.
+
+    Returns:
+        tuple[list[tuple[str, str]], int]: `(public_key, private_key_base58)` pairs
+                                           and the number of invalid lines.
+    """
+    wallets = []
+    invalid = 0
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            keypair = decode_private_key(line)
+        except (TypeError, ValueError):
+            invalid += 1
+            continue
+        wallets.append((str(keypair.pubkey()), base58.b58encode(keypair.secret()).decode("ascii")))
+    return wallets, invalid
+
+
+async def iter_lines(chunks):
+    """Split an async stream of byte chunks into text lines, holding at most one partial line."""
+    rest = b""
+    async for chunk in chunks:
+        lines = (rest + chunk).split(b"\n")
+        rest = lines.pop()
+        for line in lines:
+            yield line.decode("utf-8", "replace")
+    if rest:
+        yield rest.decode("utf-8", "replace")
+
+
+class ImportResult:
+    """
+    Progress and outcome of a bulk import.
+
+    Attributes:
+        imported (int): New wallets stored.
+        duplicates (int): Keys already stored for the user or repeated in the file.
+        invalid (int): Lines that are not valid private keys.
+        batches (int): Batches decoded and written.
+        started (float): `time.monotonic()` when the import started.
+    """
+
+    __slots__ = ("imported", "duplicates", "invalid", "batches", "started")
+
+    def __init__(self):
+        self.imported = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.batches = 0
+        self.started = time.monotonic()
+
+    @property
+    def processed(self):
+        return self.imported + self.duplicates + self.invalid
+
+    @property
+    def rate(self):
+        """Keys processed per second."""
+        elapsed = time.monotonic() - self.started
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+
+class WalletVault:
+    """
+    Bulk store of the extra wallets a user imported, e.g. for sniping and AFK.
+
+    Imports are streamed: lines are read from the upload as they arrive,
+    decoded and validated through `solders.Keypair` in batches of
+    `batch_size` on an executor (a process pool in production), and written
+    with one unordered `insert_many` per batch while the next batch is
+    being decoded. A unique index on
+    `(user_id, public_key)` deduplicates against wallets already stored and
+    within the file, so memory stays bounded by one batch however large the
+    file is. Exports read the collection back in batches of the same size.
+    """
+
+    def __init__(self, collection, wallet_store=None, executor=None, batch_size=1000, client=None):
+        """
+        Initialize the WalletVault instance.
+
+        Args:
+            collection (pymongo.collection.Collection): Holds one document per imported wallet.
+            wallet_store (WalletStore or None): The users' bot wallets; importing one counts as a duplicate.
+            executor (concurrent.futures.Executor or None): Executor running `decode_batch`.
+                                                            `None` uses the loop's default executor.
+            batch_size (int): Keys decoded and written per batch.
+            client (httpx.AsyncClient or None): Client used by `import_url`.
+
+        Attributes:
+            imported (int): Wallets imported by every user.
+            exported (int): Wallets exported by every user.
+
+        Example:
+            >>> vault = WalletVault(database["imported_wallets"], wallet_store, executor=ProcessPoolExecutor())
+            >>> result = await vault.import_url(user_id, file.file_path)
+            >>> result.imported
+            1000
+        """
+        self.collection = collection
+        self.wallet_store = wallet_store
+        self.executor = executor
+        self.batch_size = batch_size
+        self.client = client
+        self.imported = 0
+        self.exported = 0
+        self._running = set()
+
+    def ensure_indexes(self):
+        self.collection.create_index([("user_id", 1), ("public_key", 1)], unique=True)
+
+    def is_running(self, user_id):
+        """Return whether an import or export of the user is in progress."""
+        return user_id in self._running
+
+    async def count(self, user_id):
+        """Return the number of wallets the user imported."""
+        return await asyncio.to_thread(self.collection.count_documents, {"user_id": user_id})
+
+    async def import_url(self, user_id, url, on_progress=None):
+        """Download a key file and import it as it streams in, see `import_stream`."""
+        async with self.client.stream("GET", url) as response:
+            response.raise_for_status()
+            return await self.import_stream(user_id, response.aiter_bytes(), on_progress)
+
+    async def import_stream(self, user_id, chunks, on_progress=None):
+        """
+        Import the private keys of a key file, one per line.
+
+        Args:
+            user_id (int): Telegram user id of the owner.
+            chunks (AsyncIterable[bytes]): The file contents as they arrive.
+            on_progress (callable or None): Async `on_progress(result)` awaited after each batch.
+
+        Returns:
+            ImportResult: Counts of imported, duplicate and invalid keys.
+
+        Raises:
+            ValueError: If an import or export of the user is already running.
+        """
+        self._claim(user_id)
+        loop = asyncio.get_running_loop()
+        decoding = None
+        try:
+            result = ImportResult()
+            own_key = await self.wallet_store.public_key(user_id) if self.wallet_store is not None else None
+            lines = []
+            async for line in iter_lines(chunks):
+                lines.append(line)
+                if len(lines) >= self.batch_size:
+                    # The next batch is decoded while the previous one is written.
+                    previous, decoding = decoding, loop.run_in_executor(self.executor, decode_batch, lines)
+                    lines = []
+                    if previous is not None:
+                        await self._store(user_id, await previous, own_key, result, on_progress)
+            previous, decoding = decoding, None
+            if previous is not None:
+                await self._store(user_id, await previous, own_key, result, on_progress)
+            if lines:
+                await self._store(user_id, await loop.run_in_executor(self.executor, decode_batch, lines), own_key, result, on_progress)
+            return result
+        finally:
+            if decoding is not None:
+                decoding.cancel()
+            self._running.discard(user_id)
+
+    async def _store(self, user_id, decoded, own_key, result, on_progress):
+        wallets, invalid = decoded
+        result.invalid += invalid
+        now = datetime.now(timezone.utc)
+        documents = {}
+        for public_key, private_key in wallets:
+            if public_key == own_key or public_key in documents:
+                result.duplicates += 1
+                continue
+            documents[public_key] = {
+                "user_id": user_id, "public_key": public_key, "private_key": private_key, "imported_at": now,
+            }
+        inserted = await asyncio.to_thread(self._insert, list(documents.values()))
+        result.imported += inserted
+        result.duplicates += len(documents) - inserted
+        result.batches += 1
+        self.imported += inserted
+        if on_progress is not None:
+            await on_progress(result)
+
+    def _insert(self, documents):
+        if not documents:
+            return 0
+        try:
+            self.collection.insert_many(documents, ordered=False)
+        except BulkWriteError as error:
+            if any(write_error["code"] != DUPLICATE_KEY for write_error in error.details["writeErrors"]):
+                raise
+            return error.details["nInserted"]
+        return len(documents)
+
+    async def export_stream(self, user_id):
+        """
+        Export the user's imported wallets as `public_key,private_key` lines.
+
+        Wallets are read and encoded `batch_size` at a time, so the export
+        never holds more than one batch in memory.
+
+        Args:
+            user_id (int): Telegram user id of the owner.
+
+        Yields:
+            bytes: A chunk of lines.
+
+        Raises:
+            ValueError: If an import or export of the user is already running.
+        """
+        self._claim(user_id)
+        cursor = self.collection.find(
+            {"user_id": user_id}, {"_id": 0, "public_key": 1, "private_key": 1}, batch_size=self.batch_size
+        )
+        try:
+            while True:
+                batch = await asyncio.to_thread(lambda: list(itertools.islice(cursor, self.batch_size)))
+                if not batch:
+                    return
+                self.exported += len(batch)
+                yield "".join(f"{document['public_key']},{document['private_key']}\n" for document in batch).encode()
+        finally:
+            cursor.close()
+            self._running.discard(user_id)
+
+    def _claim(self, user_id):
+        if user_id in self._running:
+            raise ValueError("An import or export of your wallets is already running.")
+        self._running.add(user_id)
+
+    def stats(self):
+        """
+        Return import and export counters.
+
+        Returns:
+            dict: Jobs running and wallets imported and exported.
+        """
+        return {"running": len(self._running), "imported": self.imported, "exported": self.exported}
@@ -0,0 +1,246 @@
+import asyncio
+import hmac
+import multiprocessing
+import signal
+
+from telegram import Bot, Update
+
+from utils.http_server import HttpResponse, HttpServer
+from .update_journal import UpdateQueue
+
+SECRET_HEADER = "x-telegram-bot-api-secret-token"
+
+
+def update_chat_id(data):
+    """
+    Extract the chat id an incoming update belongs to, without building an `Update`.
+
+    Args:
+        data (dict): The raw update JSON.
+
+    Returns:
+        int: The chat id, the sending user's id for chat-less updates, or `0`.
+
+    Example:
+        >>> update_chat_id({"update_id": 1, "message": {"chat": {"id": 42}}})
+        42
+    """
+    for payload in data.values():
+        if not isinstance(payload, dict):
+            continue
+        chat = payload.get("chat") or (payload.get("message") or {}).get("chat")
+        if chat is not None:
+            return chat["id"]
+        sender = payload.get("from")
+        if sender is not None:
+            return sender["id"]
+    return 0
+
+
+class WebhookServer:
+    """
+    Receives Telegram webhook calls and hands the updates to the bot.
+
+    Requests are only accepted on `path`, with method POST and, if a secret
+    token is configured, with a matching `X-Telegram-Bot-Api-Secret-Token`
+    header (compared in constant time). The decoded JSON is passed to
+    `handle_update`, which either puts it on the `Application` update queue
+    or forwards it to a worker process.
+    """
+
+    def __init__(self, handle_update, secret_token=None, path="/webhook", host="0.0.0.0", port=8443):
+        """
+        Initialize the WebhookServer instance.
+
+        Args:
+            handle_update (callable): Async callable receiving the update JSON as a dict.
+            secret_token (str or None): Secret token registered with `setWebhook`.
+            path (str): URL path Telegram posts updates to.
+            host (str): Interface to listen on.
+            port (int): Port to listen on.
+
+        Example:
+            >>> server = WebhookServer(queue_updates(application), secret_token="s3cret")
+            >>> await server.start()
+        """
+        self.handle_update = handle_update
+        self.secret_token = secret_token
+        self.path = path
+        self.received = 0
+        self.rejected = 0
+        self.http = HttpServer(self._handle, host, port)
+
+    async def start(self):
+        await self.http.start()
+
+    async def stop(self):
+        await self.http.stop()
+
+    async def _handle(self, request):
+        if request.path != self.path:
+            return HttpResponse(404, "not found")
+        if request.method != "POST":
+            return HttpResponse(405, "method not allowed")
+        if self.secret_token and not hmac.compare_digest(
+            request.headers.get(SECRET_HEADER, "").encode(), self.secret_token.encode()
+        ):
+            self.rejected += 1
+            return HttpResponse(403, "forbidden")
+        try:
+            data = request.json()
+        except ValueError:
+            return HttpResponse(400, "invalid json")
+
+        self.received += 1
+        await self.handle_update(data)
+        return HttpResponse(200, "ok")
+
+
+async def put_update(application, data):
+    """Put the raw JSON of an update on an `Application` queue, handing it to a journaling `UpdateQueue` as is."""
+    if isinstance(application.update_queue, UpdateQueue):
+        application.update_queue.received((data,))
+    await application.update_queue.put(Update.de_json(data, application.bot))
+
+
+def queue_updates(application):
+    """
+    Return a webhook callback that puts updates on an `Application` queue.
+
+    Args:
+        application (telegram.ext.Application): The application processing updates.
+
+    Returns:
+        callable: Async callable accepting the update JSON.
+    """
+    async def handle_update(data):
+        await put_update(application, data)
+
+    return handle_update
+
+
+class StickyRouter:
+    """
+    Forwards updates to worker processes, always sending a chat to the same worker.
+
+    Routing by `chat_id % workers` keeps every update of a chat in one process,
+    so per-chat ordering and in-process caches and sessions stay valid while
+    the load is spread across cores.
+    """
+
+    def __init__(self, queues):
+        self.queues = queues
+
+    async def __call__(self, data):
+        queue = self.queues[update_chat_id(data) % len(self.queues)]
+        await asyncio.get_running_loop().run_in_executor(None, queue.put, data)
+
+
+async def serve_application(application, updates=None, on_start=None):
+    """
+    Run an `Application` without polling until `updates` is exhausted or the process is stopped.
+
+    Args:
+        application (telegram.ext.Application): The application to run.
+        updates (multiprocessing.Queue or None): Queue of raw update JSON fed by a `StickyRouter`.
+                                                 When omitted, updates arrive on the application's
+                                                 own queue and this waits for SIGINT/SIGTERM.
+        on_start (callable or None): Async callable invoked once the application has started.
+    """
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    await application.start()
+    if on_start is not None:
+        await on_start()
+    loop = asyncio.get_running_loop()
+    try:
+        if updates is None:
+            stopped = asyncio.Event()
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(signum, stopped.set)
+            await stopped.wait()
+        else:
+            while True:
+                data = await loop.run_in_executor(None, updates.get)
+                if data is None:
+                    break
+                await put_update(application, data)
+    finally:
+        await application.stop()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+        await application.shutdown()
+
+
+def _run_worker(build_application, updates, worker):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(serve_application(build_application(worker=worker), updates))
+
+
+async def _run_front(token, handle_update, url, listen, port, path, secret_token):
+    server = WebhookServer(handle_update, secret_token, path, listen, port)
+    await server.start()
+    async with Bot(token) as bot:
+        await bot.set_webhook(url.rstrip("/") + path, secret_token=secret_token, allowed_updates=Update.ALL_TYPES)
+
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopped.set)
+    await stopped.wait()
+    await server.stop()
+
+
+def run_webhook(build_application, token, url, listen="0.0.0.0", port=8443, path="/webhook", secret_token=None, workers=1):
+    """
+    Serve the bot in webhook mode.
+
+    With a single worker the HTTP server and the `Application` share one
+    process. With several workers, this process only terminates HTTP and
+    forwards each update to one of `workers` processes, each running its own
+    `Application`, with sticky routing by chat id.
+
+    Args:
+        build_application (callable): Picklable factory returning a configured `Application`;
+                                      worker processes call it with `worker=<index>`.
+        token (str): Bot token, used to register the webhook.
+        url (str): Public base URL Telegram should post to.
+        listen (str): Interface to listen on.
+        port (int): Port to listen on.
+        path (str): URL path of the webhook endpoint.
+        secret_token (str or None): Secret token Telegram must echo in every request.
+        workers (int): Number of processes running the bot.
+    """
+    if workers <= 1:
+        application = build_application()
+
+        async def run_single():
+            server = WebhookServer(queue_updates(application), secret_token, path, listen, port)
+
+            async def on_start():
+                await server.start()
+                await application.bot.set_webhook(url.rstrip("/") + path, secret_token=secret_token, allowed_updates=Update.ALL_TYPES)
+
+            try:
+                await serve_application(application, on_start=on_start)
+            finally:
+                await server.stop()
+
+        asyncio.run(run_single())
+        return
+
+    queues = [multiprocessing.Queue(maxsize=10000) for _ in range(workers)]
+    processes = [
+        multiprocessing.Process(target=_run_worker, args=(build_application, queue, index))
+        for index, queue in enumerate(queues)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        asyncio.run(_run_front(token, StickyRouter(queues), url, listen, port, path, secret_token))
+    finally:
+        for queue in queues:
+            queue.put(None)
+        for process in processes:
+            process.join()
@@ -0,0 +1,411 @@
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+
+from pymongo.errors import DuplicateKeyError
+from solders.message import MessageV0
+from solders.pubkey import Pubkey
+from solders.system_program import TransferParams, transfer
+from solders.transaction import VersionedTransaction
+
+from utils.cache import LRUCache, TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Base fee of a transaction with a single signature.
+FEE_LAMPORTS = 5000
+
+# A system account must keep at least this much or be emptied completely.
+RENT_EXEMPT_MINIMUM = 890_880
+
+
+class WithdrawalFailed(Exception):
+    """Raised when a withdrawal was rejected or its transaction failed."""
+
+
+class WithdrawState:
+    """
+    Persisted withdrawal settings of one user.
+
+    Attributes:
+        user_id (int): Telegram user id.
+        address (str or None): Destination of the user's withdrawals.
+        address_updated_at (datetime or None): When the address was last changed.
+        seq (int): Withdrawals accepted so far; used to build idempotency keys.
+    """
+
+    __slots__ = ("user_id", "address", "address_updated_at", "seq")
+
+    def __init__(self, user_id, address=None, address_updated_at=None, seq=0):
+        self.user_id = user_id
+        self.address = address
+        self.address_updated_at = address_updated_at
+        self.seq = seq
+
+    @classmethod
+    def from_document(cls, document):
+        return cls(document["user_id"], document.get("address"), document.get("address_updated_at"), document.get("seq", 0))
+
+
+class Withdrawal:
+    """
+    A queued withdrawal.
+
+    Exactly one of `lamports` and `fraction` is set; a fraction of the
+    balance is resolved when the withdrawal is sent.
+
+    Attributes:
+        key (str): Idempotency key.
+        user_id (int): Telegram user id of the owner.
+        destination (str): Receiving address.
+        lamports (int or None): Fixed amount to send.
+        fraction (float or None): Share of the balance to send; `1.0` empties the wallet.
+        future (asyncio.Future): Resolves to the transaction signature.
+    """
+
+    __slots__ = ("key", "user_id", "destination", "lamports", "fraction", "future")
+
+    def __init__(self, key, user_id, destination, lamports=None, fraction=None, future=None):
+        self.key = key
+        self.user_id = user_id
+        self.destination = destination
+        self.lamports = lamports
+        self.fraction = fraction
+        self.future = future
+
+    def to_document(self):
+        return {
+            "key": self.key,
+            "user_id": self.user_id,
+            "destination": self.destination,
+            "lamports": self.lamports,
+            "fraction": self.fraction,
+            "created_at": datetime.now(timezone.utc),
+        }
+
+
+class WithdrawalEngine:
+    """
+    Queues withdrawals and sends them in coalesced, concurrent transactions.
+
+    Every withdrawal is keyed by an idempotency key. A key seen in the last
+    `key_ttl` seconds returns the withdrawal already queued for it, and with
+    a collection the key is also recorded under a unique index, so a
+    double-tapped button never withdraws twice, even across restarts.
+
+    Withdrawals are queued per wallet. After a short `batch_window`, the
+    queued withdrawals of a wallet are sent as one transaction with one
+    transfer instruction each (up to `max_per_transaction`), so the wallet
+    pays a single fee and needs a single signature. A wallet has at most one
+    transaction in flight, and amounts are resolved against its confirmed
+    balance right before signing; that makes coalescing safe, because
+    requests that the balance cannot cover are rejected individually
+    instead of failing the whole transaction. Different wallets are sent
+    concurrently, at most `max_concurrency` transactions at a time.
+
+    A send that fails does not prove the transaction did not land: a
+    confirmation can time out while the transfer goes through. The
+    withdrawals of such a transaction are recorded with its signature as
+    `"unknown"`, and the wallet sends nothing else until
+    `getSignatureStatuses` shows the transaction confirmed or failed, or its
+    blockhash has expired without it landing. Only then do the withdrawals
+    succeed or fail, so a retry never withdraws twice.
+    """
+
+    def __init__(self, wallet_store, rpc, blockhashes, send, collection=None, state_collection=None,
+                 max_concurrency=16, max_per_transaction=8, batch_window=0.05, key_ttl=600.0, cache_size=10000,
+                 resolve_interval=2.0):
+        """
+        Initialize the WithdrawalEngine instance.
+
+        Args:
+            wallet_store (WalletStore): Provides the keypair of each user.
+            rpc (SolanaRpcClient): Client used to read confirmed balances.
+            blockhashes (BlockhashCache): Source of recent blockhashes.
+            send (callable): Async `send(transaction)` returning once the transaction is confirmed,
+                             e.g. `TradeExecutor.broadcast` bound to a side.
+            collection (pymongo.collection.Collection or None): Records withdrawals under a unique `key`.
+            state_collection (pymongo.collection.Collection or None): Persists each user's `WithdrawState`.
+            max_concurrency (int): Transactions in flight at the same time.
+            max_per_transaction (int): Transfers coalesced into one transaction.
+            batch_window (float): Seconds to wait for more withdrawals of the same wallet.
+            key_ttl (float): Seconds an idempotency key is remembered in memory.
+            cache_size (int): Maximum number of `WithdrawState`s and keys kept in memory.
+            resolve_interval (float): Seconds between two status checks of a transaction whose send failed.
+
+        Attributes:
+            submitted (int): Withdrawals accepted.
+            duplicates (int): Withdrawals rejected or merged by idempotency key.
+            completed (int): Withdrawals confirmed on chain.
+            failed (int): Withdrawals that failed.
+            unknown (int): Withdrawals whose transaction is being checked after a failed send.
+            transactions (int): Transactions sent.
+            batch_sizes (collections.Counter): Transactions sent by number of transfers.
+
+        Example:
+            >>> engine = WithdrawalEngine(wallet_store, rpc, blockhashes, send, database["withdrawals"], database["withdraw_states"])
+            >>> signature = await engine.withdraw(user_id, f"{user_id}:{seq}:half", fraction=0.5)
+        """
+        self.wallet_store = wallet_store
+        self.rpc = rpc
+        self.blockhashes = blockhashes
+        self.send = send
+        self.collection = collection
+        self.state_collection = state_collection
+        self.max_per_transaction = max_per_transaction
+        self.batch_window = batch_window
+        self.resolve_interval = resolve_interval
+        self.submitted = 0
+        self.duplicates = 0
+        self.completed = 0
+        self.failed = 0
+        self.unknown = 0
+        self.transactions = 0
+        self.batch_sizes = Counter()
+        self._keys = TTLCache(cache_size, key_ttl)
+        self._states = LRUCache(cache_size)
+        self._queues = {}
+        self._busy = set()
+        # The loop only keeps weak references to tasks; each wallet's drain is held here until done.
+        self._drains = set()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def ensure_indexes(self):
+        self.collection.create_index("key", unique=True)
+        self.collection.create_index("user_id")
+        self.state_collection.create_index("user_id", unique=True)
+
+    async def state(self, user_id):
+        """Return the withdrawal settings of a user."""
+        state = self._states.get(user_id)
+        if state is None:
+            document = None
+            if self.state_collection is not None:
+                document = await asyncio.to_thread(self.state_collection.find_one, {"user_id": user_id})
+            state = self._states.get(user_id)
+            if state is None:
+                state = WithdrawState.from_document(document) if document else WithdrawState(user_id)
+                self._states.set(user_id, state)
+        return state
+
+    async def set_address(self, user_id, address):
+        """
+        Change the withdrawal address of a user.
+
+        Raises:
+            ValueError: If the address is not a valid public key.
+        """
+        address = str(Pubkey.from_string(address))
+        state = await self.state(user_id)
+        state.address = address
+        state.address_updated_at = datetime.now(timezone.utc)
+        if self.state_collection is not None:
+            await asyncio.to_thread(
+                self.state_collection.update_one,
+                {"user_id": user_id},
+                {"$set": {"address": address, "address_updated_at": state.address_updated_at}},
+                upsert=True,
+            )
+        return state
+
+    def is_pending(self, key):
+        """Return whether a withdrawal with this idempotency key was submitted recently."""
+        return self._keys.get(key) is not None
+
+    async def submit(self, user_id, key, lamports=None, fraction=None):
+        """
+        Queue a withdrawal to the user's withdrawal address.
+
+        Args:
+            user_id (int): Telegram user id of the owner.
+            key (str): Idempotency key; resubmitting a key returns the original withdrawal.
+            lamports (int or None): Fixed amount to withdraw.
+            fraction (float or None): Share of the balance to withdraw, resolved at send time.
+
+        Returns:
+            Withdrawal: The queued withdrawal; await its `future` for the signature.
+
+        Raises:
+            WithdrawalFailed: If no address is set, the amount is invalid or the key was used before.
+        """
+        existing = self._keys.get(key)
+        if existing is not None:
+            self.duplicates += 1
+            return existing
+        if (lamports is None) == (fraction is None) or (lamports is not None and lamports <= 0) \
+                or (fraction is not None and not 0 < fraction <= 1):
+            raise WithdrawalFailed("Specify a positive amount or a fraction between 0 and 1.")
+
+        # Claim the key before the first await so a concurrent double tap sees it.
+        withdrawal = Withdrawal(key, user_id, None, lamports, fraction, asyncio.get_running_loop().create_future())
+        self._keys.set(key, withdrawal)
+        try:
+            state = await self.state(user_id)
+            if state.address is None:
+                raise WithdrawalFailed("Set a withdrawal address first.")
+            withdrawal.destination = state.address
+            if self.collection is not None:
+                try:
+                    await asyncio.to_thread(self.collection.insert_one, withdrawal.to_document())
+                except DuplicateKeyError:
+                    self.duplicates += 1
+                    raise WithdrawalFailed("This withdrawal was already submitted.")
+        except BaseException as error:
+            self._keys.pop(key)
+            withdrawal.future.set_exception(error)
+            withdrawal.future.exception()
+            raise
+
+        state.seq += 1
+        if self.state_collection is not None:
+            await asyncio.to_thread(
+                self.state_collection.update_one, {"user_id": user_id}, {"$inc": {"seq": 1}}, upsert=True
+            )
+        self.submitted += 1
+        self._queues.setdefault(user_id, []).append(withdrawal)
+        if user_id not in self._busy:
+            self._busy.add(user_id)
+            task = asyncio.get_running_loop().create_task(self._drain(user_id))
+            self._drains.add(task)
+            task.add_done_callback(self._drains.discard)
+        return withdrawal
+
+    async def withdraw(self, user_id, key, lamports=None, fraction=None):
+        """Queue a withdrawal and wait until it is confirmed. Returns the transaction signature."""
+        withdrawal = await self.submit(user_id, key, lamports, fraction)
+        return await asyncio.shield(withdrawal.future)
+
+    async def _drain(self, user_id):
+        # Runs while the wallet has queued withdrawals; one transaction at a time per wallet.
+        try:
+            await asyncio.sleep(self.batch_window)
+            while self._queues.get(user_id):
+                queue = self._queues[user_id]
+                batch = queue[:self.max_per_transaction]
+                del queue[:self.max_per_transaction]
+                async with self._semaphore:
+                    await self._send_batch(user_id, batch)
+        finally:
+            self._queues.pop(user_id, None)
+            self._busy.discard(user_id)
+
+    async def _send_batch(self, user_id, batch):
+        transaction = None
+        try:
+            wallet = await self.wallet_store.get_wallet(user_id)
+            keypair = wallet.keypair
+            balance_result = await self.rpc.call("getBalance", [wallet.public_key, {"commitment": "confirmed"}])
+            available = balance_result["value"] - FEE_LAMPORTS
+            accepted = []
+            for withdrawal in batch:
+                amount = withdrawal.lamports
+                if amount is None:
+                    amount = available if withdrawal.fraction >= 1 else int(available * withdrawal.fraction)
+                remaining = available - amount
+                if amount <= 0 or remaining < 0 or 0 < remaining < RENT_EXEMPT_MINIMUM:
+                    self._fail(withdrawal, WithdrawalFailed("Insufficient balance for this withdrawal."))
+                    continue
+                available = remaining
+                accepted.append((withdrawal, amount))
+            if not accepted:
+                return
+
+            blockhash, last_valid_block_height = await self.blockhashes.get()
+            instructions = [
+                transfer(TransferParams(from_pubkey=keypair.pubkey(), to_pubkey=Pubkey.from_string(withdrawal.destination), lamports=amount))
+                for withdrawal, amount in accepted
+            ]
+            transaction = VersionedTransaction(MessageV0.try_compile(keypair.pubkey(), instructions, [], blockhash), [keypair])
+            self.transactions += 1
+            self.batch_sizes[len(accepted)] += 1
+            await self.send(transaction)
+        except Exception as error:
+            if transaction is None:
+                logger.warning("Withdrawal batch for user %s failed: %s", user_id, error)
+                for withdrawal in batch:
+                    self._fail(withdrawal, WithdrawalFailed(str(error)))
+                return
+            # The transaction may have landed anyway; hold the wallet until that is known.
+            logger.warning("Withdrawal batch for user %s failed to confirm, checking its status: %s", user_id, error)
+            try:
+                await self._resolve(transaction, last_valid_block_height, [withdrawal for withdrawal, _ in accepted])
+            except WithdrawalFailed as failure:
+                for withdrawal, _ in accepted:
+                    self._fail(withdrawal, failure)
+                return
+
+        signature = str(transaction.signatures[0])
+        for withdrawal, _ in accepted:
+            if not withdrawal.future.done():
+                withdrawal.future.set_result(signature)
+            self.completed += 1
+
+    async def _resolve(self, transaction, last_valid_block_height, withdrawals):
+        """
+        Wait until a transaction whose send failed is known to have landed or not.
+
+        Raises:
+            WithdrawalFailed: If the transaction failed on chain or expired without landing.
+        """
+        signature = str(transaction.signatures[0])
+        self.unknown += len(withdrawals)
+        await self._record(withdrawals, {"signature": signature, "status": "unknown"})
+        try:
+            while True:
+                try:
+                    result = await self.rpc.call("getSignatureStatuses", [[signature], {"searchTransactionHistory": True}])
+                    status = result["value"][0]
+                    if status is not None:
+                        if status.get("err") is not None:
+                            raise WithdrawalFailed(f"Transaction {signature} failed: {status['err']}")
+                        if status.get("confirmationStatus") in ("confirmed", "finalized"):
+                            await self._record(withdrawals, {"status": "confirmed"})
+                            return
+                    # Past its last valid block height, a transaction not seen yet can no longer land.
+                    elif await self.rpc.call("getBlockHeight", [{"commitment": "confirmed"}]) > last_valid_block_height:
+                        raise WithdrawalFailed(f"Transaction {signature} expired without landing.")
+                except WithdrawalFailed:
+                    await self._record(withdrawals, {"status": "failed"})
+                    raise
+                except Exception as error:
+                    logger.warning("Checking the status of %s failed: %s", signature, error)
+                await asyncio.sleep(self.resolve_interval)
+        finally:
+            self.unknown -= len(withdrawals)
+
+    async def _record(self, withdrawals, fields):
+        if self.collection is None:
+            return
+        try:
+            await asyncio.to_thread(
+                self.collection.update_many, {"key": {"$in": [withdrawal.key for withdrawal in withdrawals]}}, {"$set": fields}
+            )
+        except Exception as error:
+            logger.warning("Recording withdrawal status %s failed: %s", fields.get("status"), error)
+
+    def _fail(self, withdrawal, error):
+        if not withdrawal.future.done():
+            withdrawal.future.set_exception(error)
+            # Mark the exception as retrieved if nobody awaits it any more.
+            withdrawal.future.exception()
+            self.failed += 1
+
+    def stats(self):
+        """
+        Return withdrawal counters.
+
+        Returns:
+            dict: Submitted, duplicate, completed, failed and unknown withdrawals, transactions sent,
+                  transfers per transaction and wallets with queued withdrawals.
+        """
+        return {
+            "submitted": self.submitted,
+            "duplicates": self.duplicates,
+            "completed": self.completed,
+            "failed": self.failed,
+            "unknown": self.unknown,
+            "transactions": self.transactions,
+            "batch_sizes": dict(self.batch_sizes),
+            "queued_wallets": len(self._busy),
+        }
@@ -0,0 +1,78 @@
+import asyncio
+
+import httpx
+from solders.keypair import Keypair
+
+from benchmarks.stub_rpc import StubRpcServer
+from services.balance_service import BalanceService, BalanceUnavailable
+from services.solana_rpc import SolanaRpcClient
+
+
+class ShortRpc:
+    """Wraps a client so `getMultipleAccounts` answers leave out the last account, as some nodes do."""
+
+    def __init__(self, rpc):
+        self.rpc = rpc
+
+    async def get_multiple_lamports(self, pubkeys):
+        return (await self.rpc.get_multiple_lamports(pubkeys))[:-1]
+
+
+async def with_stub(balances, test):
+    server = StubRpcServer(balances, latency=0.01)
+    await server.start()
+    rpc = SolanaRpcClient(server.url, client=httpx.AsyncClient(timeout=5))
+    try:
+        return await test(server, rpc)
+    finally:
+        await rpc.close()
+        await server.stop()
+
+
+def test_batching_resolves_every_lookup():
+    pubkeys = [str(Keypair().pubkey()) for _ in range(250)]
+    balances = {pubkey: 1000 * (n + 1) for n, pubkey in enumerate(pubkeys)}
+
+    async def test(server, rpc):
+        service = BalanceService(rpc, batch_window=0.01)
+        # Every address is asked for twice at once; the second lookup shares the first fetch.
+        results = await asyncio.gather(*(service.get_lamports(pubkey) for pubkey in pubkeys + pubkeys))
+        assert results == [balances[pubkey] for pubkey in pubkeys + pubkeys]
+        assert service.shared == len(pubkeys)
+        assert server.batch_sizes == {100: 2, 50: 1}
+        assert service._inflight == {}
+        # Within the TTL the cache answers without another call.
+        assert await service.get_lamports(pubkeys[0]) == balances[pubkeys[0]]
+        assert server.calls["getMultipleAccounts"] == 3
+
+    asyncio.run(with_stub(balances, test))
+
+
+def test_accounts_left_out_of_a_reply_fail_instead_of_hanging():
+    pubkeys = [str(Keypair().pubkey()) for _ in range(3)]
+
+    async def test(server, rpc):
+        service = BalanceService(ShortRpc(rpc), batch_window=0.01)
+        results = await asyncio.wait_for(
+            asyncio.gather(*(service.get_lamports(pubkey) for pubkey in pubkeys), return_exceptions=True), 2
+        )
+        assert results[:2] == [1, 1]
+        assert isinstance(results[2], BalanceUnavailable)
+        assert service._inflight == {}
+
+    asyncio.run(with_stub(dict.fromkeys(pubkeys, 1), test))
+
+
+def test_failed_batch_fails_every_lookup():
+    pubkeys = [str(Keypair().pubkey()) for _ in range(3)]
+
+    async def test(server, rpc):
+        await server.stop()
+        service = BalanceService(rpc, batch_window=0.01)
+        results = await asyncio.wait_for(
+            asyncio.gather(*(service.get_lamports(pubkey) for pubkey in pubkeys), return_exceptions=True), 2
+        )
+        assert all(isinstance(result, BalanceUnavailable) for result in results)
+        assert service._inflight == {}
+
+    asyncio.run(with_stub({}, test))
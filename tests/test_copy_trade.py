@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from services.copy_trade import CopyTradeEngine
+
+LEADER = "Leader1111111111111111111111111111111111111"
+
+
+class FlakyFeed:
+    """A leader feed whose first `failures` subscriptions fail, as when the socket drops mid-send."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.leaders = set()
+        self.subscribes = 0
+
+    async def subscribe(self, leader):
+        self.subscribes += 1
+        self.leaders.add(leader)
+        await asyncio.sleep(0.01)
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("socket closed")
+
+    async def unsubscribe(self, leader):
+        self.leaders.discard(leader)
+
+
+async def execute(config, trade):
+    pass
+
+
+def test_failed_subscription_leaves_no_follower_entry():
+    async def run():
+        feed = FlakyFeed(failures=1)
+        engine = CopyTradeEngine(execute, feed=feed)
+        with pytest.raises(ConnectionError):
+            await engine.add_config(1, LEADER, 0.2)
+        assert engine.leaders == 0
+        assert engine.user_configs(1) == []
+        assert feed.leaders == set()
+
+        # The next config of the same leader subscribes again.
+        await engine.add_config(1, LEADER, 0.2)
+        assert engine.leaders == 1
+        assert feed.leaders == {LEADER}
+        assert feed.subscribes == 2
+
+    asyncio.run(run())
+
+
+def test_concurrent_configs_of_a_leader_share_one_subscription():
+    async def run():
+        feed = FlakyFeed()
+        engine = CopyTradeEngine(execute, feed=feed)
+        await asyncio.gather(*(engine.add_config(user_id, LEADER, 0.2) for user_id in range(5)))
+        assert feed.subscribes == 1
+        assert engine.stats()["leaders"] == 1
+        assert sum(len(engine.user_configs(user_id)) for user_id in range(5)) == 5
+
+    asyncio.run(run())
@@ -0,0 +1,85 @@
+import asyncio
+
+import httpx
+
+from benchmarks.fake_price_server import FakePriceServer
+from services.price_oracle import PriceOracle, build_price_sources
+
+
+async def with_servers(latencies, test, **kwargs):
+    servers = [FakePriceServer(latency=latency, seed=n) for n, latency in enumerate(latencies)]
+    for server in servers:
+        await server.start()
+    client = httpx.AsyncClient(timeout=5)
+    spec = ",".join(server.source_spec("binance", f"source{n}") for n, server in enumerate(servers))
+    oracle = PriceOracle(build_price_sources(spec, client), client=client, **kwargs)
+    try:
+        return await test(servers, oracle)
+    finally:
+        await oracle.stop()
+        for server in servers:
+            await server.stop()
+
+
+async def next_quote(oracle, previous, timeout=2.0):
+    async def wait():
+        while oracle.quote() is previous:
+            await asyncio.sleep(0.01)
+        return oracle.quote()
+
+    return await asyncio.wait_for(wait(), timeout)
+
+
+def test_refresh_fails_over_to_the_next_source():
+    async def test(servers, oracle):
+        # The first refresh probes both sources and ranks them.
+        assert await oracle.refresh()
+        fastest = oracle.ranked_sources()[0]
+        servers[oracle.sources.index(fastest)].failing = True
+
+        assert await oracle.refresh()
+        assert oracle.quote().source != fastest.name
+        assert oracle.failovers == 1
+        # The failed source is benched, so the next refresh goes straight to the other one.
+        assert fastest not in oracle.ranked_sources()
+        assert await oracle.refresh()
+        assert oracle.failovers == 1
+
+    asyncio.run(with_servers([0, 0], test))
+
+
+def test_stale_read_serves_the_last_quote_and_wakes_the_refresh():
+    async def test(servers, oracle):
+        await oracle.start()
+        first = await next_quote(oracle, None)
+        servers[0].failing = True
+        await asyncio.sleep(0.15)
+
+        # The read is answered from memory, stale, and wakes the refresh long before `interval`.
+        assert oracle.quote() is first
+        assert oracle.is_stale()
+        second = await next_quote(oracle, first)
+        assert second.source == "source1"
+        assert not oracle.is_stale()
+
+        # With every source down the last good quote keeps being served.
+        servers[1].failing = True
+        await asyncio.sleep(0.15)
+        assert oracle.quote() is second
+        await asyncio.sleep(0.05)
+        assert oracle.failures >= 1
+        assert oracle.quote() is second
+
+    asyncio.run(with_servers([0, 0], test, interval=60, max_age=0.1))
+
+
+def test_stop_cancels_the_probe_fetches_left_running():
+    async def test(servers, oracle):
+        assert await oracle.refresh()
+        assert oracle.quote().source == "source0"
+        # The slow source is still being measured.
+        assert len(oracle._probes) == 1
+        await asyncio.wait_for(oracle.stop(), 1)
+        assert not oracle._probes
+
+    asyncio.run(with_servers([0, 5], test))
@@ -0,0 +1,27 @@
+import asyncio
+
+from dashboards.registry import DashboardRegistry
+
+
+def test_services_start_once_built_and_the_registry_started():
+    started = []
+
+    async def start(service):
+        started.append(service)
+
+    async def run():
+        registry = DashboardRegistry([])
+        registry.provide("early", lambda: "early", start=start)
+        registry.provide("late", lambda: "late", start=start)
+        registry.provide("unused", lambda: "unused", start=start)
+        registry.service("early")
+        assert started == []
+
+        await registry.start()
+        assert started == ["early"]
+        registry.service("late")
+        await registry.close()
+        assert started == ["early", "late"]
+        assert registry.stats()["services_built"] == 2
+
+    asyncio.run(run())
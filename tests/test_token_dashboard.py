@@ -0,0 +1,91 @@
+import asyncio
+from types import SimpleNamespace
+
+from telegram import Update
+
+from benchmarks.fake_telegram import make_callback_update
+from benchmarks.fakes import MemoryDatabase
+from dashboards.token_dashboard import TokenDashboard
+from services.idempotency import IdempotencyKeys
+from services.update_journal import UpdateJournal, UpdateQueue
+
+MINT = "So11111111111111111111111111111111111111112"
+
+
+class FakeQuery:
+    """The parts of a `CallbackQuery` the buy button uses, recording answers."""
+
+    def __init__(self, query):
+        self.id = query.id
+        self.data = query.data
+        self.message = SimpleNamespace(chat_id=query.message.chat.id, message_id=query.message.message_id)
+        self.answers = []
+
+    async def answer(self, text=None):
+        self.answers.append(text)
+
+
+def press_together(dashboard, updates):
+    """Run the buy button handler for several presses at once; returns the recorded answers of each."""
+    queries = [FakeQuery(update.callback_query) for update in updates]
+
+    async def run():
+        await asyncio.gather(*(
+            dashboard.buy(
+                SimpleNamespace(callback_query=query, effective_user=update.callback_query.from_user),
+                SimpleNamespace(args=[update.callback_query.data.split(":", 2)[2]]),
+            )
+            for query, update in zip(queries, updates)
+        ))
+        await asyncio.gather(*dashboard._pending)
+
+    asyncio.run(run())
+    return [query.answers for query in queries]
+
+
+def press(dashboard, update):
+    """Run the buy button handler for a callback query update; returns the recorded answers."""
+    return press_together(dashboard, [update])[0]
+
+
+def test_buy_press_replayed_after_a_crash_buys_once(tmp_path):
+    database = MemoryDatabase()
+    bought = []
+
+    async def buy(user_id, mint, amount_sol, reason):
+        bought.append((user_id, mint, amount_sol))
+
+    def start():
+        # Each run builds its own dashboard and keys, as a restarted process would.
+        return TokenDashboard(None, None, None, buy=buy, buy_keys=IdempotencyKeys(database["buy_keys"]))
+
+    raw = make_callback_update(7, 1001, f"token:buy:0.5:{MINT}")
+    journal = UpdateJournal(str(tmp_path))
+    journal.open()
+    journal.append(7, Update.de_json(raw, None).to_json().encode())
+    assert press(start(), Update.de_json(raw, None)) == ["Buying 0.5 SOL…"]
+    # The process dies before the handler's completion is journaled.
+    journal.close()
+
+    queue = UpdateQueue(UpdateJournal(str(tmp_path)))
+    assert queue.open(None) == 1
+    assert press(start(), queue.get_nowait()) == ["This buy was already placed."]
+    queue.close()
+    assert bought == [(1001, MINT, 0.5)]
+
+
+def test_double_tap_buys_once_while_the_buy_runs():
+    bought = []
+
+    async def buy(user_id, mint, amount_sol, reason):
+        await asyncio.sleep(0.01)
+        bought.append(amount_sol)
+
+    dashboard = TokenDashboard(None, None, None, buy=buy, buy_keys=IdempotencyKeys())
+    first, second = (Update.de_json(make_callback_update(update_id, 1001, f"token:buy:0.5:{MINT}"), None) for update_id in (1, 2))
+    assert press_together(dashboard, [first, second]) == [["Buying 0.5 SOL…"], ["This buy is already being processed."]]
+    assert bought == [0.5]
+    # Once the buy finished, pressing the button again is a new buy.
+    third = Update.de_json(make_callback_update(3, 1001, f"token:buy:0.5:{MINT}"), None)
+    assert press(dashboard, third) == ["Buying 0.5 SOL…"]
+    assert bought == [0.5, 0.5]
@@ -0,0 +1,91 @@
+import asyncio
+
+import httpx
+import pytest
+from solders.keypair import Keypair
+
+from benchmarks.bench_trade_executor import LocalRouter
+from benchmarks.stub_rpc import StubRpcServer
+from services.solana_rpc import SolanaRpcClient
+from services.trade_executor import BlockhashCache, RpcNode, TradeExecutor, TradeFailed
+
+
+async def with_nodes(latencies, test, private_latencies=(), **kwargs):
+    # A shared ledger makes the stubs nodes of one cluster: a transaction any of them received confirms on all.
+    ledger = {}
+    servers = [
+        StubRpcServer(latency=latency, confirm_latency=0.2, ledger=ledger)
+        for latency in list(latencies) + list(private_latencies)
+    ]
+    for server in servers:
+        await server.start()
+    client = httpx.AsyncClient(timeout=5)
+    nodes = [RpcNode(f"node{index}", SolanaRpcClient(server.url, client=client)) for index, server in enumerate(servers)]
+    executor = TradeExecutor(
+        nodes[:len(latencies)], LocalRouter(), BlockhashCache(nodes[0].rpc),
+        private_nodes=nodes[len(latencies):], poll_interval=0.02, **kwargs,
+    )
+    try:
+        return await test(servers, executor)
+    finally:
+        await client.aclose()
+        for server in servers:
+            await server.stop()
+
+
+def sends(servers):
+    return [server.calls["sendTransaction"] for server in servers]
+
+
+def test_fanout_sends_to_the_fastest_nodes():
+    async def test(servers, executor):
+        keypair = Keypair()
+        # Every `probe_every` trades go to every node, which measures all of them.
+        executor.probe_every = 1
+        await executor.trade(keypair, "buy", "mint", 0.1)
+        assert sends(servers) == [1, 1, 1]
+        assert [node.name for node in executor.ranked_nodes("buy")] == ["node2", "node0", "node1"]
+
+        executor.probe_every = 1000
+        result = await executor.trade(keypair, "buy", "mint", 0.1)
+        assert sends(servers) == [2, 1, 2]
+        assert result.node in ("node0", "node2")
+        assert executor.stats()["confirmed"] == 2
+
+    asyncio.run(with_nodes([0.05, 0.1, 0.0], test, fanout=2))
+
+
+def test_failed_node_falls_back_and_drops_down_the_ranking():
+    async def test(servers, executor):
+        servers[0].fail_sends = True
+        result = await executor.trade(Keypair(), "buy", "mint", 0.1)
+        assert result.node == "node1"
+        assert executor.nodes[0].failed == 1
+        assert executor.pick_node("buy").name == "node1"
+
+        servers[1].fail_sends = True
+        with pytest.raises(TradeFailed, match="Every node rejected"):
+            await executor.trade(Keypair(), "buy", "mint", 0.1)
+        assert executor.stats()["failed"] == 1
+
+    asyncio.run(with_nodes([0.0, 0.0], test, fanout=2))
+
+
+def test_private_trades_go_only_to_private_relays():
+    async def test(servers, executor):
+        executor.probe_every = 1
+        result = await executor.trade(Keypair(), "buy", "mint", 0.1, private=True)
+        assert result.node == "node2"
+        assert sends(servers) == [0, 0, 1]
+
+    asyncio.run(with_nodes([0.0, 0.0], test, private_latencies=[0.0]))
+
+
+def test_private_trade_without_a_relay_fails_before_routing():
+    async def test(servers, executor):
+        with pytest.raises(TradeFailed, match="no private relay"):
+            await executor.trade(Keypair(), "buy", "mint", 0.1, private=True)
+        assert sends(servers) == [0, 0]
+        assert next(executor.router.lamports) == 1
+
+    asyncio.run(with_nodes([0.0, 0.0], test))
@@ -0,0 +1,37 @@
+import asyncio
+import multiprocessing
+import time
+
+from benchmarks.bench_update_journal import crash_while_journaling, make_updates
+from services.update_journal import UpdateJournal, UpdateQueue
+
+
+def crash(directory, count, unfinished):
+    child = multiprocessing.Process(target=crash_while_journaling, args=(str(directory), count, unfinished))
+    child.start()
+    child.join()
+    assert child.exitcode == 1
+
+
+def test_crash_mid_burst_replays_unfinished_updates_and_drops_redeliveries(tmp_path):
+    crash(tmp_path, 5000, 50)
+
+    async def recover():
+        queue = UpdateQueue(UpdateJournal(str(tmp_path)), max_pending=100)
+        started = time.perf_counter()
+        replayed = queue.open(None)
+        elapsed = time.perf_counter() - started
+        ids = [queue.get_nowait().update_id for _ in range(replayed)]
+        # Telegram redelivers the last, unconfirmed batch after a restart.
+        for update in make_updates(100, start=4901):
+            await queue.put(update)
+        stats = queue.stats()
+        queue.close()
+        return elapsed, ids, stats
+
+    elapsed, ids, stats = asyncio.run(recover())
+    assert ids == list(range(4951, 5001))
+    assert stats["truncated"] == 1
+    assert stats["duplicates"] == 100
+    assert stats["queued"] == 0
+    assert elapsed < 2.0
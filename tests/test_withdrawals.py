@@ -0,0 +1,70 @@
+import asyncio
+import base64
+
+import httpx
+import pytest
+from solders.keypair import Keypair
+
+from benchmarks.bench_withdrawals import LocalWallets
+from benchmarks.fakes import MemoryDatabase
+from benchmarks.stub_rpc import StubRpcServer
+from services.solana_rpc import LAMPORTS_PER_SOL, SolanaRpcClient
+from services.trade_executor import BlockhashCache, TradeFailed
+from services.withdrawals import WithdrawalEngine, WithdrawalFailed
+
+
+async def with_engine(test, reach_node, blockhash_interval=0.4):
+    wallets = LocalWallets(1)
+    balances = {wallet.public_key: LAMPORTS_PER_SOL for wallet in wallets.wallets.values()}
+    server = StubRpcServer(balances, confirm_latency=0.2, blockhash_interval=blockhash_interval)
+    await server.start()
+    rpc = SolanaRpcClient(server.url, client=httpx.AsyncClient(timeout=5))
+
+    async def send(transaction):
+        # The confirmation times out, whether or not the node got the transaction.
+        if reach_node:
+            await rpc.call("sendTransaction", [base64.b64encode(bytes(transaction)).decode(), {"encoding": "base64"}])
+        raise TradeFailed(f"Transaction {transaction.signatures[0]} was not confirmed in time.")
+
+    database = MemoryDatabase()
+    engine = WithdrawalEngine(
+        wallets, rpc, BlockhashCache(rpc), send, database["withdrawals"], batch_window=0.01, resolve_interval=0.05,
+    )
+    await engine.set_address(0, str(Keypair().pubkey()))
+    try:
+        return await test(server, engine, database["withdrawals"])
+    finally:
+        await rpc.close()
+        await server.stop()
+
+
+def test_timed_out_withdrawal_that_landed_succeeds_before_a_retry_is_sent():
+    async def test(server, engine, collection):
+        first = await engine.submit(0, "0:0", lamports=1000)
+        await asyncio.sleep(0.05)
+        assert engine.stats()["unknown"] == 1
+        assert collection.find_one({"key": "0:0"})["status"] == "unknown"
+        retry = await engine.submit(0, "0:1", lamports=1000)
+
+        signature = await asyncio.wait_for(first.future, 2)
+        assert signature == collection.find_one({"key": "0:0"})["signature"]
+        assert collection.find_one({"key": "0:0"})["status"] == "confirmed"
+        assert engine.stats()["unknown"] == 0
+        # The retry read the balance only once the first transaction was known to have landed.
+        assert server.calls["getBalance"] == 1
+        await asyncio.wait_for(retry.future, 2)
+        assert engine.stats()["completed"] == 2
+
+    asyncio.run(with_engine(test, reach_node=True))
+
+
+def test_timed_out_withdrawal_that_never_landed_fails_once_its_blockhash_expired():
+    async def test(server, engine, collection):
+        withdrawal = await engine.submit(0, "0:0", lamports=1000)
+        with pytest.raises(WithdrawalFailed, match="expired without landing"):
+            await asyncio.wait_for(withdrawal.future, 3)
+        assert collection.find_one({"key": "0:0"})["status"] == "failed"
+        assert engine.stats()["failed"] == 1
+
+    # A blockhash stays valid for 150 intervals: 1.5 seconds here.
+    asyncio.run(with_engine(test, reach_node=False, blockhash_interval=0.01))
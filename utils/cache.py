@@ -0,0 +1,144 @@
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    A bounded mapping that evicts the least recently used entry.
+
+    Lookups and insertions are O(1). Once the cache holds `maxsize` entries,
+    every new key pushes out the entry that was touched longest ago, so memory
+    stays flat no matter how many distinct keys pass through it.
+    """
+
+    def __init__(self, maxsize=1024):
+        """
+        Initialize the LRUCache instance.
+
+        Args:
+            maxsize (int): The maximum number of entries kept in memory.
+
+        Attributes:
+            maxsize (int): The configured capacity.
+            hits (int): Number of lookups answered from the cache.
+            misses (int): Number of lookups that found nothing.
+
+        Example:
+            >>> cache = LRUCache(maxsize=2)
+            >>> cache.set("a", 1)
+            >>> cache.get("a")
+            1
+        """
+        if maxsize <= 0:
+            raise ValueError("maxsize must be a positive integer.")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        """
+        Return the value stored for `key` and mark it as most recently used.
+
+        Args:
+            key (hashable): The cache key.
+            default: Value returned when the key is not cached.
+
+        Returns:
+            The cached value, or `default` on a miss.
+        """
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        """
+        Store `value` under `key`, evicting the least recently used entry if full.
+
+        Args:
+            key (hashable): The cache key.
+            value: The value to cache.
+        """
+        data = self._data
+        data[key] = value
+        data.move_to_end(key)
+        if len(data) > self.maxsize:
+            data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """Remove `key` from the cache and return its value, or `default`."""
+        return self._data.pop(key, default)
+
+    def clear(self):
+        """Drop every cached entry."""
+        self._data.clear()
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TTLCache(LRUCache):
+    """
+    An `LRUCache` whose entries also expire `ttl` seconds after they were stored.
+
+    Expired entries are dropped lazily when they are looked up, or pushed
+    out by the LRU bound like any other entry.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60.0, clock=time.monotonic):
+        """
+        Initialize the TTLCache instance.
+
+        Args:
+            maxsize (int): The maximum number of entries kept in memory.
+            ttl (float): Default lifetime of an entry in seconds.
+            clock (callable): Monotonic clock; injectable for tests.
+
+        Example:
+            >>> cache = TTLCache(maxsize=1000, ttl=2.0)
+            >>> cache.set("balance", 42)
+            >>> cache.get("balance")
+            42
+        """
+        super().__init__(maxsize)
+        self.ttl = ttl
+        self.clock = clock
+
+    def get(self, key, default=None):
+        entry = super().get(key)
+        if entry is None:
+            return default
+        expires, value = entry
+        if expires <= self.clock():
+            self._data.pop(key, None)
+            self.hits -= 1
+            self.misses += 1
+            return default
+        return value
+
+    def set(self, key, value, ttl=None):
+        """
+        Store `value` under `key` for `ttl` seconds (the cache default if omitted).
+
+        Args:
+            key (hashable): The cache key.
+            value: The value to cache.
+            ttl (float or None): Lifetime of this entry in seconds.
+        """
+        super().set(key, (self.clock() + (self.ttl if ttl is None else ttl), value))
+
+    def pop(self, key, default=None):
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def __contains__(self, key):
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > self.clock()
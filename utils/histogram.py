@@ -0,0 +1,72 @@
+from bisect import bisect_left
+
+# Upper bounds (seconds) of the default latency buckets: 1ms to ~70s, 25% apart.
+DEFAULT_BOUNDS = tuple(0.001 * 1.25 ** step for step in range(51))
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram with exponential forgetting.
+
+    Recording a sample is one binary search over the bucket bounds, and the
+    memory used is constant however many samples are recorded. Once
+    `decay_after` samples have been recorded, every bucket count is halved,
+    so percentiles follow recent behaviour instead of the whole history.
+
+    Percentiles are approximate: they report the upper bound of the bucket
+    the requested rank falls in, i.e. at most 25% above the true value with
+    the default bounds.
+    """
+
+    def __init__(self, bounds=DEFAULT_BOUNDS, decay_after=1000):
+        """
+        Initialize the LatencyHistogram instance.
+
+        Args:
+            bounds (Sequence[float]): Increasing bucket upper bounds in seconds.
+                                      Larger samples land in an overflow bucket.
+            decay_after (int or None): Samples between two halvings of the counts; never halved when `None`.
+
+        Attributes:
+            counts (list[float]): Weight of each bucket; the last one is the overflow bucket.
+            count (float): Total weight of all buckets.
+            total (int): Samples recorded since creation, never decayed.
+        """
+        self.bounds = tuple(bounds)
+        self.decay_after = decay_after
+        self.counts = [0.0] * (len(self.bounds) + 1)
+        self.count = 0.0
+        self.total = 0
+        self._since_decay = 0
+
+    def record(self, seconds):
+        """Add one sample."""
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.total += 1
+        self._since_decay += 1
+        if self.decay_after is not None and self._since_decay >= self.decay_after:
+            self.counts = [count / 2 for count in self.counts]
+            self.count /= 2
+            self._since_decay = 0
+
+    def percentile(self, fraction):
+        """
+        Estimate a percentile.
+
+        Args:
+            fraction (float): e.g. `0.5` for the median or `0.99` for p99.
+
+        Returns:
+            float or None: The bucket upper bound in seconds (`inf` for the overflow bucket),
+                           or `None` if nothing was recorded.
+        """
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0.0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return self.bounds[index] if index < len(self.bounds) else float("inf")
+        return float("inf")
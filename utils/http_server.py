@@ -0,0 +1,144 @@
+import asyncio
+import json
+from http import HTTPStatus
+
+
+class HttpRequest:
+    """A parsed HTTP/1.1 request."""
+
+    __slots__ = ("method", "path", "query", "headers", "body")
+
+    def __init__(self, method, path, query, headers, body):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        """Decode the request body as JSON."""
+        return json.loads(self.body)
+
+
+class HttpResponse:
+    """An HTTP response produced by a request handler."""
+
+    __slots__ = ("status", "body", "content_type")
+
+    def __init__(self, status=200, body=b"", content_type="text/plain; charset=utf-8"):
+        self.status = status
+        self.body = body.encode("utf-8") if isinstance(body, str) else body
+        self.content_type = content_type
+
+    @classmethod
+    def json(cls, payload, status=200):
+        """Build a JSON response from a Python object."""
+        return cls(status, json.dumps(payload), "application/json")
+
+
+class HttpServer:
+    """
+    A minimal asyncio HTTP/1.1 server.
+
+    It understands just enough of the protocol for the bot's own endpoints
+    (webhook receiver, metrics, local stubs): one request at a time per
+    connection, `Content-Length` bodies and keep-alive. Every request is
+    passed to an async `handler(request)` that returns an `HttpResponse`.
+    """
+
+    def __init__(self, handler, host="127.0.0.1", port=8080, max_body=1024 * 1024):
+        """
+        Initialize the HttpServer instance.
+
+        Args:
+            handler (callable): Async callable taking an `HttpRequest` and returning an `HttpResponse`.
+            host (str): Interface to listen on.
+            port (int): Port to listen on; `0` picks a free port.
+            max_body (int): Largest accepted request body in bytes.
+
+        Example:
+            >>> async def hello(request):
+            ...     return HttpResponse(200, "hello")
+            >>> server = HttpServer(hello, port=8080)
+            >>> await server.start()
+        """
+        self.handler = handler
+        self.host = host
+        self.port = port
+        self.max_body = max_body
+        self._server = None
+
+    async def start(self):
+        """Start listening. `port` is updated with the bound port."""
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        """Stop listening and close the server."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _serve(self, reader, writer):
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                if isinstance(request, HttpResponse):
+                    response, keep_alive = request, False
+                else:
+                    try:
+                        response = await self.handler(request)
+                    except Exception:
+                        response = HttpResponse(500, "internal error")
+                    keep_alive = request.headers.get("connection", "").lower() != "close"
+                self._write_response(writer, response, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        try:
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            return HttpResponse(400, "bad request")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            return HttpResponse(400, "bad content-length")
+        if length < 0:
+            return HttpResponse(400, "bad content-length")
+        if length > self.max_body:
+            return HttpResponse(413, "payload too large")
+        body = await reader.readexactly(length) if length else b""
+        path, _, query = target.partition("?")
+        return HttpRequest(method.upper(), path, query, headers, body)
+
+    @staticmethod
+    def _write_response(writer, response, keep_alive):
+        reason = HTTPStatus(response.status).phrase
+        head = (
+            f"HTTP/1.1 {response.status} {reason}\r\n"
+            f"Content-Type: {response.content_type}\r\n"
+            f"Content-Length: {len(response.body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + response.body)
@@ -0,0 +1,68 @@
+import re
+
+from solders.pubkey import Pubkey
+
+BASE58_CHARACTERS = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+# A 32-byte key is 32 to 44 base58 characters long. The lookarounds stop the
+# pattern from matching inside longer base58 runs such as transaction signatures.
+ADDRESS_PATTERN = re.compile(r"(?<![1-9A-HJ-NP-Za-km-z])[1-9A-HJ-NP-Za-km-z]{32,44}(?![1-9A-HJ-NP-Za-km-z])")
+
+MIN_ADDRESS_LENGTH = 32
+MAX_ADDRESS_LENGTH = 44
+
+
+def is_valid_address(text):
+    """
+    Return whether a string is a base58 encoded 32-byte Solana address.
+
+    Example:
+        >>> is_valid_address("EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v")
+        True
+        >>> is_valid_address("hello")
+        False
+    """
+    if not MIN_ADDRESS_LENGTH <= len(text) <= MAX_ADDRESS_LENGTH or text.strip(BASE58_CHARACTERS):
+        return False
+    try:
+        Pubkey.from_string(text)
+    except ValueError:
+        return False
+    return True
+
+
+def find_addresses(text, limit=1):
+    """
+    Find Solana addresses in a chat message.
+
+    Messages shorter than an address are rejected by their length and most
+    others by a single precompiled regular expression, so ordinary chat
+    costs a microsecond or two. Only runs of 32 to 44 base58 characters
+    are decoded, to make sure they are exactly 32 bytes. Addresses inside
+    links (e.g. `dexscreener.com/solana/<mint>`) are found as well.
+
+    Args:
+        text (str or None): The message text.
+        limit (int): Stop after this many distinct addresses.
+
+    Returns:
+        list[str]: The addresses in order of appearance.
+
+    Example:
+        >>> find_addresses("ape this EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v now")
+        ['EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v']
+    """
+    if not text or len(text) < MIN_ADDRESS_LENGTH:
+        return []
+    found = []
+    for candidate in ADDRESS_PATTERN.findall(text):
+        if candidate in found:
+            continue
+        try:
+            Pubkey.from_string(candidate)
+        except ValueError:
+            continue
+        found.append(candidate)
+        if len(found) >= limit:
+            break
+    return found
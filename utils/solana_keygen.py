@@ -38,6 +38,27 @@ class SolanaKeyGenerator:
         self.keypair = Keypair()
         return self
 
+    def load_private_key_base58(self, private_key):
+        """
+        Restore a keypair from a base58-encoded private key.
+
+        This is the inverse of `private_key_base58`: the string is decoded back
+        into the 32-byte secret seed and the keypair is rebuilt from it.
+
+        Args:
+            private_key (str): The base58-encoded private key.
+
+        Returns:
+            SolanaKeyGenerator: The current instance of the generator for method chaining.
+
+        Example:
+            >>> generator = SolanaKeyGenerator()
+            >>> generator.load_private_key_base58('3aXqHioP8KCBRTzudm3JXsQs9J4kAf5tHXsQmYx9tmGA')
+            <SolanaKeyGenerator object>
+        """
+        self.keypair = Keypair.from_seed(base58.b58decode(private_key))
+        return self
+
     @property
     def public_key(self):
         """